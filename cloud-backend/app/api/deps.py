@@ -1,12 +1,14 @@
+import hmac
 from typing import Annotated, Optional, Union
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.crud.crud_user import user_crud
 from app.models.user import User
+from app.core.config import settings
 from app.core.security import verify_token
 
 # HTTP Bearer 认证方案 - 用于 JWT 令牌认证
@@ -93,6 +95,21 @@ def get_current_active_user(
     return current_user
 
 
+def require_admin_token(
+    x_admin_token: Annotated[Optional[str], Header()] = None,
+) -> None:
+    """
+    校验管理端点的管理员令牌 (请求头 X-Admin-Token)
+
+    Raises:
+        HTTPException: 未配置 ADMIN_TOKEN 时返回 404，令牌错误时返回 403
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无效的管理员令牌")
+
+
 # 类型别名，用于控制器中的依赖注入
 CurrentUser = Annotated[User, Depends(get_current_user)]
 ActiveUser = Annotated[User, Depends(get_current_active_user)]
\ No newline at end of file
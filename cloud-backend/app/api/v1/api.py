@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import users, health_trends
+from app.api.v1.endpoints import admin, users, health_trends
 
 api_router = APIRouter()
 
@@ -12,4 +12,7 @@ api_router.include_router(
     health_trends.router, 
     prefix="/users", 
     tags=["health-trends"]
-)
\ No newline at end of file
+)
+
+# 管理端点 (需要 X-Admin-Token)
+api_router.include_router(admin.router)
@@ -0,0 +1,49 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi.responses import PlainTextResponse
+
+from app.api import deps
+from app.core.profiling import profile_store
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(deps.require_admin_token)],
+)
+
+
+@router.get("/profiles", summary="最近的请求剖析结果")
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    获取当前进程最近的请求剖析结果摘要 (新的在前)
+
+    Returns:
+        剖析结果摘要列表
+    """
+    return [profile.summary() for profile in profile_store.list()]
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="下载折叠栈",
+    description="折叠栈格式，可直接交给 flamegraph.pl 或 speedscope 生成火焰图"
+)
+def get_profile(profile_id: int = Path(..., description="剖析ID (响应头 X-Profile-Id)")) -> str:
+    """
+    获取一次请求剖析的折叠栈
+
+    Args:
+        profile_id: 剖析ID
+
+    Returns:
+        折叠栈文本
+
+    Raises:
+        HTTPException: 剖析结果不存在或已被挤出缓冲区
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="剖析结果不存在或已过期")
+    return profile.collapsed()
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.deadline import raise_if_overloaded
 from app.schemas.health_record import (
     HealthRecord,
     HealthRecordCreate,
@@ -16,12 +17,16 @@ from app.schemas.health_record import (
     HealthTrendsQuery,
     HealthSummary,
     BatchHealthRecordCreate,
+    BatchHealthRecordDelete,
+    BatchHealthRecordUpdate,
     BatchResponse,
+    BulkOperationResponse,
     TimeRange,
     AssessmentType,
     DataSource,
     Message
 )
+from app.schemas.health_alert import AlertSeverity, AlertType, HealthAlertListResponse
 
 router = APIRouter()
 
@@ -40,6 +45,7 @@ def get_health_trends(
     assessment_type: Optional[AssessmentType] = Query(None, description="评估类型筛选"),
     data_source: Optional[DataSource] = Query(None, description="数据来源筛选"),
     include_details: bool = Query(False, description="是否包含详细指标"),
+    include_analytics: bool = Query(False, description="是否在摘要中包含趋势分析 (斜率、滑动平均、EWMA、波动率、分位数、异常点)"),
     limit: int = Query(100, ge=1, le=1000, description="返回记录数限制"),
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
@@ -57,6 +63,7 @@ def get_health_trends(
     
     支持自定义时间范围 (start_date 和 end_date)
     支持按评估类型和数据来源筛选
+    include_analytics=true 时 summary.analytics 包含四个评分维度的趋势分析
     返回适合 ECharts 使用的数据格式
     """
     # 权限检查：只能查看自己的数据或管理员可以查看所有数据
@@ -68,14 +75,6 @@ def get_health_trends(
             detail="无权限访问其他用户的健康数据"
         )
     
-    # 验证用户存在
-    user = crud.user.get(db, id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="用户不存在"
-        )
-    
     # 验证日期范围
     if start_date and end_date and start_date >= end_date:
         raise HTTPException(
@@ -84,20 +83,8 @@ def get_health_trends(
         )
     
     try:
-        # 获取 ECharts 格式的数据
-        data_points, echarts_config = crud.health_record.get_echarts_data(
-            db=db,
-            user_id=user_id,
-            time_range=time_range,
-            start_date=start_date,
-            end_date=end_date,
-            assessment_type=assessment_type,
-            data_source=data_source,
-            limit=limit
-        )
-        
-        # 获取统计摘要
-        _, summary = crud.health_record.get_health_trends(
+        # 获取 ECharts 格式的数据与统计摘要 (一次查询，并发的相同请求共享结果)
+        data_points, echarts_config, summary = crud.health_record.get_trend_view(
             db=db,
             user_id=user_id,
             time_range=time_range,
@@ -105,7 +92,8 @@ def get_health_trends(
             end_date=end_date,
             assessment_type=assessment_type,
             data_source=data_source,
-            limit=limit
+            limit=limit,
+            analytics=include_analytics
         )
         
         # 构建时间范围描述
@@ -131,6 +119,8 @@ def get_health_trends(
         )
         
     except Exception as e:
+        # 超时与连接池耗尽返回 503 + Retry-After，而不是 500 / 400
+        raise_if_overloaded(e)
         raise HTTPException(
             status_code=500,
             detail=f"获取健康趋势数据失败: {str(e)}"
@@ -194,7 +184,7 @@ def get_health_records(
 
 
 @router.get(
-    "/{user_id}/health-records/{record_id}",
+    "/{user_id}/health-records/{record_id:int}",
     response_model=HealthRecordResponse,
     summary="获取单个健康记录",
     description="根据记录ID获取用户的单个健康记录详情"
@@ -247,14 +237,6 @@ def create_health_record(
             detail="无权限为其他用户创建健康记录"
         )
     
-    # 验证用户存在
-    user = crud.user.get(db, id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="用户不存在"
-        )
-    
     try:
         record = crud.health_record.create(
             db=db,
@@ -266,6 +248,7 @@ def create_health_record(
             message="创建健康记录成功"
         )
     except Exception as e:
+        raise_if_overloaded(e)
         raise HTTPException(
             status_code=400,
             detail=f"创建健康记录失败: {str(e)}"
@@ -273,7 +256,7 @@ def create_health_record(
 
 
 @router.put(
-    "/{user_id}/health-records/{record_id}",
+    "/{user_id}/health-records/{record_id:int}",
     response_model=HealthRecordResponse,
     summary="更新健康记录",
     description="更新用户的健康记录"
@@ -311,6 +294,7 @@ def update_health_record(
             message="更新健康记录成功"
         )
     except Exception as e:
+        raise_if_overloaded(e)
         raise HTTPException(
             status_code=400,
             detail=f"更新健康记录失败: {str(e)}"
@@ -318,7 +302,7 @@ def update_health_record(
 
 
 @router.delete(
-    "/{user_id}/health-records/{record_id}",
+    "/{user_id}/health-records/{record_id:int}",
     response_model=Message,
     summary="删除健康记录",
     description="删除用户的健康记录"
@@ -359,7 +343,7 @@ def get_health_summary(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ) -> Any:
-    """获取健康统计摘要"""
+    """获取健康统计摘要 (读取增量维护的统计行，一次主键查询)"""
     # 权限检查
     if current_user.id != user_id:
         raise HTTPException(
@@ -368,7 +352,7 @@ def get_health_summary(
         )
     
     try:
-        _, summary = crud.health_record.get_health_trends(
+        summary = crud.health_stats.get_summary(
             db=db,
             user_id=user_id,
             time_range=time_range
@@ -377,6 +361,7 @@ def get_health_summary(
         return HealthSummary(**summary)
         
     except Exception as e:
+        raise_if_overloaded(e)
         raise HTTPException(
             status_code=500,
             detail=f"获取健康统计摘要失败: {str(e)}"
@@ -404,14 +389,6 @@ def batch_create_health_records(
             detail="无权限为其他用户创建健康记录"
         )
     
-    # 验证用户存在
-    user = crud.user.get(db, id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="用户不存在"
-        )
-    
     try:
         created_records = crud.health_record.batch_create(
             db=db,
@@ -427,6 +404,7 @@ def batch_create_health_records(
         )
         
     except Exception as e:
+        raise_if_overloaded(e)
         return BatchResponse(
             success_count=0,
             failed_count=len(batch_in.records),
@@ -435,6 +413,93 @@ def batch_create_health_records(
         )
 
 
+@router.patch(
+    "/{user_id}/health-records/batch",
+    response_model=BulkOperationResponse,
+    summary="批量更新健康记录",
+    description="将同一组更新字段应用到多条健康记录（最多1000条，一条 SQL 完成）"
+)
+def batch_update_health_records(
+    user_id: int = Path(..., description="用户ID"),
+    batch_in: BatchHealthRecordUpdate = ...,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+) -> Any:
+    """批量更新健康记录"""
+    # 权限检查
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="无权限修改其他用户的健康记录"
+        )
+    
+    try:
+        updated_ids = crud.health_record.bulk_update(
+            db=db,
+            user_id=user_id,
+            record_ids=batch_in.ids,
+            obj_in=batch_in.patch
+        )
+    except Exception as e:
+        raise_if_overloaded(e)
+        raise HTTPException(
+            status_code=400,
+            detail=f"批量更新健康记录失败: {str(e)}"
+        )
+    
+    return BulkOperationResponse(
+        affected_count=len(updated_ids),
+        affected_ids=updated_ids,
+        missing_ids=sorted(set(batch_in.ids) - set(updated_ids)),
+        message=f"已更新 {len(updated_ids)} 条健康记录"
+    )
+
+
+@router.post(
+    "/{user_id}/health-records/batch-delete",
+    response_model=BulkOperationResponse,
+    summary="批量删除健康记录",
+    description="按记录ID列表和 / 或筛选条件（评估时间范围、数据来源、评估类型）批量删除健康记录（一条 SQL 完成）"
+)
+def batch_delete_health_records(
+    user_id: int = Path(..., description="用户ID"),
+    batch_in: BatchHealthRecordDelete = ...,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+) -> Any:
+    """批量删除健康记录"""
+    # 权限检查
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="无权限删除其他用户的健康记录"
+        )
+    
+    try:
+        deleted_ids = crud.health_record.bulk_delete(
+            db=db,
+            user_id=user_id,
+            record_ids=batch_in.ids,
+            start_date=batch_in.start_date,
+            end_date=batch_in.end_date,
+            data_source=batch_in.data_source,
+            assessment_type=batch_in.assessment_type
+        )
+    except Exception as e:
+        raise_if_overloaded(e)
+        raise HTTPException(
+            status_code=400,
+            detail=f"批量删除健康记录失败: {str(e)}"
+        )
+    
+    return BulkOperationResponse(
+        affected_count=len(deleted_ids),
+        affected_ids=deleted_ids,
+        missing_ids=sorted(set(batch_in.ids or ()) - set(deleted_ids)),
+        message=f"已删除 {len(deleted_ids)} 条健康记录"
+    )
+
+
 @router.get(
     "/{user_id}/health-records/latest",
     response_model=HealthRecordResponse,
@@ -464,4 +529,47 @@ def get_latest_health_record(
     return HealthRecordResponse(
         data=record,
         message="获取最新健康记录成功"
-    )
\ No newline at end of file
+    )
+
+
+@router.get(
+    "/{user_id}/health-alerts",
+    response_model=HealthAlertListResponse,
+    summary="获取用户健康告警列表",
+    description="分页获取健康记录提交后异步检测出的告警（评分骤降、心率 / 血压超出范围），按检测时间倒序"
+)
+def get_health_alerts(
+    user_id: int = Path(..., description="用户ID"),
+    skip: int = Query(0, ge=0, description="跳过的记录数"),
+    limit: int = Query(20, ge=1, le=100, description="每页记录数"),
+    alert_type: Optional[AlertType] = Query(None, description="告警类型筛选"),
+    severity: Optional[AlertSeverity] = Query(None, description="严重程度筛选"),
+    start_date: Optional[datetime] = Query(None, description="开始日期"),
+    end_date: Optional[datetime] = Query(None, description="结束日期"),
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+) -> Any:
+    """获取用户健康告警列表（支持分页和筛选）"""
+    # 权限检查
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="无权限访问其他用户的健康数据"
+        )
+    
+    filters = dict(
+        alert_type=alert_type,
+        severity=severity,
+        start_date=start_date,
+        end_date=end_date
+    )
+    alerts = crud.health_alert.get_multi(db=db, user_id=user_id, skip=skip, limit=limit, **filters)
+    total = crud.health_alert.count(db=db, user_id=user_id, **filters)
+    
+    return HealthAlertListResponse(
+        items=alerts,
+        total=total,
+        page=skip // limit + 1,
+        size=limit,
+        pages=(total + limit - 1) // limit
+    )
@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.deadline import raise_if_overloaded
 from app.crud.crud_user import user_crud, UserAlreadyExistsError
 from app.database import get_db
 from app.schemas.user import (
@@ -48,6 +49,7 @@ async def create_user(
             detail=str(e)
         )
     except Exception as e:
+        raise_if_overloaded(e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="创建用户时发生错误"
@@ -0,0 +1,246 @@
+"""
+准入控制 (过载保护)
+
+按路由类别限制同时处理的请求数，超出时进入有界队列短暂等待，队列已满或等待超时立即返回
+503 + Retry-After，而不是让请求堆积在线程池和连接池上直到客户端超时重试 (重试会进一步放大负载)。
+
+路由类别按优先级排列:
+    write      写入 (POST / PUT / PATCH / DELETE)，空出名额时最先放行
+    read       普通读取
+    analytics  趋势、摘要等分析型读取，最多占用 analytics_share 比例的并发，其余留给写入和普通读取
+
+中间件运行在事件循环中，计数与队列只在事件循环线程内修改，无需加锁。
+"""
+
+import asyncio
+import json
+import math
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.deadline import deadline_scope, remaining
+from app.core.metrics import admission_queue_depth, admission_requests_total
+
+# 按优先级从高到低
+ROUTE_CLASSES: Tuple[str, ...] = ("write", "read", "analytics")
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# 分析型读取的路由后缀
+ANALYTICS_SUFFIXES: Tuple[str, ...] = ("/health-trends", "/health-summary")
+# 客户端声明的剩余超时 (秒)，只能缩短截止时间
+TIMEOUT_HEADER = b"x-request-timeout"
+# anyio 默认线程池大小：同步端点在其中执行，并发名额超过它只会在线程池里排队
+THREADPOOL_SIZE = 40
+
+
+@dataclass
+class ClassLimits:
+    """单个路由类别的限制"""
+    concurrency: int
+    queue_size: int
+    deadline_seconds: float
+
+
+class AdmissionRejected(Exception):
+    """请求被拒绝 (队列已满或排队超时)"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """按优先级分配并发名额的准入控制器"""
+
+    def __init__(
+        self,
+        capacity: int,
+        limits: Dict[str, ClassLimits],
+        queue_timeout: float = 1.0,
+        retry_after: int = 2,
+        enabled: bool = True
+    ):
+        self.capacity = capacity
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.running: Dict[str, int] = {name: 0 for name in ROUTE_CLASSES}
+        self._queues: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in ROUTE_CLASSES}
+
+    @property
+    def total_running(self) -> int:
+        """正在处理的请求总数"""
+        return sum(self.running.values())
+
+    def _can_run(self, route_class: str) -> bool:
+        return (
+            self.total_running < self.capacity
+            and self.running[route_class] < self.limits[route_class].concurrency
+        )
+
+    def _has_waiters(self, up_to: str) -> bool:
+        """优先级不低于 up_to 的类别是否有排队请求"""
+        for name in ROUTE_CLASSES:
+            if self._queues[name]:
+                return True
+            if name == up_to:
+                return False
+        return False
+
+    async def acquire(self, route_class: str) -> None:
+        """
+        获取一个并发名额
+
+        Args:
+            route_class: 路由类别
+
+        Raises:
+            AdmissionRejected: 队列已满或在排队超时 / 截止时间前未获得名额
+        """
+        if self._can_run(route_class) and not self._has_waiters(route_class):
+            self.running[route_class] += 1
+            admission_requests_total.inc((route_class, "admitted"))
+            return
+
+        queue = self._queues[route_class]
+        if len(queue) >= self.limits[route_class].queue_size:
+            admission_requests_total.inc((route_class, "shed"))
+            raise AdmissionRejected("queue_full")
+
+        timeout = self.queue_timeout
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, left)
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        admission_queue_depth.set(len(queue), (route_class,))
+        try:
+            await asyncio.wait({waiter}, timeout=max(timeout, 0.0))
+        except BaseException:
+            # 排队期间请求被取消 (客户端断开)：已分配的名额要归还
+            if waiter.done() and not waiter.cancelled():
+                self.release(route_class)
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                queue.remove(waiter)
+            admission_queue_depth.set(len(queue), (route_class,))
+        if waiter.cancelled():
+            admission_requests_total.inc((route_class, "queue_timeout"))
+            raise AdmissionRejected("queue_timeout")
+        admission_requests_total.inc((route_class, "queued"))
+
+    def release(self, route_class: str) -> None:
+        """释放名额，并按优先级放行排队的请求"""
+        self.running[route_class] -= 1
+        for name in ROUTE_CLASSES:
+            queue = self._queues[name]
+            while queue and self._can_run(name):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self.running[name] += 1
+                waiter.set_result(None)
+            admission_queue_depth.set(len(queue), (name,))
+
+    def retry_after_seconds(self) -> int:
+        """Retry-After 秒数，加随机抖动使被拒绝的客户端错开重试"""
+        return max(1, math.ceil(self.retry_after * (1 + random.random())))
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """各类别当前处理中与排队的请求数"""
+        return {
+            name: {"running": self.running[name], "queued": len(self._queues[name])}
+            for name in ROUTE_CLASSES
+        }
+
+
+def classify(method: str, path: str, api_prefix: str) -> Optional[str]:
+    """
+    确定请求的路由类别
+
+    Args:
+        method: HTTP 方法
+        path: 请求路径
+        api_prefix: API 路由前缀，前缀之外的路径 (健康检查、指标、文档) 不受准入控制
+
+    Returns:
+        路由类别，不受控制时返回 None
+    """
+    if not path.startswith(api_prefix):
+        return None
+    if method in WRITE_METHODS:
+        return "write"
+    if path.rstrip("/").endswith(ANALYTICS_SUFFIXES):
+        return "analytics"
+    return "read"
+
+
+def _client_timeout(scope: Scope) -> Optional[float]:
+    """读取请求头 X-Request-Timeout (秒)"""
+    for name, value in scope.get("headers", ()):
+        if name == TIMEOUT_HEADER:
+            try:
+                seconds = float(value)
+            except ValueError:
+                return None
+            return seconds if seconds > 0 else None
+    return None
+
+
+class AdmissionControlMiddleware:
+    """
+    设置请求截止时间并执行准入控制
+
+    排队时间计入截止时间；被拒绝的请求返回 503 + Retry-After，不占用线程池和数据库连接。
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, api_prefix: str):
+        self.app = app
+        self.controller = controller
+        self.api_prefix = api_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = classify(scope["method"], scope["path"], self.api_prefix)
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self.controller.limits[route_class].deadline_seconds
+        client_timeout = _client_timeout(scope)
+        if client_timeout is not None:
+            seconds = min(seconds, client_timeout)
+
+        with deadline_scope(seconds):
+            if not self.controller.enabled:
+                await self.app(scope, receive, send)
+                return
+            try:
+                await self.controller.acquire(route_class)
+            except AdmissionRejected:
+                await self._reject(send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.controller.release(route_class)
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": "服务繁忙，请稍后重试"}, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(self.controller.retry_after_seconds()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
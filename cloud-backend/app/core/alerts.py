@@ -0,0 +1,514 @@
+"""
+健康告警流水线
+
+健康记录提交后 (create / batch_create) 把记录摘要放入有界队列，由后台工作线程异步检测，
+写入路径只做一次非阻塞入队，不增加写入延迟；队列已满时丢弃事件并计数，而不是阻塞请求。
+
+检测器:
+    score_drop_zscore  综合评分相对最近 ZSCORE_WINDOW 次评分的 z 分数低于 -Z_THRESHOLD (突然下降)
+    score_drop_cusum   下侧 CUSUM 累积偏离超过 CUSUM_H (持续小幅下降)，基线为受控期间的 EWMA
+    heart_rate         心率超出正常范围
+    blood_pressure     血压偏高或偏低 ("收缩压/舒张压" 字符串或 {"systolic", "diastolic"})
+
+同一用户的事件按 user_id 固定路由到同一个工作线程，保证顺序且检测器状态无需加锁；
+每个用户的检测器状态保存在内存中，定期 (及关闭时) 写回数据库作为检查点，首次处理时从检查点恢复。
+评估时间早于已处理记录的事件 (补录历史数据) 只做指标范围检查，不更新评分检测器。
+
+只支持单个 API 进程: 按 user_id 路由与内存中的检测器状态都是进程内的，多个工作进程
+(run.py --workers N / WEB_CONCURRENCY > 1) 会让同一用户的事件分散到各进程，各自从检查点恢复、
+互相覆盖检查点，检测结果不可靠。多进程部署需启用事务发件箱 (OUTBOX_ENABLED)，由 run.py --worker 统一检测。
+"""
+
+import logging
+import math
+import queue
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Mapping, Optional, Protocol, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.metrics import alert_events_total, alert_queue_depth, alerts_detected_total
+from app.utils.helpers import to_local_naive
+
+logger = logging.getLogger(__name__)
+
+# 滚动 z 分数: 参考最近 ZSCORE_WINDOW 次评分，至少 MIN_POINTS 次后开始检测
+ZSCORE_WINDOW = 10
+MIN_POINTS = 5
+Z_THRESHOLD = 3.0
+# 评分标准差下限，避免评分长期不变时微小波动被放大
+MIN_STD = 2.0
+# 下侧 CUSUM: 允许偏离 CUSUM_K 分，累积超过 CUSUM_H 分报警；基线 EWMA 平滑系数
+CUSUM_K = 2.5
+CUSUM_H = 15.0
+BASELINE_ALPHA = 0.1
+
+# 心率 (次/分): 超出正常范围为 warning，超出危急范围为 critical
+HEART_RATE_RANGE = (40.0, 120.0)
+HEART_RATE_CRITICAL_RANGE = (30.0, 150.0)
+# 血压 (mmHg)
+BP_HIGH = (140.0, 90.0)
+BP_CRITICAL = (180.0, 120.0)
+BP_LOW = (90.0, 60.0)
+
+# 单次处理的最大事件数 (同一事务写入告警)
+BATCH_SIZE = 200
+# 每个工作线程内存中保留的用户状态上限，超出后淘汰最久未使用的已写回状态
+MAX_STATES = 10000
+
+# 工作线程队列中的控制标记: 停止 / 立即写回检测器状态
+_STOP = object()
+_CHECKPOINT = object()
+
+
+@dataclass(frozen=True)
+class RecordEvent:
+    """已提交的健康记录中告警检测需要的字段"""
+    user_id: int
+    record_id: int
+    assessed_at: datetime
+    overall_score: float
+    detailed_metrics: Optional[Dict[str, Any]] = None
+
+    def to_payload(self) -> Dict[str, Any]:
+        """序列化为 JSON 兼容的字典 (写入事务发件箱)"""
+        return {
+            "user_id": self.user_id,
+            "record_id": self.record_id,
+            "assessed_at": self.assessed_at.isoformat(),
+            "overall_score": self.overall_score,
+            "detailed_metrics": self.detailed_metrics,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "RecordEvent":
+        """从 to_payload 的结果恢复"""
+        return cls(**{**payload, "assessed_at": datetime.fromisoformat(payload["assessed_at"])})
+
+
+@dataclass
+class Alert:
+    """检测到的告警"""
+    user_id: int
+    record_id: int
+    alert_type: str
+    severity: str
+    message: str
+    value: Optional[float]
+    assessed_at: datetime
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class UserDetectorState:
+    """单个用户的流式检测器状态"""
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=ZSCORE_WINDOW))
+    baseline: Optional[float] = None
+    cusum: float = 0.0
+    count: int = 0
+    last_assessed_at: Optional[datetime] = None
+
+    def update(self, event: RecordEvent) -> List[Alert]:
+        """
+        用一次综合评分更新评分检测器
+
+        Args:
+            event: 健康记录事件
+
+        Returns:
+            评分骤降告警列表
+        """
+        assessed_at = to_local_naive(event.assessed_at)
+        if self.last_assessed_at is not None and assessed_at < self.last_assessed_at:
+            return []
+
+        score = float(event.overall_score)
+        alerts = []
+        if len(self.recent) >= MIN_POINTS:
+            mean = statistics.fmean(self.recent)
+            std = max(statistics.pstdev(self.recent), MIN_STD)
+            z = (score - mean) / std
+            if z <= -Z_THRESHOLD:
+                alerts.append(_alert(
+                    event, "score_drop_zscore",
+                    "critical" if z <= -2 * Z_THRESHOLD else "warning",
+                    f"综合评分突然下降: {score:.1f} (近期平均 {mean:.1f})",
+                    score,
+                    {"z_score": round(z, 2), "recent_mean": round(mean, 2), "recent_std": round(std, 2)},
+                ))
+                # 突降已单独报警，CUSUM 从零开始累积
+                self.cusum = 0.0
+            else:
+                self.cusum = max(0.0, self.cusum + (self.baseline - score) - CUSUM_K)
+                if self.cusum > CUSUM_H:
+                    alerts.append(_alert(
+                        event, "score_drop_cusum", "warning",
+                        f"综合评分持续下降: {score:.1f} (基线 {self.baseline:.1f})",
+                        score,
+                        {"cusum": round(self.cusum, 2), "baseline": round(self.baseline, 2)},
+                    ))
+                    # 报警后以当前水平作为新基线
+                    self.cusum = 0.0
+                    self.baseline = score
+
+        # 基线只在受控 (CUSUM 为零) 时跟随评分，避免持续下降被基线吸收
+        if self.baseline is None or len(self.recent) < MIN_POINTS:
+            self.baseline = (score if self.baseline is None
+                             else self.baseline + (score - self.baseline) / (len(self.recent) + 1))
+        elif self.cusum == 0.0:
+            self.baseline += BASELINE_ALPHA * (score - self.baseline)
+
+        self.recent.append(score)
+        self.count += 1
+        self.last_assessed_at = assessed_at
+        return alerts
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为检查点"""
+        return {
+            "recent": list(self.recent),
+            "baseline": self.baseline,
+            "cusum": self.cusum,
+            "count": self.count,
+            "last_assessed_at": self.last_assessed_at.isoformat() if self.last_assessed_at else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "UserDetectorState":
+        """从检查点恢复 (无检查点时为初始状态)"""
+        if not data:
+            return cls()
+        last_assessed_at = data.get("last_assessed_at")
+        return cls(
+            recent=deque(data.get("recent", []), maxlen=ZSCORE_WINDOW),
+            baseline=data.get("baseline"),
+            cusum=data.get("cusum", 0.0),
+            count=data.get("count", 0),
+            last_assessed_at=datetime.fromisoformat(last_assessed_at) if last_assessed_at else None,
+        )
+
+
+def check_metrics(event: RecordEvent) -> List[Alert]:
+    """
+    检查详细指标是否超出范围
+
+    Args:
+        event: 健康记录事件
+
+    Returns:
+        心率 / 血压告警列表
+    """
+    metrics = event.detailed_metrics or {}
+    alerts = []
+
+    heart_rate = _number(metrics.get("heart_rate"))
+    if heart_rate is not None and not HEART_RATE_RANGE[0] <= heart_rate <= HEART_RATE_RANGE[1]:
+        critical = not HEART_RATE_CRITICAL_RANGE[0] <= heart_rate <= HEART_RATE_CRITICAL_RANGE[1]
+        state = "过低" if heart_rate < HEART_RATE_RANGE[0] else "过高"
+        alerts.append(_alert(
+            event, "heart_rate", "critical" if critical else "warning",
+            f"心率{state}: {heart_rate:g} 次/分", heart_rate,
+            {"normal_range": list(HEART_RATE_RANGE)},
+        ))
+
+    pressure = _blood_pressure(metrics.get("blood_pressure"))
+    if pressure is not None:
+        systolic, diastolic = pressure
+        severity = state = None
+        if systolic >= BP_CRITICAL[0] or diastolic >= BP_CRITICAL[1]:
+            severity, state = "critical", "严重偏高"
+        elif systolic >= BP_HIGH[0] or diastolic >= BP_HIGH[1]:
+            severity, state = "warning", "偏高"
+        elif systolic < BP_LOW[0] or diastolic < BP_LOW[1]:
+            severity, state = "warning", "偏低"
+        if severity:
+            alerts.append(_alert(
+                event, "blood_pressure", severity,
+                f"血压{state}: {systolic:g}/{diastolic:g} mmHg", systolic,
+                {"systolic": systolic, "diastolic": diastolic},
+            ))
+    return alerts
+
+
+def detect(states: Mapping[int, UserDetectorState], events: Sequence[RecordEvent]) -> List[Alert]:
+    """
+    对一批事件运行全部检测器
+
+    Args:
+        states: 用户ID -> 检测器状态 (须包含事件涉及的全部用户，原地更新)
+        events: 健康记录事件
+
+    Returns:
+        检测到的告警列表
+    """
+    alerts = []
+    # 同一批内按评估时间处理 (批量创建的记录不保证时间顺序)
+    for event in sorted(events, key=lambda event: to_local_naive(event.assessed_at)):
+        alerts.extend(check_metrics(event))
+        alerts.extend(states[event.user_id].update(event))
+    return alerts
+
+
+def _alert(
+    event: RecordEvent,
+    alert_type: str,
+    severity: str,
+    message: str,
+    value: Optional[float],
+    details: Dict[str, Any]
+) -> Alert:
+    return Alert(
+        user_id=event.user_id,
+        record_id=event.record_id,
+        alert_type=alert_type,
+        severity=severity,
+        message=message,
+        value=value,
+        assessed_at=event.assessed_at,
+        details=details,
+    )
+
+
+def _number(value: Any) -> Optional[float]:
+    """指标值转换为数字 (无法转换时为空)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _blood_pressure(value: Any) -> Optional[Tuple[float, float]]:
+    """解析血压 ("120/80" 或 {"systolic": 120, "diastolic": 80})"""
+    if isinstance(value, str) and "/" in value:
+        systolic, _, diastolic = value.partition("/")
+    elif isinstance(value, dict):
+        systolic, diastolic = value.get("systolic"), value.get("diastolic")
+    else:
+        return None
+    systolic, diastolic = _number(systolic), _number(diastolic)
+    if systolic is None or diastolic is None:
+        return None
+    return systolic, diastolic
+
+
+class AlertStore(Protocol):
+    """告警与检测器状态的持久化接口 (不提交事务)"""
+
+    def load_states(self, db: Session, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]: ...
+
+    def save_states(self, db: Session, states: Dict[int, Dict[str, Any]]) -> None: ...
+
+    def create_many(self, db: Session, alerts: Sequence[Alert]) -> None: ...
+
+
+class _Worker:
+    """单个工作线程: 队列与其负责的用户状态"""
+
+    def __init__(self, queue_size: int):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.states: "OrderedDict[int, UserDetectorState]" = OrderedDict()
+        self.dirty: Set[int] = set()
+        self.thread: Optional[threading.Thread] = None
+
+
+class AlertPipeline:
+    """
+    健康记录异步告警流水线
+
+    Args:
+        session_factory: 创建数据库会话的工厂 (如 SessionLocal)
+        store: 告警与检测器状态的持久化接口
+        workers: 工作线程数
+        queue_size: 每个工作线程的队列上限
+        checkpoint_interval: 检测器状态写回数据库的间隔 (秒)
+        enabled: 是否启用 (禁用时 submit 直接忽略)
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        store: AlertStore,
+        *,
+        workers: int = 2,
+        queue_size: int = 10000,
+        checkpoint_interval: float = 30.0,
+        enabled: bool = True
+    ):
+        self.session_factory = session_factory
+        self.store = store
+        self.checkpoint_interval = checkpoint_interval
+        self.enabled = enabled
+        self._workers = [_Worker(queue_size) for _ in range(max(1, workers))]
+        self._started = False
+
+    @property
+    def running(self) -> bool:
+        """工作线程是否已启动"""
+        return self._started
+
+    def check_processes(self, processes: int) -> None:
+        """
+        检查 API 工作进程数，启用的流水线只能运行在单个进程中
+
+        Args:
+            processes: API 工作进程数 (WEB_CONCURRENCY)
+
+        Raises:
+            RuntimeError: 流水线已启用且工作进程数大于 1
+        """
+        if self.enabled and processes > 1:
+            raise RuntimeError(
+                f"进程内告警流水线只支持单个 API 进程 (当前 {processes} 个): "
+                "多进程部署请启用 OUTBOX_ENABLED 并运行 python run.py --worker，或关闭 ALERTS_ENABLED"
+            )
+
+    def start(self) -> None:
+        """启动工作线程 (重复调用无效果)"""
+        if self._started or not self.enabled:
+            return
+        for index, worker in enumerate(self._workers):
+            worker.thread = threading.Thread(
+                target=self._run, args=(worker,), name=f"alert-worker-{index}", daemon=True
+            )
+            worker.thread.start()
+        self._started = True
+        logger.info("告警流水线已启动: %d 个工作线程", len(self._workers))
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        停止工作线程: 处理完已入队的事件并写回检测器状态
+
+        Args:
+            timeout: 每个工作线程的最长等待时间 (秒)
+        """
+        if not self._started:
+            return
+        self._started = False
+        for worker in self._workers:
+            worker.queue.put(_STOP)
+        for worker in self._workers:
+            worker.thread.join(timeout)
+            if worker.thread.is_alive():
+                logger.warning("告警工作线程 %s 未在 %.1f 秒内退出", worker.thread.name, timeout)
+        logger.info("告警流水线已停止")
+
+    def submit(self, events: Sequence[RecordEvent]) -> int:
+        """
+        提交已提交的健康记录 (非阻塞)
+
+        Args:
+            events: 健康记录事件
+
+        Returns:
+            入队的事件数 (流水线未启动或队列已满时少于事件数)
+        """
+        if not self._started:
+            return 0
+        accepted = 0
+        for event in events:
+            worker = self._workers[event.user_id % len(self._workers)]
+            try:
+                worker.queue.put_nowait(event)
+            except queue.Full:
+                alert_events_total.inc(("dropped",))
+                continue
+            alert_queue_depth.inc()
+            accepted += 1
+        if accepted:
+            alert_events_total.inc(("queued",), accepted)
+        return accepted
+
+    def flush(self) -> None:
+        """等待已入队的事件处理完成并写回检测器状态"""
+        if not self._started:
+            return
+        for worker in self._workers:
+            worker.queue.put(_CHECKPOINT)
+        for worker in self._workers:
+            worker.queue.join()
+
+    def _run(self, worker: _Worker) -> None:
+        """工作线程主循环: 成批取出事件检测，按间隔写回检测器状态"""
+        next_checkpoint = time.monotonic() + self.checkpoint_interval
+        while True:
+            try:
+                item = worker.queue.get(timeout=max(0.0, next_checkpoint - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            items = [] if item is None else [item]
+            while items and items[-1] is not _STOP and items[-1] is not _CHECKPOINT and len(items) < BATCH_SIZE:
+                try:
+                    items.append(worker.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = [item for item in items if isinstance(item, RecordEvent)]
+            if events:
+                self._process(worker, events)
+            if items and items[-1] in (_STOP, _CHECKPOINT) or time.monotonic() >= next_checkpoint:
+                self._checkpoint(worker)
+                next_checkpoint = time.monotonic() + self.checkpoint_interval
+            for _ in items:
+                worker.queue.task_done()
+            if items and items[-1] is _STOP:
+                return
+
+    def _process(self, worker: _Worker, events: List[RecordEvent]) -> None:
+        """检测一批事件，告警在一个事务中写入"""
+        alert_queue_depth.dec(amount=len(events))
+        try:
+            with self.session_factory() as db:
+                missing = {event.user_id for event in events if event.user_id not in worker.states}
+                if missing:
+                    checkpoints = self.store.load_states(db, missing)
+                    for user_id in missing:
+                        worker.states[user_id] = UserDetectorState.from_dict(checkpoints.get(user_id))
+
+                alerts = detect(worker.states, events)
+                for user_id in {event.user_id for event in events}:
+                    worker.states.move_to_end(user_id)
+                    worker.dirty.add(user_id)
+
+                if alerts:
+                    self.store.create_many(db, alerts)
+                    db.commit()
+        except Exception:
+            logger.exception("告警检测失败: %d 个事件", len(events))
+            alert_events_total.inc(("failed",), len(events))
+            # 丢弃可能不完整的内存状态，下次从检查点恢复
+            for user_id in {event.user_id for event in events}:
+                worker.states.pop(user_id, None)
+                worker.dirty.discard(user_id)
+            return
+
+        alert_events_total.inc(("processed",), len(events))
+        for alert in alerts:
+            alerts_detected_total.inc((alert.alert_type,))
+        if len(worker.states) > MAX_STATES:
+            self._checkpoint(worker)
+
+    def _checkpoint(self, worker: _Worker) -> None:
+        """写回有变化的检测器状态，并淘汰超出上限的最久未使用状态"""
+        if worker.dirty:
+            states = {user_id: worker.states[user_id].to_dict() for user_id in worker.dirty}
+            try:
+                with self.session_factory() as db:
+                    self.store.save_states(db, states)
+                    db.commit()
+            except Exception:
+                logger.exception("告警检测器状态写回失败: %d 个用户", len(states))
+                return
+            worker.dirty.clear()
+
+        while len(worker.states) > MAX_STATES:
+            worker.states.popitem(last=False)
+
@@ -0,0 +1,335 @@
+"""
+趋势统计的向量化分析
+
+输入为趋势投影查询 (get_trend_points) 的四个评分列，组成 (4, n) 的 NumPy 矩阵，
+缺失的分类评分为 NaN；所有统计沿时间轴一次性计算四个评分维度:
+
+- least_squares_slope: 最小二乘斜率 (分/天) 与拟合的首末值
+- rolling_mean: 最近 window 条记录的滑动平均
+- ewma: 指数加权移动平均
+- volatility: 相邻两次评分变化量的标准差
+- score_percentiles: 分位数
+- anomaly_flags: 相对前 window 条记录的 z 分数超过阈值的点
+
+除 EWMA 按块递推外没有 Python 层循环；EWMA 每块长度保证块内衰减系数不会下溢。
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 评分维度 (矩阵的行顺序)
+SCORE_DIMENSIONS: Tuple[str, ...] = ("overall_score", "physical_score", "mental_score", "lifestyle_score")
+
+DEFAULT_WINDOW = 7
+DEFAULT_ALPHA = 0.3
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_PERCENTILES: Tuple[float, ...] = (10, 25, 50, 75, 90)
+# 拟合首末值相差超过该分数判定为上升 / 下降 (与摘要中首末比较的阈值一致)
+TREND_THRESHOLD = 5.0
+
+SECONDS_PER_DAY = 86400.0
+# EWMA 分块: 块内累计衰减不小于 exp(-600)，避免下溢
+_EWMA_LOG_FLOOR = 600.0
+# 异常检测参照窗口的最小标准差 (分)
+_MIN_STD = 1e-6
+
+
+def score_matrix(rows: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将趋势查询结果行转换为数组
+
+    Args:
+        rows: 按评估时间升序排列的行 (需要 assessed_at 与四个评分列)
+
+    Returns:
+        (评估时间戳数组 (秒，形状 (n,)), 评分矩阵 (形状 (4, n)，缺失为 NaN))
+    """
+    count = len(rows)
+    timestamps = np.fromiter((row.assessed_at.timestamp() for row in rows), dtype=np.float64, count=count)
+    scores = np.array(
+        [tuple(getattr(row, name) for name in SCORE_DIMENSIONS) for row in rows],
+        dtype=np.float64,
+    ).reshape(count, len(SCORE_DIMENSIONS))
+    return timestamps, scores.T.copy()
+
+
+def _masked_mean_std(values: np.ndarray, min_count: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按行计算忽略 NaN 的均值、总体标准差与有效值个数 (有效值不足 min_count 的行为 NaN)"""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=1)
+    filled = np.where(valid, values, 0.0)
+    safe = np.maximum(count, 1)
+    mean = filled.sum(axis=1) / safe
+    deviation = np.where(valid, values - mean[:, None], 0.0)
+    std = np.sqrt((deviation * deviation).sum(axis=1) / safe)
+    enough = count >= min_count
+    return np.where(enough, mean, np.nan), np.where(enough, std, np.nan), count
+
+
+def least_squares_slope(days: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    每个维度对时间的最小二乘线性拟合
+
+    Args:
+        days: 评估时间 (天，形状 (n,))
+        scores: 评分矩阵 (形状 (k, n))
+
+    Returns:
+        (斜率 (分/天), 最早一次评估时间的拟合值, 最近一次评估时间的拟合值)，有效点少于 2 个的维度为 NaN
+    """
+    valid = ~np.isnan(scores)
+    count = valid.sum(axis=1)
+    safe = np.maximum(count, 1)
+    t = np.broadcast_to(days - (days[0] if days.size else 0.0), scores.shape)
+
+    t_mean = np.where(valid, t, 0.0).sum(axis=1) / safe
+    y_mean = np.where(valid, scores, 0.0).sum(axis=1) / safe
+    dt = np.where(valid, t - t_mean[:, None], 0.0)
+    dy = np.where(valid, scores - y_mean[:, None], 0.0)
+    sxx = (dt * dt).sum(axis=1)
+    sxy = (dt * dy).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.full(sxx.shape, np.nan), where=(sxx > 0) & (count >= 2))
+
+    t_first = np.where(valid, t, np.inf).min(axis=1, initial=np.inf)
+    t_last = np.where(valid, t, -np.inf).max(axis=1, initial=-np.inf)
+    fitted_first = y_mean + slope * (t_first - t_mean)
+    fitted_last = y_mean + slope * (t_last - t_mean)
+    return slope, fitted_first, fitted_last
+
+
+def _window_sums(
+    values: np.ndarray, window: int, include_current: bool
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按行计算每个位置的滑动窗口内有效值的和、平方和与个数 (基于累加和，O(n))
+
+    include_current 为 True 时窗口为 [i - window + 1, i]，否则为 [i - window, i - 1]。
+    调用方应先减去每行的均值，避免长序列累加和相减时损失精度。
+    """
+    k, n = values.shape
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    zeros = np.zeros((k, 1))
+    shift = 1 if include_current else 0
+    # 前 head 个位置的窗口从序列开头开始，其余位置减去窗口起点之前的累加和
+    head = min(n, window - shift + 1)
+
+    def window_total(increments: np.ndarray) -> np.ndarray:
+        cumulative = np.concatenate([zeros, np.cumsum(increments, axis=1)], axis=1)
+        before = np.concatenate([np.zeros((k, head)), cumulative[:, head + shift - window:n + shift - window]], axis=1)
+        return cumulative[:, shift:n + shift] - before
+
+    return window_total(filled), window_total(filled * filled), window_total(valid.astype(np.float64))
+
+
+def _row_offsets(scores: np.ndarray) -> np.ndarray:
+    """每行有效值的均值 (没有有效值的行为 0)，用于中心化"""
+    mean, _, _ = _masked_mean_std(scores)
+    return np.nan_to_num(mean)[:, None]
+
+
+def rolling_mean(scores: np.ndarray, window: int = DEFAULT_WINDOW) -> np.ndarray:
+    """
+    最近 window 条记录 (含当前) 中有效值的平均
+
+    Args:
+        scores: 评分矩阵 (形状 (k, n))
+        window: 窗口记录数
+
+    Returns:
+        与 scores 形状相同的矩阵，窗口内没有有效值的位置为 NaN
+    """
+    if window < 1:
+        raise ValueError("window 必须为正整数")
+    offsets = _row_offsets(scores)
+    sums, _, counts = _window_sums(scores - offsets, window, include_current=True)
+    return np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0) + offsets
+
+
+def ewma(scores: np.ndarray, alpha: float = DEFAULT_ALPHA) -> np.ndarray:
+    """
+    指数加权移动平均 y_t = (1 - alpha) * y_(t-1) + alpha * x_t
+
+    以各维度第一个有效值为初始值，缺失值处沿用上一个值。
+    递推式的解为 y_t = P_t * (y_0 + Σ alpha * x_i / P_i)，P_t 为累计衰减系数，
+    按块用累加和 / 累乘向量化计算，块间只传递最后一个值。
+
+    Args:
+        scores: 评分矩阵 (形状 (k, n))
+        alpha: 平滑系数 (0 < alpha < 1)
+
+    Returns:
+        与 scores 形状相同的矩阵，第一个有效值之前的位置为 NaN
+    """
+    if not 0 < alpha < 1:
+        raise ValueError("alpha 必须在 (0, 1) 之间")
+    k, n = scores.shape
+    result = np.full((k, n), np.nan)
+    if n == 0:
+        return result
+
+    valid = ~np.isnan(scores)
+    log_decay = np.where(valid, math.log1p(-alpha), 0.0)
+    weighted = alpha * np.where(valid, scores, 0.0)
+    level = np.where(valid.any(axis=1), scores[np.arange(k), valid.argmax(axis=1)], 0.0)
+
+    block = max(1, int(_EWMA_LOG_FLOOR / -math.log1p(-alpha)))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        decay = np.exp(np.cumsum(log_decay[:, start:stop], axis=1))
+        result[:, start:stop] = decay * (level[:, None] + np.cumsum(weighted[:, start:stop] / decay, axis=1))
+        level = result[:, stop - 1]
+
+    result[np.cumsum(valid, axis=1) == 0] = np.nan
+    return result
+
+
+def volatility(scores: np.ndarray) -> np.ndarray:
+    """
+    波动率: 相邻两次评分变化量的总体标准差
+
+    Args:
+        scores: 评分矩阵 (形状 (k, n))
+
+    Returns:
+        每个维度的波动率 (变化量少于 2 个时为 NaN)
+    """
+    _, std, _ = _masked_mean_std(np.diff(scores, axis=1), min_count=2)
+    return std
+
+
+def score_percentiles(scores: np.ndarray, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> np.ndarray:
+    """
+    分位数 (线性插值，忽略 NaN)
+
+    Args:
+        scores: 评分矩阵 (形状 (k, n))
+        percentiles: 分位点 (0-100)
+
+    Returns:
+        形状为 (k, len(percentiles)) 的矩阵，没有有效值的维度为 NaN
+    """
+    result = np.full((scores.shape[0], len(percentiles)), np.nan)
+    has_values = (~np.isnan(scores)).any(axis=1)
+    if has_values.any():
+        result[has_values] = np.nanpercentile(scores[has_values], percentiles, axis=1).T
+    return result
+
+
+def anomaly_flags(
+    scores: np.ndarray,
+    window: int = DEFAULT_WINDOW,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    min_periods: Optional[int] = None
+) -> np.ndarray:
+    """
+    异常点标记: 相对前 window 条记录 (不含当前) 的 z 分数绝对值超过阈值
+
+    Args:
+        scores: 评分矩阵 (形状 (k, n))
+        window: 参照窗口记录数
+        z_threshold: z 分数阈值
+        min_periods: 参照窗口内至少需要的有效值个数 (默认 max(3, window // 2))
+
+    Returns:
+        与 scores 形状相同的布尔矩阵
+    """
+    if window < 2:
+        raise ValueError("window 至少为 2")
+    min_periods = min_periods or max(3, window // 2)
+    centered = scores - _row_offsets(scores)
+    sums, squares, counts = _window_sums(centered, window, include_current=False)
+    enough = counts >= min_periods
+    safe = np.maximum(counts, 1)
+    mean = sums / safe
+    std = np.sqrt(np.maximum(squares / safe - mean * mean, 0.0))
+    # 参照窗口内评分完全相同 (标准差小于累加和的舍入误差) 时不判定
+    usable = enough & (std > _MIN_STD) & ~np.isnan(scores)
+    z = np.divide(np.where(usable, centered, 0.0) - mean, std, out=np.zeros(scores.shape), where=usable)
+    return usable & (np.abs(z) > z_threshold)
+
+
+def _number(value: float, digits: int = 2) -> Optional[float]:
+    """NumPy 浮点数转换为可 JSON 序列化的值 (NaN 为 None)"""
+    return None if math.isnan(value) else round(float(value), digits)
+
+
+def _series(values: np.ndarray) -> List[Optional[float]]:
+    """NumPy 序列转换为列表 (NaN 为 None)"""
+    return [None if math.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+def analyze_trends(
+    rows: Sequence[Any],
+    *,
+    window: int = DEFAULT_WINDOW,
+    alpha: float = DEFAULT_ALPHA,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    include_series: bool = True
+) -> Dict[str, Any]:
+    """
+    计算四个评分维度的趋势统计
+
+    Args:
+        rows: 按评估时间升序排列的趋势查询结果行
+        window: 滑动平均与异常检测的窗口记录数
+        alpha: EWMA 平滑系数
+        z_threshold: 异常 z 分数阈值
+        percentiles: 分位点
+        include_series: 是否返回与数据点一一对应的滑动平均 / EWMA 序列
+
+    Returns:
+        可 JSON 序列化的分析结果，按维度组织
+    """
+    timestamps, scores = score_matrix(rows)
+    days = timestamps / SECONDS_PER_DAY
+
+    slope, fitted_first, fitted_last = least_squares_slope(days, scores)
+    rolling = rolling_mean(scores, window)
+    smoothed = ewma(scores, alpha)
+    vol = volatility(scores)
+    quantiles = score_percentiles(scores, percentiles)
+    flags = anomaly_flags(scores, window, z_threshold)
+    counts = (~np.isnan(scores)).sum(axis=1)
+    change = fitted_last - fitted_first
+
+    dimensions: Dict[str, Any] = {}
+    for i, name in enumerate(SCORE_DIMENSIONS):
+        trend = "stable"
+        if change[i] > TREND_THRESHOLD:
+            trend = "rising"
+        elif change[i] < -TREND_THRESHOLD:
+            trend = "falling"
+        change_rate = change[i] / fitted_first[i] * 100 if fitted_first[i] > 0 else math.nan
+        anomaly_index = np.flatnonzero(flags[i])
+
+        dimension = {
+            "count": int(counts[i]),
+            "slope_per_day": _number(slope[i], 4),
+            "slope_per_month": _number(slope[i] * 30),
+            "fitted_start": _number(fitted_first[i]),
+            "fitted_end": _number(fitted_last[i]),
+            "trend": trend,
+            "fitted_change_rate": _number(change_rate),
+            "rolling_mean": _number(rolling[i, -1]) if rolling.shape[1] else None,
+            "ewma": _number(smoothed[i, -1]) if smoothed.shape[1] else None,
+            "volatility": _number(vol[i]),
+            "percentiles": {f"p{q:g}": _number(quantiles[i, j]) for j, q in enumerate(percentiles)},
+            "anomaly_count": int(anomaly_index.size),
+            "anomaly_timestamps": (timestamps[anomaly_index] * 1000).astype(np.int64).tolist(),
+        }
+        if include_series:
+            dimension["rolling_mean_series"] = _series(rolling[i])
+            dimension["ewma_series"] = _series(smoothed[i])
+        dimensions[name] = dimension
+
+    return {
+        "points": int(scores.shape[1]),
+        "window": window,
+        "alpha": alpha,
+        "z_threshold": z_threshold,
+        "dimensions": dimensions,
+    }
@@ -1,4 +1,4 @@
-from typing import Union, List
+from typing import Union, List, Optional, Literal
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings
 
@@ -22,11 +22,130 @@ class Settings(BaseSettings):
     def database_url(self) -> str:
         """获取数据库 URL"""
         return self.DATABASE_URL
-    
+
+    # 连接池设置
+    # 每个数据库实例允许本服务使用的连接总数，按工作进程数平均分配
+    DB_CONNECTION_BUDGET: int = 90
+    # 工作进程数 (run.py --workers 会自动设置该环境变量)
+    WEB_CONCURRENCY: int = 1
+    # 显式指定时覆盖按预算计算的结果
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    # 连接存活检查: pre_ping (每次借出都 ping) / idle (仅空闲超过阈值时 ping) / none
+    DB_LIVENESS_CHECK: Literal["pre_ping", "idle", "none"] = "pre_ping"
+    DB_LIVENESS_IDLE_SECONDS: float = 300.0
+    # 连接池代理模式 (PgBouncer transaction 模式)：关闭服务端预编译语句和 pre_ping，每个请求一个事务
+    DB_POOLER_MODE: bool = False
+    # 代理模式下的应用侧连接池大小，0 表示使用 NullPool
+    DB_POOLER_POOL_SIZE: int = 0
+
+    # 启动时的表结构处理: check (只读取版本号并告警) / strict (版本落后时拒绝启动) /
+    # create_all (反射并建表，仅用于本地开发) / skip (启动时不访问数据库)
+    SCHEMA_STARTUP_MODE: Literal["check", "strict", "create_all", "skip"] = "check"
+
+    # 只读副本设置 (多个 URL 用逗号分隔，留空则所有查询走主库)
+    DATABASE_REPLICA_URLS: str = ""
+    # 用户写入后在该时间窗口内的读取仍走主库 (读己之写)，0 表示关闭。
+    # 进程内记录只对同一工作进程有效；多工作进程 / 多实例时依赖客户端带回写入后响应中的
+    # last_write Cookie 或 X-Last-Write 头 (SECRET_KEY 签名)，不带回的客户端可能在窗口内读到副本上的旧数据
+    REPLICA_STICKY_SECONDS: float = 5.0
+
+    @property
+    def database_replica_urls(self) -> List[str]:
+        """获取只读副本 URL 列表"""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    # 健康记录表分区设置 (仅 PostgreSQL，需先执行 manage_partitions.py convert)
+    HEALTH_RECORDS_PARTITIONING: bool = False
+    PARTITION_PREMAKE_MONTHS: int = 3
+    PARTITION_ARCHIVE_SCHEMA: str = "archive"
+
+    # SQL 统计设置 (每个请求的语句数、数据库耗时写入 Server-Timing 响应头和日志)
+    SQL_INSTRUMENTATION: bool = True
+    # 同一语句在一个请求内重复执行达到该次数时记录疑似 N+1 查询警告
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Prometheus 指标 (/metrics 与 /health/db-pool 需携带 X-Admin-Token，未配置 ADMIN_TOKEN 时返回 404)
+    METRICS_ENABLED: bool = True
+    # 多工作进程共享的指标快照目录: 配置后 /metrics 合并全部工作进程的指标 (带 worker 标签)；为空时只返回当前进程
+    METRICS_MULTIPROC_DIR: str = ""
+    # 各工作进程写入指标快照的间隔 (秒)，超过 3 个间隔未更新的快照视为进程已退出
+    METRICS_SNAPSHOT_SECONDS: float = 5.0
+
+    # 按需 CPU 剖析 (请求头 X-Profile 携带 ADMIN_TOKEN 触发，或按比例随机抽样)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_BUFFER_SIZE: int = 50
+
+    # 相同用户、相同参数的并发趋势 / 摘要请求合并为一次查询
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # 过载保护: 按路由类别 (write / read / analytics) 限制并发与排队，超出时快速返回 503 + Retry-After
+    ADMISSION_CONTROL_ENABLED: bool = True
+    # 同时处理的请求上限，默认取每个工作进程的最大数据库连接数与线程池大小 (40) 中的较小值
+    ADMISSION_MAX_CONCURRENCY: Optional[int] = None
+    # 趋势 / 摘要等分析型读取最多占用的并发比例，其余留给写入和普通读取
+    ADMISSION_ANALYTICS_SHARE: float = 0.5
+    # 每个类别的排队上限与最长排队时间 (秒)
+    ADMISSION_QUEUE_SIZE: int = 32
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0
+    # 503 响应的 Retry-After 基准秒数 (实际值在 1~2 倍之间随机)
+    ADMISSION_RETRY_AFTER: int = 2
+    # 请求截止时间 (秒)，剩余时间设置为数据库 statement_timeout；客户端可用 X-Request-Timeout 缩短
+    REQUEST_DEADLINE_SECONDS: float = 10.0
+    ANALYTICS_DEADLINE_SECONDS: float = 5.0
+
+    # 限流: 已登录请求按用户、未登录请求按 IP 使用令牌桶，每秒补充 RATE_LIMIT_RATE 个令牌，最多积累 RATE_LIMIT_BURST 个
+    # (批量创建 / 更新 / 删除消耗 10 个，趋势 5 个，摘要 3 个，其他写入 2 个，其他读取 1 个)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_RATE: float = 5.0
+    RATE_LIMIT_BURST: int = 60
+
+    # 健康告警: 记录提交后放入有界队列，由后台工作线程异步检测 (评分骤降、心率 / 血压超出范围)，不增加写入延迟
+    ALERTS_ENABLED: bool = True
+    ALERT_WORKERS: int = 2
+    # 每个工作线程的队列上限，队列已满时丢弃事件 (计入 alert_events_total{outcome="dropped"})
+    ALERT_QUEUE_SIZE: int = 10000
+    # 检测器状态写回数据库的间隔 (秒)
+    ALERT_CHECKPOINT_SECONDS: float = 30.0
+
+    # 事务发件箱: 写入健康记录时在同一事务中写入事件，由 python run.py --worker 异步处理派生工作 (告警检测等)，
+    # 启用时必须运行工作进程，否则不会产生告警，outbox_events 也不会被清理；
+    # 关闭时告警改由 API 进程内的告警流水线检测 (进程退出或队列已满时可能丢失事件)；
+    # 进程内流水线只支持单个 API 进程，WEB_CONCURRENCY > 1 且启用告警时必须开启
+    OUTBOX_ENABLED: bool = True
+    # 每次领取的事件数与空闲轮询间隔 (秒)，派生数据最多落后约一个轮询间隔加一批的处理时间
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    # 失败重试: 最多尝试 OUTBOX_MAX_ATTEMPTS 次，首次重试延迟 OUTBOX_RETRY_BACKOFF 秒，之后每次翻倍 (最长 5 分钟)
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BACKOFF: float = 1.0
+    # 已处理事件的保留时间 (小时)
+    OUTBOX_RETENTION_HOURS: int = 24
+    # API 启动时最早的待处理事件已等待超过该秒数则告警 (通常说明没有运行 python run.py --worker)
+    OUTBOX_BACKLOG_WARNING_SECONDS: float = 300.0
+
+    # 软删除 (可选): 删除健康记录只标记 is_active = false (读取只走 WHERE is_active 的部分索引)，
+    # 由 python run.py --worker 中的压缩任务分批物理删除；默认关闭，直接 DELETE。
+    # 开启后用户删除的数据至少保留 RECORD_COMPACTION_MIN_AGE_HOURS 小时，且必须运行工作进程才会被物理删除
+    HEALTH_RECORDS_SOFT_DELETE: bool = False
+    # 压缩任务: 每 RECORD_COMPACTION_INTERVAL_MINUTES 分钟运行一次，删除软删除超过 RECORD_COMPACTION_MIN_AGE_HOURS 小时的记录，
+    # 每批 RECORD_COMPACTION_BATCH_SIZE 行，批次之间暂停 RECORD_COMPACTION_PAUSE 秒，每轮最多 RECORD_COMPACTION_MAX_BATCHES 批
+    RECORD_COMPACTION_INTERVAL_MINUTES: int = 60
+    RECORD_COMPACTION_MIN_AGE_HOURS: int = 24
+    RECORD_COMPACTION_BATCH_SIZE: int = 1000
+    RECORD_COMPACTION_PAUSE: float = 0.5
+    RECORD_COMPACTION_MAX_BATCHES: int = 100
+
     # 安全设置
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # 管理端点令牌 (请求头 X-Admin-Token)，留空则关闭管理端点
+    ADMIN_TOKEN: str = ""
     
     # CORS 设置
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
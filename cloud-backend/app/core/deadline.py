@@ -0,0 +1,121 @@
+"""
+请求截止时间
+
+每个请求在进入时确定截止时间 (按路由类别的默认值，客户端可用 X-Request-Timeout 缩短)，
+保存在上下文变量中，随 run_in_threadpool 传入同步端点所在线程：
+
+- 每个数据库事务开始时把剩余时间设置为 PostgreSQL statement_timeout (SET LOCAL)，
+  超时的查询由数据库取消，而不是执行完后才被 500 兜底
+- 截止时间已过时不再开始新事务、不再等待合并的在途查询，直接抛出 DeadlineExceeded
+- DeadlineExceeded 由应用统一转换为 503 + Retry-After
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# PostgreSQL 查询被取消 (statement_timeout) 的 SQLSTATE
+QUERY_CANCELED = "57014"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """请求已超过截止时间"""
+
+    def __init__(self, message: str = "请求处理超时"):
+        super().__init__(message)
+
+
+def remaining() -> Optional[float]:
+    """当前请求的剩余秒数，没有截止时间时返回 None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """
+    截止时间已过时抛出异常
+
+    Raises:
+        DeadlineExceeded: 剩余时间不大于 0
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[float]:
+    """
+    在上下文内设置截止时间 (已有更早的截止时间时保留更早的)
+
+    Args:
+        seconds: 从现在起的秒数
+
+    Returns:
+        截止时间 (time.monotonic 时钟)
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """是否为截止时间或资源耗尽导致的错误 (应返回 503 而不是 500)"""
+    if isinstance(exc, (DeadlineExceeded, PoolTimeoutError)):
+        return True
+    orig = getattr(exc, "orig", None)
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == QUERY_CANCELED
+
+
+def raise_if_overloaded(exc: BaseException) -> None:
+    """
+    端点的兜底异常处理中调用：过载类错误转换为 DeadlineExceeded 继续抛出
+
+    Raises:
+        DeadlineExceeded: exc 为过载类错误
+    """
+    if isinstance(exc, DeadlineExceeded):
+        raise exc
+    if is_overload_error(exc):
+        raise DeadlineExceeded() from exc
+
+
+def install_statement_timeout(session_factory: Any, min_timeout_ms: int = 10) -> None:
+    """
+    在会话的每个事务开始时按剩余时间设置 statement_timeout (仅 PostgreSQL)
+
+    SET LOCAL 在事务结束时自动恢复，适用于事务级连接池代理。
+
+    Args:
+        session_factory: sessionmaker 或 Session 子类
+        min_timeout_ms: 设置的最小超时，避免 0 (PostgreSQL 中表示不限制)
+    """
+    @event.listens_for(session_factory, "after_begin")
+    def _apply(session: Any, transaction: Any, connection: Any) -> None:
+        left = remaining()
+        if left is None:
+            return
+        if left <= 0:
+            raise DeadlineExceeded()
+        if connection.dialect.name != "postgresql":
+            return
+        timeout_ms = max(int(left * 1000), min_timeout_ms)
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :value, true)"),
+            {"value": f"{timeout_ms}ms"},
+        )
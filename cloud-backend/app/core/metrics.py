@@ -0,0 +1,406 @@
+"""
+轻量级 Prometheus 指标 (文本暴露格式 0.0.4)
+
+计数器、仪表、直方图均为进程内的字典累加，无需额外依赖；
+多工作进程部署时每个进程只持有自己的计数，跨进程汇总见 app.core.multiprocess_metrics。
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+# 默认直方图分桶 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值"""
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    """格式化一行样本"""
+    if labels:
+        pairs = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+        return f"{name}{{{pairs}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+class Metric:
+    """指标基类"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, values: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def samples(self) -> Iterable[Sample]:
+        """获取当前样本"""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """单调递增计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        """增加计数"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        """获取当前计数"""
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, self._labels(labels), value
+
+
+class Gauge(Metric):
+    """可增可减的仪表"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        """设置当前值"""
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        """增加"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        """减少"""
+        self.inc(labels, -amount)
+
+    def value(self, labels: LabelValues = ()) -> float:
+        """获取当前值"""
+        return self._values.get(labels, 0.0)
+
+    @contextmanager
+    def track_in_progress(self, labels: LabelValues = ()) -> Iterator[None]:
+        """上下文内计数加一"""
+        self.inc(labels)
+        try:
+            yield
+        finally:
+            self.dec(labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, self._labels(labels), value
+
+
+class Histogram(Metric):
+    """分桶直方图"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各分桶计数 (非累计)..., +Inf 分桶计数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        """记录一次观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, labels: LabelValues = ()) -> Iterator[None]:
+        """记录上下文的执行耗时 (秒)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, labels)
+
+    def count(self, labels: LabelValues = ()) -> float:
+        """获取观测次数"""
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0.0
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in items:
+            base = self._labels(labels)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**base, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", base, series[-1]
+            yield f"{self.name}_count", base, cumulative
+
+
+Collector = Callable[[], Iterable[Tuple[Metric, Iterable[Sample]]]]
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """注册指标"""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """创建并注册计数器"""
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """创建并注册仪表"""
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """创建并注册直方图"""
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def register_collector(self, collector: Collector) -> None:
+        """注册抓取时才计算的指标 (如连接池状态)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """按文本暴露格式输出所有指标"""
+        lines: List[str] = []
+
+        def emit(metric: Metric, samples: Iterable[Sample]) -> None:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(_format_sample(name, labels, value) for name, labels, value in samples)
+
+        for metric in self._metrics:
+            emit(metric, metric.samples())
+        for collector in self._collectors:
+            for metric, samples in collector():
+                emit(metric, samples)
+        return "\n".join(lines) + "\n"
+
+
+# 文本暴露格式的 Content-Type (charset 由 Response 追加)
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4"
+
+registry = Registry()
+
+# HTTP 请求
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP 请求总数", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时 (秒)，按路由模板统计", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "正在处理的 HTTP 请求数", ("method", "route")
+)
+
+# 缓存命中
+cache_requests_total = registry.counter(
+    "cache_requests_total", "缓存查询次数", ("cache", "result")
+)
+
+# bcrypt 密码哈希 (CPU 密集，占满线程池时会拖慢所有同步端点)
+bcrypt_operations_in_progress = registry.gauge(
+    "bcrypt_operations_in_progress", "正在执行或等待 CPU 的 bcrypt 操作数", ("operation",)
+)
+bcrypt_duration_seconds = registry.histogram(
+    "bcrypt_duration_seconds", "bcrypt 操作耗时 (秒)", ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0),
+)
+
+# 请求合并: executed 为实际执行次数，shared 为被合并 (共享在途结果) 的重复请求数
+singleflight_calls_total = registry.counter(
+    "singleflight_calls_total", "请求合并调用次数", ("flight", "result")
+)
+singleflight_in_flight = registry.gauge(
+    "singleflight_in_flight", "正在执行的合并调用数", ("flight",)
+)
+
+# 准入控制: admitted 直接放行，queued 排队后放行，shed 队列已满被拒绝，queue_timeout 排队超时被拒绝
+admission_requests_total = registry.counter(
+    "admission_requests_total", "准入控制处理的请求数", ("route_class", "outcome")
+)
+admission_queue_depth = registry.gauge(
+    "admission_queue_depth", "准入控制排队中的请求数", ("route_class",)
+)
+request_deadline_exceeded_total = registry.counter(
+    "request_deadline_exceeded_total", "超过截止时间 (含数据库 statement_timeout) 返回 503 的请求数"
+)
+
+# 限流: key_type 为 user (按用户) 或 ip (未登录请求按客户端地址)
+rate_limited_requests_total = registry.counter(
+    "rate_limited_requests_total", "被限流 (429) 的请求数", ("key_type",)
+)
+
+# 增量统计摘要: hit 直接读取统计行，refresh 统计行缺失 / 失效后重新计算，shared 共享并发请求的重新计算结果
+health_stats_reads_total = registry.counter(
+    "health_stats_reads_total", "健康统计摘要读取次数", ("result",)
+)
+
+# 健康告警流水线: outcome 为 queued (入队)、dropped (队列已满丢弃)、processed (检测完成)、failed (检测出错)
+alert_events_total = registry.counter(
+    "alert_events_total", "告警流水线处理的健康记录事件数", ("outcome",)
+)
+alerts_detected_total = registry.counter(
+    "alerts_detected_total", "检测到的健康告警数", ("alert_type",)
+)
+alert_queue_depth = registry.gauge(
+    "alert_queue_depth", "告警流水线排队中的事件数"
+)
+
+# 事务发件箱: outcome 为 processed (处理完成)、retried (失败待重试)、dead (超过最大尝试次数)
+outbox_events_total = registry.counter(
+    "outbox_events_total", "发件箱事件处理次数", ("topic", "outcome")
+)
+outbox_lag_seconds = registry.histogram(
+    "outbox_lag_seconds", "发件箱事件从写入到处理完成的延迟 (秒)",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+# 软删除记录压缩: 后台任务物理删除的健康记录数
+record_compaction_purged_total = registry.counter(
+    "record_compaction_purged_total", "压缩任务物理删除的软删除健康记录数"
+)
+
+# 工作进程冷启动
+app_startup_seconds = registry.gauge(
+    "app_startup_seconds", "工作进程启动各阶段耗时 (秒)", ("phase",)
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    记录一次缓存查询
+
+    Args:
+        cache: 缓存名称
+        hit: 是否命中
+    """
+    cache_requests_total.inc((cache, "hit" if hit else "miss"))
+
+
+@contextmanager
+def track_bcrypt(operation: str) -> Iterator[None]:
+    """统计 bcrypt 操作的并发数与耗时"""
+    labels = (operation,)
+    with bcrypt_operations_in_progress.track_in_progress(labels), bcrypt_duration_seconds.time(labels):
+        yield
+
+
+def _collect_cache_hit_ratio() -> Iterable[Tuple[Metric, Iterable[Sample]]]:
+    """按缓存名称计算命中率"""
+    totals: Dict[str, List[float]] = {}
+    for _, labels, value in cache_requests_total.samples():
+        counts = totals.setdefault(labels["cache"], [0.0, 0.0])
+        counts[0 if labels["result"] == "hit" else 1] += value
+    ratio = Gauge("cache_hit_ratio", "缓存命中率 (进程启动以来)", ("cache",))
+    for cache, (hits, misses) in totals.items():
+        ratio.set(hits / (hits + misses) if hits + misses else 0.0, (cache,))
+    yield ratio, ratio.samples()
+
+
+def _collect_db_pool() -> Iterable[Tuple[Metric, Iterable[Sample]]]:
+    """抓取时读取各引擎的连接池状态"""
+    from app.database import named_engines
+    from app.db.pool import pool_status
+
+    gauges = {
+        "size": Gauge("db_pool_size", "连接池常驻连接数", ("engine",)),
+        "checked_out": Gauge("db_pool_checked_out", "已借出的连接数", ("engine",)),
+        "checked_in": Gauge("db_pool_checked_in", "池中空闲的连接数", ("engine",)),
+        "overflow": Gauge("db_pool_overflow", "当前溢出连接数", ("engine",)),
+    }
+    counters = {
+        "checkouts_total": Counter("db_pool_checkouts_total", "连接借出次数", ("engine",)),
+        "timeouts_total": Counter("db_pool_checkout_timeouts_total", "连接借出超时次数", ("engine",)),
+        "wait_seconds_total": Counter("db_pool_checkout_wait_seconds_total", "连接借出累计等待时间 (秒)", ("engine",)),
+    }
+    for name, engine in named_engines.items():
+        status = pool_status(engine)
+        for key, metric in (*gauges.items(), *counters.items()):
+            if key in status:
+                if isinstance(metric, Gauge):
+                    metric.set(status[key], (name,))
+                else:
+                    metric.inc((name,), status[key])
+    for metric in (*gauges.values(), *counters.values()):
+        yield metric, metric.samples()
+
+
+def _collect_outbox_backlog() -> Iterable[Tuple[Metric, Iterable[Sample]]]:
+    """抓取时查询发件箱积压 (启用发件箱时)，持续增长说明工作进程没有运行或处理不过来"""
+    from app.core.config import settings
+
+    if not settings.OUTBOX_ENABLED:
+        return
+    from sqlalchemy.exc import SQLAlchemyError
+    from app.crud.crud_outbox import outbox_worker
+
+    try:
+        count, age = outbox_worker.backlog()
+    except SQLAlchemyError:
+        return
+    pending = Gauge("outbox_pending_events", "待处理的发件箱事件数")
+    oldest = Gauge("outbox_oldest_pending_seconds", "最早一个待处理发件箱事件已等待的时间 (秒)")
+    pending.set(count)
+    oldest.set(age)
+    yield pending, pending.samples()
+    yield oldest, oldest.samples()
+
+
+registry.register_collector(_collect_cache_hit_ratio)
+registry.register_collector(_collect_db_pool)
+registry.register_collector(_collect_outbox_backlog)
@@ -0,0 +1,170 @@
+"""
+ASGI 中间件
+"""
+
+import logging
+import math
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import http_request_duration_seconds, http_requests_in_flight, http_requests_total
+from app.db.instrumentation import install_query_instrumentation, track_queries
+from app.db.routing import WriteMarker, decode_write_marker, encode_write_marker, write_marker_scope
+
+logger = logging.getLogger(__name__)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    统计每个请求执行的 SQL 语句
+
+    - 响应头 Server-Timing: db;dur=<数据库耗时>;desc="<语句数> queries", app;dur=<总耗时>
+    - 请求日志附带 sql_statements / sql_time_ms / sql_rows 字段
+    - 同一语句重复执行达到阈值时记录疑似 N+1 查询警告
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        install_query_instrumentation()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        with track_queries() as stats:
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    total_ms = (time.perf_counter() - started) * 1000
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.db_time_ms:.2f};desc="{stats.statements} queries", app;dur={total_ms:.2f}'
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                fields = stats.as_log_fields()
+                fields.update(
+                    method=scope["method"],
+                    path=scope["path"],
+                    status_code=status_code,
+                    duration_ms=round((time.perf_counter() - started) * 1000, 2),
+                )
+                if stats.statements:
+                    logger.info(
+                        f"{scope['method']} {scope['path']} {status_code} "
+                        f"sql_statements={fields['sql_statements']} sql_time_ms={fields['sql_time_ms']} "
+                        f"sql_rows={fields['sql_rows']}",
+                        extra=fields,
+                    )
+                for statement, count in stats.repeated(self.n_plus_one_threshold):
+                    logger.warning(
+                        f"疑似 N+1 查询: {scope['method']} {scope['path']} 中同一语句执行 {count} 次: {statement[:200]}",
+                        extra=fields,
+                    )
+
+
+# 未匹配任何路由的请求统一归入该标签，避免任意路径撑大指标基数
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """获取请求匹配的路由模板 (如 /api/v1/health-trends/{record_id})"""
+    router = getattr(scope.get("app"), "router", None)
+    partial = None
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """按路由模板统计请求数、耗时直方图与正在处理的请求数"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        labels = (method, route_template(scope))
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc(labels)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(labels)
+            http_request_duration_seconds.observe(time.perf_counter() - started, labels)
+            http_requests_total.inc((*labels, str(status_code)))
+
+
+# 写入标记的 Cookie / 请求头 / 响应头名称
+WRITE_MARKER_COOKIE = "last_write"
+WRITE_MARKER_HEADER = "X-Last-Write"
+
+
+class ReadYourWritesMiddleware:
+    """
+    跨工作进程的读己之写
+
+    请求带回的写入标记 (Cookie last_write 或请求头 X-Last-Write) 校验签名后放入请求上下文，
+    只读副本路由据此把窗口内该用户的读取发往主库；请求内发生写入时，
+    响应附带新签发的标记 (Set-Cookie 与 X-Last-Write 响应头，有效期为粘滞窗口)。
+    """
+
+    def __init__(self, app: ASGIApp, secret: str, window_seconds: float):
+        self.app = app
+        self.secret = secret
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        value = headers.get(WRITE_MARKER_HEADER) or cookie_parser(headers.get("cookie", "")).get(WRITE_MARKER_COOKIE)
+        decoded = decode_write_marker(value, self.secret) if value else None
+        marker = WriteMarker(*decoded) if decoded else WriteMarker()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and marker.written_user_id is not None:
+                token = encode_write_marker(marker.written_user_id, time.time(), self.secret)
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append(WRITE_MARKER_HEADER, token)
+                response_headers.append(
+                    "Set-Cookie",
+                    f"{WRITE_MARKER_COOKIE}={token}; Max-Age={math.ceil(self.window_seconds)}; "
+                    f"Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        with write_marker_scope(marker):
+            await self.app(scope, receive, send_wrapper)
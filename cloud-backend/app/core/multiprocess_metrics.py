@@ -0,0 +1,144 @@
+"""
+多工作进程指标汇总 (共享目录)
+
+进程内的指标注册表只包含当前进程的计数，--workers N 部署时每次抓取 /metrics
+只会落到其中一个工作进程。配置 METRICS_MULTIPROC_DIR 后:
+    - 每个工作进程每 METRICS_SNAPSHOT_SECONDS 秒把自己的指标 (文本暴露格式) 写入 <目录>/<pid>.prom
+      (先写临时文件再原子替换)，进程退出时删除自己的文件
+    - 处理 /metrics 的进程先刷新自己的快照，再合并目录中全部未过期的快照，
+      每条样本追加 worker="<pid>" 标签；按路由统计请求数 / 耗时时在查询中 sum without (worker) 聚合
+    - 超过 3 个快照周期未更新的文件 (进程被强制杀死) 不再输出
+
+快照最多落后一个周期；工作进程重启后以新的 pid 出现，计数从零开始 (Prometheus 按新序列处理)。
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.metrics import Registry
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".prom"
+
+
+def _with_worker_label(line: str, worker: str) -> str:
+    """给一条样本追加 worker 标签"""
+    label = f'worker="{worker}"'
+    name, brace, rest = line.partition("{")
+    if brace:
+        return f"{name}{{{label},{rest}" if not rest.startswith("}") else f"{name}{{{label}{rest}"
+    name, _, value = line.partition(" ")
+    return f"{name}{{{label}}} {value}"
+
+
+def merge_snapshots(snapshots: List[Tuple[str, str]]) -> str:
+    """
+    合并多个进程的文本暴露格式输出
+
+    Args:
+        snapshots: (worker 标识, 指标文本) 列表
+
+    Returns:
+        合并后的指标文本 (同名指标的 HELP / TYPE 只输出一次，样本按指标分组)
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for worker, content in snapshots:
+        family: Optional[str] = None
+        for line in content.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    entries = headers.setdefault(family, [])
+                    if len(entries) < 2 and line not in entries:
+                        entries.append(line)
+                    samples.setdefault(family, [])
+                continue
+            if family is not None:
+                samples[family].append(_with_worker_label(line, worker))
+
+    lines: List[str] = []
+    for family, header in headers.items():
+        lines.extend(header)
+        lines.extend(samples[family])
+    return "\n".join(lines) + "\n"
+
+
+class SnapshotExporter:
+    """
+    把当前进程的指标定期写入共享目录，并在抓取时合并所有进程的快照
+
+    Args:
+        registry: 指标注册表
+        directory: 共享目录 (同一台机器上的全部工作进程使用同一目录)
+        interval: 快照间隔 (秒)
+    """
+
+    def __init__(self, registry: Registry, directory: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.interval = interval
+        self.worker = str(os.getpid())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> Path:
+        """当前进程的快照文件"""
+        return self.directory / f"{self.worker}{SNAPSHOT_SUFFIX}"
+
+    def write(self) -> None:
+        """写入当前进程的快照 (原子替换)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f".{self.worker}.tmp"
+        tmp.write_text(self.registry.render(), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def render(self, now: Optional[float] = None) -> str:
+        """刷新当前进程的快照后，合并目录中所有未过期的快照"""
+        self.write()
+        now = now or time.time()
+        snapshots = []
+        for path in sorted(self.directory.glob(f"*{SNAPSHOT_SUFFIX}")):
+            try:
+                if now - path.stat().st_mtime > 3 * self.interval:
+                    continue
+                snapshots.append((path.stem, path.read_text(encoding="utf-8")))
+            except FileNotFoundError:
+                # 其他进程刚好退出并删除了文件
+                continue
+        return merge_snapshots(snapshots)
+
+    def start(self) -> None:
+        """启动定期写入快照的后台线程"""
+        if self._thread is not None:
+            return
+        self.worker = str(os.getpid())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并删除当前进程的快照"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(self.interval)
+        self._thread = None
+        self.path.unlink(missing_ok=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"写入指标快照失败: {e}")
+            self._stop.wait(self.interval)
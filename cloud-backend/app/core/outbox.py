@@ -0,0 +1,232 @@
+"""
+事务发件箱工作进程
+
+业务写入在同一事务中插入发件箱事件 (outbox_events)，请求提交后立即返回；
+后台工作进程 (python run.py --worker) 轮询领取待处理事件，执行派生工作 (告警检测等)。
+
+处理语义:
+    - 成批领取: 按 id 顺序领取最多 batch_size 个到期事件 (PostgreSQL 使用 FOR UPDATE SKIP LOCKED，
+      多个工作进程并行时互不阻塞、不会重复领取)
+    - 幂等: 处理器的数据库写入与事件标记为已处理在同一事务中提交，事务回滚时两者都不生效，
+      重试不会产生重复的派生数据；处理器仍应容忍重复投递 (例如提交成功但连接在确认前断开)
+    - 重试: 同一主题的事件先整批在保存点中处理，失败后逐个重试以隔离出错的事件；
+      出错的事件按指数退避延后，超过 max_attempts 次后标记为 dead 并记录错误，不再处理
+    - 延迟上限: 空闲时每 poll_interval 秒轮询一次，有积压时连续领取，
+      派生数据最多落后约 poll_interval + 一批的处理时间
+
+事件只由工作进程处理和清理: 启用发件箱 (OUTBOX_ENABLED) 却没有运行 python run.py --worker 时，
+告警不会产生，outbox_events 也会无限增长。API 启动时检查积压并告警，
+/metrics 暴露 outbox_pending_events 与 outbox_oldest_pending_seconds 供监控。
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.metrics import outbox_events_total, outbox_lag_seconds
+
+logger = logging.getLogger(__name__)
+
+# 处理器: 接收同一主题的一批事件内容，在传入的会话中写入 (不提交)
+Handler = Callable[[Session, List[Dict[str, Any]]], None]
+
+
+class OutboxStore(Protocol):
+    """发件箱的持久化接口 (不提交事务)"""
+
+    def claim(self, db: Session, *, limit: int, now: datetime) -> List[Any]: ...
+
+    def mark_done(self, db: Session, events: Sequence[Any], *, now: datetime) -> None: ...
+
+    def mark_failed(
+        self, db: Session, event: Any, *, error: str, now: datetime, retry_at: Optional[datetime]
+    ) -> None: ...
+
+    def purge(self, db: Session, *, before: datetime) -> int: ...
+
+    def pending_summary(self, db: Session) -> Tuple[int, Optional[datetime]]: ...
+
+
+class OutboxWorker:
+    """
+    发件箱事件处理器
+
+    Args:
+        session_factory: 创建数据库会话的工厂 (如 SessionLocal)
+        store: 发件箱持久化接口
+        batch_size: 每次领取的最大事件数
+        poll_interval: 没有待处理事件时的轮询间隔 (秒)
+        max_attempts: 最大尝试次数，超过后标记为 dead
+        retry_backoff: 首次重试的延迟 (秒)，之后每次翻倍
+        max_backoff: 重试延迟上限 (秒)
+        retention: 已处理事件的保留时间 (秒)
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        store: OutboxStore,
+        *,
+        batch_size: int = 100,
+        poll_interval: float = 0.5,
+        max_attempts: int = 8,
+        retry_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        retention: float = 86400.0
+    ):
+        self.session_factory = session_factory
+        self.store = store
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.retention = retention
+        self.handlers: Dict[str, List[Handler]] = {}
+
+    def register(self, topic: str, handler: Handler) -> None:
+        """
+        注册主题处理器 (同一主题可注册多个，按注册顺序在同一事务中执行)
+
+        Args:
+            topic: 事件主题
+            handler: 处理器
+        """
+        self.handlers.setdefault(topic, []).append(handler)
+
+    def retry_delay(self, attempts: int) -> float:
+        """第 attempts 次失败后的重试延迟 (秒)"""
+        return min(self.retry_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def backlog(self, now: Optional[datetime] = None) -> Tuple[int, float]:
+        """
+        待处理事件的积压情况
+
+        Args:
+            now: 当前时间 (UTC，默认当前时间，便于测试)
+
+        Returns:
+            (待处理事件数, 最早一个待处理事件已等待的秒数，没有积压时为 0)
+        """
+        now = now or datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            count, oldest = self.store.pending_summary(db)
+        age = max(0.0, (now - _as_utc(oldest)).total_seconds()) if oldest is not None else 0.0
+        return count, age
+
+    def drain_once(self, now: Optional[datetime] = None) -> int:
+        """
+        领取并处理一批到期事件
+
+        Args:
+            now: 当前时间 (UTC，默认当前时间，便于测试)
+
+        Returns:
+            领取的事件数
+        """
+        now = now or datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            events = self.store.claim(db, limit=self.batch_size, now=now)
+            if not events:
+                db.commit()
+                return 0
+
+            by_topic: Dict[str, List[Any]] = {}
+            for event in events:
+                by_topic.setdefault(event.topic, []).append(event)
+
+            for topic, group in by_topic.items():
+                error = self._run_handlers(db, topic, group)
+                if error is None:
+                    self._done(db, topic, group, now)
+                    continue
+                # 整批失败: 逐个重试，隔离出错的事件
+                for event in group:
+                    if len(group) > 1:
+                        error = self._run_handlers(db, topic, [event])
+                    if error is None:
+                        self._done(db, topic, [event], now)
+                    else:
+                        self._failed(db, topic, event, error, now)
+
+            db.commit()
+        return len(events)
+
+    def purge(self, now: Optional[datetime] = None) -> int:
+        """
+        删除超过保留时间的已处理事件
+
+        Args:
+            now: 当前时间 (UTC)
+
+        Returns:
+            删除的事件数
+        """
+        now = now or datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            deleted = self.store.purge(db, before=now - timedelta(seconds=self.retention))
+            db.commit()
+        return deleted
+
+    def run(self, stop: threading.Event) -> None:
+        """
+        持续处理事件，直到 stop 被设置 (处理完当前批次后退出)
+
+        Args:
+            stop: 停止信号
+        """
+        logger.info("发件箱工作进程已启动: 主题 %s", ", ".join(sorted(self.handlers)) or "(无)")
+        next_purge = time.monotonic()
+        while not stop.is_set():
+            try:
+                claimed = self.drain_once()
+                if time.monotonic() >= next_purge:
+                    purged = self.purge()
+                    if purged:
+                        logger.info("已清理 %d 个已处理的发件箱事件", purged)
+                    next_purge = time.monotonic() + min(self.retention, 3600)
+            except Exception:
+                # 数据库不可用等: 记录后等待下一轮，不退出进程
+                logger.exception("发件箱处理失败")
+                claimed = 0
+            if claimed < self.batch_size:
+                stop.wait(self.poll_interval)
+        logger.info("发件箱工作进程已停止")
+
+    def _run_handlers(self, db: Session, topic: str, events: List[Any]) -> Optional[str]:
+        """在保存点中执行主题的全部处理器，返回错误信息 (成功为 None)"""
+        payloads = [event.payload for event in events]
+        try:
+            with db.begin_nested():
+                for handler in self.handlers.get(topic, ()):
+                    handler(db, payloads)
+        except Exception as exc:
+            logger.warning("发件箱事件 %s 等 %d 个 (%s) 处理失败: %s", events[0].id, len(events), topic, exc)
+            return f"{type(exc).__name__}: {exc}"
+        return None
+
+    def _done(self, db: Session, topic: str, events: List[Any], now: datetime) -> None:
+        self.store.mark_done(db, events, now=now)
+        outbox_events_total.inc((topic, "processed"), len(events))
+        for event in events:
+            outbox_lag_seconds.observe(max(0.0, (now - _as_utc(event.created_at)).total_seconds()))
+
+    def _failed(self, db: Session, topic: str, event: Any, error: str, now: datetime) -> None:
+        attempts = event.attempts + 1
+        if attempts >= self.max_attempts:
+            logger.error("发件箱事件 %s (%s) 已失败 %d 次，不再重试: %s", event.id, topic, attempts, error)
+            self.store.mark_failed(db, event, error=error, now=now, retry_at=None)
+            outbox_events_total.inc((topic, "dead"))
+        else:
+            retry_at = now + timedelta(seconds=self.retry_delay(attempts))
+            self.store.mark_failed(db, event, error=error, now=now, retry_at=retry_at)
+            outbox_events_total.inc((topic, "retried"))
+
+
+def _as_utc(value: datetime) -> datetime:
+    """数据库返回的时间转换为 UTC (SQLite 返回无时区的 UTC 时间)"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
@@ -0,0 +1,225 @@
+"""
+按请求的采样式 CPU 剖析
+
+被选中的请求在处理期间由后台线程定时采集所有线程的调用栈 (sys._current_frames)，
+输出 flamegraph.pl / speedscope 可直接读取的折叠栈格式 (frame;frame;frame 次数)。
+最近的剖析结果保存在有界环形缓冲区中，通过管理端点查看。
+
+注意: 采样覆盖进程内所有线程 (空闲等待的线程会被过滤)，并发请求的栈会混入结果，
+排查单个慢请求时应在低流量时段或单独实例上触发。
+"""
+
+import hmac
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# 触发剖析的请求头 (值为管理员令牌) 与返回剖析ID的响应头
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# 叶子帧为这些函数时视为空闲线程，不计入采样
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+def _frame_label(frame) -> str:
+    """格式化栈帧: 函数名 (文件名)，不含行号以便火焰图按函数合并"""
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})"
+
+
+def _is_idle(frame) -> bool:
+    """线程是否处于空闲等待"""
+    code = frame.f_code
+    return (code.co_filename.rsplit("/", 1)[-1], code.co_name) in _IDLE_FRAMES
+
+
+class StackSampler:
+    """后台线程定时采集调用栈"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        """开始采样"""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止采样并等待线程退出"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or _is_idle(frame):
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+@dataclass
+class Profile:
+    """一次请求的剖析结果"""
+    id: int
+    method: str
+    path: str
+    trigger: str
+    started_at: datetime
+    duration_ms: float
+    interval_ms: float
+    samples: int
+    stacks: Dict[str, int] = field(default_factory=dict)
+
+    def collapsed(self) -> str:
+        """折叠栈格式文本"""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.stacks.items())) + "\n"
+
+    def summary(self) -> Dict[str, object]:
+        """不含调用栈的摘要"""
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 2),
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+        }
+
+
+class ProfileStore:
+    """最近剖析结果的环形缓冲区"""
+
+    def __init__(self, capacity: int):
+        self._profiles: Deque[Profile] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        """分配剖析ID"""
+        return next(self._ids)
+
+    def add(self, profile: Profile) -> None:
+        """保存剖析结果，超出容量时丢弃最旧的"""
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[Profile]:
+        """最近的剖析结果 (新的在前)"""
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        """按ID获取剖析结果"""
+        with self._lock:
+            for profile in self._profiles:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    按需剖析请求
+
+    触发方式: 请求头 X-Profile 携带管理员令牌，或按 sample_rate 随机抽样。
+    同一时间只剖析一个请求，其余请求直接放行。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        admin_token: str = "",
+        sample_rate: float = 0.0,
+        interval_ms: float = 5.0
+    ):
+        self.app = app
+        self.store = store
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self._busy = threading.Lock()
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        """判断是否剖析当前请求，返回触发方式"""
+        if self.admin_token:
+            token = Headers(scope=scope).get(PROFILE_HEADER)
+            if token and hmac.compare_digest(token, self.admin_token):
+                return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.store.next_id()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, str(profile_id))
+            await send(message)
+
+        sampler = StackSampler(self.interval_ms / 1000)
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            self._busy.release()
+            self.store.add(Profile(
+                id=profile_id,
+                method=scope["method"],
+                path=scope["path"],
+                trigger=trigger,
+                started_at=started_at,
+                duration_ms=(time.perf_counter() - started) * 1000,
+                interval_ms=self.interval_ms,
+                samples=sampler.samples,
+                stacks=dict(sampler.stacks),
+            ))
+
+
+# 进程内的剖析结果缓冲区
+profile_store = ProfileStore(settings.PROFILING_BUFFER_SIZE)
@@ -0,0 +1,244 @@
+"""
+按用户限流
+
+已登录请求按令牌中的用户 ID (与 deps.get_current_user 解析的用户一致) 计数，未登录请求按客户端 IP 计数；
+不同路由消耗不同数量的令牌，超出时返回 429 + Retry-After，请求不会占用线程池和数据库连接。
+
+- TokenBucketLimiter: 进程内令牌桶，只在事件循环线程中读写，无锁
+- CounterStoreLimiter: 基于共享计数存储 (CounterStore) 的固定窗口限流，多个工作进程 / 实例共享额度；
+  LocalCounterStore 是进程内的替身，接入 Redis 等共享存储时实现 CounterStore.incr 即可
+
+热路径只做字典查找和浮点运算：令牌校验结果按令牌缓存，同一令牌只校验一次签名。
+"""
+
+import json
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import rate_limited_requests_total
+from app.core.security import decode_access_token
+
+# 按路径后缀匹配的令牌消耗 (先匹配先生效)
+ROUTE_COSTS: Tuple[Tuple[str, int], ...] = (
+    ("/health-records/batch", 10),
+    ("/health-records/batch-delete", 10),
+    ("/health-trends", 5),
+    ("/health-summary", 3),
+)
+WRITE_COST = 2
+DEFAULT_COST = 1
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+@dataclass
+class Decision:
+    """一次限流判定"""
+    allowed: bool
+    remaining: float
+    retry_after: float = 0.0
+
+
+class RateLimiter(ABC):
+    """限流器接口"""
+
+    enabled: bool = True
+
+    @abstractmethod
+    async def hit(self, key: str, cost: int) -> Decision:
+        """
+        消耗 key 的 cost 个令牌
+
+        Args:
+            key: 限流键 (user:<id> 或 ip:<地址>)
+            cost: 本次请求消耗的令牌数
+
+        Returns:
+            限流判定
+        """
+
+
+class TokenBucketLimiter(RateLimiter):
+    """
+    进程内令牌桶
+
+    每个键一个 [令牌数, 更新时间] 列表；取令牌时按经过的时间补充。
+    键数量超过 max_keys 时清理已经补满的桶 (与不存在等价)。
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def hit(self, key: str, cost: int) -> Decision:
+        return self.consume(key, cost, time.monotonic())
+
+    def consume(self, key: str, cost: int, now: float) -> Decision:
+        """同步版本的 hit (指定当前时间，便于测试和基准)"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return Decision(True, bucket[0])
+        return Decision(False, bucket[0], (cost - bucket[0]) / self.rate)
+
+    def _prune(self, now: float) -> None:
+        full_after = self.burst / self.rate
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+
+class CounterStore(ABC):
+    """共享计数存储接口 (语义对应 Redis INCRBY + EXPIRE)"""
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        """
+        原子地增加计数并返回增加后的值
+
+        Args:
+            key: 计数键
+            amount: 增量
+            ttl: 键首次创建时设置的过期秒数
+
+        Returns:
+            增加后的计数
+        """
+
+
+class LocalCounterStore(CounterStore):
+    """进程内计数存储 (开发与测试时代替共享存储)"""
+
+    def __init__(self) -> None:
+        self._counters: Dict[str, List[float]] = {}
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        now = time.monotonic()
+        counter = self._counters.get(key)
+        if counter is None or counter[1] <= now:
+            if len(self._counters) > 10_000:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            counter = self._counters[key] = [0, now + ttl]
+        counter[0] += amount
+        return int(counter[0])
+
+
+class CounterStoreLimiter(RateLimiter):
+    """
+    基于共享计数的固定窗口限流
+
+    窗口长度为 burst / rate 秒，每个窗口最多消耗 burst 个令牌，长期平均速率与令牌桶相同。
+    """
+
+    def __init__(self, store: CounterStore, rate: float, burst: float):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.window = burst / rate
+
+    async def hit(self, key: str, cost: int) -> Decision:
+        now = time.time()
+        window_index = int(now // self.window)
+        used = await self.store.incr(f"ratelimit:{key}:{window_index}", cost, self.window * 2)
+        if used <= self.burst:
+            return Decision(True, self.burst - used)
+        return Decision(False, 0.0, (window_index + 1) * self.window - now)
+
+
+class TokenCache:
+    """
+    令牌 → 用户 ID 的校验结果缓存
+
+    缓存到令牌过期时间；无效令牌缓存为 None，避免对同一个伪造令牌反复校验签名。
+    条目数达到上限时整体清空。
+    """
+
+    def __init__(self, max_size: int = 50_000, invalid_ttl: float = 60.0):
+        self.max_size = max_size
+        self.invalid_ttl = invalid_ttl
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def user_id(self, token: str, now: float) -> Optional[str]:
+        """返回令牌对应的用户 ID，令牌无效或已过期时返回 None"""
+        entry = self._entries.get(token)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        payload = decode_access_token(token)
+        if payload is None or payload.get("sub") is None:
+            entry = (None, now + self.invalid_ttl)
+        else:
+            entry = (str(payload["sub"]), float(payload.get("exp", now + self.invalid_ttl)))
+        if len(self._entries) >= self.max_size:
+            self._entries.clear()
+        self._entries[token] = entry
+        return entry[0]
+
+
+def route_cost(method: str, path: str) -> int:
+    """请求消耗的令牌数"""
+    for suffix, cost in ROUTE_COSTS:
+        if path.endswith(suffix):
+            return cost
+    return WRITE_COST if method in WRITE_METHODS else DEFAULT_COST
+
+
+def client_key(scope: Scope, tokens: TokenCache) -> str:
+    """
+    限流键: 携带有效 Bearer 令牌时为 user:<用户ID>，否则为 ip:<客户端地址>
+
+    客户端地址取自 ASGI scope (部署在反向代理之后时使用 uvicorn --proxy-headers)。
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            if value[:7].lower() == b"bearer ":
+                user_id = tokens.user_id(value[7:].decode("latin-1"), time.time())
+                if user_id is not None:
+                    return f"user:{user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """按用户 / IP 限流，超出时返回 429 + Retry-After"""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, api_prefix: str, tokens: Optional[TokenCache] = None):
+        self.app = app
+        self.limiter = limiter
+        self.api_prefix = api_prefix
+        self.tokens = tokens or TokenCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.limiter.enabled or not scope["path"].startswith(self.api_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        key = client_key(scope, self.tokens)
+        decision = await self.limiter.hit(key, route_cost(scope["method"], scope["path"]))
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limited_requests_total.inc((key.split(":", 1)[0],))
+        body = json.dumps({"detail": "请求过于频繁，请稍后重试"}, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(decision.retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,10 +1,11 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union, Optional
+from typing import Any, Dict, Union, Optional
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import track_bcrypt
 
 # 密码加密上下文 - 使用 bcrypt 算法
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -44,7 +45,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         密码是否匹配
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with track_bcrypt("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -57,7 +59,24 @@ def get_password_hash(password: str) -> str:
     Returns:
         哈希后的密码字符串
     """
-    return pwd_context.hash(password)
+    with track_bcrypt("hash"):
+        return pwd_context.hash(password)
+
+
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    校验 JWT 令牌签名与有效期并返回载荷
+
+    Args:
+        token: JWT 令牌字符串
+
+    Returns:
+        令牌载荷，令牌无效或已过期时返回 None
+    """
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
 
 
 def verify_token(token: str) -> Optional[str]:
@@ -70,16 +89,10 @@ def verify_token(token: str) -> Optional[str]:
     Returns:
         用户标识字符串，如果令牌无效则返回 None
     """
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data: str = payload.get("sub")
-        if token_data is None:
-            return None
-        return token_data
-    except JWTError:
+    payload = decode_access_token(token)
+    if payload is None:
         return None
+    return payload.get("sub")
 
 
 def check_password_strength(password: str) -> dict:
@@ -0,0 +1,111 @@
+"""
+请求合并 (single-flight)
+
+相同键的并发调用只执行一次：第一个调用者执行函数，其余调用者等待并共享同一结果或异常。
+调用结束后立即移除，不做缓存 —— 只合并同时在途的重复请求 (客户端超时重试、多端同时打开看板)。
+
+同步端点运行在线程池中，因此基于线程事件实现；结果对象在请求间共享，调用方不得修改。
+"""
+
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app.core.deadline import DeadlineExceeded, remaining
+from app.core.metrics import singleflight_calls_total, singleflight_in_flight
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    """一次在途调用"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        执行或加入相同键的在途调用
+
+        Args:
+            key: 合并键 (应包含用户与归一化后的全部查询参数)
+            func: 实际计算
+
+        Returns:
+            (结果, 是否共享了其他请求的结果)
+
+        Raises:
+            执行者抛出的异常会传给所有等待者
+            DeadlineExceeded: 等待者在自己的截止时间前没有等到结果
+        """
+        if not self.enabled:
+            return func(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            singleflight_calls_total.inc((self.name, "shared"))
+            if not call.done.wait(remaining()):
+                raise DeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        singleflight_calls_total.inc((self.name, "executed"))
+        singleflight_in_flight.inc((self.name,))
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            singleflight_in_flight.dec((self.name,))
+            call.done.set()
+
+    def forget(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        使匹配的在途调用不再被新请求加入
+
+        写入提交后调用：此后到达的请求重新执行查询，避免拿到写入前开始的查询结果。
+        已在等待的请求仍共享原结果。
+
+        Args:
+            predicate: 键匹配函数
+
+        Returns:
+            被移除的在途调用数
+        """
+        with self._lock:
+            keys = [key for key in self._calls if predicate(key)]
+            for key in keys:
+                del self._calls[key]
+        return len(keys)
+
+    def in_flight(self) -> int:
+        """当前在途的不同键数量"""
+        with self._lock:
+            return len(self._calls)
+
+
+def normalize_key(*parts: Any) -> Tuple[Any, ...]:
+    """将枚举等参数归一化为可哈希的值"""
+    return tuple(getattr(part, "value", part) for part in parts)
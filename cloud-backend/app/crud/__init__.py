@@ -1,4 +1,7 @@
 from .crud_user import user
 from .crud_health_record import health_record
+from .crud_health_stats import health_stats
+from .crud_health_alert import health_alert, alert_pipeline
+from .crud_outbox import outbox, outbox_worker
 
-__all__ = ["user", "health_record"]
\ No newline at end of file
+__all__ = ["user", "health_record", "health_stats", "health_alert", "alert_pipeline", "outbox", "outbox_worker"]
\ No newline at end of file
@@ -0,0 +1,210 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import select
+
+from app.core.alerts import Alert, AlertPipeline, RecordEvent, UserDetectorState, detect
+from app.core.config import settings
+from app.core.metrics import alerts_detected_total
+from app.crud.crud_health_stats import _insert
+from app.database import SessionLocal
+from app.db.routing import replica_read
+from app.models.health_alert import AlertDetectorState, HealthAlert
+from app.schemas.health_alert import AlertSeverity, AlertType
+
+
+class CRUDHealthAlert:
+    """健康告警 CRUD 操作类 (同时作为告警流水线的持久化接口)"""
+
+    def __init__(self, model: type[HealthAlert]):
+        self.model = model
+
+    @replica_read
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        alert_type: Optional[AlertType] = None,
+        severity: Optional[AlertSeverity] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[HealthAlert]:
+        """
+        获取用户的健康告警列表 (按检测时间倒序)
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            skip: 跳过的记录数
+            limit: 返回的记录数
+            alert_type: 告警类型筛选
+            severity: 严重程度筛选
+            start_date: 开始日期 (按触发记录的评估时间)
+            end_date: 结束日期
+
+        Returns:
+            健康告警列表
+        """
+        stmt = self._filtered(
+            select(self.model), user_id, alert_type, severity, start_date, end_date
+        )
+        stmt = stmt.order_by(desc(self.model.detected_at), desc(self.model.id)).offset(skip).limit(limit)
+        return list(db.scalars(stmt))
+
+    @replica_read
+    def count(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        alert_type: Optional[AlertType] = None,
+        severity: Optional[AlertSeverity] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """
+        统计用户的健康告警数量
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            alert_type: 告警类型筛选
+            severity: 严重程度筛选
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            告警总数
+        """
+        stmt = self._filtered(
+            select(func.count(self.model.id)), user_id, alert_type, severity, start_date, end_date
+        )
+        return db.scalar(stmt) or 0
+
+    def create_many(self, db: Session, alerts: Sequence[Alert]) -> None:
+        """
+        写入检测到的告警 (不提交)
+
+        Args:
+            db: 数据库会话
+            alerts: 告警列表
+        """
+        db.add_all([
+            self.model(
+                user_id=alert.user_id,
+                record_id=alert.record_id,
+                alert_type=alert.alert_type,
+                severity=alert.severity,
+                message=alert.message,
+                value=alert.value,
+                details=alert.details,
+                assessed_at=alert.assessed_at,
+            )
+            for alert in alerts
+        ])
+
+    def load_states(
+        self,
+        db: Session,
+        user_ids: Iterable[int],
+        *,
+        for_update: bool = False
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        读取检测器状态检查点
+
+        Args:
+            db: 数据库会话
+            user_ids: 用户ID
+            for_update: 是否锁定状态行 (多个发件箱工作进程处理同一用户时串行化)
+
+        Returns:
+            用户ID -> 检测器状态 (没有检查点的用户不在结果中)
+        """
+        stmt = (
+            select(AlertDetectorState.user_id, AlertDetectorState.state)
+            .where(AlertDetectorState.user_id.in_(sorted(user_ids)))
+            .order_by(AlertDetectorState.user_id)
+        )
+        if for_update:
+            stmt = stmt.with_for_update()
+        return {row.user_id: row.state for row in db.execute(stmt)}
+
+    def save_states(self, db: Session, states: Dict[int, Dict[str, Any]]) -> None:
+        """
+        写回检测器状态检查点 (UPSERT，不提交)
+
+        Args:
+            db: 数据库会话
+            states: 用户ID -> 检测器状态
+        """
+        if not states:
+            return
+        stmt = _insert(db, AlertDetectorState)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AlertDetectorState.user_id],
+            set_={"state": stmt.excluded.state, "updated_at": func.now()},
+        )
+        db.execute(stmt, [{"user_id": user_id, "state": state} for user_id, state in states.items()])
+
+    def process_record_events(self, db: Session, payloads: List[Dict[str, Any]]) -> None:
+        """
+        发件箱处理器: 检测一批新健康记录并写入告警与检测器状态 (不提交)
+
+        告警、检测器状态与发件箱事件的已处理标记在同一事务中提交，重试不会重复生成告警。
+
+        Args:
+            db: 数据库会话
+            payloads: RecordEvent.to_payload() 的结果列表
+        """
+        events = [RecordEvent.from_payload(payload) for payload in payloads]
+        user_ids = {event.user_id for event in events}
+        checkpoints = self.load_states(db, user_ids, for_update=True)
+        states = {user_id: UserDetectorState.from_dict(checkpoints.get(user_id)) for user_id in user_ids}
+
+        alerts = detect(states, events)
+        self.create_many(db, alerts)
+        self.save_states(db, {user_id: state.to_dict() for user_id, state in states.items()})
+        for alert in alerts:
+            alerts_detected_total.inc((alert.alert_type,))
+
+    def _filtered(
+        self,
+        stmt,
+        user_id: int,
+        alert_type: Optional[AlertType],
+        severity: Optional[AlertSeverity],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ):
+        """添加用户与筛选条件"""
+        stmt = stmt.where(self.model.user_id == user_id)
+        if alert_type:
+            stmt = stmt.where(self.model.alert_type == alert_type)
+        if severity:
+            stmt = stmt.where(self.model.severity == severity)
+        if start_date:
+            stmt = stmt.where(self.model.assessed_at >= start_date)
+        if end_date:
+            stmt = stmt.where(self.model.assessed_at <= end_date)
+        return stmt
+
+
+# 创建 CRUD 实例
+health_alert = CRUDHealthAlert(HealthAlert)
+
+# API 进程内的告警流水线 (应用启动时 start，关闭时 stop)；启用事务发件箱时由发件箱工作进程检测。
+# 只支持单个 API 进程，WEB_CONCURRENCY > 1 时应用启动检查 (check_processes) 拒绝启动
+alert_pipeline = AlertPipeline(
+    SessionLocal,
+    health_alert,
+    workers=settings.ALERT_WORKERS,
+    queue_size=settings.ALERT_QUEUE_SIZE,
+    checkpoint_interval=settings.ALERT_CHECKPOINT_SECONDS,
+    enabled=settings.ALERTS_ENABLED and not settings.OUTBOX_ENABLED,
+)
@@ -1,9 +1,17 @@
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, and_, or_, func, text
+from sqlalchemy import desc, asc, and_, or_, func, text, Row, delete, update
 from sqlalchemy.sql import select
 
+from app.core.alerts import RecordEvent
+from app.core.analytics import analyze_trends
+from app.core.config import settings
+from app.core.singleflight import SingleFlight, normalize_key
+from app.crud.crud_health_alert import alert_pipeline
+from app.crud.crud_outbox import HEALTH_RECORD_CREATED, outbox
+from app.crud.crud_health_stats import ScoreEvent, build_summary, health_stats, window_start
+from app.db.routing import mark_written, replica_read
 from app.models.health_record import HealthRecord
 from app.schemas.health_record import (
     HealthRecordCreate, 
@@ -15,11 +23,24 @@ from app.schemas.health_record import (
     EChartsDataPoint,
     HealthSummary
 )
+from app.utils.helpers import to_local_naive
 
 
 class CRUDHealthRecord:
     """健康记录 CRUD 操作类"""
 
+    # 趋势图表只读取的列，均包含在覆盖索引 ix_health_records_user_date_active 中
+    TREND_COLUMNS = (
+        "assessed_at",
+        "overall_score",
+        "physical_score",
+        "mental_score",
+        "lifestyle_score",
+        "health_level",
+        "assessment_type",
+        "data_source",
+    )
+
     def __init__(self, model: type[HealthRecord]):
         self.model = model
 
@@ -47,13 +68,18 @@ class CRUDHealthRecord:
             lifestyle_score=obj_in.lifestyle_score,
             assessment_type=obj_in.assessment_type,
             health_level=health_level,
-            assessment_notes=obj_in.assessment_notes,
+            notes=obj_in.assessment_notes,
             detailed_metrics=obj_in.detailed_metrics,
             data_source=obj_in.data_source
         )
         
         db.add(db_obj)
+        health_stats.apply(db, user_id=user_id, added=[self._score_event(db_obj)])
+        self._publish_created(db, [db_obj])
         db.commit()
+        self._forget_trend_flights(user_id)
+        # 未启用事务发件箱时，告警检测由进程内的告警流水线异步进行 (非阻塞入队)
+        alert_pipeline.submit([self._record_event(db_obj)])
         db.refresh(db_obj)
         return db_obj
 
@@ -72,10 +98,12 @@ class CRUDHealthRecord:
         return db.query(self.model).filter(
             and_(
                 self.model.id == record_id,
-                self.model.user_id == user_id
+                self.model.user_id == user_id,
+                self.model.is_active
             )
         ).first()
 
+    @replica_read
     def get_multi(
         self, 
         db: Session, 
@@ -104,7 +132,7 @@ class CRUDHealthRecord:
         Returns:
             健康记录列表
         """
-        query = db.query(self.model).filter(self.model.user_id == user_id)
+        query = db.query(self.model).filter(self.model.user_id == user_id, self.model.is_active)
         
         # 添加筛选条件
         if assessment_type:
@@ -139,8 +167,9 @@ class CRUDHealthRecord:
         Returns:
             更新后的健康记录对象
         """
-        update_data = obj_in.model_dump(exclude_unset=True)
-        
+        update_data = self._update_values(obj_in)
+        before = self._score_event(db_obj)
+
         # 如果更新了评分，重新计算健康等级
         if "overall_score" in update_data:
             update_data["health_level"] = self._calculate_health_level(update_data["overall_score"])
@@ -149,13 +178,17 @@ class CRUDHealthRecord:
             setattr(db_obj, field, value)
         
         db.add(db_obj)
+        after = self._score_event(db_obj)
+        if after != before:
+            health_stats.apply(db, user_id=db_obj.user_id, added=[after], removed=[before])
         db.commit()
+        self._forget_trend_flights(db_obj.user_id)
         db.refresh(db_obj)
         return db_obj
 
     def delete(self, db: Session, *, record_id: int, user_id: int) -> Optional[HealthRecord]:
         """
-        删除健康记录
+        删除健康记录 (软删除模式下只标记 is_active = False，由后台压缩任务物理删除)
         
         Args:
             db: 数据库会话
@@ -167,10 +200,108 @@ class CRUDHealthRecord:
         """
         obj = self.get(db=db, record_id=record_id, user_id=user_id)
         if obj:
-            db.delete(obj)
+            if settings.HEALTH_RECORDS_SOFT_DELETE:
+                obj.is_active = False
+            else:
+                db.delete(obj)
+            health_stats.apply(db, user_id=user_id, removed=[self._score_event(obj)])
             db.commit()
+            self._forget_trend_flights(user_id)
         return obj
 
+    def bulk_update(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        record_ids: Sequence[int],
+        obj_in: HealthRecordUpdate
+    ) -> List[int]:
+        """
+        批量部分更新健康记录 (一条 UPDATE ... RETURNING)
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            record_ids: 记录ID列表
+            obj_in: 应用到每条记录的更新数据
+
+        Returns:
+            实际更新的记录ID (不存在或不属于该用户的ID被忽略)
+        """
+        values = self._update_values(obj_in)
+        if not values or not record_ids:
+            return []
+        if "overall_score" in values:
+            values["health_level"] = self._calculate_health_level(values["overall_score"])
+        if "overall_score" in values or "assessed_at" in values:
+            # 评分或评估时间变化都会影响统计摘要 (时间决定记录落入哪些时间范围)；
+            # 先使统计行失效 (锁定统计行)，并发的重新计算会等待本事务提交后再读取记录
+            health_stats.invalidate(db, user_id=user_id)
+
+        stmt = (
+            update(self.model)
+            .where(self.model.user_id == user_id, self.model.is_active, self.model.id.in_(set(record_ids)))
+            .values(**values)
+            .returning(self.model.id)
+            .execution_options(synchronize_session="fetch")
+        )
+        return self._commit_bulk(db, stmt, user_id)
+
+    def bulk_delete(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        record_ids: Optional[Sequence[int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        data_source: Optional[DataSource] = None,
+        assessment_type: Optional[AssessmentType] = None
+    ) -> List[int]:
+        """
+        按ID列表和 / 或筛选条件批量删除健康记录 (条件之间为 AND)
+
+        软删除模式下为一条 UPDATE ... SET is_active = false RETURNING，否则为 DELETE ... RETURNING
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            record_ids: 记录ID列表
+            start_date: 评估时间起始 (含)
+            end_date: 评估时间截止 (含)
+            data_source: 数据来源
+            assessment_type: 评估类型
+
+        Returns:
+            实际删除的记录ID
+
+        Raises:
+            ValueError: 没有指定任何条件
+        """
+        conditions = [self.model.user_id == user_id, self.model.is_active]
+        if record_ids is not None:
+            conditions.append(self.model.id.in_(set(record_ids)))
+        if start_date:
+            conditions.append(self.model.assessed_at >= start_date)
+        if end_date:
+            conditions.append(self.model.assessed_at <= end_date)
+        if data_source:
+            conditions.append(self.model.data_source == data_source)
+        if assessment_type:
+            conditions.append(self.model.assessment_type == assessment_type)
+        if len(conditions) == 2:
+            raise ValueError("批量删除至少需要指定记录ID列表或一个筛选条件")
+
+        health_stats.invalidate(db, user_id=user_id)
+        if settings.HEALTH_RECORDS_SOFT_DELETE:
+            stmt = update(self.model).where(*conditions).values(is_active=False)
+        else:
+            stmt = delete(self.model).where(*conditions)
+        stmt = stmt.returning(self.model.id).execution_options(synchronize_session="fetch")
+        return self._commit_bulk(db, stmt, user_id)
+
+    @replica_read
     def get_health_trends(
         self, 
         db: Session, 
@@ -206,6 +337,7 @@ class CRUDHealthRecord:
         query = db.query(self.model).filter(
             and_(
                 self.model.user_id == user_id,
+                self.model.is_active,
                 self.model.assessed_at >= query_start,
                 self.model.assessed_at <= query_end
             )
@@ -226,6 +358,7 @@ class CRUDHealthRecord:
         
         return records, summary
 
+    @replica_read
     def get_echarts_data(
         self, 
         db: Session, 
@@ -254,8 +387,8 @@ class CRUDHealthRecord:
         Returns:
             (ECharts数据点列表, ECharts配置建议)
         """
-        records, summary = self.get_health_trends(
-            db=db,
+        data_points, echarts_config, _ = self.get_trend_view(
+            db,
             user_id=user_id,
             time_range=time_range,
             start_date=start_date,
@@ -264,17 +397,126 @@ class CRUDHealthRecord:
             data_source=data_source,
             limit=limit
         )
+        return data_points, echarts_config
+
+    @replica_read
+    def get_trend_view(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        time_range: TimeRange = TimeRange.MONTH,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        assessment_type: Optional[AssessmentType] = None,
+        data_source: Optional[DataSource] = None,
+        limit: int = 100,
+        analytics: bool = False
+    ) -> Tuple[List[EChartsDataPoint], Dict[str, Any], Dict[str, Any]]:
+        """
+        获取趋势数据点、ECharts 配置建议与统计摘要 (一次查询)
+
+        相同用户、相同归一化参数的并发调用合并为一次查询并共享结果，
+        返回的对象在请求间共享，调用方不得修改。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            time_range: 时间范围 (提供完整的自定义时间范围时忽略)
+            start_date: 自定义开始日期
+            end_date: 自定义结束日期
+            assessment_type: 评估类型筛选
+            data_source: 数据来源筛选
+            limit: 返回记录数限制
+            analytics: 是否在统计摘要中加入向量化趋势分析 (summary["analytics"])
+
+        Returns:
+            (ECharts数据点列表, ECharts配置建议, 统计摘要)
+        """
+        custom_range = bool(start_date and end_date)
+        key = normalize_key(
+            user_id,
+            None if custom_range else time_range,
+            start_date if custom_range else None,
+            end_date if custom_range else None,
+            assessment_type,
+            data_source,
+            limit,
+            analytics,
+        )
+
+        def compute() -> Tuple[List[EChartsDataPoint], Dict[str, Any], Dict[str, Any]]:
+            query_start, query_end = self._calculate_time_range(time_range, start_date, end_date)
+            rows = self.get_trend_points(
+                db=db,
+                user_id=user_id,
+                start_date=query_start,
+                end_date=query_end,
+                assessment_type=assessment_type,
+                data_source=data_source,
+                limit=limit
+            )
+            summary = self._calculate_summary(db, user_id, rows, query_start, query_end)
+            if analytics:
+                summary["analytics"] = analyze_trends(rows)
+
+            # 转换为 ECharts 数据格式
+            data_points = [self._to_echarts_point(row) for row in rows]
+
+            # 生成 ECharts 配置建议
+            echarts_config = self._generate_echarts_config(data_points, summary)
+
+            return data_points, echarts_config, summary
+
+        result, _ = trend_flight.do(key, compute)
+        return result
+
+    @replica_read
+    def get_trend_points(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        assessment_type: Optional[AssessmentType] = None,
+        data_source: Optional[DataSource] = None,
+        limit: int = 100
+    ) -> List[Row]:
+        """
+        获取趋势图表数据点 (只查询图表所需列)
         
-        # 转换为 ECharts 数据格式
-        data_points = [
-            EChartsDataPoint(**record.get_echarts_data_point()) 
-            for record in records
-        ]
+        查询列全部包含在覆盖索引中，PostgreSQL 可以使用 Index Only Scan 完成查询，
+        无需回表读取 notes / detailed_metrics 等宽列。
         
-        # 生成 ECharts 配置建议
-        echarts_config = self._generate_echarts_config(data_points, summary)
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            start_date: 开始时间
+            end_date: 结束时间
+            assessment_type: 评估类型筛选
+            data_source: 数据来源筛选
+            limit: 返回记录数限制
+            
+        Returns:
+            按评估时间升序排列的行列表 (可按列名访问属性)
+        """
+        columns = [getattr(self.model, name) for name in self.TREND_COLUMNS]
+        stmt = select(*columns).where(
+            self.model.user_id == user_id,
+            self.model.is_active,
+            self.model.assessed_at >= start_date,
+            self.model.assessed_at <= end_date
+        )
         
-        return data_points, echarts_config
+        if assessment_type:
+            stmt = stmt.where(self.model.assessment_type == assessment_type)
+        
+        if data_source:
+            stmt = stmt.where(self.model.data_source == data_source)
+        
+        stmt = stmt.order_by(asc(self.model.assessed_at)).limit(limit)
+        return list(db.execute(stmt).all())
 
     def get_latest_record(self, db: Session, *, user_id: int) -> Optional[HealthRecord]:
         """
@@ -288,9 +530,11 @@ class CRUDHealthRecord:
             最新的健康记录或None
         """
         return db.query(self.model).filter(
-            self.model.user_id == user_id
+            self.model.user_id == user_id,
+            self.model.is_active
         ).order_by(desc(self.model.assessed_at)).first()
 
+    @replica_read
     def count_records(
         self, 
         db: Session, 
@@ -315,7 +559,7 @@ class CRUDHealthRecord:
         Returns:
             记录总数
         """
-        query = db.query(func.count(self.model.id)).filter(self.model.user_id == user_id)
+        query = db.query(func.count(self.model.id)).filter(self.model.user_id == user_id, self.model.is_active)
         
         # 添加筛选条件
         if assessment_type:
@@ -364,20 +608,97 @@ class CRUDHealthRecord:
                 lifestyle_score=record_in.lifestyle_score,
                 assessment_type=record_in.assessment_type,
                 health_level=health_level,
-                assessment_notes=record_in.assessment_notes,
+                notes=record_in.assessment_notes,
                 detailed_metrics=record_in.detailed_metrics,
                 data_source=record_in.data_source
             )
             db_objs.append(db_obj)
         
         db.add_all(db_objs)
+        health_stats.apply(db, user_id=user_id, added=[self._score_event(obj) for obj in db_objs])
+        self._publish_created(db, db_objs)
         db.commit()
+        self._forget_trend_flights(user_id)
+        alert_pipeline.submit([self._record_event(obj) for obj in db_objs])
         
         for obj in db_objs:
             db.refresh(obj)
         
         return db_objs
 
+    def _update_values(self, obj_in: HealthRecordUpdate) -> Dict[str, Any]:
+        """更新数据转换为列值 (只包含显式设置的字段)"""
+        update_data = obj_in.model_dump(exclude_unset=True)
+        # 备注在模型中的列名为 notes
+        if "assessment_notes" in update_data:
+            update_data["notes"] = update_data.pop("assessment_notes")
+        return update_data
+
+    def _commit_bulk(self, db: Session, stmt, user_id: int) -> List[int]:
+        """执行批量 UPDATE / DELETE ... RETURNING，有记录受影响时提交，否则回滚"""
+        affected = sorted(db.scalars(stmt).all())
+        if not affected:
+            db.rollback()
+            return []
+        db.commit()
+        # 语句不经过 ORM flush，显式标记读己之写，之后的读取不会从延迟的只读副本读到旧数据
+        mark_written(db, user_id)
+        self._forget_trend_flights(user_id)
+        return affected
+
+    def _score_event(self, record: HealthRecord) -> ScoreEvent:
+        """提取记录中影响增量统计的字段"""
+        level = record.health_level or self._calculate_health_level(record.overall_score)
+        return ScoreEvent(
+            float(record.overall_score),
+            to_local_naive(record.assessed_at),
+            getattr(level, "value", level)
+        )
+
+    def _record_event(self, record: HealthRecord) -> RecordEvent:
+        """提取告警检测需要的字段"""
+        return RecordEvent(
+            user_id=record.user_id,
+            record_id=record.id,
+            assessed_at=record.assessed_at,
+            overall_score=float(record.overall_score),
+            detailed_metrics=record.detailed_metrics
+        )
+
+    def _publish_created(self, db: Session, records: List[HealthRecord]) -> None:
+        """在记录的写事务中写入发件箱事件 (提交前调用)"""
+        if not settings.OUTBOX_ENABLED:
+            return
+        # 先写入记录以获得记录ID
+        db.flush()
+        outbox.add(db, HEALTH_RECORD_CREATED, [self._record_event(record).to_payload() for record in records])
+
+    def _forget_trend_flights(self, user_id: int) -> None:
+        """写入提交后，后续趋势 / 统计摘要请求不再加入写入前开始的在途查询"""
+        trend_flight.forget(lambda key: key[0] == user_id)
+        health_stats.forget_flights(user_id)
+
+    def _to_echarts_point(self, row: Row) -> EChartsDataPoint:
+        """
+        将趋势查询结果行转换为 ECharts 数据点
+        
+        Args:
+            row: get_trend_points 返回的行
+            
+        Returns:
+            ECharts 数据点
+        """
+        return EChartsDataPoint(
+            date=row.assessed_at.strftime('%Y-%m-%d'),
+            timestamp=int(row.assessed_at.timestamp() * 1000),
+            value=float(row.overall_score),
+            physical=float(row.physical_score) if row.physical_score is not None else None,
+            mental=float(row.mental_score) if row.mental_score is not None else None,
+            lifestyle=float(row.lifestyle_score) if row.lifestyle_score is not None else None,
+            level=row.health_level or self._calculate_health_level(row.overall_score),
+            type=row.assessment_type
+        )
+
     def _calculate_health_level(self, score: float) -> HealthLevel:
         """
         根据评分计算健康等级
@@ -388,14 +709,7 @@ class CRUDHealthRecord:
         Returns:
             健康等级
         """
-        if score >= 80:
-            return HealthLevel.EXCELLENT
-        elif score >= 60:
-            return HealthLevel.GOOD
-        elif score >= 40:
-            return HealthLevel.FAIR
-        else:
-            return HealthLevel.POOR
+        return HealthLevel.from_score(score)
 
     def _calculate_time_range(
         self, 
@@ -421,26 +735,13 @@ class CRUDHealthRecord:
             return start_date, end_date
         
         # 根据预设时间范围计算
-        if time_range == TimeRange.WEEK:
-            start = now - timedelta(days=7)
-        elif time_range == TimeRange.MONTH:
-            start = now - timedelta(days=30)
-        elif time_range == TimeRange.QUARTER:
-            start = now - timedelta(days=90)
-        elif time_range == TimeRange.HALF_YEAR:
-            start = now - timedelta(days=180)
-        elif time_range == TimeRange.YEAR:
-            start = now - timedelta(days=365)
-        else:  # ALL
-            start = datetime(2020, 1, 1)  # 假设系统从2020年开始
-        
-        return start, now
+        return window_start(time_range, now), now
 
     def _calculate_summary(
         self, 
         db: Session, 
         user_id: int, 
-        records: List[HealthRecord],
+        records: Sequence[Any],
         start_date: datetime,
         end_date: datetime
     ) -> Dict[str, Any]:
@@ -450,49 +751,14 @@ class CRUDHealthRecord:
         Args:
             db: 数据库会话
             user_id: 用户ID
-            records: 健康记录列表
+            records: 健康记录列表 (ORM 对象或 get_trend_points 返回的行，按时间升序)
             start_date: 查询开始时间
             end_date: 查询结束时间
             
         Returns:
             统计摘要字典
         """
-        if not records:
-            return {
-                "latest_score": None,
-                "average_score": None,
-                "max_score": None,
-                "min_score": None,
-                "score_trend": "stable",
-                "total_assessments": 0,
-                "assessment_frequency": 0.0,
-                "health_level_distribution": {},
-                "improvement_rate": None
-            }
-        
-        # 基础统计
         scores = [r.overall_score for r in records]
-        latest_score = records[-1].overall_score if records else None
-        average_score = sum(scores) / len(scores)
-        max_score = max(scores)
-        min_score = min(scores)
-        
-        # 趋势分析 (比较首末两个记录)
-        if len(records) >= 2:
-            first_score = records[0].overall_score
-            last_score = records[-1].overall_score
-            if last_score > first_score + 5:
-                score_trend = "rising"
-            elif last_score < first_score - 5:
-                score_trend = "falling"
-            else:
-                score_trend = "stable"
-        else:
-            score_trend = "stable"
-        
-        # 评估频率 (次/月)
-        days_span = (end_date - start_date).days
-        assessment_frequency = len(records) / max(days_span / 30, 1) if days_span > 0 else 0
         
         # 健康等级分布
         level_counts = {}
@@ -500,24 +766,16 @@ class CRUDHealthRecord:
             level = record.health_level
             level_counts[level] = level_counts.get(level, 0) + 1
         
-        # 改善率 (如果有足够的数据)
-        improvement_rate = None
-        if len(records) >= 2:
-            first_score = records[0].overall_score
-            last_score = records[-1].overall_score
-            improvement_rate = ((last_score - first_score) / first_score) * 100
-        
-        return {
-            "latest_score": round(latest_score, 1) if latest_score else None,
-            "average_score": round(average_score, 1),
-            "max_score": round(max_score, 1),
-            "min_score": round(min_score, 1),
-            "score_trend": score_trend,
-            "total_assessments": len(records),
-            "assessment_frequency": round(assessment_frequency, 2),
-            "health_level_distribution": level_counts,
-            "improvement_rate": round(improvement_rate, 2) if improvement_rate else None
-        }
+        return build_summary(
+            count=len(records),
+            mean=sum(scores) / len(scores) if scores else None,
+            min_score=min(scores, default=None),
+            max_score=max(scores, default=None),
+            first_score=scores[0] if scores else None,
+            last_score=scores[-1] if scores else None,
+            level_counts=level_counts,
+            days_span=(end_date - start_date).days
+        )
 
     def _generate_echarts_config(
         self, 
@@ -629,5 +887,8 @@ class CRUDHealthRecord:
         return colors.get(trend, "#1890ff")
 
 
+# 趋势 / 摘要计算的请求合并 (相同用户、相同参数的并发请求共享一次查询)
+trend_flight = SingleFlight("health_trends", enabled=settings.SINGLE_FLIGHT_ENABLED)
+
 # 创建 CRUD 实例
 health_record = CRUDHealthRecord(HealthRecord)
\ No newline at end of file
@@ -0,0 +1,338 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import asc, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import select
+
+from app.core.config import settings
+from app.core.metrics import health_stats_reads_total
+from app.core.singleflight import SingleFlight
+from app.models.health_record import HealthRecord
+from app.models.health_stats import HealthStats
+from app.schemas.health_record import ALL_TIME_START, TIME_RANGE_DAYS, HealthLevel, TimeRange
+from app.utils.helpers import to_local_naive
+
+
+class ScoreEvent(NamedTuple):
+    """健康记录中影响增量统计的字段"""
+    score: float
+    assessed_at: datetime  # 本地无时区时间
+    level: str
+
+
+def window_start(time_range: TimeRange, now: datetime) -> datetime:
+    """预设时间范围的开始时间"""
+    days = TIME_RANGE_DAYS[time_range]
+    return now - timedelta(days=days) if days else ALL_TIME_START
+
+
+def build_summary(
+    *,
+    count: int,
+    mean: Optional[float],
+    min_score: Optional[float],
+    max_score: Optional[float],
+    first_score: Optional[float],
+    last_score: Optional[float],
+    level_counts: Dict[str, int],
+    days_span: int
+) -> Dict[str, Any]:
+    """
+    由聚合值生成健康统计摘要
+
+    Args:
+        count: 评估次数
+        mean: 平均评分
+        min_score: 最低评分
+        max_score: 最高评分
+        first_score: 时间范围内最早一次评分
+        last_score: 时间范围内最新一次评分
+        level_counts: 健康等级分布
+        days_span: 时间范围天数
+
+    Returns:
+        统计摘要字典 (字段与 HealthSummary 一致)
+    """
+    if not count:
+        return {
+            "latest_score": None,
+            "average_score": None,
+            "max_score": None,
+            "min_score": None,
+            "score_trend": "stable",
+            "total_assessments": 0,
+            "assessment_frequency": 0.0,
+            "health_level_distribution": {},
+            "improvement_rate": None
+        }
+
+    # 趋势分析 (比较首末两个记录)
+    score_trend = "stable"
+    improvement_rate = None
+    if count >= 2:
+        if last_score > first_score + 5:
+            score_trend = "rising"
+        elif last_score < first_score - 5:
+            score_trend = "falling"
+        if first_score:
+            improvement_rate = ((last_score - first_score) / first_score) * 100
+
+    # 评估频率 (次/月)
+    assessment_frequency = count / max(days_span / 30, 1) if days_span > 0 else 0
+
+    return {
+        "latest_score": round(last_score, 1) if last_score else None,
+        "average_score": round(mean, 1),
+        "max_score": round(max_score, 1),
+        "min_score": round(min_score, 1),
+        "score_trend": score_trend,
+        "total_assessments": count,
+        "assessment_frequency": round(assessment_frequency, 2),
+        "health_level_distribution": dict(level_counts),
+        "improvement_rate": round(improvement_rate, 2) if improvement_rate else None
+    }
+
+
+class CRUDHealthStats:
+    """
+    健康统计增量维护
+
+    每个用户每个预设时间范围一行统计 (HealthStats)：
+    - 写入: 在健康记录的写事务中锁定该用户的统计行并增量更新 (Welford)；
+      删除 / 修改的记录是最值或首末记录时无法增量更新，将统计行标记为失效
+    - 读取: 一次主键查询；统计行缺失、已失效或已过期 (最早记录移出时间窗口、
+      未来时间的记录进入时间窗口) 时，用一次覆盖索引范围查询重新计算并写回
+
+    写入与重新计算都先锁定统计行 (SELECT ... FOR UPDATE)，缺失的行先插入失效占位行，
+    保证重新计算不会漏掉并发写入事务中尚未提交的记录。
+    同一用户并发的重新计算按用户合并 (stats_flight)：统计行失效后涌入的摘要请求只有一个执行
+    范围查询，其余请求不再排队等待行锁后逐个重复计算。
+    """
+
+    def __init__(self, model: type[HealthStats]):
+        self.model = model
+
+    def get_summary(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        time_range: TimeRange,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        获取健康统计摘要
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            time_range: 预设时间范围
+            now: 当前时间 (默认 datetime.now()，便于测试)
+
+        Returns:
+            统计摘要字典 (与合并的并发请求共享，调用方不得修改)
+        """
+        now = now or datetime.now()
+        stats = db.get(self.model, (user_id, time_range.value))
+        if stats is not None and self._is_fresh(stats, now):
+            health_stats_reads_total.inc(("hit",))
+            return self._to_summary(stats, time_range, now)
+
+        def refresh() -> Dict[str, Dict[str, Any]]:
+            # 执行者在自己的会话中重新计算并提交，只把摘要字典 (而不是 ORM 对象) 交给等待者
+            rows = self._refresh(db, user_id=user_id, now=now)
+            summaries = {key: self._to_summary(row, TimeRange(key), now) for key, row in rows.items()}
+            db.commit()
+            return summaries
+
+        summaries, shared = stats_flight.do(user_id, refresh)
+        health_stats_reads_total.inc(("shared" if shared else "refresh",))
+        return summaries[time_range.value]
+
+    def apply(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        added: Sequence[ScoreEvent] = (),
+        removed: Sequence[ScoreEvent] = (),
+        now: Optional[datetime] = None
+    ) -> None:
+        """
+        在健康记录的写事务中 (提交前) 增量更新统计
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            added: 新增的记录
+            removed: 删除的记录 (修改记录时为修改前的值)
+            now: 当前时间
+        """
+        if not added and not removed:
+            return
+        now = now or datetime.now()
+
+        for stats in self._lock(db, user_id):
+            # 已失效的统计行等待读取时重新计算
+            if not self._is_fresh(stats, now):
+                continue
+            time_range = TimeRange(stats.time_range)
+            start = window_start(time_range, now)
+
+            for event in removed:
+                if not start <= event.assessed_at <= now:
+                    continue
+                if not stats.remove_score(event.score, event.assessed_at, event.level):
+                    stats.stale = True
+                    break
+            if stats.stale:
+                continue
+
+            for event in added:
+                if event.assessed_at > now:
+                    # 未来时间的记录在到达评估时间时进入时间窗口
+                    stats.expires_at = _earliest(stats.expires_at, event.assessed_at)
+                elif event.assessed_at >= start:
+                    stats.add_score(event.score, event.assessed_at, event.level)
+                    days = TIME_RANGE_DAYS[time_range]
+                    if days:
+                        first_at = to_local_naive(stats.first_at)
+                        stats.expires_at = _earliest(stats.expires_at, first_at + timedelta(days=days))
+
+    def forget_flights(self, user_id: int) -> None:
+        """写入提交后，后续摘要请求不再加入写入前开始的在途重新计算"""
+        stats_flight.forget(lambda key: key == user_id)
+
+    def invalidate(self, db: Session, *, user_id: Optional[int] = None) -> int:
+        """
+        将统计行标记为失效 (绕过 CRUD 的批量写入、删除历史分区之后调用)
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID，为空时标记所有用户
+
+        Returns:
+            标记的行数
+        """
+        stmt = update(self.model).values(stale=True)
+        if user_id is not None:
+            stmt = stmt.where(self.model.user_id == user_id)
+        return db.execute(stmt).rowcount
+
+    def _lock(self, db: Session, user_id: int) -> List[HealthStats]:
+        """锁定用户的全部统计行，缺失的行先插入失效占位行"""
+        stmt = (
+            select(self.model)
+            .where(self.model.user_id == user_id)
+            .order_by(self.model.time_range)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        rows = list(db.scalars(stmt))
+        if len(rows) < len(TimeRange):
+            existing = {row.time_range for row in rows}
+            placeholders = [
+                {
+                    "user_id": user_id,
+                    "time_range": time_range.value,
+                    "count": 0,
+                    "mean": 0.0,
+                    "m2": 0.0,
+                    "level_counts": {},
+                    "stale": True,
+                }
+                for time_range in TimeRange
+                if time_range.value not in existing
+            ]
+            db.execute(_insert(db, self.model).on_conflict_do_nothing(), placeholders)
+            rows = list(db.scalars(stmt))
+        return rows
+
+    def _refresh(self, db: Session, *, user_id: int, now: datetime) -> Dict[str, HealthStats]:
+        """重新计算失效的统计行 (不提交)"""
+        rows = {stats.time_range: stats for stats in self._lock(db, user_id)}
+        targets = [stats for stats in rows.values() if not self._is_fresh(stats, now)]
+        if not targets:
+            return rows
+
+        # 一次范围查询覆盖所有需要重新计算的时间范围 (不设上限，以便找到未来时间的记录)
+        earliest = min(window_start(TimeRange(stats.time_range), now) for stats in targets)
+        record = HealthRecord
+        result = db.execute(
+            select(record.assessed_at, record.overall_score, record.health_level)
+            .where(record.user_id == user_id, record.is_active, record.assessed_at >= earliest)
+            .order_by(asc(record.assessed_at))
+        )
+        events = [
+            ScoreEvent(
+                float(row.overall_score),
+                to_local_naive(row.assessed_at),
+                row.health_level or HealthLevel.from_score(row.overall_score).value,
+            )
+            for row in result
+        ]
+
+        for stats in targets:
+            self._recompute(stats, events, now)
+        return rows
+
+    def _recompute(self, stats: HealthStats, events: Sequence[ScoreEvent], now: datetime) -> None:
+        """用按时间升序排列的记录重新计算一个统计行"""
+        time_range = TimeRange(stats.time_range)
+        start = window_start(time_range, now)
+        stats.reset()
+        expires_at = None
+        for event in events:
+            if event.assessed_at > now:
+                expires_at = event.assessed_at
+                break
+            if event.assessed_at >= start:
+                stats.add_score(event.score, event.assessed_at, event.level)
+
+        days = TIME_RANGE_DAYS[time_range]
+        if days and stats.count:
+            expires_at = _earliest(expires_at, to_local_naive(stats.first_at) + timedelta(days=days))
+        stats.expires_at = expires_at
+        stats.stale = False
+
+    def _is_fresh(self, stats: HealthStats, now: datetime) -> bool:
+        """统计行是否可以直接使用"""
+        return not stats.stale and (stats.expires_at is None or to_local_naive(stats.expires_at) > now)
+
+    def _to_summary(self, stats: HealthStats, time_range: TimeRange, now: datetime) -> Dict[str, Any]:
+        """统计行转换为统计摘要"""
+        return build_summary(
+            count=stats.count,
+            mean=stats.mean,
+            min_score=stats.min_score,
+            max_score=stats.max_score,
+            first_score=stats.first_score,
+            last_score=stats.last_score,
+            level_counts=stats.level_counts or {},
+            days_span=(now - window_start(time_range, now)).days
+        )
+
+
+def _earliest(current: Optional[datetime], candidate: datetime) -> datetime:
+    """两个时间中较早的一个 (current 可以为空)"""
+    current = to_local_naive(current)
+    return candidate if current is None or candidate < current else current
+
+
+def _insert(db: Session, model: type[HealthStats]):
+    """按会话的数据库方言构造支持 ON CONFLICT 的 INSERT"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise RuntimeError(f"不支持的数据库: {dialect}")
+
+
+# 统计行重新计算的请求合并 (按用户，一次重新计算覆盖全部时间范围)
+stats_flight = SingleFlight("health_stats", enabled=settings.SINGLE_FLIGHT_ENABLED)
+
+# 创建 CRUD 实例
+health_stats = CRUDHealthStats(HealthStats)
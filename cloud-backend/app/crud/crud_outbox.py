@@ -0,0 +1,161 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import asc, delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import select
+
+from app.core.config import settings
+from app.core.outbox import OutboxWorker
+from app.crud.crud_health_alert import health_alert
+from app.database import SessionLocal
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# 事件主题
+HEALTH_RECORD_CREATED = "health_record.created"
+
+
+class CRUDOutbox:
+    """事务发件箱 CRUD 操作类 (同时作为发件箱工作进程的持久化接口)"""
+
+    def __init__(self, model: type[OutboxEvent]):
+        self.model = model
+
+    def add(self, db: Session, topic: str, payloads: Sequence[Dict[str, Any]]) -> None:
+        """
+        在当前事务中写入事件 (随业务数据一起提交，不单独提交)
+
+        Args:
+            db: 数据库会话
+            topic: 事件主题
+            payloads: 事件内容列表 (JSON 兼容)
+        """
+        db.add_all([self.model(topic=topic, payload=payload) for payload in payloads])
+
+    def claim(self, db: Session, *, limit: int, now: datetime) -> List[OutboxEvent]:
+        """
+        领取到期的待处理事件并加锁 (事务提交前其他工作进程跳过这些行)
+
+        Args:
+            db: 数据库会话
+            limit: 最大事件数
+            now: 当前时间
+
+        Returns:
+            按 id 升序排列的事件
+        """
+        stmt = (
+            select(self.model)
+            .where(self.model.status == "pending", self.model.available_at <= now)
+            .order_by(asc(self.model.id))
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(db.scalars(stmt))
+
+    def mark_done(self, db: Session, events: Sequence[OutboxEvent], *, now: datetime) -> None:
+        """
+        标记事件已处理 (不提交)
+
+        Args:
+            db: 数据库会话
+            events: 事件
+            now: 处理完成时间
+        """
+        for event in events:
+            event.status = "done"
+            event.attempts += 1
+            event.processed_at = now
+
+    def mark_failed(
+        self,
+        db: Session,
+        event: OutboxEvent,
+        *,
+        error: str,
+        now: datetime,
+        retry_at: Optional[datetime]
+    ) -> None:
+        """
+        记录处理失败 (不提交)
+
+        Args:
+            db: 数据库会话
+            event: 事件
+            error: 错误信息
+            now: 当前时间
+            retry_at: 下次重试时间，为空时标记为 dead 不再重试
+        """
+        event.attempts += 1
+        event.last_error = error[:2000]
+        if retry_at is None:
+            event.status = "dead"
+            event.processed_at = now
+        else:
+            event.available_at = retry_at
+
+    def purge(self, db: Session, *, before: datetime) -> int:
+        """
+        删除处理完成时间早于 before 的已处理事件 (保留 dead 事件供排查)
+
+        Args:
+            db: 数据库会话
+            before: 截止时间
+
+        Returns:
+            删除的事件数
+        """
+        stmt = delete(self.model).where(self.model.status == "done", self.model.processed_at < before)
+        return db.execute(stmt).rowcount
+
+
+    def pending_summary(self, db: Session) -> Tuple[int, Optional[datetime]]:
+        """
+        待处理事件数与最早的创建时间 (走 status = 'pending' 部分索引)
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            (待处理事件数, 最早一个待处理事件的创建时间，没有时为 None)
+        """
+        stmt = select(func.count(self.model.id), func.min(self.model.created_at)).where(
+            self.model.status == "pending"
+        )
+        count, oldest = db.execute(stmt).one()
+        return count, oldest
+
+
+# 创建 CRUD 实例
+outbox = CRUDOutbox(OutboxEvent)
+
+# 发件箱工作进程 (python run.py --worker)
+outbox_worker = OutboxWorker(
+    SessionLocal,
+    outbox,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    retry_backoff=settings.OUTBOX_RETRY_BACKOFF,
+    retention=settings.OUTBOX_RETENTION_HOURS * 3600,
+)
+if settings.ALERTS_ENABLED:
+    outbox_worker.register(HEALTH_RECORD_CREATED, health_alert.process_record_events)
+
+
+def check_outbox_backlog() -> None:
+    """API 启动时检查发件箱积压，最早的待处理事件等待过久时告警 (查询失败不影响启动)"""
+    try:
+        count, age = outbox_worker.backlog()
+    except SQLAlchemyError as e:
+        logger.warning(f"无法检查发件箱积压: {e}")
+        return
+    if age > settings.OUTBOX_BACKLOG_WARNING_SECONDS:
+        logger.warning(
+            f"发件箱有 {count} 个待处理事件，最早的已等待 {age:.0f} 秒: "
+            f"请确认 python run.py --worker 正在运行 (否则不会产生告警，outbox_events 也不会被清理)"
+        )
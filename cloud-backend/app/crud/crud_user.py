@@ -7,6 +7,7 @@ import logging
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
+from app.db.routing import replica_read
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -86,6 +87,7 @@ class CRUDUser:
             logger.error(f"根据用户名获取用户失败 (username: {username}): {e}")
             return None
 
+    @replica_read
     def get_multi(
         self, 
         db: Session, 
@@ -148,6 +150,7 @@ class CRUDUser:
             logger.error(f"获取用户列表失败: {e}")
             return []
 
+    @replica_read
     def get_count(
         self, 
         db: Session,
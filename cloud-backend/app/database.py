@@ -1,7 +1,13 @@
-from typing import Generator
-from sqlalchemy import create_engine, text
+from typing import Any, Dict, Generator
+from sqlalchemy import Index, create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.core.config import settings
+from app.core.deadline import install_statement_timeout, is_overload_error
+from app.db.pool import InstrumentedQueuePool, compute_pool_sizing, install_idle_liveness_check, pool_status
+from app.db.pooler import SingleTransactionSession, pooler_engine_kwargs, single_transaction
+from app.db.routing import RoutingSession, StickinessTracker
 import logging
 
 # 配置日志
@@ -15,46 +21,121 @@ class Base(DeclarativeBase):
     pass
 
 
+def active_index(name: str, *columns: str, active: bool = True, **kwargs: Any) -> Index:
+    """
+    声明以 is_active 为谓词的部分索引 (大多数读取只访问有效的用户 / 记录)
 
+    PostgreSQL 的谓词为布尔列本身，与查询中的 is_active / NOT is_active 条件匹配；
+    SQLite 没有布尔类型，查询条件渲染为 is_active = 1 / 0，谓词写成相同形式才会被查询计划选用。
 
-# 创建 PostgreSQL 引擎 - 使用连接池配置
-engine = create_engine(
-    settings.DATABASE_URL,
-    # PostgreSQL 连接池配置
-    pool_size=10,  # 连接池大小
-    max_overflow=20,  # 最大溢出连接数
-    pool_pre_ping=True,  # 连接前验证连接有效性
-    pool_recycle=3600,  # 1小时回收连接
-    pool_timeout=30,  # 连接池获取连接超时时间
-    # 性能配置
-    echo=False,  # 生产环境关闭 SQL 日志
-    echo_pool=False,  # 关闭连接池日志
-    future=True,  # 启用 SQLAlchemy 2.0 风格
+    Args:
+        name: 索引名
+        *columns: 索引列
+        active: True 时只索引 is_active 的行，False 时只索引 NOT is_active 的行
+        **kwargs: 传给 Index 的其他参数 (如 postgresql_include)
+
+    Returns:
+        部分索引
+    """
+    return Index(
+        name,
+        *columns,
+        postgresql_where=text("is_active" if active else "NOT is_active"),
+        sqlite_where=text("is_active = 1" if active else "is_active = 0"),
+        **kwargs
+    )
+
+
+
+
+# 每个工作进程的连接池大小 - 按连接预算和工作进程数计算，避免多进程时超出 max_connections
+pool_sizing = compute_pool_sizing(
+    budget=settings.DB_CONNECTION_BUDGET,
+    workers=settings.WEB_CONCURRENCY,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
 
 
+# 创建 PostgreSQL 引擎 - 使用连接池配置
+def build_engine(url: str) -> Engine:
+    """根据 URL 创建数据库引擎 (SQLite 仅用于本地测试，不使用连接池参数)"""
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False}, future=True)
+    if settings.DB_POOLER_MODE:
+        # 前置 PgBouncer 等事务级连接池代理：关闭预编译语句与 pre_ping，使用 NullPool 或小连接池
+        return create_engine(
+            url,
+            **pooler_engine_kwargs(url, settings.DB_POOLER_POOL_SIZE, settings.DB_POOL_TIMEOUT),
+            echo=False,
+            future=True,
+        )
+    new_engine = create_engine(
+        url,
+        # PostgreSQL 连接池配置
+        poolclass=InstrumentedQueuePool,  # 记录借出等待时间与超时
+        pool_size=pool_sizing.pool_size,  # 连接池大小
+        max_overflow=pool_sizing.max_overflow,  # 最大溢出连接数
+        pool_pre_ping=settings.DB_LIVENESS_CHECK == "pre_ping",  # 连接前验证连接有效性
+        pool_recycle=settings.DB_POOL_RECYCLE,  # 连接回收时间
+        pool_timeout=settings.DB_POOL_TIMEOUT,  # 连接池获取连接超时时间
+        # 性能配置
+        echo=False,  # 生产环境关闭 SQL 日志
+        echo_pool=False,  # 关闭连接池日志
+        future=True,  # 启用 SQLAlchemy 2.0 风格
+    )
+    if settings.DB_LIVENESS_CHECK == "idle":
+        install_idle_liveness_check(new_engine, settings.DB_LIVENESS_IDLE_SECONDS)
+    return new_engine
+
+
+# 主库引擎 - 所有写入和默认读取
+engine = build_engine(settings.DATABASE_URL)
+
+# 只读副本引擎 - 趋势、统计、列表等只读查询
+replica_engines = [build_engine(url) for url in settings.database_replica_urls]
+
+# 按角色命名的全部引擎，用于连接池监控
+named_engines = {"primary": engine}
+named_engines.update({f"replica_{i}": e for i, e in enumerate(replica_engines)})
+
+# 读己之写：用户写入后短时间内的读取仍走主库
+replica_stickiness = StickinessTracker(settings.REPLICA_STICKY_SECONDS)
+
 
 # 创建会话工厂 - 使用现代配置
 SessionLocal = sessionmaker(
     bind=engine,
+    class_=SingleTransactionSession if settings.DB_POOLER_MODE else RoutingSession,
+    replicas=replica_engines,
+    stickiness=replica_stickiness,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False,  # 避免会话提交后对象失效
 )
 
+# 每个事务开始时按请求剩余时间设置 statement_timeout
+install_statement_timeout(SessionLocal)
+
 
 # 数据库会话依赖注入
 def get_db() -> Generator[sessionmaker, None, None]:
     """
     获取数据库会话依赖注入
     
-    使用生成器模式确保会话正确关闭
+    使用生成器模式确保会话正确关闭；连接池代理模式下整个请求只使用一个事务
     """
     db = SessionLocal()
     try:
-        yield db
+        if settings.DB_POOLER_MODE:
+            with single_transaction(db):
+                yield db
+        else:
+            yield db
     except Exception as e:
-        logger.error(f"数据库会话错误: {e}")
+        # 过载时的超时属于预期情况，由应用返回 503，不逐条记录错误日志
+        if not is_overload_error(e):
+            logger.error(f"数据库会话错误: {e}")
         db.rollback()
         raise
     finally:
@@ -67,6 +148,8 @@ def create_tables() -> None:
     try:
         Base.metadata.create_all(bind=engine, checkfirst=True)
         logger.info("数据库表检查/创建完成")
+        if settings.HEALTH_RECORDS_PARTITIONING:
+            ensure_health_record_partitions()
     except Exception as e:
         logger.error(f"创建数据库表失败: {e}")
         # 如果是索引已存在的错误，忽略继续执行
@@ -76,6 +159,79 @@ def create_tables() -> None:
             raise
 
 
+# 启动时的表结构版本检查
+def check_schema_version(strict: bool = False) -> None:
+    """
+    检查表结构版本 (只读取 schema_migrations 的最大版本，不执行 DDL 或反射)
+
+    Args:
+        strict: 版本落后或检查失败时抛出异常，阻止工作进程启动
+
+    Raises:
+        RuntimeError: strict 模式下表结构不是最新
+    """
+    from app.db.migrations import check_schema_version as read_schema_status
+
+    try:
+        status = read_schema_status(engine)
+    except Exception as e:
+        logger.error(f"表结构版本检查失败: {e}")
+        if strict:
+            raise RuntimeError("表结构版本检查失败") from e
+        return
+    if status.up_to_date:
+        logger.info(f"表结构版本 {status.current} 已是最新")
+        return
+    if status.current is None:
+        message = "数据库未初始化版本记录，请执行 python migrate.py upgrade"
+    else:
+        message = (
+            f"表结构版本 {status.current} 落后于代码 ({status.latest})，"
+            f"待执行迁移: {', '.join(status.pending)}"
+        )
+    if strict:
+        raise RuntimeError(message)
+    logger.warning(message)
+
+
+def prepare_schema(mode: str) -> None:
+    """
+    按 SCHEMA_STARTUP_MODE 处理启动时的表结构
+
+    Args:
+        mode: check / strict / create_all / skip
+    """
+    if mode == "skip":
+        return
+    if mode == "create_all":
+        create_tables()
+        return
+    check_schema_version(strict=mode == "strict")
+
+
+# 预建健康记录未来分区
+def ensure_health_record_partitions() -> None:
+    """
+    为已分区的 health_records 预建未来月份分区
+
+    失败只记录错误而不抛出: 预建失败时新记录仍会写入 DEFAULT 分区，不应阻止应用启动，
+    可稍后用 manage_partitions.py premake 重试
+    """
+    from app.db.partitioning import ensure_future_partitions, is_partitioned
+
+    try:
+        with engine.begin() as connection:
+            if not is_partitioned(connection):
+                logger.warning("已启用分区但 health_records 不是分区表，请先执行 manage_partitions.py convert")
+                return
+            created = ensure_future_partitions(connection, settings.PARTITION_PREMAKE_MONTHS)
+    except SQLAlchemyError as e:
+        logger.exception(f"预建健康记录分区失败，请稍后执行 manage_partitions.py premake 重试: {e}")
+        return
+    if created:
+        logger.info(f"预建健康记录分区: {', '.join(created)}")
+
+
 # 数据库健康检查
 def check_database_connection() -> bool:
     """检查数据库连接状态"""
@@ -89,6 +245,19 @@ def check_database_connection() -> bool:
         return False
 
 
+# 连接池状态
+def get_pool_status() -> Dict[str, Any]:
+    """获取所有引擎连接池的实时状态"""
+    return {
+        "workers": settings.WEB_CONCURRENCY,
+        "connection_budget": settings.DB_CONNECTION_BUDGET,
+        "per_worker_max_connections": pool_sizing.max_connections,
+        "liveness_check": "none" if settings.DB_POOLER_MODE else settings.DB_LIVENESS_CHECK,
+        "pooler_mode": settings.DB_POOLER_MODE,
+        "engines": {name: pool_status(e) for name, e in named_engines.items()},
+    }
+
+
 # 数据库维护操作
 def optimize_database() -> None:
     """执行数据库优化操作"""
@@ -0,0 +1 @@
+"""数据库运维工具包 (分区、索引、迁移等)"""
@@ -0,0 +1,144 @@
+"""
+软删除健康记录的后台压缩任务
+
+软删除模式 (HEALTH_RECORDS_SOFT_DELETE，默认关闭) 下删除健康记录只把 is_active 置为 false，
+请求路径上只有一条 UPDATE；读取均带 is_active 条件，走 WHERE is_active 的部分索引，
+已删除的记录不出现在结果中，也不占用部分索引的空间。
+
+压缩任务在 python run.py --worker 进程中周期运行 (也可用 python compact_records.py 手动执行)，
+分批物理删除软删除超过 min_age 的记录:
+    - 每批按 id 顺序最多删除 batch_size 行 (ix_health_records_inactive 部分索引定位)，单独提交，
+      锁持有时间短；PostgreSQL 使用 FOR UPDATE SKIP LOCKED，与正在读写的事务互不等待
+    - 批次之间暂停 pause 秒，把 I/O 和 WAL 写入摊开，给 autovacuum 与复制留出余量
+    - 每轮最多 max_batches 批，积压在后续轮次继续处理
+
+软删除本身经 CRUD 提交 (单条删除走 ORM flush，批量删除走 _commit_bulk)，都会标记读己之写粘滞；
+压缩只物理删除读取早已看不到的行，结果对用户不可见，因此不标记粘滞。
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import asc, delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import record_compaction_purged_total
+from app.models.health_record import HealthRecord
+
+logger = logging.getLogger(__name__)
+
+
+class RecordCompactor:
+    """
+    软删除健康记录压缩任务
+
+    Args:
+        session_factory: 创建数据库会话的工厂 (如 SessionLocal)
+        batch_size: 每批删除的最大行数
+        pause: 批次之间的暂停时间 (秒)
+        min_age: 软删除后保留的时间 (秒)，给只读副本、备份与误删排查留出余量
+        max_batches: 每轮最多执行的批数
+        interval: 两轮之间的间隔 (秒)
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        batch_size: int = 1000,
+        pause: float = 0.5,
+        min_age: float = 86400.0,
+        max_batches: int = 100,
+        interval: float = 3600.0
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause = pause
+        self.min_age = min_age
+        self.max_batches = max_batches
+        self.interval = interval
+
+    @classmethod
+    def from_settings(cls, session_factory: Callable[[], Session]) -> "RecordCompactor":
+        """按 RECORD_COMPACTION_* 配置创建压缩任务"""
+        return cls(
+            session_factory,
+            batch_size=settings.RECORD_COMPACTION_BATCH_SIZE,
+            pause=settings.RECORD_COMPACTION_PAUSE,
+            min_age=settings.RECORD_COMPACTION_MIN_AGE_HOURS * 3600,
+            max_batches=settings.RECORD_COMPACTION_MAX_BATCHES,
+            interval=settings.RECORD_COMPACTION_INTERVAL_MINUTES * 60,
+        )
+
+    def purge_batch(self, db: Session, *, before: datetime) -> int:
+        """
+        删除一批在 before 之前软删除的记录 (不提交)
+
+        Args:
+            db: 数据库会话
+            before: 软删除 (updated_at) 截止时间
+
+        Returns:
+            删除的记录数
+        """
+        batch = (
+            select(HealthRecord.id)
+            .where(~HealthRecord.is_active, HealthRecord.updated_at < before)
+            .order_by(asc(HealthRecord.id))
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = delete(HealthRecord).where(HealthRecord.id.in_(batch.scalar_subquery()))
+        return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+    def compact_once(self, now: Optional[datetime] = None, stop: Optional[threading.Event] = None) -> int:
+        """
+        执行一轮压缩: 分批删除直到没有到期记录、达到 max_batches 或 stop 被设置
+
+        Args:
+            now: 当前时间 (UTC，默认当前时间，便于测试)
+            stop: 停止信号
+
+        Returns:
+            删除的记录数
+        """
+        now = now or datetime.now(timezone.utc)
+        before = now - timedelta(seconds=self.min_age)
+        total = 0
+        for _ in range(self.max_batches):
+            with self.session_factory() as db:
+                deleted = self.purge_batch(db, before=before)
+                db.commit()
+            total += deleted
+            record_compaction_purged_total.inc(amount=deleted)
+            if deleted < self.batch_size:
+                break
+            # 限速: 批次之间暂停，收到停止信号时立即结束
+            if stop is None:
+                time.sleep(self.pause)
+            elif stop.wait(self.pause):
+                break
+        return total
+
+    def run(self, stop: threading.Event) -> None:
+        """
+        每 interval 秒执行一轮压缩，直到 stop 被设置
+
+        Args:
+            stop: 停止信号
+        """
+        logger.info("健康记录压缩任务已启动: 每 %.0f 秒一轮，每批 %d 行", self.interval, self.batch_size)
+        while not stop.is_set():
+            try:
+                purged = self.compact_once(stop=stop)
+                if purged:
+                    logger.info("已物理删除 %d 条软删除的健康记录", purged)
+            except Exception:
+                # 数据库不可用等: 记录后等待下一轮，不退出进程
+                logger.exception("健康记录压缩失败")
+            stop.wait(self.interval)
+        logger.info("健康记录压缩任务已停止")
@@ -0,0 +1,309 @@
+"""
+索引审计与基于工作负载的索引建议
+
+- 静态审计: 根据模型元数据找出与主键、唯一索引或其他复合索引前缀重复的索引
+- 动态审计: 回放 CRUD 层实际发出的查询，收集 EXPLAIN (ANALYZE, BUFFERS) 与
+  pg_stat_user_indexes 使用统计，报告未使用、冗余以及可能缺失的索引
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import MetaData, UniqueConstraint, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+AUDITED_TABLES = ("users", "health_records")
+
+
+@dataclass
+class IndexInfo:
+    """索引描述 (模型声明或数据库实际存在的索引)"""
+    table: str
+    name: str
+    columns: List[str]
+    unique: bool = False
+    primary: bool = False
+    predicate: Optional[str] = None
+    scans: Optional[int] = None
+    size_bytes: Optional[int] = None
+
+    @property
+    def is_constraint_backed(self) -> bool:
+        """是否承担主键 / 唯一约束"""
+        return self.primary or self.unique
+
+
+@dataclass
+class RedundantIndex:
+    """冗余索引"""
+    index: IndexInfo
+    covered_by: IndexInfo
+    reason: str
+
+
+@dataclass
+class PlanSummary:
+    """单条查询的执行计划摘要"""
+    label: str
+    statement: str
+    execution_ms: float = 0.0
+    shared_hit: int = 0
+    shared_read: int = 0
+    indexes_used: Set[str] = field(default_factory=set)
+    seq_scans: List[Tuple[str, Optional[str], int]] = field(default_factory=list)
+
+
+@dataclass
+class IndexReport:
+    """索引审计报告"""
+    redundant: List[RedundantIndex] = field(default_factory=list)
+    unused: List[IndexInfo] = field(default_factory=list)
+    missing: List[Tuple[str, str, str]] = field(default_factory=list)
+    plans: List[PlanSummary] = field(default_factory=list)
+
+
+def indexes_from_metadata(metadata: MetaData, tables: Iterable[str] = AUDITED_TABLES) -> List[IndexInfo]:
+    """从 SQLAlchemy 元数据中提取主键、唯一约束和索引"""
+    result = []
+    for table in metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        if table.primary_key.columns:
+            result.append(IndexInfo(
+                table=table.name,
+                name=table.primary_key.name or f"{table.name}_pkey",
+                columns=[c.name for c in table.primary_key.columns],
+                unique=True,
+                primary=True,
+            ))
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                columns = [c.name for c in constraint.columns]
+                result.append(IndexInfo(
+                    table=table.name,
+                    name=constraint.name or f"{table.name}_{'_'.join(columns)}_key",
+                    columns=columns,
+                    unique=True,
+                ))
+        for index in table.indexes:
+            result.append(IndexInfo(
+                table=table.name,
+                name=index.name,
+                columns=[c.name for c in index.columns],
+                unique=bool(index.unique),
+                predicate=_index_predicate(index),
+            ))
+    return result
+
+
+def _index_predicate(index: Any) -> Optional[str]:
+    """获取部分索引的 WHERE 条件文本"""
+    where = index.dialect_options["postgresql"].get("where")
+    return str(where) if where is not None else None
+
+
+def find_redundant(indexes: List[IndexInfo]) -> List[RedundantIndex]:
+    """
+    找出冗余索引
+
+    规则:
+        1. 列完全相同的重复索引 (保留承担约束的那个)
+        2. 非唯一索引的列是另一索引列的前缀
+        3. 非主键索引以某个唯一键开头 (唯一键已能定位到单行)
+    """
+    redundant: Dict[str, RedundantIndex] = {}
+    for a in indexes:
+        if a.primary:
+            continue
+        for b in indexes:
+            if a is b or a.table != b.table or a.predicate != b.predicate or a.name in redundant:
+                continue
+            if a.columns == b.columns:
+                # 重复索引只报告一次：保留承担约束的，其次保留名称靠前的
+                if a.is_constraint_backed and not b.is_constraint_backed:
+                    continue
+                if a.is_constraint_backed == b.is_constraint_backed and a.name < b.name:
+                    continue
+                if b.name in redundant:
+                    continue
+                redundant[a.name] = RedundantIndex(a, b, "与该索引列完全相同")
+            elif not a.unique and _is_prefix(a.columns, b.columns):
+                redundant[a.name] = RedundantIndex(a, b, "是该索引的前缀")
+            elif b.unique and b.predicate is None and _is_prefix(b.columns, a.columns):
+                redundant[a.name] = RedundantIndex(a, b, "以该唯一键开头，附加列无法提高选择性")
+    return list(redundant.values())
+
+
+def _is_prefix(prefix: List[str], columns: List[str]) -> bool:
+    """prefix 是否为 columns 的严格前缀"""
+    return len(prefix) < len(columns) and columns[:len(prefix)] == prefix
+
+
+def collect_live_indexes(conn: Connection, tables: Iterable[str] = AUDITED_TABLES) -> List[IndexInfo]:
+    """从 PostgreSQL 系统目录和 pg_stat_user_indexes 读取索引定义与使用统计"""
+    result = conn.execute(text("""
+        SELECT t.relname AS table_name,
+               i.relname AS index_name,
+               ix.indisunique AS is_unique,
+               ix.indisprimary AS is_primary,
+               pg_get_expr(ix.indpred, ix.indrelid) AS predicate,
+               ARRAY(
+                   SELECT a.attname
+                   FROM unnest(ix.indkey[0:ix.indnkeyatts - 1]) WITH ORDINALITY AS k(attnum, ord)
+                   JOIN pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.attnum
+                   ORDER BY k.ord
+               ) AS columns,
+               s.idx_scan AS scans,
+               pg_relation_size(i.oid) AS size_bytes
+        FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        JOIN pg_class t ON t.oid = ix.indrelid
+        LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = ix.indexrelid
+        WHERE t.relname = ANY(:tables) AND pg_table_is_visible(t.oid)
+        ORDER BY t.relname, i.relname
+    """), {"tables": list(tables)})
+    return [
+        IndexInfo(
+            table=row.table_name,
+            name=row.index_name,
+            columns=list(row.columns),
+            unique=row.is_unique,
+            primary=row.is_primary,
+            predicate=row.predicate,
+            scans=row.scans,
+            size_bytes=row.size_bytes,
+        )
+        for row in result
+    ]
+
+
+def capture_statements(conn: Connection, workload: Callable[[Session], None]) -> List[Tuple[str, Any]]:
+    """在给定连接上运行工作负载，记录其发出的全部 SQL 语句及参数"""
+    captured: List[Tuple[str, Any]] = []
+
+    def _record(connection, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", _record)
+    try:
+        session = Session(bind=conn)
+        workload(session)
+        session.close()
+    finally:
+        event.remove(conn, "before_cursor_execute", _record)
+    return captured
+
+
+def crud_workloads(user_id: int, record_id: Optional[int], email: str, username: str) -> List[Tuple[str, Callable[[Session], None]]]:
+    """CRUD 层读路径的代表性调用"""
+    from app import crud
+    from app.schemas.health_record import TimeRange
+
+    workloads: List[Tuple[str, Callable[[Session], None]]] = [
+        ("user.get_user_by_id", lambda db: crud.user.get_user_by_id(db, user_id=user_id)),
+        ("user.get_user_by_email", lambda db: crud.user.get_user_by_email(db, email=email)),
+        ("user.get_user_by_username", lambda db: crud.user.get_user_by_username(db, username=username)),
+        ("user.get_multi", lambda db: crud.user.get_multi(db, is_active=True)),
+        ("user.get_count", lambda db: crud.user.get_count(db, is_active=True)),
+        ("health_record.get_multi", lambda db: crud.health_record.get_multi(db, user_id=user_id)),
+        ("health_record.count_records", lambda db: crud.health_record.count_records(db, user_id=user_id)),
+        ("health_record.get_latest_record", lambda db: crud.health_record.get_latest_record(db, user_id=user_id)),
+    ]
+    if record_id is not None:
+        workloads.append(
+            ("health_record.get", lambda db: crud.health_record.get(db, record_id=record_id, user_id=user_id))
+        )
+    for time_range in TimeRange:
+        workloads.append((
+            f"health_record.get_health_trends[{time_range.value}]",
+            lambda db, tr=time_range: crud.health_record.get_health_trends(db, user_id=user_id, time_range=tr),
+        ))
+    return workloads
+
+
+def explain_statement(conn: Connection, label: str, statement: str, parameters: Any) -> PlanSummary:
+    """对语句执行 EXPLAIN (ANALYZE, BUFFERS) 并提取摘要"""
+    raw = conn.exec_driver_sql(
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+    ).scalar()
+    document = raw[0] if isinstance(raw, list) else raw
+    plan = document["Plan"]
+    # 顶层节点的缓冲区计数已包含所有子节点
+    summary = PlanSummary(
+        label=label,
+        statement=statement,
+        execution_ms=document.get("Execution Time", 0.0),
+        shared_hit=plan.get("Shared Hit Blocks", 0),
+        shared_read=plan.get("Shared Read Blocks", 0),
+    )
+    _walk_plan(plan, summary)
+    return summary
+
+
+def _walk_plan(node: Dict[str, Any], summary: PlanSummary) -> None:
+    """递归遍历计划树，统计索引使用和顺序扫描"""
+    if "Index Name" in node:
+        summary.indexes_used.add(node["Index Name"])
+    if node.get("Node Type") == "Seq Scan":
+        summary.seq_scans.append((
+            node.get("Relation Name", ""),
+            node.get("Filter"),
+            node.get("Rows Removed by Filter", 0),
+        ))
+    for child in node.get("Plans", []):
+        _walk_plan(child, summary)
+
+
+def pick_sample_subjects(conn: Connection) -> Optional[Tuple[int, Optional[int], str, str]]:
+    """选择记录数最多的用户作为回放对象"""
+    row = conn.execute(text("""
+        SELECT u.id, u.email, u.username, max(h.id) AS record_id
+        FROM users u
+        LEFT JOIN health_records h ON h.user_id = u.id
+        GROUP BY u.id, u.email, u.username
+        ORDER BY count(h.id) DESC
+        LIMIT 1
+    """)).first()
+    if row is None:
+        return None
+    return row.id, row.record_id, row.email, row.username
+
+
+def replay_workload(conn: Connection) -> List[PlanSummary]:
+    """回放 CRUD 读路径并收集执行计划 (在回滚的事务中执行)"""
+    subjects = pick_sample_subjects(conn)
+    if subjects is None:
+        logger.warning("数据库中没有用户，跳过工作负载回放")
+        return []
+    user_id, record_id, email, username = subjects
+
+    plans = []
+    for label, workload in crud_workloads(user_id, record_id, email, username):
+        try:
+            statements = capture_statements(conn, workload)
+        except Exception as e:
+            logger.warning(f"回放 {label} 失败: {e}")
+            continue
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                plans.append(explain_statement(conn, label, statement, parameters))
+    return plans
+
+
+def build_report(live_indexes: List[IndexInfo], plans: List[PlanSummary]) -> IndexReport:
+    """汇总冗余、未使用和可能缺失的索引"""
+    used_in_plans = set().union(*(p.indexes_used for p in plans)) if plans else set()
+    report = IndexReport(redundant=find_redundant(live_indexes), plans=plans)
+    report.unused = [
+        index for index in live_indexes
+        if not index.is_constraint_backed and not index.scans and index.name not in used_in_plans
+    ]
+    for plan in plans:
+        for relation, condition, rows_removed in plan.seq_scans:
+            if relation in AUDITED_TABLES and condition and rows_removed > 0:
+                report.missing.append((plan.label, relation, condition))
+    return report
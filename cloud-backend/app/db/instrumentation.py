@@ -0,0 +1,141 @@
+"""
+按请求统计 SQL 语句：语句数、数据库耗时、影响/返回行数，并检测 N+1 查询
+
+引擎事件钩子注册在 Engine 类上，对所有引擎 (主库、副本、测试引擎) 生效；
+统计结果写入当前上下文的 QueryStats；未处于 track_queries 上下文 (且没有测试断言) 时不做任何记录。
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# conn.info 中记录语句开始时间的键
+_STARTED_AT_KEY = "query_started_at"
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+# 不区分上下文的统计 (测试用：TestClient 在另一个线程中处理请求)
+_global_stats: List["QueryStats"] = []
+_installed = False
+
+
+@dataclass
+class QueryStats:
+    """一次请求 (或一段代码) 内的 SQL 统计"""
+    statements: int = 0
+    db_time_ms: float = 0.0
+    rows: int = 0
+    by_statement: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration_ms: float, rowcount: int) -> None:
+        """记录一条语句"""
+        self.statements += 1
+        self.db_time_ms += duration_ms
+        if rowcount > 0:
+            self.rows += rowcount
+        self.by_statement[" ".join(statement.split())] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        获取重复执行次数达到阈值的语句 (疑似 N+1 查询)
+
+        Args:
+            threshold: 重复次数阈值
+
+        Returns:
+            (语句, 次数) 列表，按次数降序
+        """
+        return [(sql, count) for sql, count in self.by_statement.most_common() if count >= threshold]
+
+    def as_log_fields(self) -> Dict[str, Any]:
+        """获取结构化日志字段"""
+        return {
+            "sql_statements": self.statements,
+            "sql_time_ms": round(self.db_time_ms, 2),
+            "sql_rows": self.rows,
+        }
+
+
+def current_stats() -> Optional[QueryStats]:
+    """获取当前上下文的 SQL 统计"""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """在上下文内统计执行的 SQL 语句"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _active_stats() -> List[QueryStats]:
+    """获取需要记录当前语句的所有统计对象"""
+    stats = _current_stats.get()
+    if stats is None:
+        return _global_stats
+    return [stats, *_global_stats]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None or _global_stats:
+        conn.info.setdefault(_STARTED_AT_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_STARTED_AT_KEY)
+    if not started:
+        return
+    duration_ms = (time.perf_counter() - started.pop()) * 1000
+    for stats in _active_stats():
+        # SQLite 对 SELECT 返回 -1，此时只统计写入行数
+        stats.record(statement, duration_ms, cursor.rowcount)
+
+
+def install_query_instrumentation() -> None:
+    """注册引擎事件钩子 (重复调用无副作用)"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+@contextmanager
+def assert_statement_budget(max_statements: int) -> Iterator[QueryStats]:
+    """
+    测试辅助：上下文内执行的 SQL 语句数超过预算时断言失败
+
+    统计不区分线程，可直接包住 TestClient 请求；仅用于测试。
+
+    用法:
+        with assert_statement_budget(3):
+            client.get("/api/v1/health-trends/...")
+
+    Args:
+        max_statements: 允许执行的最大语句数
+
+    Raises:
+        AssertionError: 超出语句预算
+    """
+    install_query_instrumentation()
+    stats = QueryStats()
+    _global_stats.append(stats)
+    try:
+        yield stats
+    finally:
+        _global_stats.remove(stats)
+    if stats.statements > max_statements:
+        executed = "\n".join(f"  {count} × {sql}" for sql, count in stats.by_statement.most_common())
+        raise AssertionError(
+            f"执行了 {stats.statements} 条 SQL 语句，超出预算 {max_statements}:\n{executed}"
+        )
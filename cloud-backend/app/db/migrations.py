@@ -0,0 +1,595 @@
+"""
+版本化在线表结构迁移
+
+迁移文件位于 migrations/，命名为 NNNN_描述.sql 或 NNNN_描述.py，按版本号顺序执行，
+已执行的版本记录在 schema_migrations 表中。文件头部可用注释指令调整执行方式:
+
+    -- migrate: no-transaction          逐条语句自动提交 (CREATE/DROP INDEX CONCURRENTLY 必需)
+    -- migrate: lock-timeout=3s         等待表锁的上限，超时后重试而不是长时间阻塞其他会话
+    -- migrate: statement-timeout=10min 单条语句执行上限
+
+.py 迁移使用 "# migrate: ..." 指令，并定义 upgrade(ctx: MigrationContext)，
+大表数据回填使用 ctx.backfill() 按主键范围分批、短事务、限速执行。
+
+没有执行任何语句的迁移 (只有注释的 .sql、未填写的 upgrade) 会报错而不记录版本，
+否则之后写入文件的 DDL 永远不会执行；已执行的迁移文件被修改 (校验和不一致) 时拒绝升级。
+
+包含 CONCURRENTLY 的 SQL 迁移自动按 no-transaction 执行。锁等待超时 (SQLSTATE 55P03)
+的语句会按退避间隔重试；CONCURRENTLY 建索引失败残留的 INVALID 索引会在重试前删除。
+
+PostgreSQL 不支持在分区父表上 CREATE / DROP INDEX CONCURRENTLY。health_records 转换为分区表后
+(manage_partitions.py convert)，这类语句自动改写:
+    - CREATE INDEX CONCURRENTLY: 先 CREATE INDEX ... ON ONLY 父表 (只建父表索引，暂为 INVALID)，
+      再在每个分区上 CREATE INDEX CONCURRENTLY 并 ALTER INDEX ... ATTACH PARTITION，
+      全部分区挂载后父表索引自动变为有效；已挂载的分区跳过，中断后可重复执行
+    - DROP INDEX CONCURRENTLY 分区索引: 改为普通 DROP INDEX (会短暂锁住父表与各分区)
+"""
+
+import hashlib
+import importlib.util
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+VERSION_TABLE = "schema_migrations"
+
+DEFAULT_LOCK_TIMEOUT = "5s"
+LOCK_NOT_AVAILABLE = "55P03"
+
+_FILENAME_RE = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+_DIRECTIVE_RE = re.compile(r"^\s*(?:--|#)\s*migrate:\s*(.+?)\s*$", re.MULTILINE)
+_CONCURRENTLY_RE = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+_CREATE_INDEX_CONCURRENTLY_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+# 分区表改写需要的完整形式: 唯一性、索引名、表名、其余定义 (列、INCLUDE、WHERE)
+_CREATE_INDEX_ON_RE = re.compile(
+    r"CREATE\s+(UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+(\w+)\s*(.*)",
+    re.IGNORECASE | re.DOTALL,
+)
+_DROP_INDEX_CONCURRENTLY_RE = re.compile(
+    r"DROP\s+INDEX\s+CONCURRENTLY\s+IF\s+EXISTS\s+(\w+)\s*$", re.IGNORECASE
+)
+
+T = TypeVar("T")
+
+
+@dataclass
+class Migration:
+    """一个迁移文件"""
+    version: int
+    name: str
+    path: Path
+    transactional: bool = True
+    lock_timeout: str = DEFAULT_LOCK_TIMEOUT
+    statement_timeout: Optional[str] = None
+    checksum: str = ""
+
+    @property
+    def label(self) -> str:
+        """版本号与名称，如 0002_covering_trend_index"""
+        return f"{self.version:04d}_{self.name}"
+
+    @property
+    def is_python(self) -> bool:
+        return self.path.suffix == ".py"
+
+
+@dataclass
+class SchemaStatus:
+    """数据库表结构版本状态"""
+    current: Optional[int]
+    latest: Optional[int]
+    pending: List[str] = field(default_factory=list)
+
+    @property
+    def up_to_date(self) -> bool:
+        return not self.pending
+
+
+def parse_migration(path: Path) -> Migration:
+    """
+    解析迁移文件名与头部指令
+
+    Args:
+        path: 迁移文件路径
+
+    Returns:
+        迁移定义
+    """
+    match = _FILENAME_RE.match(path.name)
+    if not match:
+        raise ValueError(f"迁移文件名应为 NNNN_描述.sql 或 NNNN_描述.py: {path.name}")
+    source = path.read_text(encoding="utf-8")
+    migration = Migration(
+        version=int(match.group(1)),
+        name=match.group(2),
+        path=path,
+        checksum=hashlib.sha256(source.encode("utf-8")).hexdigest(),
+    )
+    for directive in _DIRECTIVE_RE.findall(source):
+        key, _, value = directive.partition("=")
+        key = key.strip().lower()
+        if key == "no-transaction":
+            migration.transactional = False
+        elif key == "lock-timeout":
+            migration.lock_timeout = value.strip()
+        elif key == "statement-timeout":
+            migration.statement_timeout = value.strip()
+        else:
+            raise ValueError(f"{path.name}: 未知的迁移指令 {directive!r}")
+    if not migration.is_python and _CONCURRENTLY_RE.search(" ".join(split_statements(source))):
+        migration.transactional = False
+    return migration
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """按版本号加载全部迁移，版本号重复时报错"""
+    migrations = sorted(
+        (parse_migration(path) for path in directory.iterdir() if _FILENAME_RE.match(path.name)),
+        key=lambda migration: migration.version,
+    )
+    for previous, current in zip(migrations, migrations[1:]):
+        if previous.version == current.version:
+            raise ValueError(f"迁移版本号重复: {previous.path.name} / {current.path.name}")
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    按分号拆分 SQL 语句 (忽略引号、$$ 块和注释中的分号)
+
+    no-transaction 迁移需要逐条执行，CONCURRENTLY 不能出现在多语句的隐式事务中
+    """
+    statements: List[str] = []
+    current: List[str] = []
+    index, length = 0, len(sql)
+    quote: Optional[str] = None
+    while index < length:
+        char = sql[index]
+        if quote:
+            current.append(char)
+            if sql.startswith(quote, index):
+                current.extend(quote[1:])
+                index += len(quote)
+                quote = None
+                continue
+        elif sql.startswith("--", index):
+            end = sql.find("\n", index)
+            index = length if end == -1 else end
+            continue
+        elif char == "'":
+            quote = "'"
+            current.append(char)
+        elif char == "$":
+            match = re.match(r"\$\w*\$", sql[index:])
+            if match:
+                quote = match.group(0)
+                current.append(quote)
+                index += len(quote)
+                continue
+            current.append(char)
+        elif char == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(char)
+        index += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def _is_lock_timeout(error: DBAPIError) -> bool:
+    """是否为锁等待超时 (psycopg2: pgcode，psycopg 3: sqlstate)"""
+    orig = error.orig
+    return LOCK_NOT_AVAILABLE in (getattr(orig, "pgcode", None), getattr(orig, "sqlstate", None))
+
+
+def retry_on_lock_timeout(func: Callable[[], T], retries: int, wait: float) -> T:
+    """
+    锁等待超时时按退避间隔重试
+
+    Args:
+        func: 要执行的操作 (需自行管理事务，失败后可安全重试)
+        retries: 最多重试次数
+        wait: 首次重试前等待秒数，之后每次翻倍
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except DBAPIError as e:
+            if not _is_lock_timeout(e) or attempt == retries:
+                raise
+            delay = wait * (2 ** attempt)
+            logger.warning(f"等待锁超时，{delay:.1f}s 后重试 ({attempt + 1}/{retries})")
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _set_local_timeouts(conn: Connection, lock_timeout: Optional[str], statement_timeout: Optional[str]) -> None:
+    """在当前事务内设置超时 (SET LOCAL，事务结束自动恢复，适用于事务级连接池)"""
+    if conn.dialect.name != "postgresql":
+        return
+    if lock_timeout:
+        conn.execute(text("SELECT set_config('lock_timeout', :value, true)"), {"value": lock_timeout})
+    if statement_timeout:
+        conn.execute(text("SELECT set_config('statement_timeout', :value, true)"), {"value": statement_timeout})
+
+
+class MigrationContext:
+    """传给 .py 迁移 upgrade() 的执行上下文"""
+
+    def __init__(self, engine: Engine, migration: Migration, retries: int = 3, retry_wait: float = 2.0):
+        self.engine = engine
+        self.migration = migration
+        self.retries = retries
+        self.retry_wait = retry_wait
+        # 已执行的语句数 (execute / execute_autocommit / backfill)，为 0 时不记录版本
+        self.statements = 0
+
+    @property
+    def dialect(self) -> str:
+        return self.engine.dialect.name
+
+    def execute(self, sql: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """在独立短事务中执行一条语句 (带锁等待超时与重试)"""
+        def run() -> None:
+            with self.engine.begin() as conn:
+                _set_local_timeouts(conn, self.migration.lock_timeout, self.migration.statement_timeout)
+                conn.execute(text(sql), params or {})
+
+        retry_on_lock_timeout(run, self.retries, self.retry_wait)
+        self.statements += 1
+
+    def execute_autocommit(self, sql: str) -> None:
+        """在事务外执行一条语句 (CREATE INDEX CONCURRENTLY 等)"""
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            _run_autocommit(conn, sql, self.migration, self.retries, self.retry_wait)
+        self.statements += 1
+
+    def backfill(
+        self,
+        table: str,
+        assignments: str,
+        where: str = "TRUE",
+        batch_size: int = 1000,
+        pause: float = 0.05,
+        key: str = "id",
+        params: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        按主键范围分批回填
+
+        每批一个短事务: UPDATE table SET assignments WHERE key 在本批范围内 AND (where)，
+        批间暂停 pause 秒，避免长事务持锁、WAL 突增和从库延迟。where 应排除已回填的行，
+        使中断后重新执行可以安全继续。
+
+        Args:
+            table: 表名
+            assignments: SET 子句，如 "health_level = 'good'"
+            where: 额外筛选条件
+            batch_size: 每批覆盖的主键范围
+            pause: 批间暂停秒数 (限速)
+            key: 整数主键列
+            params: 绑定参数
+
+        Returns:
+            更新的总行数
+        """
+        self.statements += 1
+        with self.engine.connect() as conn:
+            low, high = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).one()
+        if low is None:
+            return 0
+
+        statement = text(
+            f"UPDATE {table} SET {assignments} "
+            f"WHERE {key} >= :_batch_start AND {key} < :_batch_end AND ({where})"
+        )
+        total = 0
+        started = time.perf_counter()
+        for batch_start in range(low, high + 1, batch_size):
+            bind = {**(params or {}), "_batch_start": batch_start, "_batch_end": batch_start + batch_size}
+
+            def run() -> int:
+                with self.engine.begin() as conn:
+                    _set_local_timeouts(conn, self.migration.lock_timeout, self.migration.statement_timeout)
+                    return conn.execute(statement, bind).rowcount
+
+            total += retry_on_lock_timeout(run, self.retries, self.retry_wait)
+            if pause:
+                time.sleep(pause)
+        logger.info(
+            f"{self.migration.label}: 回填 {table} {total} 行，"
+            f"耗时 {time.perf_counter() - started:.1f}s"
+        )
+        return total
+
+
+def _drop_invalid_index(conn: Connection, statement: str) -> None:
+    """CONCURRENTLY 建索引中断会残留 INVALID 索引，IF NOT EXISTS 会误以为已完成，先删除"""
+    match = _CREATE_INDEX_CONCURRENTLY_RE.search(statement)
+    if not match or conn.dialect.name != "postgresql":
+        return
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": match.group(1)}).first()
+    if invalid:
+        logger.warning(f"删除残留的 INVALID 索引 {match.group(1)}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}"))
+
+
+def _relkind(conn: Connection, name: str) -> Optional[str]:
+    """当前 search_path 中表 / 索引的 relkind (p: 分区表，I: 分区索引)，不存在时返回 None"""
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": name}
+    ).scalar()
+
+
+def _partition_index_name(index: str, partition: str) -> str:
+    """分区上的索引名 (不超过 PostgreSQL 标识符上限 63 字节)"""
+    name = f"{index}_{partition}"
+    if len(name) <= 63:
+        return name
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:8]
+    return f"{name[:54]}_{digest}"
+
+
+def _create_partitioned_index(conn: Connection, match: re.Match) -> None:
+    """
+    在分区表上按分区逐个 CONCURRENTLY 建索引并挂载到父表索引
+
+    父表索引用 ON ONLY 创建 (不递归到分区，瞬时完成)，每个分区的索引 CONCURRENTLY 创建，不阻塞写入
+    """
+    unique, index, table, definition = match.groups()
+    unique = "UNIQUE " if unique else ""
+    conn.execute(text(f"CREATE {unique}INDEX IF NOT EXISTS {index} ON ONLY {table} {definition}"))
+    partitions = conn.execute(text("""
+        SELECT c.relname,
+               EXISTS (
+                   SELECT 1 FROM pg_inherits ii
+                   JOIN pg_index pi ON pi.indexrelid = ii.inhrelid
+                   WHERE ii.inhparent = to_regclass(:index) AND pi.indrelid = c.oid
+               ) AS attached
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+        ORDER BY c.relname
+    """), {"index": index, "table": table}).all()
+    for partition, attached in partitions:
+        if attached:
+            continue
+        child = _partition_index_name(index, partition)
+        statement = f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}"
+        _drop_invalid_index(conn, statement)
+        conn.execute(text(statement))
+        conn.execute(text(f"ALTER INDEX {index} ATTACH PARTITION {child}"))
+        logger.info(f"分区索引 {child} 已挂载到 {index}")
+
+
+def _execute_statement(conn: Connection, statement: str) -> None:
+    """执行自动提交语句，分区表上的 CREATE / DROP INDEX CONCURRENTLY 按分区改写"""
+    if conn.dialect.name == "postgresql":
+        match = _CREATE_INDEX_ON_RE.match(statement)
+        if match and _relkind(conn, match.group(3)) == "p":
+            _create_partitioned_index(conn, match)
+            return
+        match = _DROP_INDEX_CONCURRENTLY_RE.match(statement)
+        if match and _relkind(conn, match.group(1)) == "I":
+            conn.execute(text(f"DROP INDEX IF EXISTS {match.group(1)}"))
+            return
+    _drop_invalid_index(conn, statement)
+    conn.execute(text(statement))
+
+
+def _run_autocommit(conn: Connection, statement: str, migration: Migration, retries: int, retry_wait: float) -> None:
+    """在自动提交连接上执行单条语句，会话级超时在执行后恢复"""
+    postgres = conn.dialect.name == "postgresql"
+    if postgres:
+        conn.execute(text("SELECT set_config('lock_timeout', :value, false)"), {"value": migration.lock_timeout})
+        if migration.statement_timeout:
+            conn.execute(
+                text("SELECT set_config('statement_timeout', :value, false)"),
+                {"value": migration.statement_timeout},
+            )
+    try:
+        retry_on_lock_timeout(lambda: _execute_statement(conn, statement), retries, retry_wait)
+    finally:
+        if postgres:
+            conn.execute(text("RESET lock_timeout"))
+            conn.execute(text("RESET statement_timeout"))
+
+
+def _load_upgrade(migration: Migration) -> Callable[[MigrationContext], None]:
+    """加载 .py 迁移的 upgrade 函数"""
+    spec = importlib.util.spec_from_file_location(f"migration_{migration.label}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    upgrade = getattr(module, "upgrade", None)
+    if not callable(upgrade):
+        raise ValueError(f"{migration.path.name} 缺少 upgrade(ctx) 函数")
+    return upgrade
+
+
+def ensure_version_table(engine: Engine) -> None:
+    """创建版本记录表"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(200) NOT NULL, "
+            "checksum VARCHAR(64) NOT NULL, "
+            "applied_at TIMESTAMP WITH TIME ZONE NOT NULL, "
+            "duration_ms INTEGER NOT NULL)"
+        ))
+
+
+def applied_migrations(conn: Connection) -> Dict[int, str]:
+    """已执行的版本及其校验和"""
+    rows = conn.execute(text(f"SELECT version, checksum FROM {VERSION_TABLE}")).all()
+    return {version: checksum for version, checksum in rows}
+
+
+def current_version(conn: Connection) -> Optional[int]:
+    """当前表结构版本 (单条查询，版本表不存在时返回 None)"""
+    try:
+        return conn.execute(text(f"SELECT MAX(version) FROM {VERSION_TABLE}")).scalar()
+    except DBAPIError:
+        conn.rollback()
+        return None
+
+
+def _record(engine: Engine, migration: Migration, duration_ms: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"INSERT INTO {VERSION_TABLE} (version, name, checksum, applied_at, duration_ms) "
+                "VALUES (:version, :name, :checksum, :applied_at, :duration_ms)"
+            ),
+            {
+                "version": migration.version,
+                "name": migration.name,
+                "checksum": migration.checksum,
+                "applied_at": datetime.now(timezone.utc),
+                "duration_ms": duration_ms,
+            },
+        )
+
+
+def apply_migration(engine: Engine, migration: Migration, retries: int = 3, retry_wait: float = 2.0) -> None:
+    """
+    执行单个迁移并记录版本
+
+    事务迁移: 全部语句与版本记录在同一事务中，锁等待超时整体重试。
+    no-transaction 迁移: 逐条自动提交，单条语句重试；中途失败时已执行的语句不会回滚，
+    因此这类迁移应使用 IF [NOT] EXISTS 保证可重复执行。
+
+    Raises:
+        ValueError: 迁移没有执行任何语句 (未填写的迁移不记录版本)
+    """
+    started = time.perf_counter()
+    logger.info(f"执行迁移 {migration.label} ({'事务' if migration.transactional else '逐条自动提交'})")
+
+    if migration.is_python:
+        ctx = MigrationContext(engine, migration, retries, retry_wait)
+        _load_upgrade(migration)(ctx)
+        if not ctx.statements:
+            raise ValueError(f"{migration.path.name} 的 upgrade(ctx) 没有执行任何语句，不记录版本")
+    else:
+        statements = split_statements(migration.path.read_text(encoding="utf-8"))
+        if not statements:
+            raise ValueError(f"{migration.path.name} 没有任何 SQL 语句，不记录版本")
+        if migration.transactional:
+
+            def run() -> None:
+                with engine.begin() as conn:
+                    _set_local_timeouts(conn, migration.lock_timeout, migration.statement_timeout)
+                    for statement in statements:
+                        conn.execute(text(statement))
+
+            retry_on_lock_timeout(run, retries, retry_wait)
+        else:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for statement in statements:
+                    _run_autocommit(conn, statement, migration, retries, retry_wait)
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    _record(engine, migration, duration_ms)
+    logger.info(f"迁移 {migration.label} 完成，耗时 {duration_ms}ms")
+
+
+def is_fresh_database(engine: Engine) -> bool:
+    """数据库中既没有版本表也没有业务表"""
+    tables = set(inspect(engine).get_table_names())
+    return VERSION_TABLE not in tables and "users" not in tables
+
+
+def stamp(engine: Engine, version: int, directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """将不超过 version 的迁移标记为已执行 (不执行 SQL)，用于全新建库或手工执行后的对齐"""
+    ensure_version_table(engine)
+    with engine.connect() as conn:
+        applied = applied_migrations(conn)
+    stamped = [m for m in load_migrations(directory) if m.version <= version and m.version not in applied]
+    for migration in stamped:
+        _record(engine, migration, 0)
+    return stamped
+
+
+def upgrade(
+    engine: Engine,
+    target: Optional[int] = None,
+    directory: Path = MIGRATIONS_DIR,
+    retries: int = 3,
+    retry_wait: float = 2.0
+) -> List[Migration]:
+    """
+    按版本顺序执行未执行的迁移
+
+    Args:
+        engine: 数据库引擎
+        target: 目标版本，默认最新
+        directory: 迁移目录
+        retries: 锁等待超时的重试次数
+        retry_wait: 首次重试等待秒数
+
+    Returns:
+        本次执行的迁移
+
+    Raises:
+        ValueError: 已执行的迁移文件内容已修改 (校验和不一致)，修改的部分不会被执行
+    """
+    ensure_version_table(engine)
+    with engine.connect() as conn:
+        applied = applied_migrations(conn)
+    migrations = load_migrations(directory)
+    modified = [
+        m.label for m in migrations
+        if m.version in applied and applied[m.version] != m.checksum
+    ]
+    if modified:
+        raise ValueError(
+            f"已执行的迁移文件内容已修改 (校验和不一致): {', '.join(modified)}；"
+            f"请恢复原文件，把新的变更写入新的迁移 (python migrate.py new)"
+        )
+
+    executed = []
+    for migration in migrations:
+        if migration.version in applied or (target is not None and migration.version > target):
+            continue
+        apply_migration(engine, migration, retries, retry_wait)
+        executed.append(migration)
+    return executed
+
+
+def check_schema_version(engine: Engine, directory: Path = MIGRATIONS_DIR) -> SchemaStatus:
+    """
+    启动时的表结构版本检查: 只读取一次 MAX(version)，不做 DDL 或反射
+
+    Returns:
+        当前版本、代码中的最新版本与待执行迁移
+    """
+    versions = sorted(
+        (int(match.group(1)), path.stem)
+        for path in directory.iterdir()
+        if (match := _FILENAME_RE.match(path.name))
+    )
+    latest = versions[-1][0] if versions else None
+    with engine.connect() as conn:
+        current = current_version(conn)
+    pending = [label for version, label in versions if current is None or version > current]
+    return SchemaStatus(current=current, latest=latest, pending=pending)
@@ -0,0 +1,361 @@
+"""
+health_records 按月范围分区工具 (PostgreSQL 声明式分区)
+
+分区为可选功能：默认的 health_records 仍是普通表，
+需要通过 manage_partitions.py convert 显式转换为按 assessed_at 月份分区的表。
+转换后 get_health_trends / get_multi 中的 assessed_at 范围条件即可触发分区裁剪。
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "health_records"
+LEGACY_TABLE = "health_records_legacy"
+DEFAULT_PARTITION = "health_records_default"
+
+# 分区命名规则: health_records_p202610
+_PARTITION_NAME_RE = re.compile(r"^health_records_p(\d{4})(\d{2})$")
+
+
+@dataclass
+class PartitionInfo:
+    """分区信息"""
+    name: str
+    month: Optional[date]
+    bound: str
+
+
+def month_floor(value: date) -> date:
+    """取所在月份的第一天"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    """月份加减 (结果总是当月第一天)"""
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def iter_months(start: date, end: date) -> List[date]:
+    """返回 [start, end] 闭区间内的所有月份"""
+    months = []
+    current = month_floor(start)
+    last = month_floor(end)
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def partition_name(month: date) -> str:
+    """根据月份生成分区表名"""
+    return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def parse_partition_month(name: str) -> Optional[date]:
+    """从分区表名解析月份，非月度分区返回 None"""
+    match = _PARTITION_NAME_RE.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_bounds(month: date) -> Tuple[str, str]:
+    """分区上下界 (UTC 时间字面量，左闭右开)"""
+    lower = month_floor(month)
+    upper = add_months(lower, 1)
+    return f"{lower.isoformat()} 00:00:00+00", f"{upper.isoformat()} 00:00:00+00"
+
+
+def create_partition_sql(month: date) -> str:
+    """生成创建月度分区的 DDL"""
+    lower, upper = partition_bounds(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    )
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """检查 health_records 是否已是分区表"""
+    if conn.dialect.name != "postgresql":
+        return False
+    result = conn.execute(text("""
+        SELECT 1
+        FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = :table AND pg_table_is_visible(c.oid)
+    """), {"table": PARENT_TABLE})
+    return result.scalar() is not None
+
+
+def list_partitions(conn: Connection) -> List[PartitionInfo]:
+    """列出 health_records 的所有分区"""
+    result = conn.execute(text("""
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :table AND pg_table_is_visible(p.oid)
+        ORDER BY c.relname
+    """), {"table": PARENT_TABLE})
+    return [
+        PartitionInfo(name=row.name, month=parse_partition_month(row.name), bound=row.bound)
+        for row in result
+    ]
+
+
+def default_partition(conn: Connection) -> Optional[str]:
+    """health_records 的 DEFAULT 分区名，没有时返回 None"""
+    result = conn.execute(text("""
+        SELECT d.relname
+        FROM pg_partitioned_table pt
+        JOIN pg_class p ON p.oid = pt.partrelid
+        JOIN pg_class d ON d.oid = pt.partdefid
+        WHERE p.relname = :table AND pg_table_is_visible(p.oid)
+    """), {"table": PARENT_TABLE})
+    return result.scalar()
+
+
+def has_default_partition(conn: Connection) -> bool:
+    """检查 health_records 是否有 DEFAULT 分区"""
+    return default_partition(conn) is not None
+
+
+def ensure_partitions(conn: Connection, start: date, end: date) -> List[str]:
+    """
+    确保 [start, end] 范围内的月度分区均已存在
+
+    DEFAULT 分区中已有落在新分区范围内的记录 (例如提前写入的未来评估时间) 时，
+    PostgreSQL 会拒绝直接创建分区；此时在同一事务中分离 DEFAULT 分区、创建新分区、
+    把这些记录移入新分区后重新挂载 DEFAULT 分区 (期间持有父表的排他锁)。
+
+    Args:
+        conn: 数据库连接 (调用方负责事务)
+        start: 开始月份
+        end: 结束月份 (含)
+
+    Returns:
+        本次新建的分区名列表
+    """
+    existing = {p.name for p in list_partitions(conn)}
+    default = default_partition(conn)
+    created = []
+    for month in iter_months(start, end):
+        name = partition_name(month)
+        if name in existing:
+            continue
+        if default is not None and _default_has_rows(conn, default, month):
+            moved = _create_partition_from_default(conn, default, month)
+            logger.info(f"创建分区: {name} (从 {default} 移入 {moved} 条记录)")
+        else:
+            conn.execute(text(create_partition_sql(month)))
+            logger.info(f"创建分区: {name}")
+        created.append(name)
+    return created
+
+
+def _default_has_rows(conn: Connection, default: str, month: date) -> bool:
+    """DEFAULT 分区中是否有落在该月份范围内的记录"""
+    lower, upper = partition_bounds(month)
+    return conn.execute(text(f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {default} WHERE assessed_at >= :lower AND assessed_at < :upper
+        )
+    """), {"lower": lower, "upper": upper}).scalar()
+
+
+def _create_partition_from_default(conn: Connection, default: str, month: date) -> int:
+    """分离 DEFAULT 分区后创建月度分区，移入该月份的记录并重新挂载，返回移动的记录数"""
+    lower, upper = partition_bounds(month)
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {default}"))
+    conn.execute(text(create_partition_sql(month)))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {default}
+            WHERE assessed_at >= :lower AND assessed_at < :upper
+            RETURNING *
+        )
+        INSERT INTO {PARENT_TABLE} SELECT * FROM moved
+    """), {"lower": lower, "upper": upper}).rowcount
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {default} DEFAULT"))
+    return moved
+
+
+def ensure_future_partitions(
+    conn: Connection,
+    months_ahead: int,
+    today: Optional[date] = None
+) -> List[str]:
+    """预建从当前月份起未来 months_ahead 个月的分区"""
+    current = month_floor(today or datetime.now(timezone.utc).date())
+    return ensure_partitions(conn, current, add_months(current, months_ahead))
+
+
+def detach_partitions_before(
+    engine: Engine,
+    before: date,
+    *,
+    archive_schema: Optional[str] = None,
+    drop: bool = False,
+    concurrently: bool = False
+) -> List[str]:
+    """
+    分离 before 月份之前的旧分区，可选择归档到其他 schema 或直接删除
+
+    Args:
+        engine: 数据库引擎
+        before: 截止月份 (不含)
+        archive_schema: 归档 schema，提供时将分离后的分区移入该 schema
+        drop: 是否直接删除分离后的分区
+        concurrently: 使用 DETACH PARTITION CONCURRENTLY (PostgreSQL 14+，不阻塞读写)
+
+    Returns:
+        被处理的分区名列表
+
+    Raises:
+        ValueError: archive_schema 与 drop 同时使用，或 concurrently 时父表有 DEFAULT 分区
+    """
+    if archive_schema and drop:
+        raise ValueError("archive_schema 与 drop 不能同时使用")
+
+    cutoff = month_floor(before)
+    with engine.connect() as conn:
+        # PostgreSQL 不允许在有 DEFAULT 分区的父表上 DETACH PARTITION CONCURRENTLY
+        if concurrently and has_default_partition(conn):
+            raise ValueError(
+                f"{PARENT_TABLE} 有 DEFAULT 分区 ({DEFAULT_PARTITION})，不能使用 CONCURRENTLY 分离，"
+                f"请去掉 --concurrently (分离期间短暂持有 ACCESS EXCLUSIVE 锁)"
+            )
+        targets = [
+            p.name for p in list_partitions(conn)
+            if p.month is not None and p.month < cutoff
+        ]
+
+    if not targets:
+        return []
+
+    # CONCURRENTLY 不能在事务块中执行
+    options = {"isolation_level": "AUTOCOMMIT"} if concurrently else {}
+    with engine.connect().execution_options(**options) as conn:
+        if archive_schema:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+        for name in targets:
+            suffix = " CONCURRENTLY" if concurrently else ""
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}{suffix}"))
+            if archive_schema:
+                conn.execute(text(f'ALTER TABLE {name} SET SCHEMA "{archive_schema}"'))
+                logger.info(f"分区已归档: {name} -> {archive_schema}.{name}")
+            elif drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+                logger.info(f"分区已删除: {name}")
+            else:
+                logger.info(f"分区已分离: {name}")
+        if not concurrently:
+            conn.commit()
+    return targets
+
+
+def convert_to_partitioned(
+    engine: Engine,
+    *,
+    premake_months: int = 3,
+    drop_legacy: bool = False
+) -> int:
+    """
+    将现有的 health_records 普通表转换为按月分区表，并迁移全部数据
+
+    在单个事务内完成：原表改名为 health_records_legacy，新建同结构的分区父表，
+    按月份逐批复制数据后重建模型中声明的索引。期间原表持有排他锁，
+    应在维护窗口执行。迁移行数与原表行数不一致时整个事务回滚。
+
+    Returns:
+        迁移的记录数
+
+    Raises:
+        RuntimeError: 不是 PostgreSQL，或迁移行数与原表行数不一致
+    """
+    from app.models.health_record import HealthRecord
+
+    with engine.begin() as conn:
+        if conn.dialect.name != "postgresql":
+            raise RuntimeError("表分区仅支持 PostgreSQL")
+        if is_partitioned(conn):
+            logger.info("health_records 已是分区表，跳过转换")
+            return 0
+
+        conn.execute(text(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}"))
+
+        # 旧表索引改名，释放索引名给新表使用
+        index_names = conn.execute(text("""
+            SELECT indexname FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = :table
+        """), {"table": LEGACY_TABLE}).scalars().all()
+        for index_name in index_names:
+            conn.execute(text(f"ALTER INDEX {index_name} RENAME TO {index_name[:56]}_legacy"))
+
+        # 分区表的主键必须包含分区键
+        conn.execute(text(f"""
+            CREATE TABLE {PARENT_TABLE} (
+                LIKE {LEGACY_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS
+            ) PARTITION BY RANGE (assessed_at)
+        """))
+        conn.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT {PARENT_TABLE}_pkey "
+            f"PRIMARY KEY (id, assessed_at)"
+        ))
+        conn.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT {PARENT_TABLE}_user_id_fkey "
+            f"FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+        ))
+
+        # 按数据覆盖的月份建分区，并预建未来分区
+        # 分区边界为 UTC 月份，数据范围也按 UTC 计算 (与会话时区无关)
+        bounds = conn.execute(text(
+            f"SELECT min(assessed_at AT TIME ZONE 'UTC'), max(assessed_at AT TIME ZONE 'UTC') FROM {LEGACY_TABLE}"
+        )).one()
+        today = datetime.now(timezone.utc).date()
+        first_month = month_floor(bounds[0].date()) if bounds[0] else month_floor(today)
+        data_last_month = month_floor(bounds[1].date()) if bounds[1] else first_month
+        last_month = max(data_last_month, add_months(month_floor(today), premake_months))
+        ensure_partitions(conn, first_month, last_month)
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+        # 逐月复制数据，便于观察进度
+        migrated = 0
+        for month in iter_months(first_month, data_last_month):
+            lower, upper = partition_bounds(month)
+            result = conn.execute(text(f"""
+                INSERT INTO {PARENT_TABLE}
+                SELECT * FROM {LEGACY_TABLE}
+                WHERE assessed_at >= :lower AND assessed_at < :upper
+            """), {"lower": lower, "upper": upper})
+            migrated += result.rowcount
+            logger.info(f"迁移 {partition_name(month)}: {result.rowcount} 条记录")
+
+        # 在父表上创建模型声明的索引，会自动传播到所有分区
+        for index in HealthRecord.__table__.indexes:
+            conn.execute(CreateIndex(index))
+
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {PARENT_TABLE}_id_seq OWNED BY {PARENT_TABLE}.id"))
+
+        total = conn.execute(text(f"SELECT count(*) FROM {LEGACY_TABLE}")).scalar()
+        if migrated != total:
+            raise RuntimeError(f"迁移记录数 {migrated} 与原表记录数 {total} 不一致，已回滚转换")
+
+        if drop_legacy:
+            conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+
+    logger.info(f"health_records 分区转换完成，共迁移 {migrated} 条记录")
+    return migrated
@@ -0,0 +1,159 @@
+"""
+数据库连接池：按工作进程数计算池大小、记录借出等待时间、轻量级连接存活检查
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolSizing:
+    """单个工作进程的连接池大小"""
+    pool_size: int
+    max_overflow: int
+
+    @property
+    def max_connections(self) -> int:
+        """单个工作进程最多占用的连接数"""
+        return self.pool_size + self.max_overflow
+
+
+def compute_pool_sizing(
+    budget: int,
+    workers: int,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None
+) -> PoolSizing:
+    """
+    按连接预算和工作进程数计算每个进程的连接池大小
+
+    每个进程分得 budget // workers 个连接，其中约 2/3 为常驻连接，其余为溢出连接。
+    显式指定的 pool_size / max_overflow 优先。
+
+    Args:
+        budget: 本服务在单个数据库实例上允许使用的连接总数
+        workers: 工作进程数
+        pool_size: 显式指定的常驻连接数
+        max_overflow: 显式指定的溢出连接数
+
+    Returns:
+        连接池大小
+    """
+    share = max(budget // max(workers, 1), 1)
+    if pool_size is None:
+        pool_size = max((share * 2) // 3, 1)
+    if max_overflow is None:
+        max_overflow = max(share - pool_size, 0)
+    if (pool_size + max_overflow) * workers > budget:
+        logger.warning(
+            f"连接池配置超出预算: {workers} 个进程 × {pool_size + max_overflow} 个连接 > {budget}"
+        )
+    return PoolSizing(pool_size=pool_size, max_overflow=max_overflow)
+
+
+class PoolStats:
+    """连接借出统计 (线程安全)"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        """记录一次成功借出的等待时间"""
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def record_timeout(self) -> None:
+        """记录一次借出超时"""
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取统计快照"""
+        with self._lock:
+            average = self.wait_seconds_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts_total": self.checkouts,
+                "timeouts_total": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(average, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录借出等待时间与超时次数的 QueuePool"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def install_idle_liveness_check(engine: Engine, idle_seconds: float) -> None:
+    """
+    仅对空闲超过 idle_seconds 的连接在借出时执行 ping
+
+    相比 pool_pre_ping 每次借出都多一次往返，繁忙时连接空闲时间很短，几乎不产生额外开销。
+    ping 失败时抛出 DisconnectionError，连接池会丢弃该连接并重新建立。
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception as e:
+            raise exc.DisconnectionError(f"空闲连接已失效: {e}")
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """获取引擎连接池的实时状态"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    stats = getattr(pool, "stats", None)
+    if isinstance(stats, PoolStats):
+        status.update(stats.snapshot())
+    return status
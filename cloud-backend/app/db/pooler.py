@@ -0,0 +1,101 @@
+"""
+事务级连接池代理 (PgBouncer transaction 模式) 兼容配置
+
+事务模式下，同一客户端连接的相邻两个事务可能落在不同的服务端连接上，因此：
+- 不能使用服务端预编译语句 (psycopg 3 默认会自动 PREPARE 高频语句)
+- 不能依赖会话级状态 (SET、LISTEN、WITH HOLD 游标、会话级 advisory lock 等)，需要时改用 SET LOCAL
+- 代理本身已经是连接池，应用侧使用 NullPool 或很小的连接池，并关闭 pool_pre_ping
+- 每个请求只开启一个事务，请求结束前不归还服务端连接
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.db.pool import InstrumentedQueuePool
+from app.db.routing import RoutingSession
+
+# Session.info 中使用的键
+SINGLE_TRANSACTION_KEY = "single_transaction"
+
+
+def pooler_connect_args(url: str) -> Dict[str, Any]:
+    """
+    获取关闭服务端预编译语句所需的驱动连接参数
+
+    Args:
+        url: 数据库 URL
+
+    Returns:
+        传给 create_engine 的 connect_args
+    """
+    driver = make_url(url).get_driver_name()
+    if driver == "psycopg":
+        # psycopg 3: 不自动 PREPARE 语句
+        return {"prepare_threshold": None}
+    # psycopg2 只使用客户端参数绑定，不产生服务端预编译语句
+    return {}
+
+
+def pooler_engine_kwargs(url: str, pool_size: int, pool_timeout: float) -> Dict[str, Any]:
+    """
+    获取连接池代理模式下的 create_engine 参数
+
+    Args:
+        url: 数据库 URL
+        pool_size: 应用侧连接池大小，0 表示使用 NullPool (每次借出都向代理新建连接)
+        pool_timeout: 连接池获取连接超时时间
+
+    Returns:
+        create_engine 关键字参数
+    """
+    kwargs: Dict[str, Any] = {
+        "pool_pre_ping": False,  # 代理负责后端连接存活，客户端 ping 只会多一次往返
+        "connect_args": pooler_connect_args(url),
+    }
+    if pool_size <= 0:
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=pool_timeout,
+        )
+    return kwargs
+
+
+class SingleTransactionSession(RoutingSession):
+    """
+    请求内只使用一个事务的会话
+
+    在 single_transaction 上下文内，CRUD 层调用的 commit() 只执行 flush，
+    真正的提交在请求结束时统一进行；上下文之外 (脚本、后台任务) 行为与普通会话一致。
+    """
+
+    def commit(self) -> None:
+        if self.info.get(SINGLE_TRANSACTION_KEY):
+            self.flush()
+            return
+        super().commit()
+
+
+@contextmanager
+def single_transaction(db: Session) -> Iterator[Session]:
+    """
+    将会话内的所有操作合并为一个事务，正常结束时提交，异常时回滚
+
+    注意: CRUD 层在异常处理中调用 rollback() 会回滚整个请求事务
+    """
+    db.info[SINGLE_TRANSACTION_KEY] = True
+    try:
+        yield db
+    except BaseException:
+        db.info.pop(SINGLE_TRANSACTION_KEY, None)
+        db.rollback()
+        raise
+    db.info.pop(SINGLE_TRANSACTION_KEY, None)
+    db.commit()
@@ -0,0 +1,244 @@
+"""
+读写分离会话路由
+
+RoutingSession 默认将所有语句发往主库；只读 CRUD 方法通过 replica_read 装饰器
+声明可以走只读副本。以下情况仍然回到主库：
+- 当前会话已经有过写入 (同一请求内读己之写)
+- 该用户在 REPLICA_STICKY_SECONDS 时间窗口内刚写入过 (跨请求读己之写)
+- 会话正在 flush
+
+跨请求的写入时间有两个来源:
+- StickinessTracker: 进程内字典，只对落在同一工作进程的后续请求有效
+- 写入标记 (WriteMarker): 写入后由 ReadYourWritesMiddleware 在响应中返回签名的
+  "用户ID.写入时间.签名" (Cookie 与 X-Last-Write 响应头)，客户端在后续请求中带回 (Cookie 或
+  X-Last-Write 请求头)，多工作进程 / 多实例部署下落到任意进程的请求都能回到主库。
+  不带回标记的客户端只能依赖进程内记录；写入时间使用各实例的系统时钟，时钟偏差会缩短或延长窗口
+"""
+
+import functools
+import hashlib
+import hmac
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Session.info 中使用的键
+REPLICA_ROUTE_KEY = "replica_route"
+SESSION_WROTE_KEY = "session_wrote"
+
+
+class WriteMarker:
+    """
+    单个请求的跨进程写入标记
+
+    Attributes:
+        user_id: 客户端带回的标记中的用户ID
+        written_at: 客户端带回的标记中的写入时间 (Unix 时间戳，秒)
+        written_user_id: 本请求内写入涉及的用户 (响应时据此签发新标记)
+    """
+
+    def __init__(self, user_id: Optional[int] = None, written_at: Optional[float] = None):
+        self.user_id = user_id
+        self.written_at = written_at
+        self.written_user_id: Optional[int] = None
+
+    def is_sticky(self, user_id: Optional[int], window_seconds: float) -> bool:
+        """客户端带回的标记是否表明该用户仍处于写后粘滞窗口内"""
+        if user_id is None or user_id != self.user_id or self.written_at is None:
+            return False
+        return time.time() - self.written_at < window_seconds
+
+
+# 当前请求的写入标记 (由 ReadYourWritesMiddleware 设置；可变对象，线程池中执行的同步端点与中间件共享)
+_write_marker: ContextVar[Optional[WriteMarker]] = ContextVar("write_marker", default=None)
+
+
+def encode_write_marker(user_id: int, written_at: float, secret: str) -> str:
+    """签发写入标记: "用户ID.写入时间(毫秒).签名" """
+    payload = f"{user_id}.{int(written_at * 1000)}"
+    signature = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{payload}.{signature}"
+
+
+def decode_write_marker(value: str, secret: str) -> Optional[Tuple[int, float]]:
+    """
+    校验并解析写入标记
+
+    Returns:
+        (用户ID, 写入时间)，格式错误或签名不符时返回 None
+    """
+    parts = value.strip().split(".")
+    if len(parts) != 3 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    expected = encode_write_marker(int(parts[0]), int(parts[1]) / 1000, secret)
+    if not hmac.compare_digest(expected, value.strip()):
+        return None
+    return int(parts[0]), int(parts[1]) / 1000
+
+
+@contextmanager
+def write_marker_scope(marker: WriteMarker) -> Iterator[WriteMarker]:
+    """在上下文内 (一个请求) 使用指定的写入标记"""
+    token = _write_marker.set(marker)
+    try:
+        yield marker
+    finally:
+        _write_marker.reset(token)
+
+
+class StickinessTracker:
+    """
+    记录用户最近一次写入时间，用于跨请求的读己之写
+
+    进程内记录只对同一工作进程有效，跨进程依赖客户端带回的写入标记 (见模块说明)；
+    过期的记录在写入时按窗口周期批量清理，不随写入过的用户数无限增长
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._deadlines: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def mark(self, user_id: int) -> None:
+        """标记用户刚刚写入 (同时记录到当前请求的写入标记)"""
+        if self.window_seconds <= 0:
+            return
+        marker = _write_marker.get()
+        if marker is not None:
+            marker.written_user_id = user_id
+        now = time.monotonic()
+        with self._lock:
+            self._deadlines[user_id] = now + self.window_seconds
+            if now >= self._next_purge:
+                self._purge(now)
+
+    def _purge(self, now: float) -> None:
+        """清理已过期的记录 (调用方持有锁)，每个窗口周期最多执行一次"""
+        expired = [user_id for user_id, deadline in self._deadlines.items() if deadline < now]
+        for user_id in expired:
+            del self._deadlines[user_id]
+        self._next_purge = now + self.window_seconds
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        """用户是否仍处于写后粘滞窗口内"""
+        if user_id is None or self.window_seconds <= 0:
+            return False
+        deadline = self._deadlines.get(user_id)
+        if deadline is None:
+            return False
+        if deadline < time.monotonic():
+            with self._lock:
+                self._deadlines.pop(user_id, None)
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """根据读写意图在主库与只读副本之间路由的会话"""
+
+    _replica_counter = itertools.count()
+
+    def __init__(
+        self,
+        *args: Any,
+        replicas: Sequence[Engine] = (),
+        stickiness: Optional[StickinessTracker] = None,
+        **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.replicas = list(replicas)
+        self.stickiness = stickiness
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        """选择执行语句的引擎"""
+        if self.replicas and self._can_use_replica():
+            index = next(self._replica_counter) % len(self.replicas)
+            return self.replicas[index]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _can_use_replica(self) -> bool:
+        """当前语句是否可以发往只读副本"""
+        route = self.info.get(REPLICA_ROUTE_KEY)
+        if route is None or self._flushing or self.info.get(SESSION_WROTE_KEY):
+            return False
+        if self.stickiness is not None:
+            user_id = route.get("user_id")
+            if self.stickiness.is_sticky(user_id):
+                return False
+            # 写入发生在其他工作进程: 由客户端带回的写入标记判断
+            marker = _write_marker.get()
+            if marker is not None and marker.is_sticky(user_id, self.stickiness.window_seconds):
+                return False
+        return True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_writes(session: RoutingSession, flush_context: Any) -> None:
+    """flush 后标记会话已写入，并记录写入涉及的用户"""
+    session.info[SESSION_WROTE_KEY] = True
+    if session.stickiness is None:
+        return
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        user_id = _owner_id(obj)
+        if user_id is not None:
+            session.stickiness.mark(user_id)
+
+
+def mark_written(db: Session, user_id: Optional[int]) -> None:
+    """
+    记录不经过 ORM flush 的写入 (批量 UPDATE / DELETE 语句)，效果与 flush 后的标记相同
+
+    Args:
+        db: 数据库会话
+        user_id: 写入涉及的用户ID
+    """
+    db.info[SESSION_WROTE_KEY] = True
+    stickiness = getattr(db, "stickiness", None)
+    if stickiness is not None and user_id is not None:
+        stickiness.mark(user_id)
+
+
+def _owner_id(obj: Any) -> Optional[int]:
+    """获取 ORM 对象所属用户的ID"""
+    user_id = getattr(obj, "user_id", None)
+    if user_id is None and getattr(obj, "__tablename__", None) == "users":
+        user_id = obj.id
+    return user_id
+
+
+@contextmanager
+def use_replica(db: Session, user_id: Optional[int] = None) -> Iterator[None]:
+    """在上下文内允许会话的读查询走只读副本"""
+    previous = db.info.get(REPLICA_ROUTE_KEY)
+    db.info[REPLICA_ROUTE_KEY] = {"user_id": user_id}
+    try:
+        yield
+    finally:
+        if previous is None:
+            db.info.pop(REPLICA_ROUTE_KEY, None)
+        else:
+            db.info[REPLICA_ROUTE_KEY] = previous
+
+
+def replica_read(method: F) -> F:
+    """
+    将 CRUD 只读方法标记为可走只读副本
+
+    被装饰方法的第一个参数须为数据库会话；若有 user_id 关键字参数，
+    则用于判断读己之写的粘滞窗口。
+    """
+    @functools.wraps(method)
+    def wrapper(self: Any, db: Session, *args: Any, **kwargs: Any) -> Any:
+        with use_replica(db, user_id=kwargs.get("user_id")):
+            return method(self, db, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
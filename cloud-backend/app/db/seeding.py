@@ -0,0 +1,262 @@
+"""
+大规模模拟数据生成与批量写入
+
+用 NumPy 按用户分块向量化生成时间相关的健康记录：每个用户有自己的基线分，
+综合分围绕基线做均值回归的 AR(1) 游走，分类评分与综合分相关并带用户级偏移。
+随机数按 (seed, 分块序号) 派生，相同参数每次生成完全相同的数据。
+
+写入时 PostgreSQL 走 COPY FROM STDIN (CSV)，其他数据库退化为 executemany。
+"""
+
+import csv
+import io
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+from sqlalchemy import Table, delete, func, select
+from sqlalchemy.engine import Connection
+
+# 模拟用户的用户名/邮箱前缀，用于识别与清理
+SEED_USER_PREFIX = "seed_"
+
+ASSESSMENT_TYPES = ("comprehensive", "quick", "specific")
+DATA_SOURCES = ("manual", "device", "api")
+# 与 CRUDHealthRecord._calculate_health_level 一致的等级阈值
+LEVEL_THRESHOLDS = ((80.0, "excellent"), (60.0, "good"), (40.0, "fair"))
+
+RECORD_COLUMNS = (
+    "user_id",
+    "assessed_at",
+    "overall_score",
+    "physical_score",
+    "mental_score",
+    "lifestyle_score",
+    "assessment_type",
+    "health_level",
+    "data_source",
+    "is_active",
+)
+
+
+@dataclass
+class SeedPlan:
+    """生成计划"""
+    users: int
+    records_per_user: int
+    start: datetime
+    span_days: int
+    seed: int = 42
+    # 每个分块包含的用户数；分块是随机数派生和提交事务的单位
+    users_per_chunk: int = 500
+
+    @property
+    def total_records(self) -> int:
+        """计划生成的记录总数"""
+        return self.users * self.records_per_user
+
+
+def chunk_rng(seed: int, chunk: int) -> np.random.Generator:
+    """按 (seed, 分块序号) 派生独立且可复现的随机数生成器"""
+    return np.random.default_rng(np.random.SeedSequence([seed, chunk]))
+
+
+def health_levels(scores: np.ndarray) -> np.ndarray:
+    """按综合评分批量计算健康等级"""
+    conditions = [scores >= threshold for threshold, _ in LEVEL_THRESHOLDS]
+    choices = [level for _, level in LEVEL_THRESHOLDS]
+    return np.select(conditions, choices, default="poor")
+
+
+def generate_records(
+    user_ids: Sequence[int],
+    records_per_user: int,
+    start: datetime,
+    span_days: int,
+    rng: np.random.Generator
+) -> Dict[str, np.ndarray]:
+    """
+    为一组用户生成健康记录 (按用户、时间排列)
+
+    Args:
+        user_ids: 用户ID
+        records_per_user: 每个用户的记录数
+        start: 起始时间
+        span_days: 时间跨度 (天)
+        rng: 随机数生成器
+
+    Returns:
+        列名到一维数组的映射，长度为 len(user_ids) * records_per_user
+    """
+    users = len(user_ids)
+    steps = records_per_user
+
+    # 评估时间: 均匀间隔加抖动，单个用户内严格递增
+    interval = span_days * 86400 / steps
+    offsets = (np.arange(steps) + rng.uniform(0.05, 0.95, size=(users, steps))) * interval
+    epoch = start.replace(tzinfo=timezone.utc) if start.tzinfo is None else start.astimezone(timezone.utc)
+    base = np.datetime64(epoch.replace(tzinfo=None), "s")
+    assessed_at = base + offsets.astype("timedelta64[s]")
+
+    # 综合评分: 用户基线 + 均值回归 AR(1) 偏离
+    baseline = np.clip(rng.normal(68.0, 12.0, size=users), 30.0, 95.0)
+    phi = 0.85
+    shocks = rng.normal(0.0, 4.0, size=(users, steps))
+    deviation = np.empty((users, steps))
+    deviation[:, 0] = shocks[:, 0] / np.sqrt(1 - phi ** 2)
+    for step in range(1, steps):
+        deviation[:, step] = phi * deviation[:, step - 1] + shocks[:, step]
+    overall = np.clip(baseline[:, None] + deviation, 0.0, 100.0)
+
+    def sub_score(spread: float) -> np.ndarray:
+        offset = rng.normal(0.0, spread, size=(users, 1))
+        return np.round(np.clip(overall + offset + rng.normal(0.0, 5.0, size=(users, steps)), 0.0, 100.0), 2)
+
+    overall = np.round(overall, 2)
+    return {
+        "user_id": np.repeat(np.asarray(user_ids, dtype=np.int64), steps),
+        "assessed_at": assessed_at.ravel(),
+        "overall_score": overall.ravel(),
+        "physical_score": sub_score(8.0).ravel(),
+        "mental_score": sub_score(8.0).ravel(),
+        "lifestyle_score": sub_score(8.0).ravel(),
+        "assessment_type": rng.choice(ASSESSMENT_TYPES, size=users * steps, p=(0.5, 0.35, 0.15)),
+        "health_level": health_levels(overall.ravel()),
+        "data_source": rng.choice(DATA_SOURCES, size=users * steps, p=(0.3, 0.55, 0.15)),
+        "is_active": np.ones(users * steps, dtype=bool),
+    }
+
+
+def generate_users(first: int, count: int, hashed_password: str) -> List[Dict]:
+    """
+    生成模拟用户
+
+    Args:
+        first: 起始序号
+        count: 用户数
+        hashed_password: 所有模拟用户共用的密码哈希 (逐个 bcrypt 太慢)
+    """
+    return [
+        {
+            "email": f"{SEED_USER_PREFIX}{index:08d}@example.com",
+            "username": f"{SEED_USER_PREFIX}{index:08d}",
+            "hashed_password": hashed_password,
+            "full_name": f"Seed User {index}",
+            "is_active": True,
+        }
+        for index in range(first, first + count)
+    ]
+
+
+def _python_columns(columns: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """数组转为驱动可接受的 Python 对象"""
+    converted = {}
+    for name, values in columns.items():
+        if np.issubdtype(values.dtype, np.datetime64):
+            converted[name] = [
+                value.replace(tzinfo=timezone.utc)
+                for value in values.astype("datetime64[us]").tolist()
+            ]
+        else:
+            converted[name] = values.tolist()
+    return converted
+
+
+def copy_csv(conn: Connection, table_name: str, columns: Sequence[str], rows: Iterable[Sequence]) -> None:
+    """
+    通过 COPY FROM STDIN 写入 PostgreSQL (psycopg2 / psycopg 3)
+
+    Args:
+        conn: 数据库连接 (调用方控制事务)
+        table_name: 目标表名
+        columns: 列名，与每行的值一一对应
+        rows: 行数据；None 写为 NULL，时间需预先格式化为 ISO 字符串
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    sql = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def bulk_insert(conn: Connection, table: Table, columns: Dict[str, np.ndarray]) -> int:
+    """
+    批量写入列式数据
+
+    Args:
+        conn: 数据库连接 (调用方控制事务)
+        table: 目标表
+        columns: 列名到一维数组的映射
+
+    Returns:
+        写入行数
+    """
+    names = list(columns)
+    values = _python_columns(columns)
+    count = len(values[names[0]])
+    if conn.dialect.name == "postgresql":
+        if "assessed_at" in values:
+            values["assessed_at"] = [value.isoformat() for value in values["assessed_at"]]
+        copy_csv(conn, table.name, names, zip(*(values[name] for name in names)))
+    else:
+        conn.execute(table.insert(), [dict(zip(names, row)) for row in zip(*(values[name] for name in names))])
+    return count
+
+
+def delete_seed_data(conn: Connection, users: Table, records: Table) -> int:
+    """删除模拟用户及其健康记录，返回删除的用户数"""
+    seed_ids = select(users.c.id).where(users.c.username.like(f"{SEED_USER_PREFIX}%"))
+    conn.execute(delete(records).where(records.c.user_id.in_(seed_ids)))
+    return conn.execute(delete(users).where(users.c.username.like(f"{SEED_USER_PREFIX}%"))).rowcount
+
+
+def count_seed_users(conn: Connection, users: Table) -> int:
+    """已存在的模拟用户数"""
+    return conn.execute(
+        select(func.count()).select_from(users).where(users.c.username.like(f"{SEED_USER_PREFIX}%"))
+    ).scalar_one()
+
+
+def seed_chunk(
+    conn: Connection,
+    users: Table,
+    records: Table,
+    plan: SeedPlan,
+    chunk: int,
+    hashed_password: str
+) -> int:
+    """
+    生成并写入一个分块的用户与记录
+
+    Args:
+        conn: 数据库连接 (调用方控制事务)
+        users: users 表
+        records: health_records 表
+        plan: 生成计划
+        chunk: 分块序号
+        hashed_password: 模拟用户的密码哈希
+
+    Returns:
+        写入的记录数
+    """
+    first = chunk * plan.users_per_chunk
+    count = min(plan.users_per_chunk, plan.users - first)
+    user_rows = generate_users(first, count, hashed_password)
+    conn.execute(users.insert(), user_rows)
+    user_ids = conn.execute(
+        select(users.c.id)
+        .where(users.c.username.in_([row["username"] for row in user_rows]))
+        .order_by(users.c.username)
+    ).scalars().all()
+
+    columns = generate_records(user_ids, plan.records_per_user, plan.start, plan.span_days, chunk_rng(plan.seed, chunk))
+    return bulk_insert(conn, records, columns)
@@ -1,27 +1,76 @@
+import time
+
+# 应用模块导入开始时间 (用于统计冷启动各阶段耗时)
+_import_started = time.perf_counter()
+
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Dict
+from fastapi.responses import JSONResponse, Response
+from typing import Any, Dict
+from sqlalchemy.exc import SQLAlchemyError
 
+from app.api import deps
 from app.api.v1.api import api_router
+from app.core.admission import THREADPOOL_SIZE, AdmissionControlMiddleware, AdmissionController, ClassLimits
 from app.core.config import settings
-from app.database import create_tables
+from app.core.deadline import DeadlineExceeded, is_overload_error
+from app.core.metrics import (
+    CONTENT_TYPE_LATEST,
+    app_startup_seconds,
+    registry,
+    request_deadline_exceeded_total,
+)
+from app.core.middleware import MetricsMiddleware, QueryInstrumentationMiddleware, ReadYourWritesMiddleware
+from app.core.multiprocess_metrics import SnapshotExporter
+from app.core.profiling import ProfilingMiddleware, profile_store
+from app.core.ratelimit import RateLimitMiddleware, TokenBucketLimiter
+from app.crud.crud_health_alert import alert_pipeline
+from app.crud.crud_outbox import check_outbox_backlog
+from app.database import ensure_health_record_partitions, get_pool_status, pool_sizing, prepare_schema
+
+
+# 多工作进程指标汇总 (未配置共享目录时 /metrics 只返回当前进程)
+metrics_exporter = (
+    SnapshotExporter(registry, settings.METRICS_MULTIPROC_DIR, settings.METRICS_SNAPSHOT_SECONDS)
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR
+    else None
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时执行
-    create_tables()
+    # 启动时执行: 默认只检查表结构版本，DDL 由 migrate.py upgrade 在部署时执行
+    started = time.perf_counter()
+    prepare_schema(settings.SCHEMA_STARTUP_MODE)
+    if settings.HEALTH_RECORDS_PARTITIONING and settings.SCHEMA_STARTUP_MODE in ("check", "strict"):
+        ensure_health_record_partitions()
+    import_seconds, schema_seconds = started - _import_started, time.perf_counter() - started
+    app_startup_seconds.set(import_seconds, ("import",))
+    app_startup_seconds.set(schema_seconds, ("schema",))
+    print(
+        f"⏱️ 工作进程启动耗时: 应用导入 {import_seconds * 1000:.0f}ms，"
+        f"表结构处理 ({settings.SCHEMA_STARTUP_MODE}) {schema_seconds * 1000:.0f}ms"
+    )
     print(f"🚀 {settings.PROJECT_NAME} v{settings.VERSION} 启动成功!")
     print(f"📚 API 文档地址: http://{settings.SERVER_HOST}:{settings.SERVER_PORT}/docs")
     print(f"🔧 ReDoc 文档地址: http://{settings.SERVER_HOST}:{settings.SERVER_PORT}/redoc")
+    if settings.OUTBOX_ENABLED:
+        check_outbox_backlog()
+    # 健康告警后台工作线程 (进程内流水线只支持单个 API 进程，多进程时拒绝启动)
+    alert_pipeline.check_processes(settings.WEB_CONCURRENCY)
+    alert_pipeline.start()
+    if metrics_exporter is not None:
+        metrics_exporter.start()
     
     yield
     
-    # 关闭时执行
+    # 关闭时执行: 处理完已入队的告警事件并写回检测器状态
     print("应用正在关闭...")
+    alert_pipeline.stop()
+    if metrics_exporter is not None:
+        metrics_exporter.stop()
 
 
 # 创建 FastAPI 应用实例
@@ -43,11 +92,83 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# 每个请求的 SQL 统计 (Server-Timing 响应头、请求日志、N+1 检测)
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(
+        QueryInstrumentationMiddleware,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    )
+
+# 跨工作进程的读己之写: 写入后返回签名的写入标记，客户端带回后任意工作进程都会把窗口内的读取发往主库
+if settings.database_replica_urls and settings.REPLICA_STICKY_SECONDS > 0:
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        secret=settings.SECRET_KEY,
+        window_seconds=settings.REPLICA_STICKY_SECONDS,
+    )
+
+# 请求截止时间与准入控制 (注册在指标中间件之前，被拒绝的 503 也计入指标)
+_admission_capacity = settings.ADMISSION_MAX_CONCURRENCY or min(pool_sizing.max_connections, THREADPOOL_SIZE)
+admission_controller = AdmissionController(
+    capacity=_admission_capacity,
+    limits={
+        "write": ClassLimits(_admission_capacity, 2 * settings.ADMISSION_QUEUE_SIZE, settings.REQUEST_DEADLINE_SECONDS),
+        "read": ClassLimits(_admission_capacity, settings.ADMISSION_QUEUE_SIZE, settings.REQUEST_DEADLINE_SECONDS),
+        "analytics": ClassLimits(
+            max(1, int(_admission_capacity * settings.ADMISSION_ANALYTICS_SHARE)),
+            settings.ADMISSION_QUEUE_SIZE,
+            settings.ANALYTICS_DEADLINE_SECONDS,
+        ),
+    },
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+    enabled=settings.ADMISSION_CONTROL_ENABLED,
+)
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller, api_prefix=settings.API_V1_STR)
+
+# 按用户 / IP 限流 (在准入控制之前拒绝，超额的客户端不占用排队名额)
+rate_limiter = TokenBucketLimiter(rate=settings.RATE_LIMIT_RATE, burst=settings.RATE_LIMIT_BURST)
+rate_limiter.enabled = settings.RATE_LIMIT_ENABLED
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, api_prefix=settings.API_V1_STR)
+
+# Prometheus 指标 (路由耗时直方图、正在处理的请求数)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 按需 CPU 剖析 (关闭时不注册中间件，无额外开销)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        admin_token=settings.ADMIN_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval_ms=settings.PROFILING_INTERVAL_MS,
+    )
+
 
 # 包含 API 路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    """超过截止时间 (含数据库 statement_timeout 取消的查询) 返回 503，提示客户端稍后重试"""
+    request_deadline_exceeded_total.inc()
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "服务繁忙，请求处理超时，请稍后重试"},
+        headers={"Retry-After": str(admission_controller.retry_after_seconds())},
+    )
+
+
+@app.exception_handler(SQLAlchemyError)
+async def database_error_handler(request: Request, exc: SQLAlchemyError) -> JSONResponse:
+    """端点未捕获的数据库错误: 查询被 statement_timeout 取消或连接池耗尽时同样返回 503"""
+    if is_overload_error(exc):
+        return await deadline_exceeded_handler(request, DeadlineExceeded())
+    raise exc
+
+
 # 根路径
 @app.get("/", response_class=JSONResponse)
 async def root() -> Dict[str, str]:
@@ -72,6 +193,21 @@ async def health_check() -> Dict[str, str]:
     }
 
 
+# 连接池状态端点 (内部端点，需管理员令牌)
+@app.get("/health/db-pool", response_class=JSONResponse, dependencies=[Depends(deps.require_admin_token)])
+def db_pool_status() -> Dict[str, Any]:
+    """连接池状态 - 当前进程各引擎的连接占用、借出等待时间与超时次数"""
+    return get_pool_status()
+
+
+# Prometheus 指标端点 (内部端点，需管理员令牌)
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(deps.require_admin_token)])
+def metrics() -> Response:
+    """Prometheus 文本格式指标 (配置 METRICS_MULTIPROC_DIR 时合并全部工作进程，否则为当前进程)"""
+    content = metrics_exporter.render() if metrics_exporter is not None else registry.render()
+    return Response(content=content, media_type=CONTENT_TYPE_LATEST)
+
+
 # 如果直接运行此文件，启动开发服务器
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,7 @@
 from .user import User
 from .health_record import HealthRecord
+from .health_stats import HealthStats
+from .health_alert import HealthAlert, AlertDetectorState
+from .outbox import OutboxEvent
 
-__all__ = ["User", "HealthRecord"]
\ No newline at end of file
+__all__ = ["User", "HealthRecord", "HealthStats", "HealthAlert", "AlertDetectorState", "OutboxEvent"]
\ No newline at end of file
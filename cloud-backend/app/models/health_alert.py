@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import Optional, Dict, Any
+from sqlalchemy import String, DateTime, Float, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSON
+from app.database import Base
+
+
+class HealthAlert(Base):
+    """
+    健康告警模型
+
+    由异步告警流水线在健康记录提交后检测生成：
+    综合评分骤降 (滚动 z 分数、CUSUM) 与详细指标 (心率、血压) 超出范围
+    """
+    __tablename__ = "health_alerts"
+
+    __table_args__ = (
+        # 告警列表按用户、检测时间倒序查询
+        Index('ix_health_alerts_user_detected', 'user_id', 'detected_at'),
+    )
+
+    # 主键字段
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True,
+        comment="告警唯一标识符"
+    )
+
+    # 关联用户字段
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="关联的用户ID"
+    )
+
+    # 触发告警的健康记录 (health_records 可能是分区表，不建外键)
+    record_id: Mapped[Optional[int]] = mapped_column(
+        nullable=True,
+        comment="触发告警的健康记录ID"
+    )
+
+    # 告警类型
+    alert_type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="告警类型 (score_drop_zscore, score_drop_cusum, heart_rate, blood_pressure)"
+    )
+
+    # 严重程度
+    severity: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        comment="严重程度 (warning, critical)"
+    )
+
+    # 告警说明
+    message: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False,
+        comment="告警说明"
+    )
+
+    # 触发值
+    value: Mapped[Optional[float]] = mapped_column(
+        Float,
+        nullable=True,
+        comment="触发告警的数值"
+    )
+
+    # 检测详情 (JSON格式存储)
+    details: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        JSON,
+        nullable=True,
+        comment="检测详情 (JSON格式)"
+    )
+
+    # 记录的评估时间
+    assessed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        comment="触发记录的评估时间"
+    )
+
+    # 检测时间
+    detected_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="告警检测时间"
+    )
+
+    def __repr__(self) -> str:
+        """告警对象的字符串表示"""
+        return (
+            f"<HealthAlert(id={self.id}, user_id={self.user_id}, "
+            f"type='{self.alert_type}', severity='{self.severity}')>"
+        )
+
+
+class AlertDetectorState(Base):
+    """
+    告警检测器状态检查点
+
+    每个用户一行，保存流式检测器 (滚动窗口、CUSUM 累积量) 的内存状态，
+    工作进程重启后从检查点恢复，而不是从全部历史记录重建。
+    """
+    __tablename__ = "alert_detector_states"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="关联的用户ID"
+    )
+
+    state: Mapped[Dict[str, Any]] = mapped_column(
+        JSON,
+        nullable=False,
+        comment="检测器状态 (JSON格式)"
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="检查点更新时间"
+    )
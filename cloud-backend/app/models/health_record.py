@@ -4,7 +4,7 @@ from sqlalchemy import Boolean, String, DateTime, Float, Text, ForeignKey, Check
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSON
-from app.database import Base
+from app.database import Base, active_index
 
 if TYPE_CHECKING:
     from app.models.user import User
@@ -40,17 +40,37 @@ class HealthRecord(Base):
         ),
         
         # 性能优化索引
-        Index('ix_health_records_user_date', 'user_id', 'assessed_at'),
+        # 单列索引 (id / user_id / assessed_at / overall_score / health_level) 与
+        # ix_health_records_time_range 已移除：它们是主键或下列复合索引的前缀重复，
+        # CRUD 查询均以 user_id 开头。详见 migrations/0001_drop_redundant_indexes.sql
+        # 趋势图表查询的覆盖索引：INCLUDE 图表所需的评分 / 等级 / 类型列，
+        # 使 user_id + assessed_at 范围查询可以走 Index Only Scan，避免回表读取宽行。
+        # 部分索引只包含有效记录 (CRUD 读取均带 is_active 条件)，软删除的记录不占索引空间
+        active_index(
+            'ix_health_records_user_date_active',
+            'user_id',
+            'assessed_at',
+            postgresql_include=[
+                'overall_score',
+                'physical_score',
+                'mental_score',
+                'lifestyle_score',
+                'health_level',
+                'assessment_type',
+                'data_source',
+            ],
+        ),
+        # 后台压缩任务按 id 分批查找软删除的记录，只索引 is_active = false 的少量行
+        active_index('ix_health_records_inactive', 'id', active=False),
         Index('ix_health_records_score_level', 'overall_score', 'health_level'),
         Index('ix_health_records_assessment_type', 'assessment_type'),
-        Index('ix_health_records_time_range', 'assessed_at', 'user_id'),
-        Index('ix_health_records_full_search', 'user_id', 'assessment_type', 'health_level'),
+        # 按评估类型 / 健康等级筛选用户的有效记录
+        active_index('ix_health_records_search_active', 'user_id', 'assessment_type', 'health_level'),
     )
 
     # 主键字段
     id: Mapped[int] = mapped_column(
         primary_key=True, 
-        index=True, 
         autoincrement=True,
         comment="健康记录唯一标识符"
     )
@@ -59,7 +79,6 @@ class HealthRecord(Base):
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), 
         nullable=False,
-        index=True,
         comment="关联的用户ID"
     )
     
@@ -67,7 +86,6 @@ class HealthRecord(Base):
     assessed_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), 
         nullable=False,
-        index=True,
         comment="健康评估时间"
     )
     
@@ -75,7 +93,6 @@ class HealthRecord(Base):
     overall_score: Mapped[float] = mapped_column(
         Float(precision=5, scale=2), 
         nullable=False,
-        index=True,
         comment="综合健康评分 (0-100)"
     )
     
@@ -102,7 +119,6 @@ class HealthRecord(Base):
     assessment_type: Mapped[str] = mapped_column(
         String(50), 
         nullable=False,
-        index=True,
         comment="评估类型 (comprehensive, quick, specialized)"
     )
     
@@ -110,7 +126,6 @@ class HealthRecord(Base):
     health_level: Mapped[Optional[str]] = mapped_column(
         String(20), 
         nullable=True,
-        index=True,
         comment="健康等级 (excellent, good, fair, poor)"
     )
     
@@ -141,7 +156,7 @@ class HealthRecord(Base):
         Boolean, 
         default=True, 
         nullable=False,
-        comment="记录是否有效"
+        comment="记录是否有效 (软删除后为 False，由后台压缩任务物理删除)"
     )
     
     # 时间戳字段
@@ -0,0 +1,184 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import Boolean, String, DateTime, Float, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSON
+from app.database import Base
+from app.utils.helpers import to_local_naive
+
+
+class HealthStats(Base):
+    """
+    用户健康评分的增量统计模型
+
+    每个用户每个预设时间范围 (7d / 30d / 90d / 180d / 365d / all) 一行，
+    写入健康记录时在同一事务中按 Welford 算法增量更新，
+    健康统计摘要只需一次主键查询即可返回。
+    """
+    __tablename__ = "health_stats"
+
+    # 主键: (用户ID, 时间范围)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="关联的用户ID"
+    )
+
+    time_range: Mapped[str] = mapped_column(
+        String(10),
+        primary_key=True,
+        comment="时间范围 (7d, 30d, 90d, 180d, 365d, all)"
+    )
+
+    # Welford 统计量
+    count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="范围内的评估次数"
+    )
+
+    mean: Mapped[float] = mapped_column(
+        Float,
+        default=0.0,
+        nullable=False,
+        comment="综合评分均值"
+    )
+
+    m2: Mapped[float] = mapped_column(
+        Float,
+        default=0.0,
+        nullable=False,
+        comment="与均值之差的平方和 (方差 = m2 / count)"
+    )
+
+    min_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, comment="最低综合评分")
+    max_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, comment="最高综合评分")
+
+    # 范围内最早 / 最新的记录 (趋势与改善率比较首末两条记录)
+    first_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, comment="最早评估时间")
+    first_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, comment="最早一次综合评分")
+    last_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, comment="最新评估时间")
+    last_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, comment="最新一次综合评分")
+
+    # 健康等级分布
+    level_counts: Mapped[Dict[str, int]] = mapped_column(
+        JSON,
+        default=dict,
+        nullable=False,
+        comment="健康等级分布 (JSON格式)"
+    )
+
+    # 失效控制
+    stale: Mapped[bool] = mapped_column(
+        Boolean,
+        default=True,
+        nullable=False,
+        comment="是否需要重新计算"
+    )
+
+    expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="统计失效时间 (最早记录移出时间窗口或未来记录进入窗口的时间，为空表示不失效)"
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="统计更新时间"
+    )
+
+    def __repr__(self) -> str:
+        """统计对象的字符串表示"""
+        return (
+            f"<HealthStats(user_id={self.user_id}, time_range='{self.time_range}', "
+            f"count={self.count}, mean={self.mean:.2f}, stale={self.stale})>"
+        )
+
+    @property
+    def variance(self) -> Optional[float]:
+        """综合评分的总体方差"""
+        return self.m2 / self.count if self.count else None
+
+    def reset(self) -> None:
+        """清空统计量 (不改变失效时间)"""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_score = None
+        self.max_score = None
+        self.first_at = None
+        self.first_score = None
+        self.last_at = None
+        self.last_score = None
+        self.level_counts = {}
+
+    def add_score(self, score: float, assessed_at: datetime, level: str) -> None:
+        """
+        加入一条记录 (Welford 增量更新)
+
+        Args:
+            score: 综合评分
+            assessed_at: 评估时间 (本地无时区时间)
+            level: 健康等级
+        """
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+
+        if self.min_score is None or score < self.min_score:
+            self.min_score = score
+        if self.max_score is None or score > self.max_score:
+            self.max_score = score
+        if self.first_at is None or assessed_at < to_local_naive(self.first_at):
+            self.first_at, self.first_score = assessed_at, score
+        if self.last_at is None or assessed_at >= to_local_naive(self.last_at):
+            self.last_at, self.last_score = assessed_at, score
+
+        # JSON 列需要整体赋值才会被标记为已修改
+        counts = dict(self.level_counts or {})
+        counts[level] = counts.get(level, 0) + 1
+        self.level_counts = counts
+
+    def remove_score(self, score: float, assessed_at: datetime, level: str) -> bool:
+        """
+        移除一条记录 (Welford 逆向更新)
+
+        被移除的记录是最值或首末记录时无法增量得到新的值，返回 False，由调用方重新计算。
+
+        Args:
+            score: 综合评分
+            assessed_at: 评估时间 (本地无时区时间)
+            level: 健康等级
+
+        Returns:
+            是否已增量移除
+        """
+        if self.count <= 1:
+            self.reset()
+            return True
+        if (
+            score <= self.min_score
+            or score >= self.max_score
+            or assessed_at <= to_local_naive(self.first_at)
+            or assessed_at >= to_local_naive(self.last_at)
+        ):
+            return False
+
+        remaining = self.count - 1
+        mean = (self.count * self.mean - score) / remaining
+        self.m2 = max(self.m2 - (score - mean) * (score - self.mean), 0.0)
+        self.mean = mean
+        self.count = remaining
+
+        counts = dict(self.level_counts or {})
+        counts[level] = counts.get(level, 0) - 1
+        if counts[level] <= 0:
+            del counts[level]
+        self.level_counts = counts
+        return True
@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Optional, Dict, Any
+from sqlalchemy import String, DateTime, Integer, Text, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSON
+from app.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    事务发件箱
+
+    业务写入 (如创建健康记录) 在同一事务中插入事件行，提交成功即保证事件不丢失；
+    后台工作进程 (python run.py --worker) 成批领取待处理事件执行派生工作，失败后按退避重试。
+    """
+    __tablename__ = "outbox_events"
+
+    __table_args__ = (
+        # 领取待处理事件: 只索引 pending 行，已处理的历史行不增加索引体积
+        Index(
+            'ix_outbox_events_pending',
+            'available_at',
+            'id',
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # 清理已处理事件
+        Index('ix_outbox_events_processed_at', 'processed_at'),
+    )
+
+    # 主键字段 (按插入顺序处理)
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True,
+        comment="事件唯一标识符"
+    )
+
+    # 事件主题
+    topic: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False,
+        comment="事件主题 (如 health_record.created)"
+    )
+
+    # 事件内容 (JSON格式存储)
+    payload: Mapped[Dict[str, Any]] = mapped_column(
+        JSON,
+        nullable=False,
+        comment="事件内容 (JSON格式)"
+    )
+
+    # 处理状态
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default="pending",
+        server_default="pending",
+        comment="处理状态 (pending, done, dead)"
+    )
+
+    # 已尝试次数
+    attempts: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="已尝试处理次数"
+    )
+
+    # 最早可处理时间 (重试退避)
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="最早可处理时间"
+    )
+
+    # 最近一次失败原因
+    last_error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True,
+        comment="最近一次处理失败的错误信息"
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="创建时间"
+    )
+
+    processed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="处理完成 (或放弃) 时间"
+    )
+
+    def __repr__(self) -> str:
+        """事件对象的字符串表示"""
+        return f"<OutboxEvent(id={self.id}, topic='{self.topic}', status='{self.status}', attempts={self.attempts})>"
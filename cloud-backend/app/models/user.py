@@ -1,9 +1,9 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
-from sqlalchemy import Boolean, String, DateTime, UniqueConstraint, CheckConstraint, Index
+from sqlalchemy import Boolean, String, DateTime, CheckConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, active_index
 
 if TYPE_CHECKING:
     from app.models.health_record import HealthRecord
@@ -19,9 +19,6 @@ class User(Base):
     
     # 表级约束
     __table_args__ = (
-        # 复合唯一约束（防止相同邮箱和用户名的组合）
-        UniqueConstraint('email', 'username', name='uq_user_email_username'),
-        
         # 检查约束
         CheckConstraint(
             "LENGTH(username) >= 3 AND LENGTH(username) <= 50", 
@@ -37,16 +34,17 @@ class User(Base):
         ),
         
         # 性能优化索引
-        Index('ix_users_email_active', 'email', 'is_active'),
-        Index('ix_users_username_active', 'username', 'is_active'),
+        # email / username 已有唯一索引，以它们为前缀的复合索引与
+        # uq_user_email_username 均为冗余，已移除
         Index('ix_users_created_at', 'created_at'),
-        Index('ix_users_full_search', 'email', 'username', 'full_name'),
+        # 激活用户列表 / 计数 (is_active=True，按创建时间排序) 只扫描激活用户的部分索引；
+        # 取代 is_active 单列索引 (低基数，查询计划几乎不会选用)
+        active_index('ix_users_created_at_active', 'created_at'),
     )
 
     # 主键字段
     id: Mapped[int] = mapped_column(
         primary_key=True, 
-        index=True, 
         autoincrement=True,
         comment="用户唯一标识符"
     )
@@ -85,7 +83,6 @@ class User(Base):
         Boolean, 
         default=True, 
         nullable=False, 
-        index=True,
         comment="用户是否激活"
     )
     
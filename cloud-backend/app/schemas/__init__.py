@@ -1,2 +1,3 @@
 from .user import *
-from .health_record import *
\ No newline at end of file
+from .health_record import *
+from .health_alert import *
\ No newline at end of file
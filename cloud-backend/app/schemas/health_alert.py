@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+# 告警类型枚举
+class AlertType(str, Enum):
+    """健康告警类型枚举"""
+    SCORE_DROP_ZSCORE = "score_drop_zscore"    # 综合评分突然下降
+    SCORE_DROP_CUSUM = "score_drop_cusum"      # 综合评分持续下降
+    HEART_RATE = "heart_rate"                  # 心率超出范围
+    BLOOD_PRESSURE = "blood_pressure"          # 血压超出范围
+
+
+# 告警严重程度枚举
+class AlertSeverity(str, Enum):
+    """健康告警严重程度枚举"""
+    WARNING = "warning"      # 警告
+    CRITICAL = "critical"    # 危急
+
+
+# 数据库中的健康告警模式（返回给客户端）
+class HealthAlert(BaseModel):
+    """健康告警数据模式"""
+    id: int = Field(..., description="告警ID")
+    user_id: int = Field(..., description="用户ID")
+    record_id: Optional[int] = Field(None, description="触发告警的健康记录ID")
+    alert_type: AlertType = Field(..., description="告警类型")
+    severity: AlertSeverity = Field(..., description="严重程度")
+    message: str = Field(..., description="告警说明")
+    value: Optional[float] = Field(None, description="触发告警的数值")
+    details: Optional[Dict[str, Any]] = Field(None, description="检测详情")
+    assessed_at: datetime = Field(..., description="触发记录的评估时间")
+    detected_at: datetime = Field(..., description="告警检测时间")
+
+    model_config = {"from_attributes": True}
+
+
+# 健康告警列表响应模式
+class HealthAlertListResponse(BaseModel):
+    """健康告警列表响应数据模式"""
+    items: List[HealthAlert] = Field(..., description="健康告警列表")
+    total: int = Field(..., description="总告警数")
+    page: int = Field(..., description="当前页码")
+    size: int = Field(..., description="页面大小")
+    pages: int = Field(..., description="总页数")
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any, Literal
 from enum import Enum
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 # 枚举类型定义
@@ -20,6 +20,18 @@ class HealthLevel(str, Enum):
     FAIR = "fair"           # 一般 (40-59分)
     POOR = "poor"           # 较差 (0-39分)
 
+    @classmethod
+    def from_score(cls, score: float) -> "HealthLevel":
+        """根据综合评分 (0-100) 计算健康等级"""
+        if score >= 80:
+            return cls.EXCELLENT
+        elif score >= 60:
+            return cls.GOOD
+        elif score >= 40:
+            return cls.FAIR
+        else:
+            return cls.POOR
+
 
 class DataSource(str, Enum):
     """数据来源枚举"""
@@ -38,6 +50,18 @@ class TimeRange(str, Enum):
     ALL = "all"            # 全部时间
 
 
+# 预设时间范围的天数 (ALL 从 ALL_TIME_START 开始，没有固定天数)
+TIME_RANGE_DAYS: Dict[TimeRange, Optional[int]] = {
+    TimeRange.WEEK: 7,
+    TimeRange.MONTH: 30,
+    TimeRange.QUARTER: 90,
+    TimeRange.HALF_YEAR: 180,
+    TimeRange.YEAR: 365,
+    TimeRange.ALL: None,
+}
+ALL_TIME_START = datetime(2020, 1, 1)  # 假设系统从2020年开始
+
+
 # 健康记录基础模式
 class HealthRecordBase(BaseModel):
     """健康记录基础数据模式"""
@@ -193,4 +217,46 @@ class BatchResponse(BaseModel):
     success_count: int = Field(..., description="成功处理的记录数")
     failed_count: int = Field(..., description="失败处理的记录数")
     errors: List[str] = Field(default_factory=list, description="错误信息列表")
-    created_ids: List[int] = Field(default_factory=list, description="成功创建的记录ID列表")
\ No newline at end of file
+    created_ids: List[int] = Field(default_factory=list, description="成功创建的记录ID列表")
+
+
+class BatchHealthRecordUpdate(BaseModel):
+    """批量部分更新健康记录的数据模式"""
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="健康记录ID列表 (最多1000个)")
+    patch: HealthRecordUpdate = Field(..., description="应用到每条记录的更新字段")
+
+    @field_validator('patch')
+    @classmethod
+    def validate_patch(cls, v: HealthRecordUpdate) -> HealthRecordUpdate:
+        """验证至少包含一个更新字段"""
+        if not v.model_fields_set:
+            raise ValueError('更新字段不能为空')
+        return v
+
+
+class BatchHealthRecordDelete(BaseModel):
+    """批量删除健康记录的数据模式 (按ID列表和 / 或筛选条件，条件之间为 AND)"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000, description="健康记录ID列表 (最多1000个)")
+    start_date: Optional[datetime] = Field(None, description="评估时间起始 (含)")
+    end_date: Optional[datetime] = Field(None, description="评估时间截止 (含)")
+    data_source: Optional[DataSource] = Field(None, description="数据来源")
+    assessment_type: Optional[AssessmentType] = Field(None, description="评估类型")
+
+    @model_validator(mode='after')
+    def validate_criteria(self) -> "BatchHealthRecordDelete":
+        """验证至少指定一个条件，避免误删全部记录"""
+        if all(value is None for value in (
+            self.ids, self.start_date, self.end_date, self.data_source, self.assessment_type
+        )):
+            raise ValueError('至少需要指定记录ID列表或一个筛选条件')
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValueError('结束日期不能早于开始日期')
+        return self
+
+
+class BulkOperationResponse(BaseModel):
+    """批量更新 / 删除响应模式"""
+    affected_count: int = Field(..., description="实际更新 / 删除的记录数")
+    affected_ids: List[int] = Field(default_factory=list, description="实际更新 / 删除的记录ID列表")
+    missing_ids: List[int] = Field(default_factory=list, description="请求中不存在或不属于该用户的记录ID")
+    message: str = Field("操作成功", description="响应消息")
@@ -1,4 +1,5 @@
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, Optional
 import re
 
 
@@ -40,4 +41,16 @@ def calculate_pagination_info(total: int, page: int, size: int) -> Dict[str, Any
         "pages": pages,
         "has_next": has_next,
         "has_prev": has_prev
-    }
\ No newline at end of file
+    }
+
+
+def to_local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    将带时区的时间转换为本地时区的无时区时间
+
+    PostgreSQL 返回带时区的 timestamptz，SQLite 返回无时区时间，
+    在 Python 中比较数据库时间与 datetime.now() 前统一为本地无时区时间。
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+趋势统计: NumPy 向量化实现与纯 Python 循环实现的对比基准
+对四个评分维度计算最小二乘斜率、滑动平均、EWMA、波动率、分位数和异常点，
+分别记录两种实现的耗时并校验结果一致
+
+使用方法:
+    python benchmarks/bench_analytics.py                              # 1k / 10k / 100k / 1M 个数据点
+    python benchmarks/bench_analytics.py --sizes 1000 10000 --rounds 5
+    python benchmarks/bench_analytics.py --output results/analytics.json
+
+说明:
+    数据使用固定随机种子生成 (约 5% 的分类评分缺失)，不访问数据库。
+    纯 Python 实现逐维度逐点循环，1M 个数据点单轮需要数十秒，默认只运行 1 轮。
+"""
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.analytics import (
+    DEFAULT_ALPHA,
+    DEFAULT_PERCENTILES,
+    DEFAULT_WINDOW,
+    DEFAULT_Z_THRESHOLD,
+    anomaly_flags,
+    ewma,
+    least_squares_slope,
+    rolling_mean,
+    score_percentiles,
+    volatility,
+)
+
+SEED = 20240601
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def make_series(count: int, seed: int = SEED) -> Tuple[np.ndarray, np.ndarray]:
+    """生成 (评估时间 (天), 评分矩阵 (4, n))，分类评分约 5% 缺失"""
+    rng = np.random.default_rng(seed)
+    days = np.cumsum(rng.uniform(0.2, 2.0, count))
+    overall = np.clip(70 + 8 * np.sin(days / 30) + rng.normal(0, 4, count), 0, 100)
+    scores = np.clip(overall + rng.normal(0, 6, (4, count)), 0, 100)
+    scores[0] = overall
+    scores[1:][rng.random((3, count)) < 0.05] = np.nan
+    return days, scores
+
+
+def to_lists(scores: np.ndarray) -> List[List[Optional[float]]]:
+    """评分矩阵转换为 Python 列表 (缺失为 None)，作为纯 Python 实现的输入"""
+    return [[None if math.isnan(v) else v for v in row] for row in scores.tolist()]
+
+
+# ---- 纯 Python 循环实现 (逐维度、逐点) ----
+
+def python_slope(days: Sequence[float], values: Sequence[Optional[float]]) -> Tuple[float, float, float]:
+    """最小二乘斜率与拟合首末值"""
+    points = [(t - days[0], v) for t, v in zip(days, values) if v is not None]
+    if len(points) < 2:
+        return math.nan, math.nan, math.nan
+    t_mean = sum(t for t, _ in points) / len(points)
+    y_mean = sum(v for _, v in points) / len(points)
+    sxx = sum((t - t_mean) ** 2 for t, _ in points)
+    sxy = sum((t - t_mean) * (v - y_mean) for t, v in points)
+    if sxx <= 0:
+        return math.nan, math.nan, math.nan
+    slope = sxy / sxx
+    return slope, y_mean + slope * (points[0][0] - t_mean), y_mean + slope * (points[-1][0] - t_mean)
+
+
+def python_rolling_mean(values: Sequence[Optional[float]], window: int) -> List[float]:
+    """滑动平均 (窗口含当前点)"""
+    result = []
+    for i in range(len(values)):
+        chunk = [v for v in values[max(0, i - window + 1):i + 1] if v is not None]
+        result.append(sum(chunk) / len(chunk) if chunk else math.nan)
+    return result
+
+
+def python_ewma(values: Sequence[Optional[float]], alpha: float) -> List[float]:
+    """指数加权移动平均 (缺失值沿用上一个值)"""
+    result, level = [], None
+    for v in values:
+        if v is not None:
+            level = v if level is None else (1 - alpha) * level + alpha * v
+        result.append(math.nan if level is None else level)
+    return result
+
+
+def python_volatility(values: Sequence[Optional[float]]) -> float:
+    """相邻变化量的总体标准差"""
+    diffs = [b - a for a, b in zip(values, values[1:]) if a is not None and b is not None]
+    if len(diffs) < 2:
+        return math.nan
+    return statistics.pstdev(diffs)
+
+
+def python_percentiles(values: Sequence[Optional[float]], percentiles: Sequence[float]) -> List[float]:
+    """线性插值分位数"""
+    data = sorted(v for v in values if v is not None)
+    if not data:
+        return [math.nan] * len(percentiles)
+    result = []
+    for q in percentiles:
+        position = (len(data) - 1) * q / 100
+        low = math.floor(position)
+        high = min(low + 1, len(data) - 1)
+        result.append(data[low] + (data[high] - data[low]) * (position - low))
+    return result
+
+
+def python_anomalies(values: Sequence[Optional[float]], window: int, z_threshold: float) -> List[bool]:
+    """相对前 window 个点的 z 分数异常标记"""
+    min_periods = max(3, window // 2)
+    flags = []
+    for i, v in enumerate(values):
+        reference = [x for x in values[max(0, i - window):i] if x is not None]
+        if v is None or len(reference) < min_periods:
+            flags.append(False)
+            continue
+        mean = sum(reference) / len(reference)
+        std = math.sqrt(max(sum(x * x for x in reference) / len(reference) - mean * mean, 0.0))
+        flags.append(std > 1e-6 and abs(v - mean) / std > z_threshold)
+    return flags
+
+
+def python_analytics(days: List[float], columns: List[List[Optional[float]]]) -> Dict[str, List[Any]]:
+    """纯 Python 实现: 逐维度计算全部统计"""
+    return {
+        "slope": [python_slope(days, values) for values in columns],
+        "rolling_mean": [python_rolling_mean(values, DEFAULT_WINDOW) for values in columns],
+        "ewma": [python_ewma(values, DEFAULT_ALPHA) for values in columns],
+        "volatility": [python_volatility(values) for values in columns],
+        "percentiles": [python_percentiles(values, DEFAULT_PERCENTILES) for values in columns],
+        "anomalies": [python_anomalies(values, DEFAULT_WINDOW, DEFAULT_Z_THRESHOLD) for values in columns],
+    }
+
+
+def numpy_analytics(days: np.ndarray, scores: np.ndarray) -> Dict[str, Any]:
+    """向量化实现: 四个维度一次计算"""
+    return {
+        "slope": np.stack(least_squares_slope(days, scores), axis=1),
+        "rolling_mean": rolling_mean(scores, DEFAULT_WINDOW),
+        "ewma": ewma(scores, DEFAULT_ALPHA),
+        "volatility": volatility(scores),
+        "percentiles": score_percentiles(scores, DEFAULT_PERCENTILES),
+        "anomalies": anomaly_flags(scores, DEFAULT_WINDOW, DEFAULT_Z_THRESHOLD),
+    }
+
+
+def max_difference(vectorized: Dict[str, Any], reference: Dict[str, Any]) -> Dict[str, float]:
+    """两种实现各项结果的最大绝对误差 (异常点为标记不一致的个数)"""
+    result = {}
+    for key, expected in reference.items():
+        actual = vectorized[key]
+        expected = np.array(expected, dtype=bool if key == "anomalies" else np.float64)
+        if key == "anomalies":
+            result[key] = float(np.count_nonzero(actual != expected))
+        else:
+            both_nan = np.isnan(actual) & np.isnan(expected)
+            diff = np.where(both_nan, 0.0, np.abs(actual - expected))
+            result[key] = float(np.nanmax(np.where(np.isnan(diff), np.inf, diff))) if diff.size else 0.0
+    return result
+
+
+def timed(func: Callable[[], Any], rounds: int) -> Tuple[float, Any]:
+    """运行 rounds 轮，返回中位数耗时 (秒) 与最后一次结果"""
+    timings, result = [], None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def format_time(seconds: float) -> str:
+    """格式化耗时"""
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+
+def main() -> None:
+    """主函数 - 运行对比基准"""
+    parser = argparse.ArgumentParser(description="趋势统计向量化实现对比基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="数据点个数")
+    parser.add_argument("--rounds", type=int, default=3, help="向量化实现的统计轮数")
+    parser.add_argument("--python-rounds", type=int, default=1, help="纯 Python 实现的统计轮数")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    print(f"  {'数据点':>10}{'NumPy':>12}{'纯 Python':>14}{'加速比':>10}   最大误差")
+    results = []
+    for size in args.sizes:
+        days, scores = make_series(size)
+        days_list, columns = days.tolist(), to_lists(scores)
+
+        numpy_time, vectorized = timed(lambda: numpy_analytics(days, scores), args.rounds)
+        python_time, reference = timed(lambda: python_analytics(days_list, columns), args.python_rounds)
+        errors = max_difference(vectorized, reference)
+        speedup = python_time / numpy_time if numpy_time else math.inf
+
+        print(
+            f"  {size:>10}{format_time(numpy_time):>12}{format_time(python_time):>14}{speedup:>9.1f}x   "
+            f"{max(value for key, value in errors.items() if key != 'anomalies'):.2e}"
+            f" (异常点不一致 {int(errors['anomalies'])})"
+        )
+        results.append({
+            "points": size,
+            "numpy_seconds": numpy_time,
+            "python_seconds": python_time,
+            "speedup": speedup,
+            "max_errors": errors,
+        })
+
+    if args.output:
+        report = {"datetime": datetime.now(timezone.utc).isoformat(), "seed": SEED, "results": results}
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"💾 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
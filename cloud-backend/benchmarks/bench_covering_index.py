@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+趋势查询覆盖索引基准
+对比普通 (user_id, assessed_at) 索引与 INCLUDE 覆盖索引在 1 年趋势查询上的缓冲区访问量
+
+使用方法:
+    python benchmarks/bench_covering_index.py --rows 500000 --users 200
+
+说明:
+    报告每次查询访问的共享缓冲区页数 (Shared Hit + Shared Read)。
+    冷缓存时这些页全部需要从磁盘读取，因此页数即冷缓存下的 I/O 次数；
+    Heap Fetches 为 Index Only Scan 仍需回表的行数 (VACUUM 后应接近 0)。
+    需要 PostgreSQL 11+，运行结束后会删除临时 schema。
+"""
+
+import argparse
+import random
+import statistics
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.crud.crud_health_record import CRUDHealthRecord
+from benchmarks.common import HEALTH_RECORD_COLUMNS
+
+SCHEMA = "bench_covering_index"
+
+VARIANTS = {
+    "narrow": "(user_id, assessed_at)",
+    "cover": (
+        "(user_id, assessed_at) INCLUDE (overall_score, physical_score, mental_score, "
+        "lifestyle_score, health_level, assessment_type, data_source)"
+    ),
+}
+
+# 在数据库端批量生成宽行 (长备注 + JSON 指标)，setseed 保证可重复
+POPULATE_SQL = """
+    INSERT INTO {table} (user_id, assessed_at, overall_score, physical_score, mental_score,
+                         lifestyle_score, assessment_type, health_level, detailed_metrics,
+                         notes, data_source)
+    SELECT (random() * (:users - 1))::int + 1,
+           now() - random() * interval '730 days',
+           s.score, s.score - 3, s.score + 2, s.score - 1,
+           (ARRAY['comprehensive', 'quick', 'specific'])[1 + (random() * 2)::int],
+           CASE WHEN s.score >= 80 THEN 'excellent' WHEN s.score >= 60 THEN 'good' ELSE 'fair' END,
+           json_build_object('heart_rate', 60 + (random() * 40)::int,
+                             'blood_pressure', '120/80',
+                             'sleep_hours', round((6 + random() * 3)::numeric, 1)),
+           repeat('健康评估备注 ', 40),
+           (ARRAY['manual', 'device', 'api'])[1 + (random() * 2)::int]
+    FROM (SELECT 40 + random() * 58 AS score FROM generate_series(1, :rows)) AS s
+"""
+
+
+def trend_sql(table: str) -> str:
+    """与 CRUDHealthRecord.get_trend_points 相同的投影查询"""
+    columns = ", ".join(CRUDHealthRecord.TREND_COLUMNS)
+    return (
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT {columns} FROM {SCHEMA}.{table} "
+        f"WHERE user_id = :user_id AND assessed_at >= now() - interval '365 days' "
+        f"AND assessed_at <= now() ORDER BY assessed_at LIMIT 1000"
+    )
+
+
+def find_scan(node: Dict[str, Any]) -> Dict[str, Any]:
+    """找到计划树中访问表的扫描节点"""
+    if "Relation Name" in node:
+        return node
+    for child in node.get("Plans", []):
+        found = find_scan(child)
+        if found:
+            return found
+    return {}
+
+
+def main() -> None:
+    """主函数"""
+    parser = argparse.ArgumentParser(description="趋势查询覆盖索引基准")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="PostgreSQL 连接 URL")
+    parser.add_argument("--rows", type=int, default=500_000, help="记录数")
+    parser.add_argument("--users", type=int, default=200, help="模拟用户数")
+    parser.add_argument("--queries", type=int, default=50, help="查询的用户数")
+    parser.add_argument("--seed", type=float, default=0.42, help="随机种子 (-1 ~ 1)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        print("❌ 覆盖索引基准仅支持 PostgreSQL")
+        sys.exit(1)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text("SELECT setseed(:seed)"), {"seed": args.seed})
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.narrow ({HEALTH_RECORD_COLUMNS}, PRIMARY KEY (id))"))
+        conn.execute(text(POPULATE_SQL.format(table=f"{SCHEMA}.narrow")), {"rows": args.rows, "users": args.users})
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.cover (LIKE {SCHEMA}.narrow INCLUDING ALL)"))
+        conn.execute(text(f"INSERT INTO {SCHEMA}.cover SELECT * FROM {SCHEMA}.narrow"))
+        for table, columns in VARIANTS.items():
+            conn.execute(text(f"CREATE INDEX {table}_trend ON {SCHEMA}.{table} {columns}"))
+
+    # VACUUM 更新可见性映射，Index Only Scan 才能跳过回表
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in VARIANTS:
+            conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+    try:
+        user_ids = random.Random(args.seed).sample(range(1, args.users + 1), min(args.queries, args.users))
+        results: Dict[str, Dict[str, List[float]]] = {}
+        with engine.connect() as conn:
+            for table in VARIANTS:
+                stats: Dict[str, List[float]] = {"buffers": [], "heap_fetches": [], "ms": []}
+                node_types = set()
+                for user_id in user_ids:
+                    document = conn.execute(text(trend_sql(table)), {"user_id": user_id}).scalar()[0]
+                    plan = document["Plan"]
+                    scan = find_scan(plan)
+                    node_types.add(scan.get("Node Type", "?"))
+                    stats["buffers"].append(plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0))
+                    stats["heap_fetches"].append(scan.get("Heap Fetches", 0))
+                    stats["ms"].append(document.get("Execution Time", 0.0))
+                stats["node_types"] = sorted(node_types)
+                results[table] = stats
+
+        print(f"📊 {args.rows} 行, {args.users} 用户, 每组 {len(user_ids)} 次 1 年趋势查询")
+        print(f"{'索引':<10}{'扫描方式':<28}{'平均页数':>10}{'平均回表':>10}{'p50(ms)':>10}")
+        for table, stats in results.items():
+            print(
+                f"{table:<10}{', '.join(stats['node_types']):<28}"
+                f"{statistics.fmean(stats['buffers']):>10.1f}"
+                f"{statistics.fmean(stats['heap_fetches']):>10.1f}"
+                f"{statistics.median(stats['ms']):>10.3f}"
+            )
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
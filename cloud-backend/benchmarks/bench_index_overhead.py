@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+冗余索引对写入吞吐的影响基准
+在临时 schema 中分别创建删除冗余索引前后的 health_records 对照表，比较批量写入吞吐与索引体积
+
+使用方法:
+    python benchmarks/bench_index_overhead.py --rows 200000
+
+注意: 需要 PostgreSQL，运行结束后会删除临时 schema
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from benchmarks.common import HEALTH_RECORD_COLUMNS, INSERT_SQL, generate_rows
+
+SCHEMA = "bench_index_overhead"
+
+# 删除冗余索引前模型声明的全部索引
+INDEXES_BEFORE = [
+    "(id)",
+    "(user_id)",
+    "(assessed_at)",
+    "(overall_score)",
+    "(health_level)",
+    "(user_id, assessed_at)",
+    "(overall_score, health_level)",
+    "(assessment_type)",
+    "(assessed_at, user_id)",
+    "(user_id, assessment_type, health_level)",
+]
+
+# migrations/0001_drop_redundant_indexes.sql 之后保留的索引
+INDEXES_AFTER = [
+    "(user_id, assessed_at)",
+    "(overall_score, health_level)",
+    "(assessment_type)",
+    "(user_id, assessment_type, health_level)",
+]
+
+
+def setup_table(conn, table: str, indexes: List[str]) -> None:
+    """创建对照表及其索引"""
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.{table} ({HEALTH_RECORD_COLUMNS}, PRIMARY KEY (id))"))
+    for i, columns in enumerate(indexes):
+        conn.execute(text(f"CREATE INDEX {table}_ix{i} ON {SCHEMA}.{table} {columns}"))
+
+
+def bench_insert(engine, table: str, rows: List[Dict], batch_size: int) -> float:
+    """批量写入并返回吞吐 (行/秒)"""
+    sql = text(INSERT_SQL.format(table=f"{SCHEMA}.{table}"))
+    started = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        with engine.begin() as conn:
+            conn.execute(sql, rows[offset:offset + batch_size])
+    return len(rows) / (time.perf_counter() - started)
+
+
+def index_size(engine, table: str) -> int:
+    """表上全部索引的总大小 (字节)"""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT pg_indexes_size(:table)"), {"table": f"{SCHEMA}.{table}"}).scalar()
+
+
+def main() -> None:
+    """主函数"""
+    parser = argparse.ArgumentParser(description="冗余索引写入开销基准")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="PostgreSQL 连接 URL")
+    parser.add_argument("--rows", type=int, default=200_000, help="写入记录数")
+    parser.add_argument("--users", type=int, default=1000, help="模拟用户数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批写入行数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        print("❌ 索引开销基准仅支持 PostgreSQL")
+        sys.exit(1)
+
+    end = datetime.now(timezone.utc)
+    rows = generate_rows(args.rows, args.users, end - timedelta(days=365), 365, args.seed)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        setup_table(conn, "before", INDEXES_BEFORE)
+        setup_table(conn, "after", INDEXES_AFTER)
+
+    try:
+        results = {}
+        for table in ("before", "after"):
+            throughput = bench_insert(engine, table, rows, args.batch_size)
+            results[table] = (throughput, index_size(engine, table))
+
+        print(f"📊 {args.rows} 行, 批大小 {args.batch_size}")
+        print(f"{'索引集':<12}{'索引数':>8}{'写入吞吐(行/秒)':>18}{'索引大小(MB)':>16}")
+        for table, indexes in (("before", INDEXES_BEFORE), ("after", INDEXES_AFTER)):
+            throughput, size = results[table]
+            print(f"{table:<12}{len(indexes) + 1:>8}{throughput:>18.0f}{size / 1024 / 1024:>16.1f}")
+        speedup = results["after"][0] / results["before"][0]
+        print(f"\n写入吞吐提升: {speedup:.2f}x")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
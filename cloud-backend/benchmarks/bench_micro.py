@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+纯 Python 热点路径微基准
+覆盖趋势/摘要计算、ECharts 数据点与配置生成、模型序列化、请求体校验和 JWT 校验，
+结果以 JSON 输出 (字段与 pytest-benchmark 相近)，便于按提交追踪
+
+使用方法:
+    python benchmarks/bench_micro.py                                  # 运行全部用例并打印结果
+    python benchmarks/bench_micro.py --output results/micro.json      # 保存 JSON 结果
+    python benchmarks/bench_micro.py --compare results/micro.json     # 与之前的结果对比
+    python benchmarks/bench_micro.py --filter summary --rounds 50
+
+说明:
+    每个用例先校准单轮迭代次数 (单轮至少 --min-time 秒)，再运行 --rounds 轮，统计单次调用耗时。
+    数据使用固定随机种子生成，不访问数据库。--compare 时中位数变慢超过 --tolerance 即以非零状态码退出。
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.ratelimit import TokenBucketLimiter, TokenCache, client_key, route_cost
+from app.core.security import create_access_token, verify_token
+from app.crud.crud_health_record import CRUDHealthRecord, health_record as crud_health_record
+from app.models.health_record import HealthRecord
+from app.schemas.health_record import HealthRecordCreate
+
+SEED = 20240601
+SIZES = (100, 1000)
+
+# 与 get_trend_points 返回的 Row 一样按列名访问
+TrendRow = namedtuple("TrendRow", CRUDHealthRecord.TREND_COLUMNS)
+
+
+def make_trend_rows(count: int, seed: int = SEED) -> List[TrendRow]:
+    """生成按时间升序的趋势查询结果行"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        score = rng.uniform(40, 98)
+        rows.append(TrendRow(
+            assessed_at=start + timedelta(hours=i * 8),
+            overall_score=score,
+            physical_score=max(0.0, min(100.0, score + rng.uniform(-10, 10))),
+            mental_score=max(0.0, min(100.0, score + rng.uniform(-10, 10))),
+            lifestyle_score=max(0.0, min(100.0, score + rng.uniform(-10, 10))),
+            health_level=crud_health_record._calculate_health_level(score).value,
+            assessment_type=rng.choice(["comprehensive", "quick", "specific"]),
+            data_source=rng.choice(["manual", "device", "api"]),
+        ))
+    return rows
+
+
+def make_records(count: int, seed: int = SEED) -> List[HealthRecord]:
+    """生成未持久化的 ORM 健康记录 (属性访问走 SQLAlchemy 插桩，与线上一致)"""
+    records = []
+    for i, row in enumerate(make_trend_rows(count, seed)):
+        record = HealthRecord(id=i + 1, user_id=1, is_active=True, notes=None, **row._asdict())
+        record.detailed_metrics = {"heart_rate": 72, "sleep_hours": 7.5}
+        records.append(record)
+    return records
+
+
+def make_create_payloads(count: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """生成创建健康记录的请求体"""
+    rng = random.Random(seed)
+    return [
+        {
+            "assessed_at": (datetime(2024, 1, 1) + timedelta(hours=i)).isoformat(),
+            "overall_score": round(rng.uniform(40, 98), 1),
+            "physical_score": round(rng.uniform(40, 98), 1),
+            "mental_score": round(rng.uniform(40, 98), 1),
+            "lifestyle_score": round(rng.uniform(40, 98), 1),
+            "assessment_type": rng.choice(["comprehensive", "quick", "specific"]),
+            "assessment_notes": "定期评估",
+            "detailed_metrics": {"heart_rate": rng.randint(55, 100), "sleep_hours": round(rng.uniform(5, 9), 1)},
+            "data_source": rng.choice(["manual", "device", "api"]),
+        }
+        for i in range(count)
+    ]
+
+
+@dataclass
+class Case:
+    """一个基准用例: setup 返回被测的无参函数"""
+    name: str
+    group: str
+    params: Dict[str, Any]
+    setup: Callable[[], Callable[[], Any]]
+
+
+def build_cases() -> List[Case]:
+    """构建全部基准用例"""
+    cases: List[Case] = []
+    start, end = datetime(2024, 1, 1), datetime(2024, 12, 31)
+
+    for n in SIZES:
+        def summary(n=n):
+            rows = make_trend_rows(n)
+            return lambda: crud_health_record._calculate_summary(None, 1, rows, start, end)
+
+        def echarts_points(n=n):
+            rows = make_trend_rows(n)
+            return lambda: [crud_health_record._to_echarts_point(row) for row in rows]
+
+        def echarts_config(n=n):
+            rows = make_trend_rows(n)
+            points = [crud_health_record._to_echarts_point(row) for row in rows]
+            result = crud_health_record._calculate_summary(None, 1, rows, start, end)
+            return lambda: crud_health_record._generate_echarts_config(points, result)
+
+        def to_trend_point(n=n):
+            records = make_records(n)
+            return lambda: [record.to_trend_point() for record in records]
+
+        def get_summary(n=n):
+            records = make_records(n)
+            return lambda: [record.get_summary() for record in records]
+
+        cases += [
+            Case(f"calculate_summary[{n}]", "trends", {"n": n}, summary),
+            Case(f"echarts_points[{n}]", "trends", {"n": n}, echarts_points),
+            Case(f"generate_echarts_config[{n}]", "trends", {"n": n}, echarts_config),
+            Case(f"to_trend_point[{n}]", "serialization", {"n": n}, to_trend_point),
+            Case(f"get_summary[{n}]", "serialization", {"n": n}, get_summary),
+        ]
+
+    def validate_create():
+        payloads = make_create_payloads(100)
+        return lambda: [HealthRecordCreate.model_validate(payload) for payload in payloads]
+
+    def verify_valid_token():
+        token = create_access_token(42)
+        return lambda: verify_token(token)
+
+    def verify_invalid_token():
+        token = create_access_token(42)[:-4] + "AAAA"
+        return lambda: verify_token(token)
+
+    def rate_limit_request():
+        # 中间件每个请求的限流开销: 解析限流键 (令牌已缓存)、计算路由消耗、取令牌
+        limiter, tokens = TokenBucketLimiter(rate=1e9, burst=1e9), TokenCache()
+        scope = {
+            "headers": [(b"host", b"api"), (b"authorization", f"Bearer {create_access_token(42)}".encode())],
+            "client": ("10.0.0.1", 50000),
+            "method": "GET",
+            "path": "/api/v1/users/42/health-trends",
+        }
+        return lambda: limiter.consume(
+            client_key(scope, tokens), route_cost(scope["method"], scope["path"]), time.monotonic()
+        )
+
+    cases += [
+        Case("health_record_create_validation[100]", "validation", {"n": 100}, validate_create),
+        Case("verify_token[valid]", "auth", {"valid": True}, verify_valid_token),
+        Case("verify_token[invalid]", "auth", {"valid": False}, verify_invalid_token),
+        Case("rate_limit_request", "auth", {}, rate_limit_request),
+    ]
+    return cases
+
+
+def run_case(case: Case, rounds: int, min_time: float) -> Dict[str, Any]:
+    """
+    运行单个用例
+
+    Args:
+        case: 基准用例
+        rounds: 统计轮数
+        min_time: 单轮最少耗时 (秒)，据此校准每轮迭代次数
+
+    Returns:
+        用例结果 (耗时单位为秒)
+    """
+    func = case.setup()
+    func()  # 预热
+
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or iterations >= 1_000_000:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        timings.append((time.perf_counter() - started) / iterations)
+
+    mean = statistics.fmean(timings)
+    return {
+        "name": case.name,
+        "group": case.group,
+        "params": case.params,
+        "stats": {
+            "min": min(timings),
+            "max": max(timings),
+            "mean": mean,
+            "median": statistics.median(timings),
+            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "rounds": rounds,
+            "iterations": iterations,
+            "ops": 1 / mean if mean else 0.0,
+        },
+    }
+
+
+def commit_info() -> Dict[str, Any]:
+    """当前 git 提交信息"""
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=project_root, capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return {"id": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+def compare(current: List[Dict[str, Any]], previous: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    与之前的结果按中位数对比，返回变慢超过 tolerance 的用例说明
+    """
+    previous_by_name = {bench["name"]: bench for bench in previous}
+    regressions = []
+    for bench in current:
+        before = previous_by_name.get(bench["name"])
+        if before is None:
+            continue
+        ratio = bench["stats"]["median"] / before["stats"]["median"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{bench['name']}: 中位数慢了 {ratio - 1:.1%}")
+    return regressions
+
+
+def format_time(seconds: float) -> str:
+    """格式化耗时"""
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f}ms"
+    return f"{seconds * 1e6:.2f}µs"
+
+
+def main() -> None:
+    """主函数 - 运行微基准"""
+    parser = argparse.ArgumentParser(description="纯 Python 热点路径微基准")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--rounds", type=int, default=20, help="统计轮数")
+    parser.add_argument("--min-time", type=float, default=0.05, help="单轮最少耗时 (秒)")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    parser.add_argument("--compare", type=Path, help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的中位数变慢比例 (默认 10%%)")
+    args = parser.parse_args()
+
+    cases = [case for case in build_cases() if args.filter in case.name]
+    print(f"  {'用例':<42}{'中位数':>12}{'最小':>12}{'标准差':>12}{'ops/s':>12}")
+    benchmarks = []
+    for case in cases:
+        result = run_case(case, args.rounds, args.min_time)
+        stats = result["stats"]
+        print(
+            f"  {case.name:<42}{format_time(stats['median']):>12}{format_time(stats['min']):>12}"
+            f"{format_time(stats['stddev']):>12}{stats['ops']:>12.1f}"
+        )
+        benchmarks.append(result)
+
+    report = {
+        "machine_info": {
+            "python_version": platform.python_version(),
+            "python_implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+        },
+        "commit_info": commit_info(),
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "seed": SEED,
+        "benchmarks": benchmarks,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"💾 结果已保存: {args.output}")
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))["benchmarks"]
+        regressions = compare(benchmarks, previous, args.tolerance)
+        if regressions:
+            print(f"\n❌ 性能回退 ({len(regressions)} 项):")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\n✅ 与 {args.compare} 相比无回退 (容差 {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+过载压测
+以开环 (按固定到达率，不等待前一个请求完成) 方式发送趋势查询与记录写入，逐步提高到容量的 N 倍，
+统计有效吞吐 (goodput: 在客户端超时内成功返回的请求数/秒)。客户端按小程序 utils/network.js
+的策略重试 (超时或 503 后重试，最多 3 次，优先按 Retry-After 等待)，放弃的请求在服务端仍继续执行。
+
+使用方法:
+    python benchmarks/bench_overload.py                                 # 启动本地服务，对比准入控制开启 / 关闭
+    python benchmarks/bench_overload.py --factors 1 2 3 --duration 20
+    python benchmarks/bench_overload.py --server-env ADMISSION_MAX_CONCURRENCY=8
+    python benchmarks/bench_overload.py --base-url http://localhost:8000 --capacity 150
+
+说明:
+    未指定 --base-url 时按每种模式启动一个 uvicorn 子进程 (压测客户端与服务端不共享 CPU 和事件循环)，
+    并关闭请求合并 (避免重复的趋势查询被合并后掩盖过载) 与按用户限流；--base-url 时使用服务端自身的配置。
+    未指定 --capacity 时先以闭环压测测出容量 (成功请求数/秒)；
+    准入控制开启时，最大过载倍数下的 goodput 低于 1 倍负载时的 (1 - tolerance) 倍则以非零状态码退出。
+    3 倍过载时压测客户端本身每秒要发出上千个请求，应与服务端运行在不同的机器 (或至少不同的 CPU) 上，
+    否则客户端与服务端争抢 CPU，测得的是压测机的瓶颈。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.load_test import SCALES, Dataset, cleanup, percentile, seed_dataset, watermarks
+
+# 配置日志
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+API = settings.API_V1_STR
+RETRYABLE_STATUS = (502, 503, 504)
+
+
+@dataclass
+class Outcome:
+    """一个逻辑请求 (含重试) 的结果"""
+    kind: str
+    success: bool
+    latency_s: float
+    attempts: int
+    shed: int
+
+
+@dataclass
+class Phase:
+    """一个负载阶段的统计"""
+    mode: str
+    factor: float
+    offered_rps: float
+    duration_s: float
+    outcomes: List[Outcome] = field(default_factory=list)
+
+    def summary(self, capacity: float) -> Dict[str, Any]:
+        good = [o for o in self.outcomes if o.success]
+        latencies = [o.latency_s * 1000 for o in good]
+        attempts = sum(o.attempts for o in self.outcomes)
+        goodput = len(good) / self.duration_s
+        return {
+            "mode": self.mode,
+            "factor": self.factor,
+            "offered_rps": round(self.offered_rps, 1),
+            "attempts_rps": round(attempts / self.duration_s, 1),
+            "goodput_rps": round(goodput, 1),
+            "goodput_ratio": round(goodput / capacity, 3) if capacity else 0.0,
+            "write_success_rate": _success_rate([o for o in self.outcomes if o.kind == "write"]),
+            "read_success_rate": _success_rate([o for o in self.outcomes if o.kind == "analytics"]),
+            "shed_responses": sum(o.shed for o in self.outcomes),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+        }
+
+
+def _success_rate(outcomes: List[Outcome]) -> float:
+    return round(sum(o.success for o in outcomes) / len(outcomes), 3) if outcomes else 0.0
+
+
+class Workload:
+    """按比例生成趋势查询与记录写入，并按客户端策略执行"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        dataset: Dataset,
+        write_ratio: float,
+        timeout: float,
+        max_attempts: int,
+        retry_delay: float,
+        seed: int
+    ):
+        self.client = client
+        self.dataset = dataset
+        self.write_ratio = write_ratio
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.rng = random.Random(seed)
+        # 客户端已放弃但服务端仍在处理的请求
+        self.abandoned: Set[asyncio.Task] = set()
+
+    def _build(self) -> Dict[str, Any]:
+        user = self.dataset.users[self.rng.randrange(len(self.dataset.users))]
+        headers = {"Authorization": f"Bearer {user.token}", "X-Request-Timeout": str(self.timeout)}
+        if self.rng.random() < self.write_ratio:
+            score = round(self.rng.uniform(60.0, 95.0), 1)
+            return {
+                "kind": "write",
+                "method": "POST",
+                "url": f"{API}/users/{user.id}/health-records",
+                "json": {
+                    "assessed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "overall_score": score,
+                    "assessment_type": "quick",
+                    "data_source": "device",
+                },
+                "headers": headers,
+            }
+        return {
+            "kind": "analytics",
+            "method": "GET",
+            "url": f"{API}/users/{user.id}/health-trends",
+            "params": {"time_range": self.rng.choice(["30d", "90d", "365d"])},
+            "headers": headers,
+        }
+
+    async def _attempt(self, spec: Dict[str, Any]) -> Optional[httpx.Response]:
+        """发送一次请求，客户端超时则返回 None (请求在服务端继续执行)"""
+        kwargs = {key: spec[key] for key in ("params", "json", "headers") if key in spec}
+        task = asyncio.ensure_future(self.client.request(spec["method"], spec["url"], **kwargs))
+        done, _ = await asyncio.wait({task}, timeout=self.timeout)
+        if not done:
+            self.abandoned.add(task)
+            task.add_done_callback(self._forget)
+            return None
+        try:
+            return task.result()
+        except httpx.HTTPError as e:
+            logger.warning(f"请求失败: {e}")
+            return None
+
+    async def run_one(self) -> Outcome:
+        """执行一个逻辑请求，按 network.js 的策略重试"""
+        spec = self._build()
+        started = time.perf_counter()
+        shed = 0
+        for attempt in range(1, self.max_attempts + 1):
+            response = await self._attempt(spec)
+            if response is not None and response.status_code < 400:
+                latency = time.perf_counter() - started
+                return Outcome(spec["kind"], latency <= self.timeout, latency, attempt, shed)
+            if response is not None:
+                if response.status_code == 503:
+                    shed += 1
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+            if attempt < self.max_attempts:
+                retry_after = response.headers.get("Retry-After") if response is not None else None
+                base = float(retry_after) if retry_after else self.retry_delay * 2 ** (attempt - 1)
+                await asyncio.sleep(base * (1 + self.rng.random() * 0.5))
+        return Outcome(spec["kind"], False, time.perf_counter() - started, attempt, shed)
+
+    def _forget(self, task: asyncio.Task) -> None:
+        self.abandoned.discard(task)
+        if not task.cancelled():
+            task.exception()  # 已放弃的请求失败 (如连接被关闭) 不再单独报错
+
+    async def drain(self) -> None:
+        """等待客户端已放弃的请求在服务端处理完，避免影响下一阶段"""
+        if self.abandoned:
+            await asyncio.wait(set(self.abandoned))
+
+
+async def calibrate(workload: Workload, concurrency: int, seconds: float) -> float:
+    """闭环压测，返回容量 (成功请求数/秒)"""
+    deadline = time.perf_counter() + seconds
+    successes = 0
+
+    async def worker() -> None:
+        nonlocal successes
+        while time.perf_counter() < deadline:
+            response = await workload._attempt(workload._build())
+            if response is not None and response.status_code < 400:
+                successes += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await workload.drain()
+    return successes / (time.perf_counter() - started)
+
+
+async def run_phase(workload: Workload, mode: str, factor: float, capacity: float, duration: float) -> Phase:
+    """按 factor × capacity 的到达率 (泊松过程) 发送 duration 秒"""
+    rate = factor * capacity
+    phase = Phase(mode=mode, factor=factor, offered_rps=rate, duration_s=duration)
+    tasks = []
+    started = time.perf_counter()
+    next_arrival = 0.0
+    while next_arrival < duration:
+        delay = started + next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(workload.run_one()))
+        next_arrival += workload.rng.expovariate(rate)
+    phase.outcomes = list(await asyncio.gather(*tasks))
+    await workload.drain()
+    return phase
+
+
+@contextmanager
+def local_server(admission: bool, extra_env: Dict[str, str]) -> Iterator[str]:
+    """
+    启动一个 uvicorn 子进程，返回其地址
+
+    Args:
+        admission: 是否开启准入控制
+        extra_env: 额外的环境变量 (如 ADMISSION_MAX_CONCURRENCY)
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {
+        **os.environ,
+        "ADMISSION_CONTROL_ENABLED": str(admission).lower(),
+        "SINGLE_FLIGHT_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "SCHEMA_STARTUP_MODE": "skip",
+        **extra_env,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "error"],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            if process.poll() is not None:
+                raise RuntimeError("服务启动失败")
+            try:
+                httpx.get(f"{base_url}/health", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def print_header(args: argparse.Namespace, capacity: float) -> None:
+    """打印容量与结果表头"""
+    print(f"📏 容量: {capacity:.1f} 请求/秒 (客户端超时 {args.timeout}s，写入占比 {args.write_ratio:.0%})")
+    print(
+        f"  {'模式':<8}{'倍数':>6}{'到达率':>10}{'实际请求':>10}{'goodput':>10}{'比例':>8}"
+        f"{'写入成功':>10}{'读取成功':>10}{'503':>8}{'p50(ms)':>10}{'p99(ms)':>10}"
+    )
+
+
+async def run_mode(
+    args: argparse.Namespace,
+    dataset: Dataset,
+    base_url: str,
+    mode: str,
+    capacity: Optional[float]
+) -> Tuple[float, List[Dict[str, Any]]]:
+    """对一个服务执行校准 (如需要) 与各负载阶段"""
+    results = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300.0, limits=limits) as client:
+        workload = Workload(
+            client, dataset, args.write_ratio, args.timeout, args.max_attempts, args.retry_delay, args.seed
+        )
+        if capacity is None:
+            capacity = await calibrate(workload, args.concurrency, args.calibrate)
+            print_header(args, capacity)
+        for factor in args.factors:
+            phase = await run_phase(workload, mode, factor, capacity, args.duration)
+            summary = phase.summary(capacity)
+            results.append(summary)
+            print(
+                f"  {mode:<8}{factor:>6.1f}{summary['offered_rps']:>10.1f}{summary['attempts_rps']:>10.1f}"
+                f"{summary['goodput_rps']:>10.1f}{summary['goodput_ratio']:>8.2f}"
+                f"{summary['write_success_rate']:>10.1%}{summary['read_success_rate']:>10.1%}"
+                f"{summary['shed_responses']:>8}{summary['p50_ms']:>10.1f}{summary['p99_ms']:>10.1f}"
+            )
+            await asyncio.sleep(args.cooldown)
+    return capacity, results
+
+
+def run(args: argparse.Namespace, dataset: Dataset) -> List[Dict[str, Any]]:
+    """按模式依次压测；容量在第一个模式上校准后复用，保证各模式的到达率相同"""
+    if args.capacity is not None:
+        print_header(args, args.capacity)
+    if args.base_url:
+        return asyncio.run(run_mode(args, dataset, args.base_url, "server", args.capacity))[1]
+    extra_env = dict(item.split("=", 1) for item in args.server_env)
+    capacity, results = args.capacity, []
+    for mode in args.modes:
+        with local_server(mode == "on", extra_env) as base_url:
+            capacity, mode_results = asyncio.run(run_mode(args, dataset, base_url, mode, capacity))
+        results.extend(mode_results)
+    return results
+
+
+def check_goodput(results: List[Dict[str, Any]], mode: str, tolerance: float) -> Optional[str]:
+    """
+    检查最大过载倍数下的 goodput 是否不低于 1 倍负载时的 (1 - tolerance) 倍
+
+    Returns:
+        不满足时返回说明，否则返回 None
+    """
+    phases = sorted((r for r in results if r["mode"] == mode), key=lambda r: r["factor"])
+    if len(phases) < 2:
+        return None
+    base, worst = phases[0], phases[-1]
+    if worst["goodput_rps"] < base["goodput_rps"] * (1 - tolerance):
+        return (
+            f"{worst['factor']}x 过载时 goodput {worst['goodput_rps']}/s < "
+            f"{base['factor']}x 时 {base['goodput_rps']}/s 的 {1 - tolerance:.0%}"
+        )
+    return None
+
+
+def main() -> None:
+    """主函数 - 执行过载压测"""
+    parser = argparse.ArgumentParser(description="过载压测 (goodput 与重试放大)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="模拟数据规模")
+    parser.add_argument("--base-url", help="压测已启动的服务 (默认进程内压测)")
+    parser.add_argument("--capacity", type=float, help="容量 (请求/秒)，默认闭环校准")
+    parser.add_argument("--calibrate", type=float, default=5.0, help="校准时长 (秒)")
+    parser.add_argument("--concurrency", type=int, default=32, help="校准时的并发客户端数")
+    parser.add_argument("--factors", type=float, nargs="+", default=[1.0, 3.0], help="到达率相对容量的倍数")
+    parser.add_argument("--duration", type=float, default=15.0, help="每个阶段的时长 (秒)")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="阶段之间的间隔 (秒)")
+    parser.add_argument("--modes", nargs="+", choices=["on", "off"], default=["on", "off"], help="本地服务的准入控制开关")
+    parser.add_argument("--server-env", nargs="*", default=[], metavar="KEY=VALUE", help="本地服务的额外环境变量")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="写入请求占比")
+    parser.add_argument("--timeout", type=float, default=3.0, help="客户端超时 (秒)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="最多尝试次数 (含首次)")
+    parser.add_argument("--retry-delay", type=float, default=1.0, help="重试基准等待 (秒)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的 goodput 下降比例 (默认 20%%)")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    if args.base_url is None:
+        from app.database import create_tables
+        create_tables()
+    print(f"🌱 准备 {args.scale} 规模数据 ({SCALES[args.scale][0]} 用户 × {SCALES[args.scale][1]} 记录)...")
+    dataset = seed_dataset(args.scale, args.seed)
+    user_max, record_max = watermarks()
+    try:
+        results = run(args, dataset)
+    finally:
+        cleanup(user_max, record_max)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"💾 结果已保存: {args.output}")
+
+    failure = check_goodput(results, "on" if args.base_url is None else "server", args.tolerance)
+    if failure:
+        print(f"\n❌ {failure}")
+        sys.exit(1)
+    print(f"\n✅ 过载时 goodput 保持稳定 (容差 {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
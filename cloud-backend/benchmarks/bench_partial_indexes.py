@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+is_active 部分索引基准
+在临时 schema 中生成大规模 users / health_records (默认各 1000 万行，部分行为停用 / 软删除)，
+依次在三组索引上执行相同的查询:
+    - before: 迁移 0006 / 0007 之前的全量索引 (users.is_active 单列索引、全量覆盖索引与筛选索引)
+    - after: 迁移之后的部分索引 (WHERE is_active)
+    - email_partial: 在 after 基础上再加 (email) WHERE is_active，评估登录查询是否值得额外的部分索引
+报告各索引体积，以及每类查询选用的索引、平均访问页数与 p50 耗时
+
+使用方法:
+    python benchmarks/bench_partial_indexes.py
+    python benchmarks/bench_partial_indexes.py --users 1000000 --records 1000000 --inactive 0.3
+
+注意: 需要 PostgreSQL 11+，1000 万行的生成与建索引需要数分钟，运行结束后会删除临时 schema
+"""
+
+import argparse
+import random
+import statistics
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.crud.crud_health_record import CRUDHealthRecord
+from benchmarks.bench_covering_index import find_scan
+from benchmarks.common import HEALTH_RECORD_COLUMNS
+
+SCHEMA = "bench_partial_indexes"
+
+USERS_DDL = f"""
+    CREATE TABLE {SCHEMA}.users (
+        id SERIAL PRIMARY KEY,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        username VARCHAR(50) NOT NULL UNIQUE,
+        hashed_password VARCHAR(255) NOT NULL,
+        full_name VARCHAR(100),
+        is_active BOOLEAN NOT NULL DEFAULT TRUE,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+# 在数据库端批量生成，setseed 保证可重复
+POPULATE_USERS_SQL = f"""
+    INSERT INTO {SCHEMA}.users (email, username, hashed_password, full_name, is_active, created_at)
+    SELECT 'user' || g || '@example.com', 'user' || g, repeat('x', 60), '用户 ' || g,
+           random() >= :inactive, now() - random() * interval '1500 days'
+    FROM generate_series(1, :rows) AS g
+"""
+
+POPULATE_RECORDS_SQL = f"""
+    INSERT INTO {SCHEMA}.health_records (user_id, assessed_at, overall_score, physical_score, mental_score,
+                                         lifestyle_score, assessment_type, health_level, data_source, is_active)
+    SELECT (random() * (:users - 1))::int + 1,
+           now() - random() * interval '730 days',
+           s.score, s.score - 3, s.score + 2, s.score - 1,
+           (ARRAY['comprehensive', 'quick', 'specific'])[1 + (random() * 2)::int],
+           CASE WHEN s.score >= 80 THEN 'excellent' WHEN s.score >= 60 THEN 'good' ELSE 'fair' END,
+           (ARRAY['manual', 'device', 'api'])[1 + (random() * 2)::int],
+           random() >= :inactive
+    FROM (SELECT 40 + random() * 58 AS score FROM generate_series(1, :rows)) AS s
+"""
+
+COVER = (
+    "(user_id, assessed_at) INCLUDE (overall_score, physical_score, mental_score, lifestyle_score, "
+    "health_level, assessment_type, data_source)"
+)
+
+# 每组索引: (索引名, 表, 定义)；主键与 email / username 唯一索引三组共有
+PHASES: Dict[str, List[Tuple[str, str, str]]] = {
+    "before": [
+        ("ix_users_is_active", "users", "(is_active)"),
+        ("ix_users_created_at", "users", "(created_at)"),
+        ("ix_health_records_user_date_cover", "health_records", COVER),
+        ("ix_health_records_full_search", "health_records", "(user_id, assessment_type, health_level)"),
+    ],
+    "after": [
+        ("ix_users_created_at", "users", "(created_at)"),
+        ("ix_users_created_at_active", "users", "(created_at) WHERE is_active"),
+        ("ix_health_records_user_date_active", "health_records", f"{COVER} WHERE is_active"),
+        ("ix_health_records_search_active", "health_records",
+         "(user_id, assessment_type, health_level) WHERE is_active"),
+    ],
+}
+PHASES["email_partial"] = PHASES["after"] + [("ix_users_email_active", "users", "(email) WHERE is_active")]
+
+# 查询: (名称, SQL, 参数生成函数)；与 CRUDUser / CRUDHealthRecord 的读路径一致
+Case = Tuple[str, str, Callable[[random.Random], Dict[str, Any]]]
+
+
+def build_cases(users: int) -> List[Case]:
+    """生成各类读取查询"""
+    trend_columns = ", ".join(CRUDHealthRecord.TREND_COLUMNS)
+    return [
+        (
+            "login (email)",
+            f"SELECT * FROM {SCHEMA}.users WHERE email = :email",
+            lambda rng: {"email": f"user{rng.randint(1, users)}@example.com"},
+        ),
+        (
+            "login (email + is_active)",
+            f"SELECT * FROM {SCHEMA}.users WHERE email = :email AND is_active",
+            lambda rng: {"email": f"user{rng.randint(1, users)}@example.com"},
+        ),
+        (
+            "active users page",
+            f"SELECT * FROM {SCHEMA}.users WHERE is_active ORDER BY created_at DESC OFFSET :skip LIMIT 100",
+            lambda rng: {"skip": rng.randint(0, 100) * 100},
+        ),
+        (
+            "active users count",
+            f"SELECT count(id) FROM {SCHEMA}.users WHERE is_active",
+            lambda rng: {},
+        ),
+        (
+            "record trend points",
+            f"SELECT {trend_columns} FROM {SCHEMA}.health_records "
+            f"WHERE user_id = :user_id AND is_active AND assessed_at >= now() - interval '365 days' "
+            f"AND assessed_at <= now() ORDER BY assessed_at LIMIT 1000",
+            lambda rng: {"user_id": rng.randint(1, users)},
+        ),
+        (
+            "record count by type",
+            f"SELECT count(id) FROM {SCHEMA}.health_records "
+            f"WHERE user_id = :user_id AND is_active AND assessment_type = 'quick'",
+            lambda rng: {"user_id": rng.randint(1, users)},
+        ),
+    ]
+
+
+def apply_phase(engine, phase: str) -> None:
+    """删除上一组的索引，创建本组索引并 VACUUM ANALYZE"""
+    with engine.begin() as conn:
+        existing = {
+            row[0] for row in conn.execute(
+                text("SELECT indexname FROM pg_indexes WHERE schemaname = :schema"), {"schema": SCHEMA}
+            )
+        }
+        wanted = {name for name, _, _ in PHASES[phase]}
+        for name, _, _ in (entry for entries in PHASES.values() for entry in entries):
+            if name in existing and name not in wanted:
+                conn.execute(text(f"DROP INDEX {SCHEMA}.{name}"))
+                existing.discard(name)
+        for name, table, definition in PHASES[phase]:
+            if name not in existing:
+                conn.execute(text(f"CREATE INDEX {name} ON {SCHEMA}.{table} {definition}"))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ("users", "health_records"):
+            conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+
+def index_sizes(engine) -> List[Tuple[str, int]]:
+    """临时 schema 中各索引的大小 (字节)"""
+    with engine.connect() as conn:
+        return [
+            (name, size) for name, size in conn.execute(
+                text("""
+                    SELECT indexname, pg_relation_size(format('%I.%I', schemaname, indexname)::regclass)
+                    FROM pg_indexes WHERE schemaname = :schema ORDER BY tablename, indexname
+                """),
+                {"schema": SCHEMA},
+            )
+        ]
+
+
+def run_case(engine, case: Case, queries: int, seed: int) -> Tuple[str, float, float]:
+    """执行 EXPLAIN ANALYZE，返回 (选用的索引, 平均访问页数, p50 耗时毫秒)"""
+    _, sql, params = case
+    rng = random.Random(seed)
+    buffers, timings, indexes = [], [], set()
+    with engine.connect() as conn:
+        for _ in range(queries):
+            document = conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params(rng)
+            ).scalar()[0]
+            plan = document["Plan"]
+            scan = find_scan(plan)
+            indexes.add(scan.get("Index Name") or scan.get("Node Type", "?"))
+            buffers.append(plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0))
+            timings.append(document.get("Execution Time", 0.0))
+    return ", ".join(sorted(indexes)), statistics.fmean(buffers), statistics.median(timings)
+
+
+def main() -> None:
+    """主函数"""
+    parser = argparse.ArgumentParser(description="is_active 部分索引基准")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="PostgreSQL 连接 URL")
+    parser.add_argument("--users", type=int, default=10_000_000, help="用户数")
+    parser.add_argument("--records", type=int, default=10_000_000, help="健康记录数")
+    parser.add_argument("--inactive", type=float, default=0.2, help="停用用户 / 软删除记录的比例")
+    parser.add_argument("--queries", type=int, default=200, help="每类查询的执行次数")
+    parser.add_argument("--seed", type=float, default=0.42, help="随机种子 (-1 ~ 1)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        print("❌ 部分索引基准仅支持 PostgreSQL")
+        sys.exit(1)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text("SELECT setseed(:seed)"), {"seed": args.seed})
+        conn.execute(text(USERS_DDL))
+        conn.execute(text(POPULATE_USERS_SQL), {"rows": args.users, "inactive": args.inactive})
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.health_records ({HEALTH_RECORD_COLUMNS}, PRIMARY KEY (id))"))
+        conn.execute(
+            text(POPULATE_RECORDS_SQL),
+            {"rows": args.records, "users": args.users, "inactive": args.inactive},
+        )
+
+    try:
+        cases = build_cases(args.users)
+        print(f"📊 {args.users} 用户, {args.records} 条记录, 停用 / 软删除比例 {args.inactive:.0%}, 每类查询 {args.queries} 次")
+        for phase in PHASES:
+            apply_phase(engine, phase)
+            print(f"\n== {phase} ==")
+            for name, size in index_sizes(engine):
+                print(f"  {name:<40}{size / 1024 / 1024:>10.1f} MB")
+            print(f"  {'查询':<28}{'选用索引':<40}{'平均页数':>10}{'p50(ms)':>10}")
+            for case in cases:
+                index, buffers, p50 = run_case(engine, case, args.queries, int(args.seed * 1000))
+                print(f"  {case[0]:<28}{index:<40}{buffers:>10.1f}{p50:>10.3f}")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
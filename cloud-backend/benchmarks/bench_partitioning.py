@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+health_records 分区前后性能基准
+在独立 schema 中分别创建普通表和按月分区表，对比批量写入吞吐与时间范围查询延迟
+
+使用方法:
+    python benchmarks/bench_partitioning.py --rows 200000 --users 500 --months 24
+
+注意: 需要 PostgreSQL，运行结束后会删除临时 schema
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db.partitioning import add_months, iter_months, month_floor, partition_bounds
+from benchmarks.common import HEALTH_RECORD_COLUMNS, INSERT_SQL, generate_rows
+
+SCHEMA = "bench_partitioning"
+
+# 与 HealthRecord 模型声明一致的复合索引
+INDEXES = [
+    "(user_id, assessed_at) INCLUDE (overall_score, physical_score, mental_score, lifestyle_score, "
+    "health_level, assessment_type, data_source)",
+    "(overall_score, health_level)",
+    "(assessment_type)",
+    "(user_id, assessment_type, health_level)",
+]
+
+RANGE_SQL = """
+    SELECT assessed_at, overall_score, health_level FROM {table}
+    WHERE user_id = :user_id AND assessed_at >= :start AND assessed_at <= :end
+    ORDER BY assessed_at LIMIT 1000
+"""
+
+
+def setup_tables(conn, months: List[date]) -> None:
+    """创建普通表与分区表"""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.plain ({HEALTH_RECORD_COLUMNS}, PRIMARY KEY (id))"))
+    conn.execute(text(
+        f"CREATE TABLE {SCHEMA}.partitioned ({HEALTH_RECORD_COLUMNS}, PRIMARY KEY (id, assessed_at)) "
+        f"PARTITION BY RANGE (assessed_at)"
+    ))
+    for month in months:
+        lower, upper = partition_bounds(month)
+        conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.partitioned_p{month:%Y%m} PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        ))
+    for table in ("plain", "partitioned"):
+        for i, columns in enumerate(INDEXES):
+            conn.execute(text(f"CREATE INDEX {table}_ix{i} ON {SCHEMA}.{table} {columns}"))
+
+
+def bench_insert(engine, table: str, rows: List[Dict], batch_size: int) -> float:
+    """批量写入并返回吞吐 (行/秒)"""
+    sql = text(INSERT_SQL.format(table=f"{SCHEMA}.{table}"))
+    started = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        with engine.begin() as conn:
+            conn.execute(sql, rows[offset:offset + batch_size])
+    return len(rows) / (time.perf_counter() - started)
+
+
+def bench_range(engine, table: str, users: int, end: datetime, days: int, queries: int, seed: int) -> Dict[str, float]:
+    """执行时间范围查询并返回延迟统计 (毫秒)"""
+    rng = random.Random(seed)
+    sql = text(RANGE_SQL.format(table=f"{SCHEMA}.{table}"))
+    latencies = []
+    with engine.connect() as conn:
+        for _ in range(queries):
+            params = {"user_id": rng.randint(1, users), "start": end - timedelta(days=days), "end": end}
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+def main() -> None:
+    """主函数"""
+    parser = argparse.ArgumentParser(description="health_records 分区性能基准")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="PostgreSQL 连接 URL")
+    parser.add_argument("--rows", type=int, default=200_000, help="写入记录数")
+    parser.add_argument("--users", type=int, default=500, help="模拟用户数")
+    parser.add_argument("--months", type=int, default=24, help="数据覆盖月数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批写入行数")
+    parser.add_argument("--queries", type=int, default=500, help="每组范围查询次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--keep", action="store_true", help="保留临时 schema 便于分析")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        print("❌ 分区基准仅支持 PostgreSQL")
+        sys.exit(1)
+
+    first_month = add_months(month_floor(datetime.now(timezone.utc).date()), -args.months + 1)
+    months = iter_months(first_month, add_months(first_month, args.months - 1))
+    start = datetime(first_month.year, first_month.month, 1, tzinfo=timezone.utc)
+    end = datetime.now(timezone.utc)
+    rows = generate_rows(args.rows, args.users, start, (end - start).days, args.seed)
+
+    with engine.begin() as conn:
+        setup_tables(conn, months)
+
+    try:
+        print(f"📊 {args.rows} 行, {args.users} 用户, {args.months} 个月, 批大小 {args.batch_size}")
+        print(f"{'指标':<24}{'普通表':>14}{'分区表':>14}")
+        inserts = {table: bench_insert(engine, table, rows, args.batch_size) for table in ("plain", "partitioned")}
+        print(f"{'写入吞吐 (行/秒)':<24}{inserts['plain']:>14.0f}{inserts['partitioned']:>14.0f}")
+
+        with engine.begin() as conn:
+            conn.execute(text(f"ANALYZE {SCHEMA}.plain"))
+            conn.execute(text(f"ANALYZE {SCHEMA}.partitioned"))
+
+        for days in (30, 365):
+            stats = {
+                table: bench_range(engine, table, args.users, end, days, args.queries, args.seed)
+                for table in ("plain", "partitioned")
+            }
+            for key in ("p50", "p95", "mean"):
+                label = f"{days}天范围查询 {key} (ms)"
+                print(f"{label:<24}{stats['plain'][key]:>14.3f}{stats['partitioned'][key]:>14.3f}")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
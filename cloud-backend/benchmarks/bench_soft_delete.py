@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+软删除与后台压缩基准
+在临时 schema 中创建两张对照表:
+    - hard: 迁移 0006 之前的索引，逐条 DELETE (原 CRUDHealthRecord.delete 的行为)
+    - soft: 迁移 0006 之后的索引 (WHERE is_active 部分覆盖索引 + 软删除记录索引)，
+      逐条 UPDATE is_active = false，之后按压缩任务的方式分批物理删除
+比较单条删除延迟、删除后的趋势查询延迟、各索引体积与死元组数 (删除前 / 删除后 / 压缩 + VACUUM 后)
+
+使用方法:
+    python benchmarks/bench_soft_delete.py --rows 500000 --delete-fraction 0.1
+
+注意: 需要 PostgreSQL，运行结束后会删除临时 schema
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from benchmarks.common import HEALTH_RECORD_COLUMNS, INSERT_SQL, generate_rows
+
+SCHEMA = "bench_soft_delete"
+
+COVER = (
+    "(user_id, assessed_at) INCLUDE (overall_score, physical_score, mental_score, lifestyle_score, "
+    "health_level, assessment_type, data_source)"
+)
+COMMON_INDEXES = [
+    "(overall_score, health_level)",
+    "(assessment_type)",
+    "(user_id, assessment_type, health_level)",
+]
+
+# 迁移 0006 之前 / 之后的索引 (主键另计)
+INDEXES = {
+    "hard": [COVER] + COMMON_INDEXES,
+    "soft": [f"{COVER} WHERE is_active", "(id) WHERE NOT is_active"] + COMMON_INDEXES,
+}
+
+DELETE_SQL = {
+    "hard": "DELETE FROM {table} WHERE id = :id",
+    "soft": "UPDATE {table} SET is_active = false, updated_at = now() WHERE id = :id AND is_active",
+}
+
+TREND_SQL = {
+    "hard": """
+        SELECT assessed_at, overall_score, health_level FROM {table}
+        WHERE user_id = :user_id AND assessed_at >= :start ORDER BY assessed_at LIMIT 100
+    """,
+    "soft": """
+        SELECT assessed_at, overall_score, health_level FROM {table}
+        WHERE user_id = :user_id AND is_active AND assessed_at >= :start ORDER BY assessed_at LIMIT 100
+    """,
+}
+
+# 与 RecordCompactor.purge_batch 相同的分批物理删除
+COMPACT_SQL = """
+    DELETE FROM {table} WHERE id IN (
+        SELECT id FROM {table} WHERE NOT is_active ORDER BY id LIMIT :limit FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+def setup_table(conn, table: str) -> None:
+    """创建对照表及其索引"""
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.{table} ({HEALTH_RECORD_COLUMNS}, PRIMARY KEY (id))"))
+    for i, definition in enumerate(INDEXES[table]):
+        conn.execute(text(f"CREATE INDEX {table}_ix{i} ON {SCHEMA}.{table} {definition}"))
+
+
+def load(engine, table: str, rows: List[Dict], batch_size: int) -> None:
+    """写入模拟数据并更新统计信息"""
+    sql = text(INSERT_SQL.format(table=f"{SCHEMA}.{table}"))
+    for offset in range(0, len(rows), batch_size):
+        with engine.begin() as conn:
+            conn.execute(sql, rows[offset:offset + batch_size])
+    vacuum(engine, table)
+
+
+def vacuum(engine, table: str) -> None:
+    """VACUUM ANALYZE (不能在事务块中执行)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+
+def bench_deletes(engine, table: str, ids: List[int]) -> List[float]:
+    """逐条删除 (每条一个事务，与 API 请求一致)，返回每条的耗时 (毫秒)"""
+    sql = text(DELETE_SQL[table].format(table=f"{SCHEMA}.{table}"))
+    timings = []
+    for record_id in ids:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(sql, {"id": record_id})
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def bench_trends(engine, table: str, users: int, start: datetime, queries: int, seed: int) -> float:
+    """随机用户的趋势查询平均耗时 (毫秒)"""
+    sql = text(TREND_SQL[table].format(table=f"{SCHEMA}.{table}"))
+    rng = random.Random(seed)
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(sql, {"user_id": rng.randint(1, users), "start": start}).all()
+        return (time.perf_counter() - started) * 1000 / queries
+
+
+def compact(engine, table: str, batch_size: int) -> int:
+    """分批物理删除软删除的记录，返回删除行数"""
+    sql = text(COMPACT_SQL.format(table=f"{SCHEMA}.{table}"))
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            deleted = conn.execute(sql, {"limit": batch_size}).rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def index_sizes(engine, table: str) -> Dict[str, int]:
+    """表上每个索引的大小 (字节)"""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("""
+                SELECT c.relname, pg_relation_size(i.indexrelid)
+                FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indrelid = CAST(:table AS regclass)
+                ORDER BY c.relname
+            """),
+            {"table": f"{SCHEMA}.{table}"},
+        ).all()
+    return {name: size for name, size in rows}
+
+
+def dead_tuples(engine, table: str) -> int:
+    """表的死元组数 (来自累计统计，可能有短暂延迟)"""
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT n_dead_tup FROM pg_stat_user_tables WHERE schemaname = :schema AND relname = :table"),
+            {"schema": SCHEMA, "table": table},
+        ).scalar() or 0
+
+
+def print_sizes(label: str, sizes: Dict[str, Dict[str, int]], dead: Dict[str, int]) -> None:
+    """打印两张表的索引体积"""
+    print(f"\n{label}")
+    for table in ("hard", "soft"):
+        total = sum(sizes[table].values())
+        detail = ", ".join(f"{name} {size / 1024 / 1024:.1f}" for name, size in sizes[table].items())
+        print(f"  {table:<6}索引合计 {total / 1024 / 1024:>8.1f} MB  死元组 {dead[table]:>9}  ({detail})")
+
+
+def main() -> None:
+    """主函数"""
+    parser = argparse.ArgumentParser(description="软删除与后台压缩基准")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="PostgreSQL 连接 URL")
+    parser.add_argument("--rows", type=int, default=500_000, help="写入记录数")
+    parser.add_argument("--users", type=int, default=1000, help="模拟用户数")
+    parser.add_argument("--delete-fraction", type=float, default=0.1, help="删除的记录比例")
+    parser.add_argument("--max-deletes", type=int, default=20_000, help="逐条删除的最大条数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="写入与压缩的每批行数")
+    parser.add_argument("--queries", type=int, default=500, help="趋势查询次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        print("❌ 软删除基准仅支持 PostgreSQL")
+        sys.exit(1)
+
+    end = datetime.now(timezone.utc)
+    rows = generate_rows(args.rows, args.users, end - timedelta(days=365), 365, args.seed)
+    deletes = min(int(args.rows * args.delete_fraction), args.max_deletes)
+    ids = random.Random(args.seed).sample(range(1, args.rows + 1), deletes)
+    trend_start = end - timedelta(days=90)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        for table in INDEXES:
+            setup_table(conn, table)
+
+    try:
+        for table in INDEXES:
+            load(engine, table, rows, args.batch_size)
+        print(f"📊 {args.rows} 行, {args.users} 个用户, 逐条删除 {deletes} 行")
+        print_sizes(
+            "删除前",
+            {table: index_sizes(engine, table) for table in INDEXES},
+            {table: dead_tuples(engine, table) for table in INDEXES},
+        )
+
+        print(f"\n{'模式':<8}{'删除 p50(ms)':>14}{'删除 p95(ms)':>14}{'趋势查询(ms)':>14}")
+        for table in INDEXES:
+            timings = sorted(bench_deletes(engine, table, ids))
+            p50 = statistics.median(timings)
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            trend = bench_trends(engine, table, args.users, trend_start, args.queries, args.seed)
+            print(f"{table:<8}{p50:>14.3f}{p95:>14.3f}{trend:>14.3f}")
+
+        time.sleep(1)  # 等待累计统计刷新
+        print_sizes(
+            "删除后 (VACUUM 前)",
+            {table: index_sizes(engine, table) for table in INDEXES},
+            {table: dead_tuples(engine, table) for table in INDEXES},
+        )
+
+        started = time.perf_counter()
+        purged = compact(engine, "soft", args.batch_size)
+        print(f"\n🧹 压缩: 分批物理删除 {purged} 行，耗时 {time.perf_counter() - started:.2f}s")
+        for table in INDEXES:
+            vacuum(engine, table)
+        print_sizes(
+            "压缩 + VACUUM 后",
+            {table: index_sizes(engine, table) for table in INDEXES},
+            {table: dead_tuples(engine, table) for table in INDEXES},
+        )
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
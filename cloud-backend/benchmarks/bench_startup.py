@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+工作进程冷启动基准
+每次启动一个全新的 Python 进程，测量导入 app.main 与执行 lifespan 启动钩子的耗时，
+并统计启动期间发出的 SQL 语句数，对比不同 SCHEMA_STARTUP_MODE
+
+使用方法:
+    python benchmarks/bench_startup.py                              # 对比 check / create_all / skip
+    python benchmarks/bench_startup.py --modes check strict --runs 20
+    python benchmarks/bench_startup.py --output results/startup.json
+
+注意: 使用配置中的 DATABASE_URL；check / strict 模式需要先执行 python migrate.py upgrade
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+# 在子进程中执行: 导入应用、运行 lifespan 启动阶段，输出一行 JSON
+CHILD_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+from app.main import app
+imported = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print("BENCH " + json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "statements": len(statements),
+}))
+"""
+
+
+def run_once(mode: str) -> Dict[str, Any]:
+    """启动一个子进程并返回各阶段耗时 (毫秒)"""
+    env = {**os.environ, "SCHEMA_STARTUP_MODE": mode}
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=project_root, env=env, capture_output=True, text=True, check=False,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in completed.stdout.splitlines():
+        if line.startswith("BENCH "):
+            return {**json.loads(line[len("BENCH "):]), "wall_ms": wall_ms}
+    raise RuntimeError(f"{mode} 模式启动失败:\n{completed.stderr[-2000:]}")
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """按字段计算中位数与最大值"""
+    summary: Dict[str, Any] = {"runs": len(samples)}
+    for key in ("wall_ms", "import_ms", "startup_ms"):
+        values = [sample[key] for sample in samples]
+        summary[f"{key}_median"] = round(statistics.median(values), 1)
+        summary[f"{key}_max"] = round(max(values), 1)
+    summary["statements"] = samples[-1]["statements"]
+    return summary
+
+
+def main() -> None:
+    """主函数 - 对比各启动模式的冷启动耗时"""
+    parser = argparse.ArgumentParser(description="工作进程冷启动基准")
+    parser.add_argument(
+        "--modes", nargs="+", default=["check", "create_all", "skip"],
+        choices=["check", "strict", "create_all", "skip"], help="要对比的 SCHEMA_STARTUP_MODE"
+    )
+    parser.add_argument("--runs", type=int, default=10, help="每种模式的启动次数 (默认: 10)")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"  {'模式':<12}{'总耗时':>10}{'导入':>10}{'启动钩子':>10}{'最大总耗时':>12}{'SQL 语句':>10}")
+    for mode in args.modes:
+        run_once(mode)  # 预热文件系统缓存与 .pyc
+        summary = summarize([run_once(mode) for _ in range(args.runs)])
+        results[mode] = summary
+        print(
+            f"  {mode:<12}{summary['wall_ms_median']:>8.0f}ms{summary['import_ms_median']:>8.0f}ms"
+            f"{summary['startup_ms_median']:>8.0f}ms{summary['wall_ms_max']:>10.0f}ms{summary['statements']:>10}"
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"💾 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""基准测试公共工具：模拟数据生成与临时表结构"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+# 与 health_records 一致的列定义 (用于临时 schema 中的对照表)
+HEALTH_RECORD_COLUMNS = """
+    id BIGSERIAL,
+    user_id INTEGER NOT NULL,
+    assessed_at TIMESTAMPTZ NOT NULL,
+    overall_score REAL NOT NULL,
+    physical_score REAL,
+    mental_score REAL,
+    lifestyle_score REAL,
+    assessment_type VARCHAR(50) NOT NULL,
+    health_level VARCHAR(20),
+    detailed_metrics JSON,
+    notes TEXT,
+    data_source VARCHAR(50) NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+"""
+
+INSERT_SQL = """
+    INSERT INTO {table} (user_id, assessed_at, overall_score, physical_score, mental_score,
+                         lifestyle_score, assessment_type, health_level, data_source)
+    VALUES (:user_id, :assessed_at, :overall_score, :physical_score, :mental_score,
+            :lifestyle_score, :assessment_type, :health_level, :data_source)
+"""
+
+
+def generate_rows(count: int, users: int, start: datetime, span_days: int, seed: int) -> List[Dict]:
+    """生成确定性的模拟健康记录"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        score = rng.uniform(40, 98)
+        rows.append({
+            "user_id": rng.randint(1, users),
+            "assessed_at": start + timedelta(seconds=rng.randint(0, span_days * 86400 - 1)),
+            "overall_score": score,
+            "physical_score": score + rng.uniform(-5, 5),
+            "mental_score": score + rng.uniform(-5, 5),
+            "lifestyle_score": score + rng.uniform(-5, 5),
+            "assessment_type": rng.choice(["comprehensive", "quick", "specific"]),
+            "health_level": "excellent" if score >= 80 else "good" if score >= 60 else "fair",
+            "data_source": rng.choice(["manual", "device", "api"]),
+        })
+    return rows
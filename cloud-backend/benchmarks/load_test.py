@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+API 负载测试与基准对比
+按指定规模生成模拟用户和健康记录，以并发客户端逐个压测 users.py 与 health_trends.py 的全部路由，
+报告吞吐量与 p50/p95/p99 延迟，并与保存的基线对比，出现回退时以非零状态码退出
+
+使用方法:
+    python benchmarks/load_test.py --scale small                       # 进程内压测 (httpx ASGITransport)
+    python benchmarks/load_test.py --scale medium --base-url http://localhost:8000
+    python benchmarks/load_test.py --scale small --save-baseline       # 更新基线
+    python benchmarks/load_test.py --scale small --routes health-trends --concurrency 32
+
+说明:
+    数据直接写入 DATABASE_URL 指向的数据库，请只对基准测试库使用；
+    使用 --base-url 时服务端必须连接同一数据库并使用相同的 SECRET_KEY (访问令牌由本脚本签发)，
+    并设置 RATE_LIMIT_ENABLED=false (进程内压测时自动关闭限流)。
+    运行结束后删除本次压测新增的用户和记录，已生成的模拟数据保留供下次复用。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+from sqlalchemy import delete, func, insert, select
+
+from app.core.config import settings
+from app.core.security import create_access_token, get_password_hash
+from app.database import create_tables, engine
+from app.models.health_record import HealthRecord
+from app.models.user import User
+from benchmarks.common import generate_rows
+
+# 配置日志
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 规模: (用户数, 每个用户的记录数)
+SCALES = {
+    "small": (20, 100),
+    "medium": (200, 500),
+    "large": (1000, 2000),
+}
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "load_test.json"
+API = settings.API_V1_STR
+
+
+@dataclass
+class SeedUser:
+    """压测用户"""
+    id: int
+    email: str
+    username: str
+    token: str
+    record_ids: List[int]
+
+
+@dataclass
+class Dataset:
+    """压测数据集"""
+    users: List[SeedUser]
+    # 供 DELETE 路由使用的待删除记录 (user_id, record_id)
+    victims: List[Tuple[int, int]] = field(default_factory=list)
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+
+def seed_dataset(scale: str, seed: int) -> Dataset:
+    """
+    生成 (或复用) 指定规模的模拟数据
+
+    用户名前缀为 loadtest_<scale>_，已存在则直接复用，保证多次运行的数据一致。
+    记录生成与 HealthRecord.create_sample_record 的取值范围一致。
+    """
+    user_count, per_user = SCALES[scale]
+    prefix = f"loadtest_{scale}_"
+    with engine.begin() as conn:
+        existing = conn.execute(
+            select(User.id, User.email, User.username)
+            .where(User.username.like(f"{prefix}%"))
+            .order_by(User.id)
+        ).all()
+        if len(existing) < user_count:
+            hashed = get_password_hash("loadtest-password")
+            conn.execute(insert(User), [
+                {
+                    "email": f"{prefix}{i}@example.com",
+                    "username": f"{prefix}{i}",
+                    "hashed_password": hashed,
+                    "full_name": f"Load Test {i}",
+                    "is_active": True,
+                }
+                for i in range(len(existing), user_count)
+            ])
+            existing = conn.execute(
+                select(User.id, User.email, User.username)
+                .where(User.username.like(f"{prefix}%"))
+                .order_by(User.id)
+            ).all()
+            rows = generate_rows(
+                count=user_count * per_user,
+                users=user_count,
+                start=datetime.now() - timedelta(days=365),
+                span_days=365,
+                seed=seed,
+            )
+            user_ids = [row.id for row in existing]
+            for row in rows:
+                row["user_id"] = user_ids[row["user_id"] - 1]
+                row["overall_score"] = min(row["overall_score"], 100.0)
+                for key in ("physical_score", "mental_score", "lifestyle_score"):
+                    row[key] = max(0.0, min(100.0, row[key]))
+            conn.execute(delete(HealthRecord).where(HealthRecord.user_id.in_(user_ids)))
+            for start in range(0, len(rows), 5000):
+                conn.execute(insert(HealthRecord), rows[start:start + 5000])
+
+        users = []
+        for row in existing[:user_count]:
+            record_ids = conn.execute(
+                select(HealthRecord.id).where(HealthRecord.user_id == row.id).order_by(HealthRecord.id).limit(50)
+            ).scalars().all()
+            users.append(SeedUser(
+                id=row.id,
+                email=row.email,
+                username=row.username,
+                token=create_access_token(row.id),
+                record_ids=list(record_ids),
+            ))
+    return Dataset(users=users)
+
+
+def add_victims(dataset: Dataset, count: int) -> None:
+    """为 DELETE 路由预先插入待删除的记录"""
+    with engine.begin() as conn:
+        for i in range(count):
+            user = dataset.users[i % len(dataset.users)]
+            record_id = conn.execute(
+                insert(HealthRecord).returning(HealthRecord.id),
+                {
+                    "user_id": user.id,
+                    "assessed_at": datetime.now(),
+                    "overall_score": 70.0,
+                    "assessment_type": "quick",
+                    "health_level": "good",
+                    "data_source": "manual",
+                },
+            ).scalar_one()
+            dataset.victims.append((user.id, record_id))
+
+
+def watermarks() -> Tuple[int, int]:
+    """当前用户表和记录表的最大ID，用于压测结束后清理新增数据"""
+    with engine.connect() as conn:
+        user_max = conn.execute(select(func.coalesce(func.max(User.id), 0))).scalar_one()
+        record_max = conn.execute(select(func.coalesce(func.max(HealthRecord.id), 0))).scalar_one()
+    return user_max, record_max
+
+
+def cleanup(user_max: int, record_max: int) -> None:
+    """删除压测期间新增的用户和记录"""
+    with engine.begin() as conn:
+        conn.execute(delete(HealthRecord).where(HealthRecord.id > record_max))
+        conn.execute(delete(User).where(User.id > user_max))
+
+
+# ---------------------------------------------------------------- 路由场景
+
+RequestSpec = Tuple[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[SeedUser]]
+
+
+def _record_body(rng: random.Random) -> Dict[str, Any]:
+    score = round(rng.uniform(60.0, 95.0), 1)
+    return {
+        "assessed_at": (datetime.now() - timedelta(days=rng.randint(0, 90))).isoformat(),
+        "overall_score": score,
+        "physical_score": round(max(0, min(100, score + rng.uniform(-10, 10))), 1),
+        "mental_score": round(max(0, min(100, score + rng.uniform(-10, 10))), 1),
+        "lifestyle_score": round(max(0, min(100, score + rng.uniform(-10, 10))), 1),
+        "assessment_type": rng.choice(["comprehensive", "quick", "specific"]),
+        "data_source": rng.choice(["manual", "device", "api"]),
+    }
+
+
+def _new_user_body(dataset: Dataset, rng: random.Random) -> Dict[str, Any]:
+    # 预热与正式压测使用不同的随机种子，邮箱和用户名不会重复
+    suffix = f"{dataset.run_id}_{rng.getrandbits(40):x}"
+    return {
+        "email": f"lt_{suffix}@example.com",
+        "username": f"lt_{suffix}",
+        "password": "loadtest-password",
+        "full_name": "Load Test",
+    }
+
+
+def _user(dataset: Dataset, i: int) -> SeedUser:
+    return dataset.users[i % len(dataset.users)]
+
+
+def _record(user: SeedUser, i: int) -> int:
+    return user.record_ids[i % len(user.record_ids)] if user.record_ids else 0
+
+
+@dataclass
+class Scenario:
+    """一个路由的压测场景"""
+    method: str
+    route: str
+    group: str
+    build: Callable[[Dataset, int, random.Random], RequestSpec]
+    # 每个请求消耗一条预插入记录 (DELETE)
+    consumes_victims: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+SCENARIOS: List[Scenario] = [
+    # users.py
+    Scenario("POST", "/users/", "users", lambda d, i, r: (
+        "POST", f"{API}/users/", None, _new_user_body(d, r), None)),
+    Scenario("GET", "/users/", "users", lambda d, i, r: (
+        "GET", f"{API}/users/", {"page": 1 + i % 5, "size": 20}, None, None)),
+    Scenario("GET", "/users/{user_id}", "users", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}", None, None, None)),
+    Scenario("GET", "/users/email/{email}", "users", lambda d, i, r: (
+        "GET", f"{API}/users/email/{_user(d, i).email}", None, None, None)),
+    Scenario("GET", "/users/username/{username}", "users", lambda d, i, r: (
+        "GET", f"{API}/users/username/{_user(d, i).username}", None, None, None)),
+    # health_trends.py
+    Scenario("GET", "/users/{user_id}/health-trends", "health-trends", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}/health-trends",
+        {"time_range": r.choice(["30d", "90d", "365d"])}, None, _user(d, i))),
+    Scenario("GET", "/users/{user_id}/health-records", "health-trends", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}/health-records",
+        {"skip": 20 * (i % 3), "limit": 20}, None, _user(d, i))),
+    Scenario("GET", "/users/{user_id}/health-records/{record_id}", "health-trends", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}/health-records/{_record(_user(d, i), i)}", None, None, _user(d, i))),
+    Scenario("POST", "/users/{user_id}/health-records", "health-trends", lambda d, i, r: (
+        "POST", f"{API}/users/{_user(d, i).id}/health-records", None, _record_body(r), _user(d, i))),
+    Scenario("PUT", "/users/{user_id}/health-records/{record_id}", "health-trends", lambda d, i, r: (
+        "PUT", f"{API}/users/{_user(d, i).id}/health-records/{_record(_user(d, i), i)}", None,
+        {"overall_score": round(r.uniform(60.0, 95.0), 1)}, _user(d, i))),
+    Scenario("DELETE", "/users/{user_id}/health-records/{record_id}", "health-trends", lambda d, i, r: (
+        "DELETE", f"{API}/users/{d.victims[i][0]}/health-records/{d.victims[i][1]}", None, None,
+        next(u for u in d.users if u.id == d.victims[i][0])), consumes_victims=True),
+    Scenario("GET", "/users/{user_id}/health-summary", "health-trends", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}/health-summary",
+        {"time_range": r.choice(["30d", "90d", "365d"])}, None, _user(d, i))),
+    Scenario("POST", "/users/{user_id}/health-records/batch", "health-trends", lambda d, i, r: (
+        "POST", f"{API}/users/{_user(d, i).id}/health-records/batch", None,
+        {"records": [_record_body(r) for _ in range(10)]}, _user(d, i))),
+    Scenario("PATCH", "/users/{user_id}/health-records/batch", "health-trends", lambda d, i, r: (
+        "PATCH", f"{API}/users/{_user(d, i).id}/health-records/batch", None,
+        {"ids": _user(d, i).record_ids[:10], "patch": {"overall_score": round(r.uniform(60.0, 95.0), 1)}},
+        _user(d, i))),
+    # 按筛选条件删除: 时间范围早于全部模拟数据，只测量集合删除语句本身，不消耗数据
+    Scenario("POST", "/users/{user_id}/health-records/batch-delete", "health-trends", lambda d, i, r: (
+        "POST", f"{API}/users/{_user(d, i).id}/health-records/batch-delete", None,
+        {"start_date": "2000-01-01T00:00:00", "end_date": "2000-01-02T00:00:00", "data_source": "device"},
+        _user(d, i))),
+    Scenario("GET", "/users/{user_id}/health-records/latest", "health-trends", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}/health-records/latest", None, None, _user(d, i))),
+    Scenario("GET", "/users/{user_id}/health-alerts", "health-trends", lambda d, i, r: (
+        "GET", f"{API}/users/{_user(d, i).id}/health-alerts", {"limit": 20}, None, _user(d, i))),
+]
+
+
+# ---------------------------------------------------------------- 执行与统计
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class RouteResult:
+    """单个路由的压测结果"""
+    name: str
+    latencies_ms: List[float]
+    status_counts: Dict[int, int]
+    duration_s: float
+
+    def summary(self) -> Dict[str, Any]:
+        total = len(self.latencies_ms)
+        errors = sum(count for code, count in self.status_counts.items() if code >= 400 or code == 0)
+        return {
+            "requests": total,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "throughput_rps": round(total / self.duration_s, 2) if self.duration_s else 0.0,
+            "p50_ms": round(percentile(self.latencies_ms, 50), 2),
+            "p95_ms": round(percentile(self.latencies_ms, 95), 2),
+            "p99_ms": round(percentile(self.latencies_ms, 99), 2),
+            "status_counts": {str(code): count for code, count in sorted(self.status_counts.items())},
+        }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    seed: int
+) -> RouteResult:
+    """以 concurrency 个并发客户端对一个路由发出 requests 个请求"""
+    rng = random.Random(f"{seed}:{scenario.name}")
+    specs = [scenario.build(dataset, i, rng) for i in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    cursor = iter(range(requests))
+
+    async def worker() -> None:
+        for i in cursor:
+            method, url, params, body, user = specs[i]
+            headers = {"Authorization": f"Bearer {user.token}"} if user else None
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, params=params, json=body, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                logger.warning(f"{scenario.name} 请求失败: {e}")
+                status = 0
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    return RouteResult(scenario.name, latencies, statuses, time.perf_counter() - started)
+
+
+def make_client(base_url: Optional[str]) -> httpx.AsyncClient:
+    """创建进程内 (ASGI) 或远程 HTTP 客户端"""
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=60.0)
+    from app.main import app, rate_limiter
+    # 压测用户数远少于真实用户，按用户限流会把压测变成限流测试
+    rate_limiter.enabled = False
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60.0)
+
+
+async def run_load_test(
+    scenarios: List[Scenario],
+    dataset: Dataset,
+    base_url: Optional[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int
+) -> Dict[str, Dict[str, Any]]:
+    """依次压测每个路由"""
+    results: Dict[str, Dict[str, Any]] = {}
+    async with make_client(base_url) as client:
+        for scenario in scenarios:
+            if warmup and not scenario.consumes_victims:
+                await run_scenario(client, scenario, dataset, warmup, concurrency, seed + 1)
+            result = await run_scenario(client, scenario, dataset, requests, concurrency, seed)
+            results[scenario.name] = result.summary()
+            print_row(scenario.name, results[scenario.name])
+    return results
+
+
+# ---------------------------------------------------------------- 基线对比
+
+def compare_with_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    min_delta_ms: float = 1.0
+) -> List[str]:
+    """
+    与基线对比，返回回退说明列表
+
+    p95 延迟超过基线 (1 + tolerance) 倍且差值大于 min_delta_ms、吞吐量低于基线 (1 - tolerance) 倍、
+    或错误率比基线高出 1 个百分点以上时视为回退。
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit and current["p95_ms"] - base["p95_ms"] > min_delta_ms:
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > 基线 {base['p95_ms']}ms (+{tolerance:.0%})")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: 吞吐量 {current['throughput_rps']}/s < 基线 {base['throughput_rps']}/s (-{tolerance:.0%})"
+            )
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: 错误率 {current['error_rate']:.2%} > 基线 {base['error_rate']:.2%}")
+    return regressions
+
+
+def load_baseline(path: Path, scale: str) -> Dict[str, Dict[str, Any]]:
+    """读取指定规模的基线"""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8")).get(scale, {})
+
+
+def save_baseline(path: Path, scale: str, results: Dict[str, Dict[str, Any]]) -> None:
+    """保存指定规模的基线 (保留其他规模)"""
+    data = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    data[scale] = results
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def print_row(name: str, summary: Dict[str, Any]) -> None:
+    """打印单个路由的结果"""
+    print(
+        f"  {name:<52}{summary['throughput_rps']:>10.1f}{summary['p50_ms']:>10.2f}"
+        f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}{summary['error_rate']:>9.1%}"
+    )
+
+
+def main() -> None:
+    """主函数 - 执行负载测试"""
+    parser = argparse.ArgumentParser(description="API 负载测试与基准对比")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="模拟数据规模")
+    parser.add_argument("--base-url", help="压测已启动的服务 (默认进程内压测)")
+    parser.add_argument("--requests", type=int, default=200, help="每个路由的请求数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发客户端数")
+    parser.add_argument("--warmup", type=int, default=10, help="每个路由的预热请求数 (不计入结果)")
+    parser.add_argument("--routes", choices=["all", "users", "health-trends"], default="all", help="压测的路由组")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="基线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的回退比例 (默认 20%%)")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="输出应用日志 (N+1 警告等)")
+    args = parser.parse_args()
+
+    # 每个请求一行的 httpx 日志会淹没结果表格
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.verbose:
+        logging.getLogger("app").setLevel(logging.ERROR)
+
+    scenarios = [s for s in SCENARIOS if args.routes in ("all", s.group)]
+
+    if not args.base_url:
+        create_tables()
+    print(f"🌱 准备 {args.scale} 规模数据 ({SCALES[args.scale][0]} 用户 × {SCALES[args.scale][1]} 记录)...")
+    dataset = seed_dataset(args.scale, args.seed)
+    user_max, record_max = watermarks()
+    if any(s.consumes_victims for s in scenarios):
+        add_victims(dataset, args.requests)
+
+    print(f"🚀 压测 {len(scenarios)} 个路由，每个 {args.requests} 请求，并发 {args.concurrency}")
+    print(f"  {'路由':<52}{'吞吐(/s)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'错误率':>9}")
+    try:
+        results = asyncio.run(run_load_test(
+            scenarios, dataset, args.base_url, args.requests, args.concurrency, args.warmup, args.seed
+        ))
+    finally:
+        cleanup(user_max, record_max)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, args.scale, results)
+        print(f"💾 基线已保存: {args.baseline} [{args.scale}]")
+        return
+
+    baseline = load_baseline(args.baseline, args.scale)
+    if not baseline:
+        print(f"ℹ️  没有 {args.scale} 规模的基线，使用 --save-baseline 保存")
+        return
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ 性能回退 ({len(regressions)} 项):")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print(f"\n✅ 与基线相比无回退 (容差 {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+软删除健康记录压缩脚本
+分批物理删除软删除 (is_active = false) 超过保留时间的健康记录，
+与 python run.py --worker 中周期运行的压缩任务相同，用于手动清理积压
+
+使用方法:
+    python compact_records.py
+    python compact_records.py --min-age-hours 0 --batch-size 5000 --pause 0.1
+    python compact_records.py --max-batches 10
+"""
+
+import argparse
+import sys
+from pathlib import Path
+import logging
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.db.compaction import RecordCompactor
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """主函数 - 解析命令行参数并执行一轮压缩"""
+    parser = argparse.ArgumentParser(description="物理删除软删除的健康记录")
+    parser.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=settings.RECORD_COMPACTION_MIN_AGE_HOURS,
+        help=f"只删除软删除超过该小时数的记录 (默认: {settings.RECORD_COMPACTION_MIN_AGE_HOURS})"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.RECORD_COMPACTION_BATCH_SIZE,
+        help=f"每批删除的行数 (默认: {settings.RECORD_COMPACTION_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--pause",
+        type=float,
+        default=settings.RECORD_COMPACTION_PAUSE,
+        help=f"批次之间的暂停秒数 (默认: {settings.RECORD_COMPACTION_PAUSE})"
+    )
+    parser.add_argument(
+        "--max-batches",
+        type=int,
+        default=None,
+        help="最多执行的批数 (默认: 不限，直到没有到期记录)"
+    )
+
+    args = parser.parse_args()
+
+    compactor = RecordCompactor(
+        SessionLocal,
+        batch_size=args.batch_size,
+        pause=args.pause,
+        min_age=args.min_age_hours * 3600,
+        max_batches=args.max_batches or sys.maxsize,
+    )
+    logger.info(f"开始压缩: 软删除超过 {args.min_age_hours} 小时的记录，每批 {args.batch_size} 行")
+    purged = compactor.compact_once()
+    print(f"✅ 已物理删除 {purged} 条软删除的健康记录")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+索引审计与建议工具
+回放 CRUD 层发出的查询，结合 EXPLAIN (ANALYZE, BUFFERS) 与 pg_stat_user_indexes
+报告未使用、冗余和可能缺失的索引
+
+使用方法:
+    python index_advisor.py             # 连接数据库进行完整审计
+    python index_advisor.py --static    # 仅根据模型声明做静态冗余检查，无需数据库
+    python index_advisor.py --json      # 以 JSON 输出报告
+
+注意: 完整审计仅支持 PostgreSQL；回放在只读事务中执行并在结束时回滚
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+import logging
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.database import Base, engine
+from app.db.index_advisor import (
+    IndexReport,
+    build_report,
+    collect_live_indexes,
+    find_redundant,
+    indexes_from_metadata,
+    replay_workload,
+)
+import app.models  # noqa: F401  注册所有模型
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def format_size(size_bytes: int) -> str:
+    """格式化字节数"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size_bytes < 1024:
+            return f"{size_bytes:.0f}{unit}"
+        size_bytes /= 1024
+    return f"{size_bytes:.1f}TB"
+
+
+def print_report(report: IndexReport) -> None:
+    """打印审计报告"""
+    print("\n🔁 冗余索引:")
+    if not report.redundant:
+        print("  无")
+    for item in report.redundant:
+        print(
+            f"  - {item.index.table}.{item.index.name} ({', '.join(item.index.columns)}) "
+            f"{item.reason}: {item.covered_by.name} ({', '.join(item.covered_by.columns)})"
+        )
+    if report.redundant:
+        print("  📝 可参考 migrations/0001_drop_redundant_indexes.sql 删除")
+
+    print("\n💤 未使用索引 (idx_scan = 0 且回放中未被选用):")
+    if not report.unused:
+        print("  无")
+    for index in report.unused:
+        size = f", {format_size(index.size_bytes)}" if index.size_bytes is not None else ""
+        print(f"  - {index.table}.{index.name} ({', '.join(index.columns)}{size})")
+
+    print("\n🔍 可能缺失的索引 (顺序扫描并过滤掉大量行):")
+    if not report.missing:
+        print("  无")
+    for label, relation, condition in report.missing:
+        print(f"  - [{label}] {relation}: {condition}")
+
+    if report.plans:
+        print("\n📊 回放的查询:")
+        print(f"  {'调用':<44}{'耗时(ms)':>10}{'命中块':>10}{'读取块':>10}  使用索引")
+        for plan in report.plans:
+            indexes = ", ".join(sorted(plan.indexes_used)) or "-"
+            print(
+                f"  {plan.label:<44}{plan.execution_ms:>10.3f}"
+                f"{plan.shared_hit:>10}{plan.shared_read:>10}  {indexes}"
+            )
+
+
+def main() -> None:
+    """主函数 - 执行索引审计"""
+    parser = argparse.ArgumentParser(description="索引审计与建议工具")
+    parser.add_argument("--static", action="store_true", help="仅检查模型声明的索引，不连接数据库")
+    parser.add_argument("--skip-replay", action="store_true", help="跳过 CRUD 查询回放，仅读取索引统计")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出")
+    args = parser.parse_args()
+
+    if args.static:
+        report = IndexReport(redundant=find_redundant(indexes_from_metadata(Base.metadata)))
+    else:
+        if engine.dialect.name != "postgresql":
+            print("❌ 完整审计仅支持 PostgreSQL，可使用 --static 进行静态检查")
+            sys.exit(1)
+        with engine.connect() as conn:
+            plans = [] if args.skip_replay else replay_workload(conn)
+            conn.rollback()
+            live_indexes = collect_live_indexes(conn)
+        report = build_report(live_indexes, plans)
+
+    if args.json:
+        payload = asdict(report)
+        for plan in payload["plans"]:
+            plan["indexes_used"] = sorted(plan["indexes_used"])
+        print(json.dumps(payload, ensure_ascii=False, indent=2, default=str))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
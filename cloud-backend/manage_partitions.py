@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+health_records 分区管理脚本
+用于将健康记录表转换为按月分区表，并维护未来分区与历史分区
+
+使用方法:
+    python manage_partitions.py status
+    python manage_partitions.py convert [--drop-legacy]
+    python manage_partitions.py premake [--months 3]
+    python manage_partitions.py detach --before 2024-01 [--archive | --drop] [--concurrently]
+
+注意: 仅支持 PostgreSQL，convert 期间会锁表，请在维护窗口执行
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+from pathlib import Path
+import logging
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app import crud
+from app.core.config import settings
+from app.database import SessionLocal, engine
+from app.db.partitioning import (
+    convert_to_partitioned,
+    detach_partitions_before,
+    ensure_future_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_month(value: str) -> date:
+    """解析 YYYY-MM 格式的月份参数"""
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"月份格式应为 YYYY-MM: {value}")
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    """显示分区状态"""
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            print("health_records 不是分区表")
+            return 0
+        partitions = list_partitions(conn)
+    print(f"health_records 共 {len(partitions)} 个分区:")
+    for partition in partitions:
+        print(f"  - {partition.name}: {partition.bound}")
+    return 0
+
+
+def cmd_convert(args: argparse.Namespace) -> int:
+    """转换为分区表并迁移数据"""
+    migrated = convert_to_partitioned(
+        engine,
+        premake_months=args.premake_months,
+        drop_legacy=args.drop_legacy
+    )
+    print(f"✅ 转换完成，迁移 {migrated} 条记录")
+    if not args.drop_legacy:
+        print("ℹ️ 原数据保留在 health_records_legacy，确认无误后可手动删除")
+    return 0
+
+
+def cmd_premake(args: argparse.Namespace) -> int:
+    """预建未来分区"""
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            print("❌ health_records 不是分区表，请先执行 convert")
+            return 1
+        created = ensure_future_partitions(conn, args.months)
+    print(f"✅ 新建分区 {len(created)} 个: {', '.join(created) or '无'}")
+    return 0
+
+
+def cmd_detach(args: argparse.Namespace) -> int:
+    """分离 / 归档 / 删除历史分区"""
+    try:
+        detached = detach_partitions_before(
+            engine,
+            args.before,
+            archive_schema=settings.PARTITION_ARCHIVE_SCHEMA if args.archive else None,
+            drop=args.drop,
+            concurrently=args.concurrently
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if detached:
+        # 分离的记录仍计入增量统计 (全部时间范围)，标记失效后在下次读取时重新计算
+        with SessionLocal() as db:
+            crud.health_stats.invalidate(db)
+            db.commit()
+    print(f"✅ 处理分区 {len(detached)} 个: {', '.join(detached) or '无'}")
+    return 0
+
+
+def main() -> None:
+    """主函数 - 解析命令行参数并执行分区操作"""
+    parser = argparse.ArgumentParser(description="health_records 分区管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = subparsers.add_parser("status", help="显示分区状态")
+    status_parser.set_defaults(func=cmd_status)
+
+    convert_parser = subparsers.add_parser("convert", help="转换为按月分区表并迁移现有数据")
+    convert_parser.add_argument(
+        "--premake-months",
+        type=int,
+        default=settings.PARTITION_PREMAKE_MONTHS,
+        help=f"预建未来分区月数 (默认: {settings.PARTITION_PREMAKE_MONTHS})"
+    )
+    convert_parser.add_argument("--drop-legacy", action="store_true", help="迁移后删除原表")
+    convert_parser.set_defaults(func=cmd_convert)
+
+    premake_parser = subparsers.add_parser("premake", help="预建未来月份分区")
+    premake_parser.add_argument(
+        "--months",
+        type=int,
+        default=settings.PARTITION_PREMAKE_MONTHS,
+        help=f"预建月数 (默认: {settings.PARTITION_PREMAKE_MONTHS})"
+    )
+    premake_parser.set_defaults(func=cmd_premake)
+
+    detach_parser = subparsers.add_parser("detach", help="分离早于指定月份的历史分区")
+    detach_parser.add_argument("--before", type=parse_month, required=True, help="截止月份 YYYY-MM (不含)")
+    action = detach_parser.add_mutually_exclusive_group()
+    action.add_argument(
+        "--archive",
+        action="store_true",
+        help=f"分离后移入归档 schema ({settings.PARTITION_ARCHIVE_SCHEMA})"
+    )
+    action.add_argument("--drop", action="store_true", help="分离后直接删除")
+    detach_parser.add_argument(
+        "--concurrently",
+        action="store_true",
+        help="使用 DETACH PARTITION CONCURRENTLY (PostgreSQL 14+，父表有 DEFAULT 分区时不可用)"
+    )
+    detach_parser.set_defaults(func=cmd_detach)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+版本化表结构迁移脚本
+按版本号执行 migrations/ 下的 SQL / Python 迁移，已执行的版本记录在 schema_migrations
+
+使用方法:
+    python migrate.py status                     # 当前版本与待执行迁移
+    python migrate.py upgrade                    # 执行全部待执行迁移
+    python migrate.py upgrade --target 2         # 执行到指定版本
+    python migrate.py stamp 2                    # 标记为已执行 (不执行 SQL)
+    python migrate.py new add_alert_table        # 新建 SQL 迁移文件
+    python migrate.py new backfill_levels --python
+
+注意:
+    全新数据库 (没有 users 表和版本表) 执行 upgrade 时按当前模型建表并标记为最新版本。
+    应用启动时只检查版本，不再执行 DDL；部署新版本前先执行 migrate.py upgrade。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+import logging
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.database import Base, engine
+from app.db.migrations import (
+    MIGRATIONS_DIR,
+    applied_migrations,
+    check_schema_version,
+    ensure_version_table,
+    is_fresh_database,
+    load_migrations,
+    stamp,
+    upgrade,
+)
+import app.models  # noqa: F401  注册全部模型
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SQL_TEMPLATE = """-- {title}
+--
+-- 大表 DDL 注意事项:
+--   * 建索引 / 删索引使用 CONCURRENTLY (自动按逐条自动提交执行)，并加 IF [NOT] EXISTS 以便重试
+--   * 加列不带易变默认值；NOT NULL 约束先 ADD CONSTRAINT ... NOT VALID 再 VALIDATE
+-- migrate: lock-timeout=5s
+
+"""
+
+PYTHON_TEMPLATE = '''"""
+{title}
+"""
+# migrate: lock-timeout=2s
+
+from app.db.migrations import MigrationContext
+
+
+def upgrade(ctx: MigrationContext) -> None:
+    """执行迁移: DDL 用 ctx.execute / ctx.execute_autocommit，大表数据用 ctx.backfill 分批回填"""
+    # 在此编写迁移步骤，例如:
+    #     ctx.execute_autocommit("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_name ON table (column)")
+    raise NotImplementedError("{title}: 请先编写迁移步骤")
+'''
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    """显示迁移状态"""
+    status = check_schema_version(engine)
+    print(f"当前版本: {status.current if status.current is not None else '未初始化'}")
+    print(f"最新版本: {status.latest}")
+    if status.current is not None:
+        with engine.connect() as conn:
+            applied = applied_migrations(conn)
+        for migration in load_migrations():
+            if migration.version in applied and applied[migration.version] != migration.checksum:
+                print(f"  ❌ {migration.label} 已执行后被修改 (upgrade 将拒绝执行)")
+    if status.up_to_date:
+        print("✅ 已是最新")
+    else:
+        print(f"待执行迁移 {len(status.pending)} 个:")
+        for label in status.pending:
+            print(f"  - {label}")
+    return 0
+
+
+def cmd_upgrade(args: argparse.Namespace) -> int:
+    """执行待执行迁移"""
+    if is_fresh_database(engine):
+        logger.info("📋 全新数据库: 按当前模型建表并标记为最新版本")
+        Base.metadata.create_all(bind=engine)
+        stamped = stamp(engine, max((m.version for m in load_migrations()), default=0))
+        print(f"✅ 建表完成，标记 {len(stamped)} 个迁移为已执行")
+        return 0
+
+    try:
+        executed = upgrade(engine, target=args.target, retries=args.retries, retry_wait=args.retry_wait)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ 执行迁移 {len(executed)} 个: {', '.join(m.label for m in executed) or '无'}")
+    return 0
+
+
+def cmd_stamp(args: argparse.Namespace) -> int:
+    """标记迁移为已执行"""
+    ensure_version_table(engine)
+    stamped = stamp(engine, args.version)
+    print(f"✅ 标记 {len(stamped)} 个迁移为已执行: {', '.join(m.label for m in stamped) or '无'}")
+    return 0
+
+
+def cmd_new(args: argparse.Namespace) -> int:
+    """新建迁移文件"""
+    version = max((m.version for m in load_migrations()), default=0) + 1
+    suffix = "py" if args.python else "sql"
+    path = MIGRATIONS_DIR / f"{version:04d}_{args.name}.{suffix}"
+    template = PYTHON_TEMPLATE if args.python else SQL_TEMPLATE
+    path.write_text(template.format(title=args.name.replace("_", " ")), encoding="utf-8")
+    print(f"✅ 已创建 {path.relative_to(project_root)}")
+    return 0
+
+
+def main() -> None:
+    """主函数 - 解析命令行参数并执行迁移操作"""
+    parser = argparse.ArgumentParser(description="版本化表结构迁移")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = subparsers.add_parser("status", help="显示当前版本与待执行迁移")
+    status_parser.set_defaults(func=cmd_status)
+
+    upgrade_parser = subparsers.add_parser("upgrade", help="执行待执行迁移")
+    upgrade_parser.add_argument("--target", type=int, default=None, help="目标版本 (默认: 最新)")
+    upgrade_parser.add_argument("--retries", type=int, default=3, help="锁等待超时的重试次数 (默认: 3)")
+    upgrade_parser.add_argument("--retry-wait", type=float, default=2.0, help="首次重试等待秒数，之后翻倍 (默认: 2)")
+    upgrade_parser.set_defaults(func=cmd_upgrade)
+
+    stamp_parser = subparsers.add_parser("stamp", help="将不超过指定版本的迁移标记为已执行")
+    stamp_parser.add_argument("version", type=int, help="版本号")
+    stamp_parser.set_defaults(func=cmd_stamp)
+
+    new_parser = subparsers.add_parser("new", help="新建迁移文件")
+    new_parser.add_argument("name", help="迁移描述 (小写下划线)，如 add_alert_table")
+    new_parser.add_argument("--python", action="store_true", help="新建 Python 迁移 (数据回填)")
+    new_parser.set_defaults(func=cmd_new)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+-- 删除冗余索引
+-- 这些索引是主键 / 唯一索引 / 其他复合索引的前缀重复，或与 CRUD 查询模式不匹配，
+-- 每次写入都要额外维护，却不会被查询计划选用。
+-- 依据: python index_advisor.py 的冗余索引报告
+--
+-- 使用 DROP INDEX CONCURRENTLY 避免阻塞写入，不能放在事务块中执行:
+--     psql "$DATABASE_URL" -f migrations/0001_drop_redundant_indexes.sql
+
+-- health_records: 主键重复
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_id;
+-- health_records: ix_health_records_user_date (user_id, assessed_at) 的前缀
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_user_id;
+-- health_records: 与 ix_health_records_user_date 列相同、顺序相反，CRUD 查询均以 user_id 开头
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_time_range;
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_assessed_at;
+-- health_records: ix_health_records_score_level (overall_score, health_level) 的前缀
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_overall_score;
+-- health_records: 低基数单列索引，无查询单独按健康等级筛选
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_health_level;
+
+-- users: 主键重复
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_id;
+-- users: 以唯一列 email / username 为前缀的复合索引
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_active;
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_username_active;
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_full_search;
+-- users: email 已唯一，(email, username) 组合唯一约束恒成立
+ALTER TABLE users DROP CONSTRAINT IF EXISTS uq_user_email_username;
@@ -0,0 +1,15 @@
+-- 趋势图表查询的覆盖索引
+-- 以 (user_id, assessed_at) 为键并 INCLUDE 图表所需列，使趋势查询可以走 Index Only Scan，
+-- 不再为每一行回表读取包含 notes / detailed_metrics 的宽行。
+-- 新索引的键与 ix_health_records_user_date 相同，创建完成后删除旧索引。
+--
+-- 需要 PostgreSQL 11+，不能放在事务块中执行:
+--     psql "$DATABASE_URL" -f migrations/0002_covering_trend_index.sql
+-- 执行后建议 VACUUM health_records，以更新可见性映射 (Index Only Scan 依赖它跳过回表)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_health_records_user_date_cover
+    ON health_records (user_id, assessed_at)
+    INCLUDE (overall_score, physical_score, mental_score, lifestyle_score,
+             health_level, assessment_type, data_source);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_user_date;
@@ -0,0 +1,26 @@
+-- 健康统计增量维护表
+-- 每个用户每个预设时间范围 (7d / 30d / 90d / 180d / 365d / all) 一行，写入健康记录时在同一事务中
+-- 按 Welford 算法增量更新，/health-summary 只需一次主键查询。
+-- 无需回填: 统计行缺失时，首次读取摘要会用一次覆盖索引范围查询计算并写入。
+--
+-- 执行:
+--     python migrate.py upgrade
+
+CREATE TABLE IF NOT EXISTS health_stats (
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    time_range VARCHAR(10) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+    m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+    min_score DOUBLE PRECISION,
+    max_score DOUBLE PRECISION,
+    first_at TIMESTAMP WITH TIME ZONE,
+    first_score DOUBLE PRECISION,
+    last_at TIMESTAMP WITH TIME ZONE,
+    last_score DOUBLE PRECISION,
+    level_counts JSON NOT NULL DEFAULT '{}',
+    stale BOOLEAN NOT NULL DEFAULT TRUE,
+    expires_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, time_range)
+);
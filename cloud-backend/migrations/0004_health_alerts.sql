@@ -0,0 +1,30 @@
+-- 健康告警表与告警检测器状态检查点
+-- 健康记录提交后由后台告警流水线异步检测 (评分骤降、心率 / 血压超出范围)，检测结果写入 health_alerts，
+-- 供 GET /users/{user_id}/health-alerts 查询；每个用户的流式检测器状态定期写回 alert_detector_states，
+-- 工作进程重启后从检查点恢复。
+-- record_id 不建外键: health_records 可能是分区表 (见 manage_partitions.py)，删除记录时保留告警历史。
+-- 无需回填: 上线后新提交的记录开始检测，检测器状态从第一条记录开始积累。
+--
+-- 执行:
+--     python migrate.py upgrade
+
+CREATE TABLE IF NOT EXISTS health_alerts (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    record_id INTEGER,
+    alert_type VARCHAR(50) NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    message VARCHAR(255) NOT NULL,
+    value DOUBLE PRECISION,
+    details JSON,
+    assessed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    detected_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_health_alerts_user_detected ON health_alerts (user_id, detected_at);
+
+CREATE TABLE IF NOT EXISTS alert_detector_states (
+    user_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+    state JSON NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
@@ -0,0 +1,24 @@
+-- 事务发件箱
+-- 创建健康记录时在同一事务中写入事件，请求提交后立即返回；python run.py --worker 成批领取事件
+-- (FOR UPDATE SKIP LOCKED)，执行告警检测等派生工作，派生数据与 status = 'done' 在同一事务中提交。
+-- 待处理事件的部分索引只包含 pending 行，已处理的历史行 (保留 OUTBOX_RETENTION_HOURS 小时) 不增加其体积。
+--
+-- 执行:
+--     python migrate.py upgrade
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id SERIAL PRIMARY KEY,
+    topic VARCHAR(100) NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    processed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_outbox_events_pending
+    ON outbox_events (available_at, id) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS ix_outbox_events_processed_at ON outbox_events (processed_at);
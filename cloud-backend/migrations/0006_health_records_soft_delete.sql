@@ -0,0 +1,23 @@
+-- 健康记录软删除的部分索引
+-- 删除健康记录改为 is_active = false (HEALTH_RECORDS_SOFT_DELETE)，CRUD 读取均带 is_active 条件。
+-- 趋势覆盖索引改为只包含有效记录的部分索引 (WHERE is_active)，软删除的记录不再占用其空间；
+-- 新增只包含软删除记录的小索引，供后台压缩任务 (app/db/compaction.py) 按 id 分批物理删除。
+-- 新索引建立完成后删除旧的覆盖索引 ix_health_records_user_date_cover。
+--
+-- 注意: is_active 出现在索引谓词中，修改它的 UPDATE 不再是 HOT 更新 (需要写入其余索引)，
+-- 代价由软删除承担；请求路径上的删除仍只有一条 UPDATE，物理删除与索引清理移到后台分批进行。
+--
+-- 执行 (CONCURRENTLY，自动按 no-transaction 逐条执行):
+--     python migrate.py upgrade
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_health_records_user_date_active
+    ON health_records (user_id, assessed_at)
+    INCLUDE (overall_score, physical_score, mental_score, lifestyle_score,
+             health_level, assessment_type, data_source)
+    WHERE is_active;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_health_records_inactive
+    ON health_records (id)
+    WHERE NOT is_active;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_user_date_cover;
@@ -0,0 +1,22 @@
+-- 以 is_active 为谓词的部分索引
+-- users: is_active 单列索引基数极低 (绝大多数用户为激活状态)，查询计划几乎不会选用，却随每次写入维护；
+-- 改为只包含激活用户的 (created_at) 部分索引，激活用户列表 (按创建时间倒序分页) 与计数直接扫描它。
+-- 登录 (authenticate -> get_user_by_email) 仍走 email 唯一索引: 唯一性必须覆盖全部用户，
+-- 部分索引只能作为额外的索引，而唯一索引上的等值查找已是一次索引下探 (见 benchmarks/bench_partial_indexes.py)。
+-- health_records: (user_id, assessment_type, health_level) 改为只包含有效记录的部分索引，
+-- CRUD 读取均带 is_active 条件，软删除的记录不再占用其空间。
+--
+-- 执行 (CONCURRENTLY，自动按 no-transaction 逐条执行):
+--     python migrate.py upgrade
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at_active
+    ON users (created_at)
+    WHERE is_active;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_is_active;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_health_records_search_active
+    ON health_records (user_id, assessment_type, health_level)
+    WHERE is_active;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_health_records_full_search;
@@ -2,10 +2,19 @@
 """
 用户管理 API 启动脚本
 支持开发和生产环境配置
+
+使用方法:
+    python run.py                          # 开发模式 (热重载)
+    python run.py --no-reload --workers 4  # 生产模式
+    python run.py --worker                 # 后台工作进程 (事务发件箱派生工作与软删除记录压缩)
 """
 
 import argparse
+import logging
+import os
+import signal
 import sys
+import threading
 from pathlib import Path
 
 import uvicorn
@@ -17,6 +26,32 @@ sys.path.insert(0, str(project_root))
 from app.core.config import settings
 
 
+def run_worker(log_level: str) -> None:
+    """运行后台工作进程 (发件箱事件处理与软删除记录压缩)，收到 SIGINT / SIGTERM 后处理完当前批次再退出"""
+    logging.basicConfig(
+        level=log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    from app.crud.crud_outbox import outbox_worker
+    from app.database import SessionLocal
+    from app.db.compaction import RecordCompactor
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    print(f"📮 启动发件箱工作进程 (每批 {outbox_worker.batch_size} 个事件，轮询间隔 {outbox_worker.poll_interval}s)")
+    if not settings.OUTBOX_ENABLED:
+        print("⚠️ OUTBOX_ENABLED=false: API 不会写入新的发件箱事件，只处理已有事件")
+
+    # 软删除记录压缩在独立线程中运行，批次之间的限速暂停不影响发件箱事件的处理延迟
+    compactor = RecordCompactor.from_settings(SessionLocal)
+    compaction = threading.Thread(target=compactor.run, args=(stop,), name="record-compaction", daemon=True)
+    compaction.start()
+    outbox_worker.run(stop)
+    compaction.join()
+
+
 def main() -> None:
     """主函数 - 解析命令行参数并启动服务器"""
     parser = argparse.ArgumentParser(description="启动 FastAPI 用户管理服务")
@@ -55,9 +90,27 @@ def main() -> None:
         default=1,
         help="工作进程数量 (生产环境建议设置为 CPU 核心数)"
     )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="运行后台工作进程 (发件箱事件处理与软删除记录压缩) 而不是 API 服务器"
+    )
 
     args = parser.parse_args()
 
+    if args.worker:
+        run_worker(args.log_level)
+        return
+
+    # 进程内告警流水线只支持单个 API 进程 (应用启动时也会检查，这里提前给出明确提示)
+    if args.workers > 1 and not args.reload and settings.ALERTS_ENABLED and not settings.OUTBOX_ENABLED:
+        print("❌ OUTBOX_ENABLED=false 时告警由 API 进程内的流水线检测，只支持单个工作进程")
+        print("   多进程部署请启用 OUTBOX_ENABLED 并运行 python run.py --worker，或关闭 ALERTS_ENABLED")
+        sys.exit(1)
+
+    # 工作进程数写入环境变量，各进程据此计算自己的连接池大小
+    os.environ["WEB_CONCURRENCY"] = str(args.workers if not args.reload else 1)
+
     print(f"🚀 启动 {settings.PROJECT_NAME} v{settings.VERSION}")
     print(f"📚 API 文档: http://{args.host}:{args.port}/docs")
     print(f"🔧 ReDoc 文档: http://{args.host}:{args.port}/redoc")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+大规模模拟数据填充脚本
+非交互地为大量模拟用户生成时间相关的健康记录，用于本地规模测试
+
+使用方法:
+    python seed_data.py --users 1000 --records-per-user 1000           # 100 万条记录
+    python seed_data.py --users 10000 --records-per-user 500 --seed 7
+    python seed_data.py --reset --users 100 --records-per-user 50      # 先清理已有模拟数据
+    python seed_data.py --clean                                        # 只清理模拟数据
+
+说明:
+    模拟用户以 seed_ 为用户名前缀，共用同一个密码 (--password)。
+    每个分块 (--users-per-chunk 个用户) 一个事务；中断后用相同参数重新运行会从下一个分块继续。
+    PostgreSQL 使用 COPY 写入，其他数据库使用 executemany。
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.core.security import get_password_hash
+from app.database import engine
+from app.db.seeding import SeedPlan, count_seed_users, delete_seed_data, seed_chunk
+from app.models.health_record import HealthRecord
+from app.models.user import User
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value: str) -> datetime:
+    """解析 YYYY-MM-DD 格式的日期参数"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD: {value}")
+
+
+def main() -> None:
+    """主函数 - 生成并写入模拟数据"""
+    default_start = (datetime.now(timezone.utc) - timedelta(days=365)).strftime("%Y-%m-%d")
+    parser = argparse.ArgumentParser(description="大规模模拟健康数据填充")
+    parser.add_argument("--users", type=int, default=1000, help="模拟用户数 (默认: 1000)")
+    parser.add_argument("--records-per-user", type=int, default=100, help="每个用户的记录数 (默认: 100)")
+    parser.add_argument("--start", type=parse_date, default=default_start, help="起始日期 YYYY-MM-DD (默认: 一年前)")
+    parser.add_argument("--days", type=int, default=365, help="时间跨度天数 (默认: 365)")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+    parser.add_argument("--users-per-chunk", type=int, default=500, help="每个事务的用户数 (默认: 500)")
+    parser.add_argument("--password", default="seedpassword", help="模拟用户的统一密码")
+    parser.add_argument("--reset", action="store_true", help="写入前删除已有模拟数据")
+    parser.add_argument("--clean", action="store_true", help="只删除模拟数据后退出")
+    args = parser.parse_args()
+
+    users_table, records_table = User.__table__, HealthRecord.__table__
+
+    if args.reset or args.clean:
+        with engine.begin() as conn:
+            deleted = delete_seed_data(conn, users_table, records_table)
+        logger.info(f"🧹 已删除 {deleted} 个模拟用户及其健康记录")
+        if args.clean:
+            return
+
+    plan = SeedPlan(
+        users=args.users,
+        records_per_user=args.records_per_user,
+        start=args.start,
+        span_days=args.days,
+        seed=args.seed,
+        users_per_chunk=args.users_per_chunk,
+    )
+    chunks = -(-plan.users // plan.users_per_chunk)
+
+    with engine.connect() as conn:
+        existing = count_seed_users(conn, users_table)
+    if existing >= plan.users:
+        logger.info(f"✅ 已存在 {existing} 个模拟用户，无需写入")
+        return
+    if existing % plan.users_per_chunk:
+        logger.error(f"❌ 已有 {existing} 个模拟用户，与分块大小不匹配，请使用 --reset 重新生成")
+        sys.exit(1)
+    first_chunk = existing // plan.users_per_chunk
+    if first_chunk:
+        logger.info(f"⏩ 已存在 {existing} 个模拟用户，从第 {first_chunk + 1}/{chunks} 个分块继续")
+
+    hashed_password = get_password_hash(args.password)
+    logger.info(
+        f"🚀 生成 {plan.users} 个用户 × {plan.records_per_user} 条记录 = {plan.total_records} 条 "
+        f"({engine.dialect.name}, seed={plan.seed})"
+    )
+
+    started = time.perf_counter()
+    written = 0
+    for chunk in range(first_chunk, chunks):
+        with engine.begin() as conn:
+            written += seed_chunk(conn, users_table, records_table, plan, chunk, hashed_password)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"📦 分块 {chunk + 1}/{chunks}: 累计 {written} 条记录，"
+            f"{written / elapsed:,.0f} 条/秒"
+        )
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"✅ 完成: 写入 {written} 条记录，耗时 {elapsed:.1f}s ({written / elapsed:,.0f} 条/秒)")
+    if engine.dialect.name == "postgresql":
+        logger.info("ℹ️ 建议执行 ANALYZE users, health_records 更新统计信息")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import os
+import uuid
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import get_db, Base
@@ -37,4 +40,28 @@ def db():
 def client():
     """创建测试客户端"""
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+
+@pytest.fixture()
+def pg_engine():
+    """
+    独立 schema 中的 PostgreSQL 引擎 (分区、CONCURRENTLY 等 PostgreSQL 专有功能的测试使用)
+
+    需要设置 TEST_POSTGRES_URL，否则跳过。会话时区设为 Asia/Shanghai (非零时差)，
+    以覆盖 timestamptz 按会话时区转换的情况
+    """
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("未设置 TEST_POSTGRES_URL")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema} -ctimezone=Asia/Shanghai"})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AdmissionRejected,
+    ClassLimits,
+    classify,
+)
+from app.core.deadline import DeadlineExceeded, deadline_scope, is_overload_error, raise_if_overloaded, remaining
+
+
+def make_controller(capacity: int = 1, analytics: int = 1, queue_size: int = 2, queue_timeout: float = 1.0):
+    """创建测试用准入控制器"""
+    return AdmissionController(
+        capacity=capacity,
+        limits={
+            "write": ClassLimits(capacity, queue_size, 10.0),
+            "read": ClassLimits(capacity, queue_size, 10.0),
+            "analytics": ClassLimits(analytics, queue_size, 5.0),
+        },
+        queue_timeout=queue_timeout,
+    )
+
+
+class TestAdmissionController:
+    """准入控制器测试类"""
+
+    def test_classify(self):
+        """按方法与路径确定路由类别"""
+        assert classify("POST", "/api/v1/users/1/health-records", "/api/v1") == "write"
+        assert classify("GET", "/api/v1/users/1/health-trends", "/api/v1") == "analytics"
+        assert classify("GET", "/api/v1/users/1/health-summary/", "/api/v1") == "analytics"
+        assert classify("GET", "/api/v1/users/1/health-records", "/api/v1") == "read"
+        assert classify("GET", "/health", "/api/v1") is None
+
+    def test_writes_are_released_before_analytics(self):
+        """名额空出时排队的写入先于分析型读取放行"""
+        async def scenario():
+            controller = make_controller(capacity=1)
+            await controller.acquire("read")
+            order = []
+
+            async def request(route_class):
+                await controller.acquire(route_class)
+                order.append(route_class)
+                controller.release(route_class)
+
+            analytics = asyncio.create_task(request("analytics"))
+            await asyncio.sleep(0)
+            write = asyncio.create_task(request("write"))
+            await asyncio.sleep(0)
+            controller.release("read")
+            await asyncio.gather(analytics, write)
+            return order, controller.total_running
+
+        order, running = asyncio.run(scenario())
+        assert order == ["write", "analytics"]
+        assert running == 0
+
+    def test_analytics_share_leaves_room_for_writes(self):
+        """分析型读取达到上限时，写入仍可直接放行"""
+        async def scenario():
+            controller = make_controller(capacity=2, analytics=1, queue_size=0)
+            await controller.acquire("analytics")
+            with pytest.raises(AdmissionRejected):
+                await controller.acquire("analytics")
+            await controller.acquire("write")
+            return controller.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        assert snapshot["write"]["running"] == 1
+        assert snapshot["analytics"] == {"running": 1, "queued": 0}
+
+    def test_queue_timeout_is_bounded_by_deadline(self):
+        """排队等待不超过请求剩余时间"""
+        async def scenario():
+            controller = make_controller(capacity=1, queue_timeout=10.0)
+            await controller.acquire("read")
+            with deadline_scope(0.05):
+                started = asyncio.get_running_loop().time()
+                with pytest.raises(AdmissionRejected, match="queue_timeout"):
+                    await controller.acquire("read")
+                waited = asyncio.get_running_loop().time() - started
+            return waited, controller.snapshot()["read"]
+
+        waited, read = asyncio.run(scenario())
+        assert waited < 1.0
+        assert read == {"running": 1, "queued": 0}
+
+
+class TestAdmissionMiddleware:
+    """准入控制中间件测试类"""
+
+    def test_sheds_with_retry_after_when_saturated(self):
+        """并发名额与队列占满时立即返回 503 + Retry-After"""
+        controller = make_controller(capacity=1, queue_size=0)
+        release = threading.Event()
+        entered = threading.Event()
+        app = FastAPI()
+        app.add_middleware(AdmissionControlMiddleware, controller=controller, api_prefix="/api")
+
+        @app.get("/api/slow")
+        def slow():
+            entered.set()
+            release.wait(5)
+            return {"ok": True}
+
+        with TestClient(app) as client:
+            worker = threading.Thread(target=client.get, args=("/api/slow",))
+            worker.start()
+            assert entered.wait(5)
+            response = client.get("/api/slow")
+            release.set()
+            worker.join(5)
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        assert controller.total_running == 0
+
+    def test_deadline_reaches_sync_endpoint(self):
+        """截止时间传入线程池中的同步端点，客户端超时请求头只能缩短截止时间"""
+        controller = make_controller()
+        app = FastAPI()
+        app.add_middleware(AdmissionControlMiddleware, controller=controller, api_prefix="/api")
+
+        @app.get("/api/deadline")
+        def deadline():
+            return {"remaining": remaining()}
+
+        with TestClient(app) as client:
+            default = client.get("/api/deadline").json()["remaining"]
+            shortened = client.get("/api/deadline", headers={"X-Request-Timeout": "2"}).json()["remaining"]
+            extended = client.get("/api/deadline", headers={"X-Request-Timeout": "60"}).json()["remaining"]
+
+        assert 9 < default <= 10
+        assert 1 < shortened <= 2
+        assert extended <= 10
+
+
+class TestDeadline:
+    """请求截止时间测试类"""
+
+    def test_nested_scope_keeps_earlier_deadline(self):
+        """嵌套设置时保留更早的截止时间"""
+        assert remaining() is None
+        with deadline_scope(1.0):
+            with deadline_scope(30.0):
+                assert remaining() <= 1.0
+        assert remaining() is None
+
+    def test_overload_errors(self):
+        """statement_timeout 取消的查询视为过载错误"""
+        class QueryCanceled(Exception):
+            pgcode = "57014"
+
+        class DBError(Exception):
+            orig = QueryCanceled()
+
+        assert is_overload_error(DBError())
+        assert not is_overload_error(ValueError())
+        with pytest.raises(DeadlineExceeded):
+            raise_if_overloaded(DBError())
+        raise_if_overloaded(ValueError())
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.alerts import AlertPipeline, RecordEvent, UserDetectorState, check_metrics
+from app.core.metrics import alert_events_total
+from app.crud.crud_health_alert import health_alert as crud_health_alert
+from app.database import Base
+from app.models.health_alert import AlertDetectorState
+from app.models.user import User
+
+
+@pytest.fixture()
+def session_factory():
+    """独立的内存 SQLite 会话工厂 (工作线程与测试共享同一连接)"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with factory() as db:
+        db.add(User(id=1, email="alerts@example.com", username="alertuser", hashed_password="x" * 20))
+        db.commit()
+    yield factory
+    Base.metadata.drop_all(bind=engine)
+
+
+def make_events(scores, start=datetime(2024, 1, 1), metrics=None):
+    """按天生成同一用户的健康记录事件"""
+    return [
+        RecordEvent(
+            user_id=1,
+            record_id=i + 1,
+            assessed_at=start + timedelta(days=i),
+            overall_score=score,
+            detailed_metrics=metrics,
+        )
+        for i, score in enumerate(scores)
+    ]
+
+
+def feed(state, events):
+    """依次更新检测器，返回告警类型列表"""
+    return [alert.alert_type for event in events for alert in state.update(event)]
+
+
+class TestDetectors:
+    """流式检测器测试类"""
+
+    def test_sudden_drop_triggers_zscore(self):
+        """评分突然下降触发 z 分数告警，正常波动不触发"""
+        state = UserDetectorState()
+        assert feed(state, make_events([80, 82, 79, 81, 80, 83, 78])) == []
+        assert feed(state, make_events([55], start=datetime(2024, 2, 1))) == ["score_drop_zscore"]
+
+    def test_gradual_decline_triggers_cusum(self):
+        """持续小幅下降由 CUSUM 检出，补录的历史记录不更新评分检测器"""
+        state = UserDetectorState()
+        scores = [80, 81, 79, 80, 80, 81, 72, 71, 70, 72, 71, 70]
+        assert "score_drop_cusum" in feed(state, make_events(scores))
+        assert "score_drop_zscore" not in feed(state, make_events(scores))
+
+        count = state.count
+        assert feed(state, make_events([10], start=datetime(2023, 1, 1))) == []
+        assert state.count == count
+
+    def test_metric_ranges(self):
+        """心率与血压超出范围"""
+        event = make_events([80], metrics={"heart_rate": 155, "blood_pressure": "145/85"})[0]
+        alerts = {alert.alert_type: alert.severity for alert in check_metrics(event)}
+        assert alerts == {"heart_rate": "critical", "blood_pressure": "warning"}
+
+        normal = make_events([80], metrics={"heart_rate": 72, "blood_pressure": {"systolic": 120, "diastolic": 80}})
+        assert check_metrics(normal[0]) == []
+
+
+class TestAlertPipeline:
+    """告警流水线测试类"""
+
+    def test_alerts_persisted_and_state_restored(self, session_factory):
+        """告警写入数据库，检测器状态写回检查点后由新的流水线恢复"""
+        pipeline = AlertPipeline(session_factory, crud_health_alert, workers=2, checkpoint_interval=60)
+        pipeline.start()
+        processed = alert_events_total.value(("processed",))
+        assert pipeline.submit(make_events([80, 82, 79, 81, 80, 83], metrics={"heart_rate": 35})) == 6
+        pipeline.stop()
+        assert alert_events_total.value(("processed",)) == processed + 6
+
+        with session_factory() as db:
+            assert crud_health_alert.count(db, user_id=1) == 6
+            assert db.get(AlertDetectorState, 1).state["count"] == 6
+
+        # 重启后从检查点恢复，无需重新积累 MIN_POINTS 个评分即可检测突降
+        restarted = AlertPipeline(session_factory, crud_health_alert, workers=1)
+        restarted.start()
+        restarted.submit(make_events([50], start=datetime(2024, 2, 1)))
+        restarted.flush()
+        with session_factory() as db:
+            latest = crud_health_alert.get_multi(db, user_id=1, alert_type="score_drop_zscore")
+        restarted.stop()
+        assert [alert.record_id for alert in latest] == [1]
+        assert not pipeline.running and pipeline.submit(make_events([50])) == 0
+
+    def test_enabled_pipeline_refuses_multiple_processes(self, session_factory):
+        """启用的进程内流水线在多个 API 进程下拒绝启动，禁用 (由发件箱检测) 时不受限制"""
+        pipeline = AlertPipeline(session_factory, crud_health_alert, workers=1)
+        pipeline.check_processes(1)
+        with pytest.raises(RuntimeError):
+            pipeline.check_processes(4)
+        AlertPipeline(session_factory, crud_health_alert, enabled=False).check_processes(4)
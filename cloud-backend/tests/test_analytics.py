@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.core.analytics import analyze_trends, ewma
+from benchmarks.bench_analytics import make_series, max_difference, numpy_analytics, python_analytics, to_lists
+from benchmarks.bench_micro import make_trend_rows
+
+
+class TestVectorizedAnalytics:
+    """向量化趋势统计测试类"""
+
+    def test_matches_python_reference(self):
+        """向量化实现与逐点循环实现结果一致 (含缺失值)"""
+        days, scores = make_series(2_000)
+        errors = max_difference(numpy_analytics(days, scores), python_analytics(days.tolist(), to_lists(scores)))
+        assert errors.pop("anomalies") == 0
+        assert max(errors.values()) < 1e-9
+
+    def test_ewma_spans_multiple_blocks(self):
+        """EWMA 分块计算跨块连续，长序列不下溢"""
+        values = np.full((1, 10_000), 80.0)
+        values[0, ::2] = 60.0
+        result = ewma(values, alpha=0.9)
+        assert not np.isnan(result).any()
+        assert abs(result[0, -1] - 78.18) < 0.01
+
+    def test_analyze_trends_summary(self):
+        """分析结果按维度组织，可 JSON 序列化，检测到骤降"""
+        rows = make_trend_rows(60)
+        base = datetime(2024, 1, 1)
+        rows = [
+            row._replace(assessed_at=base + timedelta(days=i), overall_score=70.0 + i * 0.5 + (i % 3),
+                         physical_score=None if i % 10 == 0 else row.physical_score)
+            for i, row in enumerate(rows)
+        ]
+        rows[45] = rows[45]._replace(overall_score=20.0)
+
+        result = analyze_trends(rows)
+        overall = result["dimensions"]["overall_score"]
+        assert result["points"] == 60
+        assert overall["trend"] == "rising"
+        assert 0.4 < overall["slope_per_day"] < 0.6
+        assert overall["anomaly_timestamps"] == [int((base + timedelta(days=45)).timestamp() * 1000)]
+        assert result["dimensions"]["physical_score"]["count"] == 54
+        assert len(overall["ewma_series"]) == 60
+        assert analyze_trends([])["dimensions"]["overall_score"]["slope_per_day"] is None
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.crud.crud_health_record import health_record as crud_health_record
+from app.crud.crud_health_stats import health_stats as crud_health_stats
+from app.database import Base
+from app.db.compaction import RecordCompactor
+from app.models.health_record import HealthRecord
+from app.models.user import User
+from app.models.health_stats import HealthStats
+from app.schemas.health_record import HealthRecordUpdate, TimeRange
+
+
+@pytest.fixture()
+def session():
+    """独立的内存 SQLite 会话"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture()
+def user_with_records(session):
+    """创建带有 5 条健康记录的用户"""
+    user = User(email="trend@example.com", username="trenduser", hashed_password="x" * 20)
+    session.add(user)
+    session.flush()
+    now = datetime.now()
+    for days_ago, score in [(20, 70.0), (15, 75.0), (10, 82.0), (5, 85.0), (1, 90.0)]:
+        session.add(HealthRecord(
+            user_id=user.id,
+            assessed_at=now - timedelta(days=days_ago),
+            overall_score=score,
+            physical_score=score - 2,
+            assessment_type="comprehensive",
+            health_level=None,
+            notes="宽列不应出现在趋势查询中",
+            data_source="manual",
+        ))
+    session.commit()
+    return user
+
+
+class TestTrendPoints:
+    """趋势图表投影查询测试类"""
+
+    def test_trend_points_only_select_chart_columns(self, session, user_with_records):
+        """测试趋势查询只返回图表所需列，并按时间升序"""
+        now = datetime.now()
+        rows = crud_health_record.get_trend_points(
+            session,
+            user_id=user_with_records.id,
+            start_date=now - timedelta(days=30),
+            end_date=now,
+        )
+        assert len(rows) == 5
+        assert tuple(rows[0]._fields) == crud_health_record.TREND_COLUMNS
+        assert [row.overall_score for row in rows] == [70.0, 75.0, 82.0, 85.0, 90.0]
+
+    def test_echarts_data_uses_projection(self, session, user_with_records):
+        """测试 ECharts 数据由投影行生成，缺失的健康等级按评分补全"""
+        data_points, config = crud_health_record.get_echarts_data(
+            session,
+            user_id=user_with_records.id,
+            time_range=TimeRange.WEEK,
+        )
+        assert [dp.value for dp in data_points] == [85.0, 90.0]
+        assert data_points[-1].level == "excellent"
+        assert data_points[0].physical == 83.0
+        assert config["title"]["subtext"].startswith("共 2 次评估")
+
+
+class TestBulkOperations:
+    """批量更新与删除测试类"""
+
+    def test_bulk_update_recomputes_level(self, session, user_with_records):
+        """一条 UPDATE 更新多条记录，健康等级按新评分计算，其他用户的记录不受影响，统计行失效"""
+        other = User(email="other@example.com", username="otheruser", hashed_password="x" * 20)
+        session.add(other)
+        session.flush()
+        foreign = HealthRecord(
+            user_id=other.id, assessed_at=datetime.now(), overall_score=50.0,
+            assessment_type="quick", health_level="fair", data_source="manual",
+        )
+        session.add(foreign)
+        session.commit()
+        crud_health_stats.get_summary(session, user_id=user_with_records.id, time_range=TimeRange.MONTH)
+
+        ids = [record.id for record in user_with_records.health_records][:3]
+        updated = crud_health_record.bulk_update(
+            session,
+            user_id=user_with_records.id,
+            record_ids=ids + [foreign.id],
+            obj_in=HealthRecordUpdate(overall_score=35.0, assessment_notes="设备数据校正"),
+        )
+        assert updated == sorted(ids)
+        rows = session.query(HealthRecord).filter(HealthRecord.id.in_(ids)).all()
+        assert {(row.overall_score, row.health_level, row.notes) for row in rows} == {(35.0, "poor", "设备数据校正")}
+        assert session.get(HealthRecord, foreign.id).overall_score == 50.0
+        assert all(stats.stale for stats in session.query(HealthStats).filter_by(user_id=user_with_records.id))
+
+    def test_bulk_update_assessed_at_invalidates_stats(self, session, user_with_records):
+        """只修改评估时间也会使统计行失效 (记录可能移出或移入统计时间范围)"""
+        crud_health_stats.get_summary(session, user_id=user_with_records.id, time_range=TimeRange.WEEK)
+        ids = sorted(record.id for record in user_with_records.health_records)
+
+        updated = crud_health_record.bulk_update(
+            session,
+            user_id=user_with_records.id,
+            record_ids=ids[:1],
+            obj_in=HealthRecordUpdate(assessed_at=datetime.now() - timedelta(hours=1)),
+        )
+        assert updated == ids[:1]
+        assert all(stats.stale for stats in session.query(HealthStats).filter_by(user_id=user_with_records.id))
+        summary = crud_health_stats.get_summary(session, user_id=user_with_records.id, time_range=TimeRange.WEEK)
+        assert summary["total_assessments"] == 3
+
+    def test_bulk_delete_by_ids_and_filter(self, session, user_with_records):
+        """按筛选条件与ID列表删除并返回删除的ID，没有匹配时不提交"""
+        now = datetime.now()
+        ids = sorted(record.id for record in user_with_records.health_records)
+        deleted = crud_health_record.bulk_delete(
+            session,
+            user_id=user_with_records.id,
+            start_date=now - timedelta(days=12),
+            data_source="manual",
+        )
+        assert deleted == ids[2:]
+
+        assert crud_health_record.bulk_delete(session, user_id=user_with_records.id, record_ids=ids[2:]) == []
+        assert crud_health_record.bulk_delete(session, user_id=user_with_records.id, record_ids=ids) == ids[:2]
+        with pytest.raises(ValueError):
+            crud_health_record.bulk_delete(session, user_id=user_with_records.id)
+
+
+class TestSoftDelete:
+    """软删除与后台压缩测试类"""
+
+    def test_hard_delete_by_default(self, session, user_with_records):
+        """默认 (未开启软删除) 直接删除记录"""
+        assert settings.HEALTH_RECORDS_SOFT_DELETE is False
+        ids = sorted(record.id for record in user_with_records.health_records)
+        crud_health_record.delete(session, record_id=ids[0], user_id=user_with_records.id)
+        assert crud_health_record.bulk_delete(session, user_id=user_with_records.id, record_ids=ids[1:3]) == ids[1:3]
+        assert sorted(id_ for (id_,) in session.query(HealthRecord.id)) == ids[3:]
+
+    def test_deleted_records_hidden_then_compacted(self, session, user_with_records, monkeypatch):
+        """删除只标记 is_active，读取路径不再返回；压缩任务只物理删除超过保留时间的软删除记录"""
+        monkeypatch.setattr(settings, "HEALTH_RECORDS_SOFT_DELETE", True)
+        user_id = user_with_records.id
+        ids = sorted(record.id for record in user_with_records.health_records)
+        assert crud_health_record.delete(session, record_id=ids[0], user_id=user_id).is_active is False
+        assert crud_health_record.bulk_delete(session, user_id=user_id, record_ids=ids[1:3]) == ids[1:3]
+
+        assert crud_health_record.get(session, record_id=ids[0], user_id=user_id) is None
+        assert [record.id for record in crud_health_record.get_multi(session, user_id=user_id)] == ids[:2:-1]
+        assert crud_health_record.count_records(session, user_id=user_id) == 2
+        summary = crud_health_stats.get_summary(session, user_id=user_id, time_range=TimeRange.MONTH)
+        assert summary["total_assessments"] == 2
+        assert session.query(HealthRecord).count() == 5
+
+        compactor = RecordCompactor(sessionmaker(bind=session.get_bind()), batch_size=2, pause=0, min_age=3600)
+        assert compactor.compact_once() == 0
+        assert compactor.compact_once(now=datetime.now(timezone.utc) + timedelta(hours=2)) == 3
+        assert sorted(id_ for (id_,) in session.query(HealthRecord.id)) == ids[3:]
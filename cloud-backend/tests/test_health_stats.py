@@ -0,0 +1,187 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.metrics import health_stats_reads_total, singleflight_calls_total
+from app.crud.crud_health_record import health_record as crud_health_record
+from app.crud.crud_health_stats import health_stats as crud_health_stats
+from app.database import Base
+from app.models.health_stats import HealthStats
+from app.models.user import User
+from app.schemas.health_record import HealthRecordCreate, HealthRecordUpdate, TimeRange
+
+
+@pytest.fixture()
+def session():
+    """独立的内存 SQLite 会话"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture()
+def user_with_records(session):
+    """通过 CRUD 创建带有 5 条健康记录的用户"""
+    user = User(email="stats@example.com", username="statsuser", hashed_password="x" * 20)
+    session.add(user)
+    session.commit()
+    now = datetime.now()
+    records = [
+        crud_health_record.create(
+            session,
+            obj_in=HealthRecordCreate(
+                assessed_at=now - timedelta(days=days_ago),
+                overall_score=score,
+                assessment_type="comprehensive",
+            ),
+            user_id=user.id,
+        )
+        for days_ago, score in [(20, 70.0), (15, 75.0), (10, 82.0), (5, 85.0), (1, 90.0)]
+    ]
+    return user, records
+
+
+def recomputed_summary(session, user_id, time_range):
+    """按原始记录全量计算的摘要"""
+    start, end = crud_health_record._calculate_time_range(time_range)
+    rows = crud_health_record.get_trend_points(
+        session, user_id=user_id, start_date=start, end_date=end, limit=10_000
+    )
+    return crud_health_record._calculate_summary(session, user_id, rows, start, end)
+
+
+class TestRunningStats:
+    """Welford 增量统计测试类"""
+
+    def test_add_and_remove_match_batch_statistics(self):
+        """增量加入 / 移除后的均值与方差与全量计算一致"""
+        stats = HealthStats(user_id=1, time_range="all", count=0, mean=0.0, m2=0.0, level_counts={})
+        base = datetime(2024, 1, 1)
+        scores = [70.0, 75.0, 82.0, 85.0, 90.0]
+        for i, score in enumerate(scores):
+            stats.add_score(score, base + timedelta(days=i), "good")
+
+        assert stats.remove_score(82.0, base + timedelta(days=2), "good")
+        rest = [70.0, 75.0, 85.0, 90.0]
+        mean = sum(rest) / len(rest)
+        assert stats.mean == pytest.approx(mean)
+        assert stats.variance == pytest.approx(sum((s - mean) ** 2 for s in rest) / len(rest))
+        assert stats.level_counts == {"good": 4}
+
+        # 移除最值或首末记录需要重新计算
+        assert not stats.remove_score(90.0, base + timedelta(days=4), "good")
+        assert not stats.remove_score(75.0, base, "good")
+
+
+class TestHealthStatsCRUD:
+    """增量统计维护测试类"""
+
+    def test_summary_matches_full_recompute(self, session, user_with_records):
+        """写入路径增量更新后，摘要与全量计算一致且直接命中统计行"""
+        user, _ = user_with_records
+        crud_health_stats.get_summary(session, user_id=user.id, time_range=TimeRange.MONTH)
+
+        now = datetime.now()
+        crud_health_record.create(
+            session,
+            obj_in=HealthRecordCreate(assessed_at=now - timedelta(hours=1), overall_score=55.0),
+            user_id=user.id,
+        )
+        hits = health_stats_reads_total.value(("hit",))
+        for time_range in (TimeRange.WEEK, TimeRange.MONTH, TimeRange.ALL):
+            summary = crud_health_stats.get_summary(session, user_id=user.id, time_range=time_range)
+            assert summary == recomputed_summary(session, user.id, time_range)
+        assert health_stats_reads_total.value(("hit",)) == hits + 3
+
+    def test_update_and_delete(self, session, user_with_records):
+        """修改中间记录增量更新，删除最高分记录后重新计算"""
+        user, records = user_with_records
+        crud_health_stats.get_summary(session, user_id=user.id, time_range=TimeRange.MONTH)
+
+        crud_health_record.update(session, db_obj=records[2], obj_in=HealthRecordUpdate(overall_score=78.0))
+        stats = session.get(HealthStats, (user.id, TimeRange.MONTH.value))
+        assert not stats.stale
+        assert stats.mean == pytest.approx((70 + 75 + 78 + 85 + 90) / 5)
+
+        crud_health_record.delete(session, record_id=records[4].id, user_id=user.id)
+        assert session.get(HealthStats, (user.id, TimeRange.MONTH.value)).stale
+        summary = crud_health_stats.get_summary(session, user_id=user.id, time_range=TimeRange.MONTH)
+        assert summary == recomputed_summary(session, user.id, TimeRange.MONTH)
+        assert summary["max_score"] == 85.0
+
+    def test_window_expires_when_oldest_record_ages_out(self, session, user_with_records):
+        """最早的记录移出时间窗口后重新计算"""
+        user, _ = user_with_records
+        now = datetime.now()
+        summary = crud_health_stats.get_summary(session, user_id=user.id, time_range=TimeRange.WEEK, now=now)
+        assert summary["total_assessments"] == 2
+
+        later = now + timedelta(days=3)
+        refreshes = health_stats_reads_total.value(("refresh",))
+        summary = crud_health_stats.get_summary(session, user_id=user.id, time_range=TimeRange.WEEK, now=later)
+        assert summary["total_assessments"] == 1
+        assert health_stats_reads_total.value(("refresh",)) == refreshes + 1
+
+    def test_concurrent_refreshes_share_one_computation(self, tmp_path, monkeypatch):
+        """统计行失效后同一用户不同时间范围的并发摘要请求只重新计算一次"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        db = factory()
+        user = User(email="flight@example.com", username="flightuser", hashed_password="x" * 20)
+        db.add(user)
+        db.commit()
+        crud_health_record.create(
+            db, obj_in=HealthRecordCreate(assessed_at=datetime.now() - timedelta(days=1), overall_score=80.0),
+            user_id=user.id,
+        )
+        crud_health_stats.invalidate(db, user_id=user.id)
+        db.commit()
+        db.close()
+
+        release = threading.Event()
+        refreshes = []
+        original = type(crud_health_stats)._refresh
+
+        def blocking_refresh(self, db, *, user_id, now):
+            refreshes.append(user_id)
+            release.wait(5)
+            return original(self, db, user_id=user_id, now=now)
+
+        monkeypatch.setattr(type(crud_health_stats), "_refresh", blocking_refresh)
+        shared = singleflight_calls_total.value(("health_stats", "shared"))
+
+        def read(time_range):
+            session = factory()
+            try:
+                return crud_health_stats.get_summary(session, user_id=user.id, time_range=time_range)
+            finally:
+                session.close()
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            leader = pool.submit(read, TimeRange.MONTH)
+            while not refreshes:
+                threading.Event().wait(0.001)
+            followers = [pool.submit(read, TimeRange.WEEK), pool.submit(read, TimeRange.ALL)]
+            for _ in range(1000):
+                if singleflight_calls_total.value(("health_stats", "shared")) >= shared + 2:
+                    break
+                threading.Event().wait(0.005)
+            release.set()
+            summaries = [leader.result()] + [f.result() for f in followers]
+
+        assert refreshes == [user.id]
+        assert [summary["total_assessments"] for summary in summaries] == [1, 1, 1]
+        engine.dispose()
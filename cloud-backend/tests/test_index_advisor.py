@@ -0,0 +1,56 @@
+from app.database import Base
+from app.db.index_advisor import IndexInfo, find_redundant, indexes_from_metadata
+import app.models  # noqa: F401
+
+
+class TestIndexAdvisor:
+    """索引审计测试类"""
+
+    def test_prefix_index_is_redundant(self):
+        """测试作为复合索引前缀的单列索引被识别为冗余"""
+        indexes = [
+            IndexInfo("health_records", "pk", ["id"], unique=True, primary=True),
+            IndexInfo("health_records", "ix_user", ["user_id"]),
+            IndexInfo("health_records", "ix_user_date", ["user_id", "assessed_at"]),
+        ]
+        redundant = {r.index.name: r.covered_by.name for r in find_redundant(indexes)}
+        assert redundant == {"ix_user": "ix_user_date"}
+
+    def test_duplicate_of_primary_key_is_redundant(self):
+        """测试与主键重复的索引被识别为冗余，主键本身保留"""
+        indexes = [
+            IndexInfo("users", "users_pkey", ["id"], unique=True, primary=True),
+            IndexInfo("users", "ix_users_id", ["id"]),
+        ]
+        redundant = find_redundant(indexes)
+        assert [r.index.name for r in redundant] == ["ix_users_id"]
+
+    def test_index_starting_with_unique_key_is_redundant(self):
+        """测试以唯一键开头的复合索引被识别为冗余"""
+        indexes = [
+            IndexInfo("users", "ix_users_email", ["email"], unique=True),
+            IndexInfo("users", "ix_users_email_active", ["email", "is_active"]),
+        ]
+        redundant = find_redundant(indexes)
+        assert [r.index.name for r in redundant] == ["ix_users_email_active"]
+
+    def test_partial_index_not_compared_with_full_index(self):
+        """测试谓词不同的部分索引不被视为冗余"""
+        indexes = [
+            IndexInfo("users", "ix_a", ["email"], predicate="is_active"),
+            IndexInfo("users", "ix_b", ["email", "username"]),
+        ]
+        assert find_redundant(indexes) == []
+
+    def test_models_declare_no_redundant_indexes(self):
+        """测试模型中声明的索引没有冗余"""
+        assert find_redundant(indexes_from_metadata(Base.metadata)) == []
+
+    def test_models_declare_active_partial_indexes(self):
+        """测试 is_active 部分索引在模型中声明，低基数的 is_active 单列索引已移除"""
+        predicates = {info.name: info.predicate for info in indexes_from_metadata(Base.metadata)}
+        assert predicates["ix_users_created_at_active"] == "is_active"
+        assert predicates["ix_health_records_user_date_active"] == "is_active"
+        assert predicates["ix_health_records_search_active"] == "is_active"
+        assert predicates["ix_health_records_inactive"] == "NOT is_active"
+        assert "ix_users_is_active" not in predicates
@@ -0,0 +1,46 @@
+from benchmarks.load_test import SCENARIOS, compare_with_baseline, percentile
+from app.main import app
+
+
+def make_summary(p95_ms, throughput_rps, error_rate=0.0):
+    return {"p95_ms": p95_ms, "throughput_rps": throughput_rps, "error_rate": error_rate}
+
+
+class TestLoadTestHarness:
+    """负载测试工具测试类"""
+
+    def test_percentile_nearest_rank(self):
+        """最近秩法百分位数"""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_regressions_fail_loudly(self):
+        """延迟、吞吐量、错误率回退都会被报告"""
+        baseline = {"GET /a": make_summary(10.0, 100.0), "GET /b": make_summary(10.0, 100.0)}
+        results = {
+            "GET /a": make_summary(10.5, 95.0),
+            "GET /b": make_summary(20.0, 50.0, error_rate=0.1),
+            "GET /new": make_summary(1.0, 1.0),
+        }
+        regressions = compare_with_baseline(results, baseline, tolerance=0.2)
+        assert len(regressions) == 3
+        assert all(line.startswith("GET /b") for line in regressions)
+
+    def test_small_latency_jitter_is_ignored(self):
+        """低于最小差值的延迟波动不算回退"""
+        baseline = {"GET /a": make_summary(1.0, 100.0)}
+        assert compare_with_baseline({"GET /a": make_summary(1.8, 100.0)}, baseline, tolerance=0.2) == []
+
+    def test_scenarios_cover_all_routes(self):
+        """压测场景覆盖 users.py 与 health_trends.py 的全部路由"""
+        prefix = "/api/v1"
+        routes = {
+            f"{method} {route.path[len(prefix):].replace(':int', '')}"
+            for route in app.routes
+            if getattr(route, "tags", None) and set(route.tags) & {"users", "health-trends"}
+            for method in route.methods
+        }
+        assert routes == {scenario.name for scenario in SCENARIOS}
@@ -0,0 +1,132 @@
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import (
+    Histogram,
+    Registry,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    record_cache_lookup,
+    registry,
+)
+from app.core.config import settings
+from app.core.middleware import MetricsMiddleware
+from app.core.multiprocess_metrics import SnapshotExporter, merge_snapshots
+
+
+class TestRegistry:
+    """指标注册表测试类"""
+
+    def test_histogram_exposition(self):
+        """直方图按累计分桶输出"""
+        local = Registry()
+        histogram = local.register(Histogram("latency_seconds", "耗时", ("route",), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, ("/a",))
+
+        text = local.render()
+        assert "# TYPE latency_seconds histogram" in text
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{route="/a",le="1"} 3' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{route="/a"} 4' in text
+        assert 'latency_seconds_sum{route="/a"} 3.65' in text
+
+    def test_counter_and_label_escaping(self):
+        """计数器累加并转义标签值"""
+        local = Registry()
+        counter = local.counter("events_total", "事件数", ("name",))
+        counter.inc(('say "hi"',))
+        counter.inc(('say "hi"',), 2)
+        assert 'events_total{name="say \\"hi\\""} 3' in local.render()
+
+    def test_cache_hit_ratio(self):
+        """按缓存名称计算命中率"""
+        for hit in (True, True, True, False):
+            record_cache_lookup("test-cache", hit)
+        assert 'cache_hit_ratio{cache="test-cache"} 0.75' in registry.render()
+
+
+class TestMetricsMiddleware:
+    """路由指标中间件测试类"""
+
+    def test_labels_use_route_template(self):
+        """按路由模板而非实际路径统计"""
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def get_item(item_id: int):
+            assert http_requests_in_flight.value(("GET", "/items/{item_id}")) == 1
+            return {"id": item_id}
+
+        labels = ("GET", "/items/{item_id}")
+        before = http_request_duration_seconds.count(labels)
+        with TestClient(app) as client:
+            assert client.get("/items/1").status_code == 200
+            assert client.get("/items/2").status_code == 200
+            assert client.get("/nowhere").status_code == 404
+
+        assert http_request_duration_seconds.count(labels) - before == 2
+        assert http_requests_in_flight.value(labels) == 0
+        text = registry.render()
+        assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"}' in text
+        assert 'route="<unmatched>",status="404"' in text
+
+
+class TestMultiprocessMetrics:
+    """多工作进程指标汇总测试类"""
+
+    def test_merge_adds_worker_label_and_dedupes_headers(self):
+        """合并后每条样本带 worker 标签，HELP / TYPE 只输出一次"""
+        first, second = Registry(), Registry()
+        for local, count in ((first, 2), (second, 3)):
+            counter = local.counter("jobs_total", "任务数", ("route",))
+            counter.inc(("/a",), count)
+            local.gauge("idle", "空闲数").set(1)
+
+        text = merge_snapshots([("101", first.render()), ("102", second.render())])
+        assert text.count("# TYPE jobs_total counter") == 1
+        assert text.count("# HELP idle") == 1
+        assert 'jobs_total{worker="101",route="/a"} 2' in text
+        assert 'jobs_total{worker="102",route="/a"} 3' in text
+        assert 'idle{worker="102"} 1' in text
+        # 同一指标的样本紧跟在其 TYPE 之后
+        lines = text.splitlines()
+        type_at = lines.index("# TYPE jobs_total counter")
+        assert lines[type_at + 1].startswith("jobs_total{") and lines[type_at + 2].startswith("jobs_total{")
+
+    def test_exporter_merges_fresh_snapshots_only(self, tmp_path):
+        """抓取时合并其他进程的快照，跳过过期文件，退出时删除自己的快照"""
+        local = Registry()
+        local.counter("jobs_total", "任务数").inc()
+        exporter = SnapshotExporter(local, str(tmp_path), interval=5.0)
+        other = Registry()
+        other.counter("jobs_total", "任务数").inc((), 4)
+        (tmp_path / "999.prom").write_text(other.render(), encoding="utf-8")
+        stale = tmp_path / "998.prom"
+        stale.write_text(other.render(), encoding="utf-8")
+        os.utime(stale, (time.time() - 60, time.time() - 60))
+
+        text = exporter.render()
+        assert f'jobs_total{{worker="{os.getpid()}"}} 1' in text
+        assert 'jobs_total{worker="999"} 4' in text
+        assert 'worker="998"' not in text
+
+        exporter.start()
+        assert exporter.path.exists()
+        exporter.stop()
+        assert not exporter.path.exists()
+
+    def test_internal_endpoints_require_admin_token(self, client, monkeypatch):
+        """/metrics 与 /health/db-pool 需携带管理员令牌"""
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+        assert client.get("/metrics").status_code == 404
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+        for path in ("/metrics", "/health/db-pool"):
+            assert client.get(path).status_code == 403
+            assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+            assert client.get(path, headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,24 @@
+from benchmarks.bench_micro import build_cases, compare, run_case
+
+
+def make_result(name, median):
+    return {"name": name, "stats": {"median": median}}
+
+
+class TestMicroBenchmarks:
+    """微基准工具测试类"""
+
+    def test_every_case_runs(self):
+        """所有用例都能运行并产生统计"""
+        for case in build_cases():
+            result = run_case(case, rounds=2, min_time=0.0)
+            assert result["stats"]["rounds"] == 2
+            assert result["stats"]["min"] <= result["stats"]["median"] <= result["stats"]["max"]
+
+    def test_compare_reports_median_regressions(self):
+        """中位数变慢超过容差才报告"""
+        previous = [make_result("a", 1.0), make_result("b", 1.0)]
+        current = [make_result("a", 1.05), make_result("b", 1.5), make_result("new", 9.0)]
+        regressions = compare(current, previous, tolerance=0.1)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("b:")
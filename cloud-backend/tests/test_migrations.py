@@ -0,0 +1,170 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+from app import database
+from app.db.migrations import (
+    MIGRATIONS_DIR,
+    check_schema_version,
+    load_migrations,
+    retry_on_lock_timeout,
+    split_statements,
+    stamp,
+    upgrade,
+)
+from app.db.partitioning import convert_to_partitioned
+
+
+class LockNotAvailable(Exception):
+    pgcode = "55P03"
+
+
+def write(directory, name, content):
+    (directory / name).write_text(content, encoding="utf-8")
+
+
+class TestMigrations:
+    """版本化迁移测试类"""
+
+    def test_split_statements(self):
+        """分号拆分忽略引号、$$ 块和注释"""
+        sql = """
+            -- 注释里的分号; 不拆分
+            CREATE TABLE t (note TEXT DEFAULT 'a;b');
+            DO $$ BEGIN PERFORM 1; END $$;
+            SELECT 1
+        """
+        statements = split_statements(sql)
+        assert len(statements) == 3
+        assert statements[0].endswith("DEFAULT 'a;b')")
+        assert statements[1] == "DO $$ BEGIN PERFORM 1; END $$"
+
+    def test_concurrently_runs_outside_transaction(self):
+        """含 CONCURRENTLY 的现有迁移自动按逐条自动提交执行"""
+        migrations = {m.version: m for m in load_migrations(MIGRATIONS_DIR)}
+        assert not migrations[1].transactional
+        assert not migrations[2].transactional
+
+    def test_upgrade_backfill_and_version_check(self, tmp_path):
+        """按版本执行 SQL 与 Python 迁移、分批回填，并可重复执行"""
+        write(tmp_path, "0001_create_items.sql", """
+            -- migrate: lock-timeout=1s
+            CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER);
+            INSERT INTO items (id, value) VALUES (1, 1), (2, 2), (3, 3), (4, 4), (5, 5);
+        """)
+        write(tmp_path, "0002_add_doubled.sql", "ALTER TABLE items ADD COLUMN doubled INTEGER;")
+        write(tmp_path, "0003_backfill_doubled.py", "\n".join([
+            "def upgrade(ctx):",
+            "    assert ctx.backfill('items', 'doubled = value * 2', where='doubled IS NULL',"
+            " batch_size=2, pause=0) == 5",
+        ]))
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+
+        status = check_schema_version(engine, tmp_path)
+        assert status.current is None and status.latest == 3 and len(status.pending) == 3
+
+        assert [m.version for m in upgrade(engine, target=2, directory=tmp_path)] == [1, 2]
+        assert check_schema_version(engine, tmp_path).pending == ["0003_backfill_doubled"]
+        assert [m.version for m in upgrade(engine, directory=tmp_path)] == [3]
+        assert upgrade(engine, directory=tmp_path) == []
+        assert check_schema_version(engine, tmp_path).up_to_date
+
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT value, doubled FROM items")).all()
+        assert all(doubled == value * 2 for value, doubled in rows)
+
+    def test_failed_transactional_migration_is_not_recorded(self, tmp_path):
+        """事务迁移失败时整体回滚且不记录版本"""
+        write(tmp_path, "0001_create_items.sql", "CREATE TABLE items (id INTEGER PRIMARY KEY);")
+        write(tmp_path, "0002_broken.sql", "INSERT INTO items (id) VALUES (1); SELECT * FROM missing_table;")
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        with pytest.raises(DBAPIError):
+            upgrade(engine, directory=tmp_path)
+        assert check_schema_version(engine, tmp_path).current == 1
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM items")).scalar() == 0
+
+    def test_empty_and_modified_migrations_refused(self, tmp_path):
+        """未填写的迁移报错且不记录版本，已执行的迁移被修改后拒绝升级"""
+        write(tmp_path, "0001_create_items.sql", "CREATE TABLE items (id INTEGER PRIMARY KEY);")
+        write(tmp_path, "0002_todo.sql", "-- 待补充\n-- migrate: lock-timeout=5s\n")
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        with pytest.raises(ValueError, match="没有任何 SQL 语句"):
+            upgrade(engine, directory=tmp_path)
+        assert check_schema_version(engine, tmp_path).current == 1
+
+        (tmp_path / "0002_todo.sql").unlink()
+        write(tmp_path, "0002_todo.py", "def upgrade(ctx):\n    pass\n")
+        with pytest.raises(ValueError, match="没有执行任何语句"):
+            upgrade(engine, directory=tmp_path)
+        write(tmp_path, "0002_todo.py", "def upgrade(ctx):\n    ctx.execute('ALTER TABLE items ADD COLUMN note TEXT')\n")
+        assert [m.version for m in upgrade(engine, directory=tmp_path)] == [2]
+
+        write(tmp_path, "0001_create_items.sql", "CREATE TABLE items (id INTEGER PRIMARY KEY, extra TEXT);")
+        with pytest.raises(ValueError, match="0001_create_items"):
+            upgrade(engine, directory=tmp_path)
+
+    def test_retry_on_lock_timeout(self):
+        """锁等待超时重试，其他错误直接抛出"""
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise DBAPIError("ALTER TABLE", {}, LockNotAvailable())
+            return "done"
+
+        assert retry_on_lock_timeout(flaky, retries=3, wait=0) == "done"
+        assert len(attempts) == 3
+
+        def broken():
+            raise DBAPIError("ALTER TABLE", {}, Exception("syntax error"))
+
+        with pytest.raises(DBAPIError):
+            retry_on_lock_timeout(broken, retries=3, wait=0)
+
+    def test_startup_modes(self, tmp_path, monkeypatch):
+        """strict 模式在版本落后时拒绝启动，check 只告警"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        monkeypatch.setattr(database, "engine", engine)
+
+        with pytest.raises(RuntimeError):
+            database.prepare_schema("strict")
+        database.prepare_schema("check")
+        database.prepare_schema("skip")
+
+        stamp(engine, max(m.version for m in load_migrations()))
+        database.prepare_schema("strict")
+
+    def test_concurrent_index_migrations_on_partitioned_table(self, pg_engine):
+        """分区表上的 CONCURRENTLY 迁移按分区建索引并挂载，现有迁移可完整执行且可重复执行"""
+        with pg_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO users (id, email, username, hashed_password, is_active, created_at, updated_at) "
+                "VALUES (1, 'mig@example.com', 'miguser', 'xxxxxxxxxxxx', true, now(), now())"
+            ))
+            conn.execute(text(
+                "INSERT INTO health_records (user_id, assessed_at, overall_score, assessment_type, "
+                "data_source, is_active, created_at, updated_at) "
+                "VALUES (1, now() - interval '40 days', 80, 'quick', 'manual', true, now(), now())"
+            ))
+        convert_to_partitioned(pg_engine)
+
+        assert [m.version for m in upgrade(pg_engine, retry_wait=0)] == [m.version for m in load_migrations()]
+        with pg_engine.connect() as conn:
+            partitions = conn.execute(text(
+                "SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass('health_records')"
+            )).scalar()
+            for index in ("ix_health_records_user_date_active", "ix_health_records_search_active"):
+                valid, attached = conn.execute(text(
+                    "SELECT i.indisvalid, (SELECT count(*) FROM pg_inherits WHERE inhparent = i.indexrelid) "
+                    "FROM pg_index i WHERE i.indexrelid = to_regclass(:index)"
+                ), {"index": index}).one()
+                assert valid and attached == partitions
+            # 0002 创建、0006 删除的覆盖索引
+            assert conn.execute(text("SELECT to_regclass('ix_health_records_user_date_cover')")).scalar() is None
+
+        # 中断后重新执行 (版本未记录): 已挂载的分区跳过
+        with pg_engine.begin() as conn:
+            conn.execute(text("DELETE FROM schema_migrations WHERE version = 6"))
+        assert [m.version for m in upgrade(pg_engine, retry_wait=0)] == [6]
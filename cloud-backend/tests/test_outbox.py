@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.outbox import OutboxWorker
+from app.crud.crud_health_alert import health_alert as crud_health_alert
+from app.crud.crud_health_record import health_record as crud_health_record
+from app.crud.crud_outbox import HEALTH_RECORD_CREATED, outbox as crud_outbox
+from app.database import Base
+from app.models.outbox import OutboxEvent
+from app.models.user import User
+from app.schemas.health_record import HealthRecordCreate
+
+
+@pytest.fixture()
+def session_factory():
+    """独立的内存 SQLite 会话工厂"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with factory() as db:
+        db.add(User(id=1, email="outbox@example.com", username="outboxuser", hashed_password="x" * 20))
+        db.commit()
+    yield factory
+    Base.metadata.drop_all(bind=engine)
+
+
+def events(factory):
+    """全部发件箱事件 (按 id)"""
+    with factory() as db:
+        return list(db.scalars(select(OutboxEvent).order_by(OutboxEvent.id)))
+
+
+class TestOutbox:
+    """事务发件箱测试类"""
+
+    def test_record_and_event_committed_together(self, session_factory):
+        """创建记录时同一事务写入事件，工作进程处理后生成告警，重复领取不会重复处理"""
+        worker = OutboxWorker(session_factory, crud_outbox)
+        worker.register(HEALTH_RECORD_CREATED, crud_health_alert.process_record_events)
+
+        with session_factory() as db:
+            record = crud_health_record.create(
+                db,
+                obj_in=HealthRecordCreate(
+                    assessed_at=datetime.now() - timedelta(hours=1),
+                    overall_score=80.0,
+                    detailed_metrics={"heart_rate": 160},
+                ),
+                user_id=1,
+            )
+        [event] = events(session_factory)
+        assert (event.status, event.payload["record_id"]) == ("pending", record.id)
+
+        assert worker.drain_once() == 1
+        assert worker.drain_once() == 0
+        assert events(session_factory)[0].status == "done"
+        with session_factory() as db:
+            alerts = crud_health_alert.get_multi(db, user_id=1)
+        assert [(alert.alert_type, alert.record_id) for alert in alerts] == [("heart_rate", record.id)]
+
+    def test_failed_event_retried_then_dead(self, session_factory):
+        """出错的事件与同批其他事件隔离，按退避重试，超过最大次数后标记为 dead"""
+        def handler(db, payloads):
+            if any(payload.get("poison") for payload in payloads):
+                raise ValueError("bad payload")
+
+        worker = OutboxWorker(session_factory, crud_outbox, max_attempts=2, retry_backoff=10)
+        worker.register("test.topic", handler)
+        with session_factory() as db:
+            crud_outbox.add(db, "test.topic", [{"poison": True}, {"poison": False}])
+            db.commit()
+
+        now = datetime.now(timezone.utc) + timedelta(seconds=1)
+        assert worker.drain_once(now=now) == 2
+        poison, ok = events(session_factory)
+        assert (poison.status, poison.attempts, ok.status) == ("pending", 1, "done")
+        assert "bad payload" in poison.last_error
+
+        # 退避期间不会再次领取
+        assert worker.drain_once(now=now + timedelta(seconds=5)) == 0
+        assert worker.drain_once(now=now + timedelta(seconds=11)) == 1
+        assert events(session_factory)[0].status == "dead"
+
+    def test_backlog_reports_pending_count_and_age(self, session_factory):
+        """积压统计只计待处理事件，等待时间从最早的事件算起"""
+        worker = OutboxWorker(session_factory, crud_outbox)
+        worker.register("test.topic", lambda db, payloads: None)
+        assert worker.backlog() == (0, 0.0)
+
+        with session_factory() as db:
+            crud_outbox.add(db, "test.topic", [{"n": 1}, {"n": 2}])
+            db.commit()
+        created = events(session_factory)[0].created_at.replace(tzinfo=timezone.utc)
+        count, age = worker.backlog(now=created + timedelta(minutes=10))
+        assert count == 2 and age == pytest.approx(600, abs=1)
+
+        worker.drain_once(now=created + timedelta(seconds=1))
+        assert worker.backlog(now=created + timedelta(minutes=10)) == (0, 0.0)
@@ -0,0 +1,113 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.db.partitioning import (
+    add_months,
+    convert_to_partitioned,
+    create_partition_sql,
+    detach_partitions_before,
+    ensure_partitions,
+    iter_months,
+    list_partitions,
+    parse_partition_month,
+    partition_bounds,
+    partition_name,
+)
+
+
+class TestPartitionHelpers:
+    """分区工具函数测试类"""
+
+    def test_add_months_across_year(self):
+        """测试跨年的月份加减"""
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+    def test_iter_months_inclusive(self):
+        """测试月份区间为闭区间且按月对齐"""
+        months = iter_months(date(2025, 11, 15), date(2026, 1, 2))
+        assert months == [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)]
+
+    def test_partition_name_roundtrip(self):
+        """测试分区名生成与解析"""
+        name = partition_name(date(2026, 3, 1))
+        assert name == "health_records_p202603"
+        assert parse_partition_month(name) == date(2026, 3, 1)
+        assert parse_partition_month("health_records_default") is None
+
+    def test_partition_bounds_and_ddl(self):
+        """测试分区边界为左闭右开的 UTC 月份"""
+        lower, upper = partition_bounds(date(2025, 12, 1))
+        assert lower == "2025-12-01 00:00:00+00"
+        assert upper == "2026-01-01 00:00:00+00"
+        sql = create_partition_sql(date(2025, 12, 1))
+        assert "PARTITION OF health_records" in sql
+        assert f"FROM ('{lower}') TO ('{upper}')" in sql
+
+
+class TestPartitionConversion:
+    """分区转换与分离测试类 (需要 PostgreSQL，见 conftest.pg_engine)"""
+
+    def seed(self, engine, *moments):
+        """写入一个用户和指定评估时间 (UTC) 的记录"""
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO users (id, email, username, hashed_password, is_active, created_at, updated_at) "
+                "VALUES (1, 'part@example.com', 'partuser', 'xxxxxxxxxxxx', true, now(), now())"
+            ))
+            for moment in moments:
+                conn.execute(text(
+                    "INSERT INTO health_records (user_id, assessed_at, overall_score, assessment_type, "
+                    "data_source, is_active, created_at, updated_at) "
+                    "VALUES (1, :at, 80, 'quick', 'manual', true, now(), now())"
+                ), {"at": moment})
+
+    def test_convert_copies_rows_across_local_month_boundary(self, pg_engine):
+        """会话时区非 UTC 时，UTC 月初 / 月末附近的记录也全部迁移，原表可安全删除"""
+        self.seed(
+            pg_engine,
+            # 会话时区 (UTC+8) 下已是 2 月，但属于 UTC 1 月分区
+            datetime(2026, 1, 31, 20, 0, tzinfo=timezone.utc),
+            datetime(2026, 2, 15, 12, 0, tzinfo=timezone.utc),
+            datetime(2026, 3, 31, 23, 30, tzinfo=timezone.utc),
+        )
+        assert convert_to_partitioned(pg_engine, drop_legacy=True) == 3
+        with pg_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM health_records_p202601")).scalar() == 1
+            assert conn.execute(text("SELECT count(*) FROM health_records")).scalar() == 3
+
+    def test_concurrent_detach_refused_with_default_partition(self, pg_engine):
+        """转换后的表有 DEFAULT 分区，CONCURRENTLY 分离给出明确错误，普通分离正常执行"""
+        self.seed(pg_engine, datetime(2026, 1, 10, tzinfo=timezone.utc), datetime(2026, 2, 10, tzinfo=timezone.utc))
+        convert_to_partitioned(pg_engine)
+
+        with pytest.raises(ValueError, match="DEFAULT"):
+            detach_partitions_before(pg_engine, date(2026, 2, 1), concurrently=True)
+        with pg_engine.connect() as conn:
+            assert "health_records_p202601" in {p.name for p in list_partitions(conn)}
+
+        assert detach_partitions_before(pg_engine, date(2026, 2, 1), drop=True) == ["health_records_p202601"]
+
+    def test_premake_moves_future_rows_out_of_default(self, pg_engine):
+        """DEFAULT 分区中已有未来月份的记录时，预建该月份分区会把记录移入新分区"""
+        self.seed(pg_engine, datetime(2026, 1, 10, tzinfo=timezone.utc))
+        convert_to_partitioned(pg_engine, premake_months=0)
+        with pg_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO health_records (user_id, assessed_at, overall_score, assessment_type, "
+                "data_source, is_active, created_at, updated_at) "
+                "VALUES (1, '2030-01-15 08:00:00+00', 80, 'quick', 'manual', true, now(), now())"
+            ))
+            assert conn.execute(text("SELECT count(*) FROM health_records_default")).scalar() == 1
+
+        with pg_engine.begin() as conn:
+            assert ensure_partitions(conn, date(2029, 12, 1), date(2030, 1, 1)) == [
+                "health_records_p202912", "health_records_p203001",
+            ]
+        with pg_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM health_records_p203001")).scalar() == 1
+            assert conn.execute(text("SELECT count(*) FROM health_records_default")).scalar() == 0
+            assert conn.execute(text("SELECT count(*) FROM health_records")).scalar() == 2
+            assert "DEFAULT" in {p.bound for p in list_partitions(conn)}
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.db.pool import InstrumentedQueuePool, compute_pool_sizing, install_idle_liveness_check, pool_status
+
+
+class TestComputePoolSizing:
+    """按工作进程数计算连接池大小"""
+
+    def test_budget_split_across_workers(self):
+        """每个进程分得的连接数之和不超过预算"""
+        sizing = compute_pool_sizing(budget=90, workers=4)
+        assert sizing.max_connections * 4 <= 90
+        assert sizing.pool_size == 14
+        assert sizing.max_overflow == 8
+
+    def test_explicit_values_override(self):
+        """显式指定的池大小优先"""
+        sizing = compute_pool_sizing(budget=90, workers=1, pool_size=5, max_overflow=0)
+        assert (sizing.pool_size, sizing.max_overflow) == (5, 0)
+
+    def test_tiny_budget_keeps_one_connection(self):
+        """预算小于进程数时每个进程至少保留一个连接"""
+        sizing = compute_pool_sizing(budget=2, workers=8)
+        assert sizing.pool_size == 1
+
+
+class TestInstrumentedQueuePool:
+    """连接借出统计"""
+
+    @pytest.fixture()
+    def engine(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        yield engine
+        engine.dispose()
+
+    def test_records_checkouts_and_timeouts(self, engine):
+        """成功借出计数，池耗尽时记录超时"""
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+            status = pool_status(engine)
+            assert status["checked_out"] == 1
+        status = pool_status(engine)
+        assert status["checkouts_total"] == 1
+        assert status["timeouts_total"] == 1
+        assert status["checked_in"] == 1
+
+    def test_idle_liveness_check_replaces_dead_connection(self, engine):
+        """空闲超过阈值且已失效的连接在借出时被替换"""
+        install_idle_liveness_check(engine, idle_seconds=0.01)
+        with engine.connect() as conn:
+            dead = conn.connection.dbapi_connection
+        # 模拟服务端断开空闲连接
+        dead.close()
+        time.sleep(0.02)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert conn.connection.dbapi_connection is not dead
@@ -0,0 +1,187 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.crud.crud_health_record import health_record as crud_health_record
+from app.database import Base
+from app.db.pooler import SingleTransactionSession, pooler_connect_args, pooler_engine_kwargs, single_transaction
+from app.models.health_record import HealthRecord
+from app.models.user import User
+
+# 事务级代理不支持的会话级语句
+SESSION_LEVEL_PREFIXES = ("PREPARE", "SET ", "LISTEN", "DECLARE")
+
+
+class TransactionPoolerStandIn:
+    """
+    事务级连接池代理的本地替身 (基于 SQLite 文件)
+
+    统计客户端建立的连接数与提交/回滚的事务数，并记录代理无法支持的会话级语句。
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.connections = 0
+        self.transactions = 0
+        self.rejected = []
+
+    def connect(self):
+        self.connections += 1
+        return _ClientConnection(self, sqlite3.connect(self.path, check_same_thread=False))
+
+
+class _ClientConnection:
+    """代理客户端连接：转发到 SQLite 连接并统计事务"""
+
+    def __init__(self, pooler, raw):
+        object.__setattr__(self, "_pooler", pooler)
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_in_transaction", False)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    def cursor(self, *args):
+        return _ClientCursor(self, self._raw.cursor(*args))
+
+    def _statement(self, statement):
+        if statement.lstrip().upper().startswith(SESSION_LEVEL_PREFIXES):
+            self._pooler.rejected.append(statement)
+        object.__setattr__(self, "_in_transaction", True)
+
+    def _end(self, method):
+        if self._in_transaction:
+            self._pooler.transactions += 1
+            object.__setattr__(self, "_in_transaction", False)
+        return getattr(self._raw, method)()
+
+    def commit(self):
+        return self._end("commit")
+
+    def rollback(self):
+        return self._end("rollback")
+
+
+class _ClientCursor:
+    """代理客户端游标"""
+
+    def __init__(self, connection, raw):
+        self._connection = connection
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def execute(self, statement, *args):
+        self._connection._statement(statement)
+        return self._raw.execute(statement, *args)
+
+    def executemany(self, statement, *args):
+        self._connection._statement(statement)
+        return self._raw.executemany(statement, *args)
+
+
+@pytest.fixture()
+def pooler(tmp_path):
+    return TransactionPoolerStandIn(tmp_path / "pooled.db")
+
+
+@pytest.fixture()
+def factory(pooler):
+    """通过代理替身连接、使用代理模式配置的会话工厂"""
+    engine = create_engine(
+        "sqlite://",
+        creator=pooler.connect,
+        **pooler_engine_kwargs("sqlite://", pool_size=0, pool_timeout=1.0),
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, class_=SingleTransactionSession, autoflush=False, expire_on_commit=False)
+    engine.dispose()
+
+
+def add_user_with_record(db, username):
+    """按 CRUD 层的写法写入用户和记录：每次写入后都调用 commit()"""
+    user = User(email=f"{username}@example.com", username=username, hashed_password="x" * 20)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.add(HealthRecord(
+        user_id=user.id,
+        assessed_at=datetime.now() - timedelta(days=1),
+        overall_score=75.0,
+        assessment_type="quick",
+        data_source="manual",
+    ))
+    db.commit()
+    return user
+
+
+class TestPoolerEngineConfig:
+    """代理模式引擎参数测试类"""
+
+    def test_null_pool_without_pre_ping(self):
+        """pool_size 为 0 时使用 NullPool 且关闭 pre_ping"""
+        kwargs = pooler_engine_kwargs("postgresql://u:p@pgbouncer:6432/db", pool_size=0, pool_timeout=5)
+        assert kwargs["poolclass"] is NullPool
+        assert kwargs["pool_pre_ping"] is False
+
+    def test_small_pool_has_no_overflow(self):
+        """指定 pool_size 时使用不溢出的小连接池"""
+        kwargs = pooler_engine_kwargs("postgresql://u:p@pgbouncer:6432/db", pool_size=2, pool_timeout=5)
+        assert kwargs["pool_size"] == 2
+        assert kwargs["max_overflow"] == 0
+
+    def test_psycopg3_disables_prepared_statements(self):
+        """psycopg 3 关闭自动预编译"""
+        assert pooler_connect_args("postgresql+psycopg://u:p@h/db") == {"prepare_threshold": None}
+        assert pooler_connect_args("postgresql+psycopg2://u:p@h/db") == {}
+
+
+class TestSingleTransactionRequests:
+    """经由代理替身的单事务请求测试类"""
+
+    def test_request_uses_one_connection_and_one_transaction(self, pooler, factory):
+        """请求内多次 commit() 合并为一个事务，只占用一个代理连接"""
+        connections, transactions = pooler.connections, pooler.transactions
+        db = factory()
+        with single_transaction(db):
+            user = add_user_with_record(db, "pooled")
+            assert crud_health_record.count_records(db, user_id=user.id) == 1
+        db.close()
+
+        assert pooler.connections - connections == 1
+        assert pooler.transactions - transactions == 1
+        assert pooler.rejected == []
+
+        db = factory()
+        assert db.query(User).filter(User.username == "pooled").count() == 1
+        db.close()
+
+    def test_request_error_rolls_back_everything(self, factory):
+        """请求出错时整个请求的写入全部回滚"""
+        db = factory()
+        with pytest.raises(RuntimeError):
+            with single_transaction(db):
+                add_user_with_record(db, "doomed")
+                raise RuntimeError("请求处理失败")
+        db.close()
+
+        db = factory()
+        assert db.query(User).count() == 0
+        assert db.query(HealthRecord).count() == 0
+        db.close()
+
+    def test_commit_outside_request_is_normal(self, pooler, factory):
+        """上下文之外 (脚本、后台任务) commit() 正常提交"""
+        db = factory()
+        transactions = pooler.transactions
+        add_user_with_record(db, "script")
+        assert pooler.transactions - transactions == 2
+        db.close()
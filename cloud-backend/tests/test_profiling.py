@@ -0,0 +1,73 @@
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import Profile, ProfileStore, ProfilingMiddleware
+
+
+def burn_cpu(seconds):
+    """占用 CPU 一段时间"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(1000))
+    return total
+
+
+def make_app(store, **options):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store, interval_ms=1.0, **options)
+
+    @app.get("/slow")
+    def slow():
+        burn_cpu(0.1)
+        return {"ok": True}
+
+    return app
+
+
+class TestProfilingMiddleware:
+    """按需剖析中间件测试类"""
+
+    def test_header_triggers_profile(self):
+        """携带管理员令牌的请求被剖析，折叠栈包含端点函数"""
+        store = ProfileStore(capacity=5)
+        with TestClient(make_app(store, admin_token="secret")) as client:
+            plain = client.get("/slow")
+            wrong = client.get("/slow", headers={"X-Profile": "guess"})
+            profiled = client.get("/slow", headers={"X-Profile": "secret"})
+
+        assert "x-profile-id" not in plain.headers
+        assert "x-profile-id" not in wrong.headers
+        profile = store.get(int(profiled.headers["x-profile-id"]))
+        assert profile is not None and profile.trigger == "header"
+        assert profile.samples > 0
+        collapsed = profile.collapsed()
+        assert "burn_cpu (test_profiling.py)" in collapsed
+        # 折叠栈格式: 以分号分隔的栈帧 + 空格 + 次数
+        stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+
+    def test_sample_rate(self):
+        """抽样比例为 1 时每个请求都被剖析"""
+        store = ProfileStore(capacity=5)
+        with TestClient(make_app(store, sample_rate=1.0)) as client:
+            client.get("/slow")
+        assert [p.trigger for p in store.list()] == ["sampled"]
+
+
+class TestProfileStore:
+    """剖析结果环形缓冲区测试类"""
+
+    def test_keeps_most_recent(self):
+        """超出容量时丢弃最旧的结果"""
+        store = ProfileStore(capacity=2)
+        for _ in range(3):
+            store.add(Profile(
+                id=store.next_id(), method="GET", path="/", trigger="sampled",
+                started_at=datetime.now(timezone.utc), duration_ms=1.0, interval_ms=5.0, samples=0,
+            ))
+        assert [p.id for p in store.list()] == [3, 2]
+        assert store.get(1) is None
@@ -0,0 +1,124 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import rate_limited_requests_total
+from app.core.ratelimit import (
+    CounterStoreLimiter,
+    LocalCounterStore,
+    RateLimitMiddleware,
+    TokenBucketLimiter,
+    TokenCache,
+    client_key,
+    route_cost,
+)
+from app.core.security import create_access_token
+
+
+def make_scope(authorization: bytes = b"", client: str = "10.0.0.1") -> dict:
+    """构造 ASGI scope"""
+    headers = [(b"authorization", authorization)] if authorization else []
+    return {"type": "http", "headers": headers, "client": (client, 1234)}
+
+
+class TestTokenBucket:
+    """令牌桶测试类"""
+
+    def test_burst_then_refill(self):
+        """突发额度用完后按速率补充"""
+        limiter = TokenBucketLimiter(rate=2.0, burst=10)
+        assert limiter.consume("user:1", 10, now=0.0).allowed
+        denied = limiter.consume("user:1", 5, now=0.0)
+        assert not denied.allowed
+        assert denied.retry_after == 2.5
+        assert limiter.consume("user:1", 5, now=2.5).allowed
+        # 不同的键互不影响
+        assert limiter.consume("user:2", 10, now=2.5).allowed
+
+    def test_prune_drops_only_full_buckets(self):
+        """键数量达到上限时只清理已补满的桶"""
+        limiter = TokenBucketLimiter(rate=1.0, burst=5, max_keys=2)
+        limiter.consume("a", 5, now=0.0)
+        limiter.consume("b", 5, now=9.0)
+        limiter.consume("c", 1, now=10.0)
+        assert set(limiter._buckets) == {"b", "c"}
+
+    def test_route_costs(self):
+        """批量创建与分析型读取消耗更多令牌"""
+        assert route_cost("POST", "/api/v1/users/1/health-records/batch") == 10
+        assert route_cost("GET", "/api/v1/users/1/health-trends") == 5
+        assert route_cost("POST", "/api/v1/users/1/health-records") == 2
+        assert route_cost("GET", "/api/v1/users/1/health-records") == 1
+
+
+class TestCounterStoreLimiter:
+    """共享计数限流测试类"""
+
+    def test_window_limit(self):
+        """同一窗口内超过 burst 后拒绝"""
+        async def scenario():
+            limiter = CounterStoreLimiter(LocalCounterStore(), rate=1.0, burst=3600)
+            first = await limiter.hit("ip:1", 3000)
+            second = await limiter.hit("ip:1", 1000)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first.allowed and first.remaining == 600
+        assert not second.allowed and 0 < second.retry_after <= 3600
+
+
+class TestClientKey:
+    """限流键测试类"""
+
+    def test_user_key_from_valid_token(self):
+        """有效令牌按用户计数，无效令牌按 IP 计数"""
+        tokens = TokenCache()
+        token = create_access_token(7)
+        assert client_key(make_scope(f"Bearer {token}".encode()), tokens) == "user:7"
+        assert client_key(make_scope(b"Bearer forged"), tokens) == "ip:10.0.0.1"
+        assert client_key(make_scope(client="10.0.0.2"), tokens) == "ip:10.0.0.2"
+
+    def test_token_verified_once(self, monkeypatch):
+        """同一令牌只校验一次签名"""
+        calls = []
+        import app.core.ratelimit as ratelimit
+
+        def decode(token):
+            calls.append(token)
+            return {"sub": "9", "exp": 4102444800}
+
+        monkeypatch.setattr(ratelimit, "decode_access_token", decode)
+        tokens = TokenCache()
+        for _ in range(3):
+            assert tokens.user_id("abc", now=0.0) == "9"
+        assert calls == ["abc"]
+
+
+class TestRateLimitMiddleware:
+    """限流中间件测试类"""
+
+    def test_returns_429_with_retry_after(self):
+        """超出额度返回 429，API 前缀之外的路径不限流"""
+        app = FastAPI()
+        app.add_middleware(
+            RateLimitMiddleware, limiter=TokenBucketLimiter(rate=0.5, burst=5), api_prefix="/api"
+        )
+
+        @app.get("/api/users/1/health-trends")
+        def trends():
+            return {"ok": True}
+
+        @app.get("/health")
+        def health():
+            return {"ok": True}
+
+        before = rate_limited_requests_total.value(("ip",))
+        with TestClient(app) as client:
+            assert client.get("/api/users/1/health-trends").status_code == 200
+            limited = client.get("/api/users/1/health-trends")
+            assert all(client.get("/health").status_code == 200 for _ in range(10))
+
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "10"
+        assert rate_limited_requests_total.value(("ip",)) == before + 1
@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.middleware import WRITE_MARKER_HEADER, ReadYourWritesMiddleware
+from app.crud.crud_health_record import health_record as crud_health_record
+from app.crud.crud_user import user_crud
+from app.database import Base
+from app.db.routing import RoutingSession, StickinessTracker, decode_write_marker, encode_write_marker
+from app.models.health_record import HealthRecord
+from app.models.user import User
+from app.schemas.health_record import HealthRecordUpdate
+
+
+@pytest.fixture()
+def engines(tmp_path):
+    """主库与只读副本使用两个独立的 SQLite 文件"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        Base.metadata.create_all(bind=engine)
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+def make_session_factory(primary, replica, sticky_seconds):
+    """创建带读写分离路由的会话工厂"""
+    return sessionmaker(
+        bind=primary,
+        class_=RoutingSession,
+        replicas=[replica],
+        stickiness=StickinessTracker(sticky_seconds),
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+def seed_primary(factory):
+    """只在主库写入用户和记录 (副本为空，可据此判断路由)"""
+    db = factory()
+    user = User(email="route@example.com", username="routeuser", hashed_password="x" * 20)
+    db.add(user)
+    db.flush()
+    db.add(HealthRecord(
+        user_id=user.id,
+        assessed_at=datetime.now() - timedelta(days=1),
+        overall_score=80.0,
+        assessment_type="quick",
+        data_source="manual",
+    ))
+    db.commit()
+    db.close()
+    return user.id
+
+
+class TestReplicaRouting:
+    """读写分离路由测试类"""
+
+    def test_read_only_methods_use_replica(self, engines):
+        """测试只读 CRUD 方法走副本，普通查询走主库"""
+        primary, replica = engines
+        factory = make_session_factory(primary, replica, sticky_seconds=0)
+        user_id = seed_primary(factory)
+
+        db = factory()
+        assert crud_health_record.get_multi(db, user_id=user_id) == []
+        assert crud_health_record.count_records(db, user_id=user_id) == 0
+        assert user_crud.get_count(db) == 0
+        assert user_crud.get_user_by_id(db, user_id=user_id) is not None
+        assert crud_health_record.get_latest_record(db, user_id=user_id) is not None
+        db.close()
+
+    def test_sticky_window_routes_reads_to_primary(self, engines):
+        """测试用户写入后的粘滞窗口内读取走主库"""
+        primary, replica = engines
+        factory = make_session_factory(primary, replica, sticky_seconds=60)
+        user_id = seed_primary(factory)
+
+        db = factory()
+        assert len(crud_health_record.get_multi(db, user_id=user_id)) == 1
+        # 与该用户无关的只读查询不受粘滞影响，仍走副本
+        assert user_crud.get_count(db) == 0
+        db.close()
+
+    def test_session_with_writes_stays_on_primary(self, engines):
+        """测试同一会话内写入后的读取走主库"""
+        primary, replica = engines
+        factory = make_session_factory(primary, replica, sticky_seconds=0)
+        user_id = seed_primary(factory)
+
+        db = factory()
+        db.add(HealthRecord(
+            user_id=user_id,
+            assessed_at=datetime.now(),
+            overall_score=85.0,
+            assessment_type="quick",
+            data_source="manual",
+        ))
+        db.flush()
+        assert crud_health_record.count_records(db, user_id=user_id) == 2
+        db.rollback()
+        db.close()
+
+    def test_bulk_writes_mark_user_sticky(self, engines):
+        """测试批量 UPDATE 语句 (不经过 ORM flush) 提交后同样进入粘滞窗口"""
+        primary, replica = engines
+        # 主库与副本写入相同数据 (模拟已复制)，之后的批量写入只到达主库
+        user_id = seed_primary(make_session_factory(primary, replica, sticky_seconds=0))
+        seed_primary(make_session_factory(replica, replica, sticky_seconds=0))
+        factory = make_session_factory(primary, replica, sticky_seconds=60)
+
+        db = factory()
+        record_id = crud_health_record.get_latest_record(db, user_id=user_id).id
+        updated = crud_health_record.bulk_update(
+            db, user_id=user_id, record_ids=[record_id], obj_in=HealthRecordUpdate(overall_score=30.0)
+        )
+        assert updated == [record_id]
+        db.close()
+
+        db = factory()
+        assert [r.overall_score for r in crud_health_record.get_multi(db, user_id=user_id)] == [30.0]
+        db.close()
+        # 与写入无关的新会话在窗口外会读到副本上的旧数据，说明上面的读取确实由粘滞路由到主库
+        stale = make_session_factory(primary, replica, sticky_seconds=0)()
+        assert [r.overall_score for r in crud_health_record.get_multi(stale, user_id=user_id)] == [80.0]
+        stale.close()
+
+    def test_soft_bulk_delete_marks_user_sticky(self, engines, monkeypatch):
+        """测试软删除的批量 UPDATE 提交后进入粘滞窗口，读取不会从副本读到已删除的记录"""
+        monkeypatch.setattr(settings, "HEALTH_RECORDS_SOFT_DELETE", True)
+        primary, replica = engines
+        user_id = seed_primary(make_session_factory(primary, replica, sticky_seconds=0))
+        seed_primary(make_session_factory(replica, replica, sticky_seconds=0))
+        factory = make_session_factory(primary, replica, sticky_seconds=60)
+
+        db = factory()
+        record_id = crud_health_record.get_latest_record(db, user_id=user_id).id
+        assert crud_health_record.bulk_delete(db, user_id=user_id, record_ids=[record_id]) == [record_id]
+        db.close()
+
+        db = factory()
+        assert crud_health_record.get_multi(db, user_id=user_id) == []
+        assert crud_health_record.count_records(db, user_id=user_id) == 0
+        db.close()
+        stale = make_session_factory(primary, replica, sticky_seconds=0)()
+        assert crud_health_record.count_records(stale, user_id=user_id) == 1
+        stale.close()
+
+    def test_write_marker_routes_reads_on_other_worker_to_primary(self, engines):
+        """测试写入响应返回签名标记，带回标记的请求在其他工作进程 (独立的进程内记录) 也走主库"""
+        primary, replica = engines
+        user_id = seed_primary(make_session_factory(primary, replica, sticky_seconds=0))
+        seed_primary(make_session_factory(replica, replica, sticky_seconds=0))
+        # 两个工作进程各自的会话工厂与进程内记录
+        writer = make_session_factory(primary, replica, sticky_seconds=60)
+        reader = make_session_factory(primary, replica, sticky_seconds=60)
+
+        app = FastAPI()
+        app.add_middleware(ReadYourWritesMiddleware, secret="test-secret", window_seconds=60)
+
+        @app.post("/write")
+        def write():
+            with writer() as db:
+                record_id = crud_health_record.get_latest_record(db, user_id=user_id).id
+                crud_health_record.bulk_update(
+                    db, user_id=user_id, record_ids=[record_id], obj_in=HealthRecordUpdate(overall_score=30.0)
+                )
+            return {}
+
+        @app.get("/read")
+        def read():
+            with reader() as db:
+                return [r.overall_score for r in crud_health_record.get_multi(db, user_id=user_id)]
+
+        client = TestClient(app)
+        response = client.post("/write")
+        assert decode_write_marker(response.headers[WRITE_MARKER_HEADER], "test-secret")[0] == user_id
+        assert "last_write=" in response.headers["set-cookie"]
+        assert client.get("/read").json() == [30.0]
+
+        # 不带标记或标记签名不符时只能依赖进程内记录，读到副本上的旧数据
+        assert TestClient(app).get("/read").json() == [80.0]
+        forged = encode_write_marker(user_id, datetime.now().timestamp(), "other-secret")
+        assert TestClient(app).get("/read", headers={WRITE_MARKER_HEADER: forged}).json() == [80.0]
+        # 只读请求不签发新标记
+        assert WRITE_MARKER_HEADER not in TestClient(app).get("/read").headers
+
+    def test_tracker_purges_expired_users(self, monkeypatch):
+        """测试进程内记录在写入时清理过期用户，不随写入过的用户数无限增长"""
+        now = [1000.0]
+        monkeypatch.setattr("app.db.routing.time.monotonic", lambda: now[0])
+        tracker = StickinessTracker(5)
+        for user_id in range(100):
+            tracker.mark(user_id)
+        now[0] += 10
+        tracker.mark(1000)
+        assert list(tracker._deadlines) == [1000]
+        assert tracker.is_sticky(1000) and not tracker.is_sticky(1)
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+
+from app.database import Base
+from app.db.seeding import (
+    RECORD_COLUMNS,
+    SeedPlan,
+    chunk_rng,
+    count_seed_users,
+    delete_seed_data,
+    generate_records,
+    health_levels,
+    seed_chunk,
+)
+from app.models.health_record import HealthRecord
+from app.models.user import User
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class TestSeeding:
+    """模拟数据生成测试类"""
+
+    def test_generation_is_deterministic_and_ordered(self):
+        """相同种子生成相同数据，单个用户内时间递增"""
+        first = generate_records([1, 2, 3], 50, START, 90, chunk_rng(7, 0))
+        second = generate_records([1, 2, 3], 50, START, 90, chunk_rng(7, 0))
+        other = generate_records([1, 2, 3], 50, START, 90, chunk_rng(7, 1))
+
+        assert tuple(first) == RECORD_COLUMNS
+        for name in RECORD_COLUMNS:
+            assert np.array_equal(first[name], second[name])
+        assert not np.array_equal(first["overall_score"], other["overall_score"])
+
+        assert len(first["user_id"]) == 150
+        times = first["assessed_at"].reshape(3, 50)
+        assert (np.diff(times, axis=1) > np.timedelta64(0, "s")).all()
+        assert first["overall_score"].min() >= 0 and first["overall_score"].max() <= 100
+
+    def test_scores_are_time_correlated(self):
+        """相邻记录的综合评分明显正相关"""
+        scores = generate_records([1], 2000, START, 365, chunk_rng(1, 0))["overall_score"]
+        assert np.corrcoef(scores[:-1], scores[1:])[0, 1] > 0.5
+
+    def test_health_levels_match_crud_thresholds(self):
+        """等级阈值与 CRUD 一致"""
+        levels = health_levels(np.array([95.0, 80.0, 79.9, 60.0, 40.0, 39.9]))
+        assert levels.tolist() == ["excellent", "excellent", "good", "good", "fair", "poor"]
+
+    def test_seed_chunk_and_cleanup(self):
+        """分块写入用户与记录，并可按前缀清理"""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[User.__table__, HealthRecord.__table__])
+        plan = SeedPlan(users=5, records_per_user=20, start=START, span_days=30, users_per_chunk=3)
+
+        with engine.begin() as conn:
+            written = sum(
+                seed_chunk(conn, User.__table__, HealthRecord.__table__, plan, chunk, "x" * 60)
+                for chunk in range(2)
+            )
+            assert written == plan.total_records
+            assert count_seed_users(conn, User.__table__) == 5
+            per_user = conn.execute(
+                select(func.count()).select_from(HealthRecord.__table__).group_by(HealthRecord.user_id)
+            ).scalars().all()
+            assert per_user == [20] * 5
+
+            assert delete_seed_data(conn, User.__table__, HealthRecord.__table__) == 5
+            assert conn.execute(select(func.count()).select_from(HealthRecord.__table__)).scalar_one() == 0
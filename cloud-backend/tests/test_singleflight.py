@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.metrics import singleflight_calls_total
+from app.core.singleflight import SingleFlight, normalize_key
+from app.schemas.health_record import TimeRange
+
+
+def _wait_for_followers(name: str, expected: int) -> None:
+    """等待指定数量的请求加入在途调用"""
+    for _ in range(1000):
+        if singleflight_calls_total.value((name, "shared")) >= expected:
+            return
+        threading.Event().wait(0.005)
+    raise AssertionError("等待者未加入在途调用")
+
+
+class TestSingleFlight:
+    """请求合并测试类"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """相同键的并发调用只执行一次并共享结果"""
+        flight = SingleFlight("test_share")
+        release = threading.Event()
+        executions = []
+
+        def compute():
+            executions.append(1)
+            release.wait(5)
+            return {"value": 42}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            leader = pool.submit(flight.do, ("user", 1), compute)
+            while flight.in_flight() == 0:
+                threading.Event().wait(0.001)
+            followers = [pool.submit(flight.do, ("user", 1), compute) for _ in range(4)]
+            _wait_for_followers("test_share", 4)
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+
+        assert len(executions) == 1
+        assert results[0] == ({"value": 42}, False)
+        assert all(result is results[0][0] and shared for result, shared in results[1:])
+        assert singleflight_calls_total.value(("test_share", "executed")) == 1
+        assert singleflight_calls_total.value(("test_share", "shared")) == 4
+        assert flight.in_flight() == 0
+
+    def test_error_propagates_to_waiters(self):
+        """执行者的异常传给所有等待者，且不会残留在途调用"""
+        flight = SingleFlight("test_error")
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "key", compute)
+            while flight.in_flight() == 0:
+                threading.Event().wait(0.001)
+            follower = pool.submit(flight.do, "key", compute)
+            _wait_for_followers("test_error", 1)
+            release.set()
+            for future in (leader, follower):
+                with pytest.raises(ValueError, match="boom"):
+                    future.result()
+
+        assert flight.in_flight() == 0
+
+    def test_forget_starts_new_flight(self):
+        """写入后移除在途调用，新请求重新执行"""
+        flight = SingleFlight("test_forget")
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return len(calls)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(flight.do, (7, "month"), compute)
+            while flight.in_flight() == 0:
+                threading.Event().wait(0.001)
+            assert flight.forget(lambda key: key[0] == 7) == 1
+            release.set()
+            second = flight.do((7, "month"), compute)
+            assert first.result()[1] is False
+
+        assert second == (2, False)
+        assert flight.in_flight() == 0
+
+    def test_disabled_bypasses_coalescing(self):
+        """关闭后每次调用都直接执行"""
+        flight = SingleFlight("test_disabled", enabled=False)
+        assert flight.do("key", lambda: 1) == (1, False)
+        assert flight.in_flight() == 0
+        assert singleflight_calls_total.value(("test_disabled", "executed")) == 0
+
+    def test_normalize_key_uses_enum_values(self):
+        """枚举参数归一化为取值"""
+        assert normalize_key(1, TimeRange.MONTH, None) == normalize_key(1, TimeRange.MONTH.value, None)
@@ -0,0 +1,82 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.middleware import QueryInstrumentationMiddleware
+from app.db.instrumentation import assert_statement_budget, install_query_instrumentation, track_queries
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (name) VALUES ('a'), ('b'), ('c')"))
+    install_query_instrumentation()
+    yield engine
+    engine.dispose()
+
+
+def select_each_item(engine):
+    """逐行查询 (典型的 N+1 写法)"""
+    with engine.connect() as conn:
+        ids = conn.execute(text("SELECT id FROM items ORDER BY id")).scalars().all()
+        for item_id in ids:
+            conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": item_id}).scalar()
+
+
+class TestQueryStats:
+    """SQL 统计测试类"""
+
+    def test_counts_statements_and_repeats(self, engine):
+        """统计语句数并识别重复语句"""
+        with track_queries() as stats:
+            select_each_item(engine)
+        assert stats.statements == 4
+        assert stats.db_time_ms > 0
+        assert stats.repeated(3) == [("SELECT name FROM items WHERE id = ?", 3)]
+
+    def test_nothing_recorded_outside_context(self, engine):
+        """上下文之外不记录"""
+        with track_queries() as stats:
+            pass
+        select_each_item(engine)
+        assert stats.statements == 0
+
+    def test_statement_budget(self, engine):
+        """超出语句预算时断言失败，并列出执行的语句"""
+        with assert_statement_budget(4):
+            select_each_item(engine)
+        with pytest.raises(AssertionError, match="超出预算 2"):
+            with assert_statement_budget(2):
+                select_each_item(engine)
+
+
+class TestQueryInstrumentationMiddleware:
+    """请求级 SQL 统计中间件测试类"""
+
+    def test_server_timing_header(self, engine):
+        """响应头包含数据库耗时和语句数"""
+        app = FastAPI()
+        app.add_middleware(QueryInstrumentationMiddleware, n_plus_one_threshold=3)
+
+        @app.get("/items")
+        def list_items():
+            select_each_item(engine)
+            return {"ok": True}
+
+        with TestClient(app) as client:
+            with assert_statement_budget(4):
+                response = client.get("/items")
+
+        assert response.status_code == 200
+        server_timing = response.headers["server-timing"]
+        assert server_timing.startswith("db;dur=")
+        assert 'desc="4 queries"' in server_timing
+        assert "app;dur=" in server_timing
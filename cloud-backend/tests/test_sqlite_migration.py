@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, func, select
+
+from app.database import Base
+from app.db.seeding import SeedPlan, seed_chunk
+from app.models.health_record import HealthRecord
+from app.models.user import User
+from migrate_sqlite_to_postgresql import DatabaseMigrator, checkpoints_table, split_ranges
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar_one()
+
+
+class TestSqliteMigration:
+    """SQLite 迁移测试类"""
+
+    def test_split_ranges(self):
+        """主键区间切分为连续闭区间"""
+        assert split_ranges(1, 10, 3) == [(1, 4), (5, 8), (9, 10)]
+        assert split_ranges(5, 5, 4) == [(5, 5)]
+        assert split_ranges(1, 0, 2) == []
+
+    def test_migrates_all_tables_and_resumes(self, tmp_path):
+        """迁移用户与健康记录、重映射外键、去重并可断点续传"""
+        source_path = tmp_path / "source.db"
+        source = create_engine(f"sqlite:///{source_path}")
+        target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+        for engine in (source, target):
+            Base.metadata.create_all(engine, tables=[User.__table__, HealthRecord.__table__])
+
+        plan = SeedPlan(users=6, records_per_user=25, start=START, span_days=30, users_per_chunk=6)
+        with source.begin() as conn:
+            seed_chunk(conn, User.__table__, HealthRecord.__table__, plan, 0, "x" * 60)
+        # 目标库已存在同邮箱用户 (去重并映射) 与同用户名不同邮箱的用户 (无法映射，跳过)
+        with target.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {"email": "placeholder@example.com", "username": "placeholder", "hashed_password": "y" * 60},
+                {"email": "seed_00000000@example.com", "username": "existing", "hashed_password": "y" * 60},
+                {"email": "other@example.com", "username": "seed_00000001", "hashed_password": "y" * 60},
+            ])
+
+        migrator = DatabaseMigrator(str(source_path), str(target.url), chunk_size=10, workers=2)
+        assert migrator.run_migration()
+
+        assert count(target, User.__table__) == 3 + 4
+        assert count(target, HealthRecord.__table__) == 5 * 25
+        with source.connect() as conn:
+            source_scores = conn.execute(
+                select(HealthRecord.overall_score).join(User).where(User.username == "seed_00000003")
+                .order_by(HealthRecord.assessed_at)
+            ).scalars().all()
+        with target.connect() as conn:
+            target_scores = conn.execute(
+                select(HealthRecord.overall_score).join(User).where(User.username == "seed_00000003")
+                .order_by(HealthRecord.assessed_at)
+            ).scalars().all()
+            shards = conn.execute(select(checkpoints_table.c.shard)).scalars().all()
+        assert target_scores == source_scores
+        assert len(shards) == 4
+
+        # 再次运行: 所有分片已完成，不会重复写入
+        assert DatabaseMigrator(str(source_path), str(target.url), chunk_size=10, workers=2).run_migration()
+        assert count(target, HealthRecord.__table__) == 5 * 25
@@ -111,12 +111,12 @@ class NetworkUtil {
     const url = `${apiConfig.baseUrl}${endpoint}`;
     let lastError = null;
 
-    // 重试机制
+    // 重试机制：只重试网络错误和 502/503/504，服务端给出 Retry-After 时按其等待
     for (let attempt = 1; attempt <= maxRetries; attempt++) {
       try {
         const result = await this._singleRequest(url, method, data, timeout);
         
-        if (result.success || attempt === maxRetries) {
+        if (result.success || attempt === maxRetries || !this._isRetryable(result)) {
           return result;
         }
         
@@ -124,13 +124,13 @@ class NetworkUtil {
         
         // 延迟后重试
         if (attempt < maxRetries) {
-          await this._delay(retryDelay * attempt);
+          await this._delay(this._retryDelay(result, retryDelay, attempt));
           console.log(`请求重试第 ${attempt} 次:`, url);
         }
       } catch (error) {
         lastError = error;
         if (attempt < maxRetries) {
-          await this._delay(retryDelay * attempt);
+          await this._delay(this._retryDelay(null, retryDelay, attempt));
         }
       }
     }
@@ -142,6 +142,25 @@ class NetworkUtil {
     };
   }
 
+  /**
+   * 是否值得重试（4xx 等确定性错误重试也不会成功，只会增加服务端负载）
+   */
+  _isRetryable(result) {
+    if (result.errorType !== 'HTTP_ERROR') {
+      return result.errorType !== 'DOMAIN_ERROR';
+    }
+    return [502, 503, 504].includes(result.statusCode);
+  }
+
+  /**
+   * 重试等待时间：优先使用 Retry-After，否则指数退避，并加随机抖动避免客户端同时重试
+   */
+  _retryDelay(result, retryDelay, attempt) {
+    const retryAfter = result && result.retryAfter;
+    const base = retryAfter ? retryAfter * 1000 : retryDelay * Math.pow(2, attempt - 1);
+    return base + Math.random() * base * 0.5;
+  }
+
   /**
    * 单次请求
    */
@@ -153,7 +172,9 @@ class NetworkUtil {
         data: data,
         header: {
           'Content-Type': 'application/json',
-          'Accept': 'application/json'
+          'Accept': 'application/json',
+          // 客户端超时（秒），服务端据此缩短请求截止时间，超时后不再继续执行查询
+          'X-Request-Timeout': String(timeout / 1000)
         },
         timeout: timeout,
         success: (res) => {
@@ -166,11 +187,14 @@ class NetworkUtil {
               statusCode: res.statusCode
             });
           } else {
+            const header = res.header || {};
+            const retryAfter = parseInt(header['Retry-After'] || header['retry-after'], 10);
             resolve({
               success: false,
               error: this._parseHttpError(res),
               errorType: 'HTTP_ERROR',
-              statusCode: res.statusCode
+              statusCode: res.statusCode,
+              retryAfter: Number.isNaN(retryAfter) ? null : retryAfter
             });
           }
         },